@@ -1,6 +1,11 @@
 import sys
 import os
 
+# the startup report (the --startup_report=1 option) times the imports, so it starts before the application imports
+if '--startup_report=1' in sys.argv[1:]:
+    from appCommon.StartupReport import startup_report
+    startup_report.start()
+
 from PyQt5 import QtWidgets
 from PyQt5.QtCore import QSettings, Qt
 from app_Main import App
@@ -53,6 +58,15 @@ if __name__ == '__main__':
               "Your Python version is: %s.%s" % (MIN_VERSION_MAJOR, MIN_VERSION_MINOR, str(major_v), str(minor_v)))
         sys.exit(0)
 
+    # run as a headless job server for Tcl scripts; the workers start their own FlatCAM application
+    # The requests are unpickled so a TCP address (--server=host:port) always requires a key: it is read from the
+    # --authkey=<key_file> file (default ~/.flatcam_jobserver.key), which is created, readable only by the user, with a
+    # new random key if it does not exist. The clients have to use the same key file.
+    if App.cmd_line_server is not None:
+        from appCommon.JobServer import JobServer
+        sys.exit(JobServer(App.cmd_line_server, workers=App.cmd_line_workers,
+                           key_file=App.cmd_line_authkey).serve_forever())
+
     debug_trace()
 
     # apply High DPI support
@@ -0,0 +1,360 @@
+# ##########################################################
+# FlatCAM: 2D Post-processing for Manufacturing            #
+# Date: 10/18/2026                                         #
+# MIT Licence                                              #
+# ##########################################################
+
+"""
+Auto-levelling of G-Code over a probed height map.
+
+The probed heights are interpolated for all the points of a block of G-Code at once: bilinear over a regular grid
+of probe points (see ``appCommon.bilinearInterpolator``) or the height of the nearest probe point (the probe point
+in whose Voronoi cell the point lies) for probe points placed anywhere. The G-Code is processed in blocks of lines
+so the levelled program can be written out while it is made.
+"""
+
+import re
+import math
+import numpy as np
+
+from appCommon.bilinearInterpolator import bilinearInterpolator
+
+import logging
+
+log = logging.getLogger('base')
+
+# the GRBL answer to a G38.2 probing command: [PRB:x,y,z:success]
+grbl_probe_re = re.compile(r'\[PRB:\s*([+-]?[\d.]+),\s*([+-]?[\d.]+),\s*([+-]?[\d.]+)(?::(\d))?\]')
+
+gcode_word_re = re.compile(r'([A-Z])\s*([+-]?\d*\.?\d+)')
+gcode_comment_re = re.compile(r'\(.*?\)|;.*$')
+# a linear move with X and Y, and optionally Z, in the format of the FlatCAM preprocessors
+fast_move_re = re.compile(
+    r'^(G0?[01])\s*X([+-]?\d*\.?\d+)\s*Y([+-]?\d*\.?\d+)\s*(?:Z([+-]?\d*\.?\d+))?\s*$')
+
+# how many distances are calculated at once when searching for the nearest probe point
+NEAREST_CHUNK = 4000000
+
+
+def parse_grbl_probes(text):
+    """
+    Extract the probed points from the answers of a GRBL controller to the probing commands.
+
+    :param text:    the text returned by the GRBL controller; a string or a list of lines (bytes or strings)
+    :type text:     str | list
+    :return:        the probed points as a (N, 3) array of x, y, z; only the successful probes are returned
+    :rtype:         numpy.ndarray
+    """
+    if not isinstance(text, str):
+        text = '\n'.join(line.decode('utf-8', 'replace') if isinstance(line, bytes) else str(line) for line in text)
+
+    probes = [
+        (float(x), float(y), float(z))
+        for x, y, z, success in grbl_probe_re.findall(text.upper()) if success != '0'
+    ]
+    return np.array(probes, dtype=float).reshape(-1, 3)
+
+
+def parse_grbl_offset(text, name='G54'):
+    """
+    Extract a coordinate offset from the answer of a GRBL controller to the '$#' command: [G54:x,y,z]
+
+    :param text:    the text returned by the GRBL controller
+    :type text:     str
+    :param name:    the name of the offset: G54 ... G59, G28, G30, G92
+    :type name:     str
+    :return:        the offset as an array of x, y, z; zeros if it is not found
+    :rtype:         numpy.ndarray
+    """
+    match = re.search(r'\[%s:\s*([+-]?[\d.]+),\s*([+-]?[\d.]+),\s*([+-]?[\d.]+)' % name, text.upper())
+    if match is None:
+        return np.zeros(3)
+    return np.array([float(v) for v in match.groups()])
+
+
+def nearest_indexes(points, x, y):
+    """
+    For each of the (x, y) locations find the index of the nearest point.
+
+    :param points:  (N, 2) or (N, 3) array of points; only the first two columns are used
+    :param x:       array of X coordinates of the locations
+    :param y:       array of Y coordinates of the locations
+    :return:        array of indexes in points, one for each location
+    """
+    px = points[:, 0]
+    py = points[:, 1]
+    nr_points = len(px)
+
+    indexes = np.empty(len(x), dtype=np.int64)
+    chunk = max(1, NEAREST_CHUNK // max(1, nr_points))
+    for start in range(0, len(x), chunk):
+        stop = start + chunk
+        dist = (x[start:stop, None] - px[None, :]) ** 2 + (y[start:stop, None] - py[None, :]) ** 2
+        indexes[start:stop] = np.argmin(dist, axis=1)
+    return indexes
+
+
+class VoronoiInterpolator:
+    """
+    The height of a location is the height of the nearest probe point, that is, each probe point sets the height
+    for its Voronoi cell.
+    """
+
+    def __init__(self, points):
+        """
+
+        :param points:  (N, 3) array of probed points: x, y, z
+        """
+        self.points = np.asarray(points, dtype=float).reshape(-1, 3)
+        if not len(self.points):
+            raise ValueError("No probe points.")
+
+    def interpolate(self, x, y):
+        """
+        The heights for many locations at once.
+
+        :param x:   array of X coordinates
+        :param y:   array of Y coordinates
+        :return:    array of heights
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        return self.points[nearest_indexes(self.points, x, y), 2]
+
+
+def make_interpolator(points, method):
+    """
+    Make the height map interpolator for the probed points.
+
+    :param points:  (N, 3) array of probed points: x, y, z
+    :param method:  'b' for bilinear interpolation over a grid of probe points, 'v' for the Voronoi method
+    :return:        an object with an interpolate(x, y) method
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    if method == 'b':
+        xs = np.unique(points[:, 0])
+        ys = np.unique(points[:, 1])
+        # a grid needs at least two rows and two columns; a single row or column is levelled as Voronoi cells
+        if len(xs) > 1 and len(ys) > 1:
+            return bilinearInterpolator(points)
+    return VoronoiInterpolator(points)
+
+
+def probe_spacing(points):
+    """
+    The smallest distance between two different probe coordinates on each axis. It is used as the segment length
+    when the G-Code was not made with segmented moves.
+
+    :param points:  (N, 3) array of probed points
+    :return:        tuple (x spacing, y spacing); 0.0 for an axis with a single coordinate
+    """
+    spacing = []
+    for axis in (0, 1):
+        coords = np.unique(np.round(points[:, axis], 6))
+        spacing.append(float(np.min(np.diff(coords))) if len(coords) > 1 else 0.0)
+    return tuple(spacing)
+
+
+def level_gcode(lines, interpolator, step_x=0.0, step_y=0.0, decimals=4, block_size=100000):
+    """
+    Add the probed heights to the Z of the moves in the G-Code. The feed moves (G1) are split in segments no longer
+    than step_x on the X axis and step_y on the Y axis (as CNCjob.segment() does) so the tool follows the height map
+    between the probe points; the Z of each segment end is the programmed Z plus the height map at that location.
+    The rapid moves keep their XY path and only their Z (when they have one) is levelled. The arcs and the moves
+    made in relative mode (G91) are not changed.
+
+    The lines are processed in blocks: the positions are tracked line by line and the segments and their heights
+    are calculated for the whole block at once.
+
+    :param lines:           iterable of G-Code lines
+    :param interpolator:    the height map, an object with an interpolate(x, y) method working on arrays
+    :param step_x:          the maximum length of a segment on the X axis; no splitting on X if <= 0
+    :param step_y:          the maximum length of a segment on the Y axis; no splitting on Y if <= 0
+    :param decimals:        the number of decimals of the coordinates of the levelled moves
+    :param block_size:      how many lines are processed at once
+    :return:                a generator of blocks of levelled G-Code (strings, each ending with a new line)
+    """
+    state = {
+        'motion': None,
+        'absolute': True,
+        'x': math.nan,
+        'y': math.nan,
+        'z': math.nan
+    }
+
+    block = []
+    for line in lines:
+        block.append(line.rstrip('\r\n'))
+        if len(block) >= block_size:
+            yield _level_block(block, state, interpolator, step_x, step_y, decimals)
+            block = []
+    if block:
+        yield _level_block(block, state, interpolator, step_x, step_y, decimals)
+
+
+def _level_block(block, state, interpolator, step_x, step_y, decimals):
+    """
+    Level a block of G-Code lines. See level_gcode().
+
+    :param block:           list of G-Code lines, without line endings
+    :param state:           dict with the modal state of the machine at the start of the block; it is updated
+    :return:                the levelled block as a string
+    """
+    motion = state['motion']
+    absolute = state['absolute']
+    cx, cy, cz = state['x'], state['y'], state['z']
+    isnan = math.isnan
+
+    # for each levelled line: its index in the block, its motion word, the other words and the move
+    line_idx = []
+    codes = []
+    others = {}
+    split = []      # True for a feed move with XY that is split; False for a move that only gets its Z
+    xy_moves = []
+    starts = []
+    ends = []
+
+    for idx, line in enumerate(block):
+        # most of the lines are simple linear moves in absolute mode
+        match = fast_move_re.match(line) if absolute else None
+        if match is not None:
+            code, nx, ny, nz = match.groups()
+            motion = 1 if code[-1] == '1' else 0
+            nx = float(nx)
+            ny = float(ny)
+            nz = float(nz) if nz is not None else cz
+            if motion == 1 or match.group(4) is not None:
+                line_idx.append(idx)
+                codes.append(code)
+                split.append(motion == 1 and not (isnan(cx) or isnan(cy)))
+                xy_moves.append(True)
+                starts.append((cx, cy, nz if isnan(cz) else cz))
+                ends.append((nx, ny, nz))
+            cx, cy, cz = nx, ny, nz
+            continue
+
+        if '(' in line or ';' in line:
+            line = gcode_comment_re.sub('', line)
+        words = gcode_word_re.findall(line.upper())
+        if not words:
+            continue
+
+        xyz = {}
+        line_code = None
+        line_other = []
+        for letter, value in words:
+            if letter == 'G':
+                g = float(value)
+                if g in (0.0, 1.0, 2.0, 3.0):
+                    motion = int(g)
+                    line_code = 'G%02d' % motion if value.startswith('0') else 'G%d' % motion
+                    continue
+                if g == 90.0:
+                    absolute = True
+                elif g == 91.0:
+                    absolute = False
+                line_other.append(letter + value)
+            elif letter in 'XYZ':
+                xyz[letter] = float(value)
+            else:
+                line_other.append(letter + value)
+
+        if not xyz:
+            continue
+
+        if not absolute:
+            # the relative moves are not levelled and the position is lost
+            cx = cy = cz = math.nan
+            continue
+
+        nx = xyz.get('X', cx)
+        ny = xyz.get('Y', cy)
+        nz = xyz.get('Z', cz)
+
+        # the rapid moves without Z keep the Z the tool has
+        levelled = motion == 1 or (motion == 0 and 'Z' in xyz)
+        if levelled and not (isnan(nx) or isnan(ny)):
+            has_xy = 'X' in xyz or 'Y' in xyz
+            if line_other:
+                others[len(line_idx)] = ' '.join(line_other)
+            line_idx.append(idx)
+            codes.append(line_code if line_code else ('G%02d' % motion))
+            # the moves where the position is not known yet can't be split
+            split.append(motion == 1 and has_xy and not (isnan(cx) or isnan(cy)))
+            xy_moves.append(has_xy)
+            starts.append((cx, cy, nz if isnan(cz) else cz))
+            ends.append((nx, ny, nz))
+
+        cx, cy, cz = nx, ny, nz
+
+    state['motion'] = motion
+    state['absolute'] = absolute
+    state['x'], state['y'], state['z'] = cx, cy, cz
+
+    if not line_idx:
+        return '\n'.join(block) + '\n'
+
+    starts = np.array(starts, dtype=float)
+    ends = np.array(ends, dtype=float)
+    split = np.array(split, dtype=bool)
+
+    # the number of segments of each move
+    delta = ends - starts
+    counts = np.ones(len(starts), dtype=np.int64)
+    if step_x > 0:
+        counts = np.maximum(counts, np.ceil(np.abs(delta[:, 0]) / step_x - 1e-9).astype(np.int64))
+    if step_y > 0:
+        counts = np.maximum(counts, np.ceil(np.abs(delta[:, 1]) / step_y - 1e-9).astype(np.int64))
+    counts[~split] = 1
+
+    # the end points of all the segments
+    move_of_pt = np.repeat(np.arange(len(counts)), counts)
+    first_pt = np.cumsum(counts) - counts
+    seg_nr = np.arange(len(move_of_pt)) - first_pt[move_of_pt] + 1
+    t = (seg_nr / counts[move_of_pt])[:, None]
+    pts = starts[move_of_pt] + delta[move_of_pt] * t
+
+    heights = interpolator.interpolate(pts[:, 0], pts[:, 1])
+    levelled_z = pts[:, 2] + heights
+
+    # the text of all the segments
+    fmt = '%%s X%%.%df Y%%.%df Z%%.%df' % (decimals, decimals, decimals)
+    seg_codes = [codes[k] for k in move_of_pt.tolist()]
+    seg_text = list(map(fmt.__mod__, zip(seg_codes, pts[:, 0].tolist(), pts[:, 1].tolist(), levelled_z.tolist())))
+
+    out = list(block)
+    counts = counts.tolist()
+    first_pt = first_pt.tolist()
+    for k, idx in enumerate(line_idx):
+        first = first_pt[k]
+        if not xy_moves[k] or isnan(levelled_z[first]):
+            # a move only on Z or a move made before the Z is known
+            seg_text[first] = fmt_words(codes[k], pts[first], levelled_z[first], xy_moves[k], decimals)
+        if k in others:
+            seg_text[first] += ' ' + others[k]
+
+        if counts[k] == 1:
+            out[idx] = seg_text[first]
+        else:
+            out[idx] = '\n'.join(seg_text[first:first + counts[k]])
+
+    return '\n'.join(out) + '\n'
+
+
+def fmt_words(code, point, z, has_xy, decimals):
+    """
+    The text of a move that has no X and Y words or no Z word.
+
+    :param code:        the motion word
+    :param point:       the (x, y, z) end of the move
+    :param z:           the levelled Z or NaN if the Z is not known
+    :param has_xy:      if the move has X and Y words
+    :param decimals:    the number of decimals of the coordinates
+    :return:            the text of the move
+    """
+    words = [code]
+    if has_xy:
+        words.append('X%.*f Y%.*f' % (decimals, point[0], decimals, point[1]))
+    if not math.isnan(z):
+        words.append('Z%.*f' % (decimals, z))
+    return ' '.join(words)
@@ -12,8 +12,10 @@
 # ##########################################################
 from PyQt5 import QtCore
 
-from shapely.geometry import Polygon, Point, LineString
+from shapely.geometry import Polygon, MultiPolygon, Point, LineString
 from shapely.ops import unary_union
+from shapely.prepared import prep
+from rtree import index as rtindex
 
 from appGUI.VisPyVisuals import ShapeCollection
 from appTool import AppTool
@@ -281,6 +283,10 @@ class ExclusionAreas(QtCore.QObject):
         self.strategy_button = None
         self.cnc_button = None
 
+        # routers for the travel lines, one for each tool diameter, made for the current exclusion areas
+        self.routers = {}
+        self.routers_signature = None
+
     def on_add_area_click(self, shape_button, overz_button, strategy_radio, cnc_button, solid_geo, obj_type):
         """
 
@@ -714,7 +720,53 @@ class ExclusionAreas(QtCore.QObject):
     def travel_coordinates(self, start_point, end_point, tooldia):
         """
         WIll create a path the go around the exclusion areas on the shortest path when travelling (at a Z above the
-        material).
+        material). The path is found by the router made for the tool diameter (see ExclusionRouter).
+
+        :param start_point:     X,Y coordinates for the start point of the travel line
+        :type start_point:      tuple
+        :param end_point:       X,Y coordinates for the destination point of the travel line
+        :type end_point:        tuple
+        :param tooldia:         THe tool diameter used and which generates the travel lines
+        :type tooldia           float
+        :return:                A list of x,y tuples that describe the avoiding path
+        :rtype:                 list
+        """
+        if not self.exclusion_areas_storage:
+            return [[None, end_point]]
+
+        travels = self.get_router(tooldia).travel_coordinates(start_point, end_point)
+        if travels is None:
+            # the router could not find a path that goes around the areas
+            travels = self.outline_travel_coordinates(start_point, end_point, tooldia)
+        return travels
+
+    def get_router(self, tooldia):
+        """
+        The router for the current exclusion areas and the given tool diameter. The routers are made once and are
+        dropped when the exclusion areas change.
+
+        :param tooldia:         THe tool diameter used and which generates the travel lines
+        :type tooldia           float
+        :return:                the router
+        :rtype:                 ExclusionRouter
+        """
+        # add a little something to the half diameter, to make sure that we really don't enter in the exclusion zones
+        buffered_distance = (tooldia / 2.0) + (0.1 if self.app.defaults['units'] == 'MM' else 0.00393701)
+
+        # the routers keep a reference to the shapes so the id() of the shapes can't be reused while they are stored
+        signature = tuple((id(area['shape']), area['strategy'], area['overz']) for area in self.exclusion_areas_storage)
+        if signature != self.routers_signature:
+            self.routers = {}
+            self.routers_signature = signature
+
+        if buffered_distance not in self.routers:
+            self.routers[buffered_distance] = ExclusionRouter(self.exclusion_areas_storage, buffered_distance)
+        return self.routers[buffered_distance]
+
+    def outline_travel_coordinates(self, start_point, end_point, tooldia):
+        """
+        WIll create a path the go around the exclusion areas by following their outline when travelling (at a Z above
+        the material).
 
         :param start_point:     X,Y coordinates for the start point of the travel line
         :type start_point:      tuple
@@ -896,6 +948,264 @@ class ExclusionAreas(QtCore.QObject):
         return ret_list
 
 
+class ExclusionRouter:
+    """
+    Finds the travel paths around the exclusion areas for one tool diameter.
+
+    The areas are buffered once and kept in a R-tree so a travel line that does not hit any area is returned at once.
+    For the areas with the 'around' strategy a visibility graph is made between the vertices of their outlines and
+    the shortest paths between all the vertices are calculated once; a detour is the shortest path from the start
+    point to a vertex visible from it, through the graph, to a vertex visible from the end point. The travel lines
+    that still hit areas with the 'over' strategy go over them at the area Over Z.
+    """
+
+    # how many points have their visible vertices kept
+    visibility_cache_size = 10000
+
+    def __init__(self, areas, buffered_distance):
+        """
+
+        :param areas:               the exclusion areas storage, list of dicts (see ExclusionAreas)
+        :type areas:                list
+        :param buffered_distance:   the distance the areas are buffered with
+        :type buffered_distance:    float
+        """
+        # keep a reference to the shapes, their id() is used in ExclusionAreas.get_router() to find the router
+        self.sources = [area['shape'] for area in areas]
+
+        # the buffered areas; each polygon of a multipolygon area is an area of its own
+        self.areas = []
+        for area in areas:
+            shape = area['shape'].buffer(buffered_distance, join_style=2)
+            polygons = shape.geoms if isinstance(shape, MultiPolygon) else [shape]
+            for poly in polygons:
+                if poly.is_empty:
+                    continue
+                self.areas.append({
+                    'shape': poly,
+                    'prepared': prep(poly),
+                    'strategy': area['strategy'],
+                    'overz': area['overz']
+                })
+        self.rti = rtindex.Index((idx, area['shape'].bounds, None) for idx, area in enumerate(self.areas))
+        self.around = [idx for idx, area in enumerate(self.areas) if area['strategy'] == 'around']
+
+        # the vertices of the 'around' areas outlines and the shortest paths between them
+        self.vertices = [
+            pt for idx in self.around for pt in self.areas[idx]['shape'].exterior.coords[:-1]
+        ]
+        self.distances, self.next_vertex = self.shortest_paths()
+
+        self.visibility_cache = {}
+
+    def candidates(self, start, end, strategy=None):
+        """
+        The indexes of the areas whose bounds intersect the bounds of the segment.
+
+        :param start:       (x, y) start of the segment
+        :param end:         (x, y) end of the segment
+        :param strategy:    if not None, only the areas with this strategy are returned
+        :return:            list of indexes in self.areas
+        """
+        # the bounds are calculated here, the LineString bounds are slow
+        bounds = (min(start[0], end[0]), min(start[1], end[1]), max(start[0], end[0]), max(start[1], end[1]))
+        return [
+            idx for idx in self.rti.intersection(bounds)
+            if strategy is None or self.areas[idx]['strategy'] == strategy
+        ]
+
+    def is_blocked(self, start, end, ignored=()):
+        """
+        Check if the segment goes through the inside of an 'around' area. A segment that only touches an
+        outline is not blocked.
+
+        :param start:       (x, y) start of the segment
+        :param end:         (x, y) end of the segment
+        :param ignored:     indexes of the areas that are not checked
+        :return:            True if the segment is blocked
+        """
+        candidates = [idx for idx in self.candidates(start, end, strategy='around') if idx not in ignored]
+        if not candidates:
+            return False
+
+        line = LineString([start, end])
+        for idx in candidates:
+            prepared = self.areas[idx]['prepared']
+            if prepared.intersects(line) and not prepared.touches(line):
+                return True
+        return False
+
+    def shortest_paths(self):
+        """
+        Makes the visibility graph of the vertices and calculates the shortest paths between all of them.
+
+        :return:    tuple of two numpy arrays: the lengths of the shortest paths and, for each pair of vertices,
+                    the vertex that follows the first one on the shortest path (-1 if there is no path)
+        """
+        nr_vertices = len(self.vertices)
+        distances = np.full((nr_vertices, nr_vertices), np.inf)
+        next_vertex = np.full((nr_vertices, nr_vertices), -1, dtype=np.int64)
+        if nr_vertices == 0:
+            return distances, next_vertex
+
+        for i in range(nr_vertices):
+            distances[i, i] = 0.0
+            next_vertex[i, i] = i
+            for j in range(i + 1, nr_vertices):
+                (x0, y0), (x1, y1) = self.vertices[i], self.vertices[j]
+                if not self.is_blocked((x0, y0), (x1, y1)):
+                    dist = np.hypot(x0 - x1, y0 - y1)
+                    distances[i, j] = distances[j, i] = dist
+                    next_vertex[i, j] = j
+                    next_vertex[j, i] = i
+
+        # Floyd-Warshall
+        for k in range(nr_vertices):
+            through_k = distances[:, k, None] + distances[None, k, :]
+            shorter = through_k < distances
+            distances = np.where(shorter, through_k, distances)
+            next_vertex = np.where(shorter, next_vertex[:, k, None], next_vertex)
+        return distances, next_vertex
+
+    def visible_vertices(self, point, ignored):
+        """
+        The vertices that can be reached from the point without going through an 'around' area.
+
+        :param point:       (x, y) point
+        :param ignored:     indexes of the areas that are not checked
+        :return:            tuple (numpy array of vertices indexes, numpy array of their distances to the point)
+        """
+        key = (point, ignored)
+        if key in self.visibility_cache:
+            return self.visibility_cache[key]
+
+        visible = [idx for idx, vertex in enumerate(self.vertices) if not self.is_blocked(point, vertex, ignored)]
+        visible = np.array(visible, dtype=np.int64)
+        vertices = np.array(self.vertices, dtype=float).reshape(-1, 2)[visible]
+        dists = np.hypot(vertices[:, 0] - point[0], vertices[:, 1] - point[1])
+
+        if len(self.visibility_cache) >= self.visibility_cache_size:
+            self.visibility_cache.clear()
+        self.visibility_cache[key] = (visible, dists)
+        return visible, dists
+
+    def detour(self, start_point, end_point):
+        """
+        The shortest path from the start point to the end point that does not go through an 'around' area.
+
+        :param start_point:     (x, y) start point
+        :param end_point:       (x, y) end point
+        :return:                list of (x, y) points, from the start point to the end point; None if there is none
+        """
+        # a path can leave the area where it starts and enter the area where it ends
+        ignored = tuple(
+            idx for idx in self.around
+            if self.areas[idx]['prepared'].intersects(Point(start_point)) or
+            self.areas[idx]['prepared'].intersects(Point(end_point))
+        )
+        if not self.is_blocked(start_point, end_point, ignored):
+            return [start_point, end_point]
+
+        start_vertices, start_dists = self.visible_vertices(start_point, ignored)
+        end_vertices, end_dists = self.visible_vertices(end_point, ignored)
+        if not len(start_vertices) or not len(end_vertices):
+            return None
+
+        lengths = start_dists[:, None] + self.distances[np.ix_(start_vertices, end_vertices)] + end_dists[None, :]
+        best = np.unravel_index(np.argmin(lengths), lengths.shape)
+        if np.isinf(lengths[best]):
+            return None
+
+        vertex = int(start_vertices[best[0]])
+        last = int(end_vertices[best[1]])
+        path = [start_point, self.vertices[vertex]]
+        while vertex != last:
+            vertex = int(self.next_vertex[vertex, last])
+            path.append(self.vertices[vertex])
+        path.append(end_point)
+        return path
+
+    def over_travels(self, start_point, end_point):
+        """
+        The moves that go over the 'over' areas hit by the travel line: for each area, a move at the area Over Z to
+        the point where the line enters the area and a move to the point where it exits the area.
+
+        :param start_point:     (x, y) start point
+        :param end_point:       (x, y) end point
+        :return:                list of [z, (x, y)] moves, without the move to the end point
+        """
+        candidates = self.candidates(start_point, end_point, strategy='over')
+        if not candidates:
+            return []
+
+        travel_line = LineString([start_point, end_point])
+        hit = [idx for idx in candidates if self.areas[idx]['prepared'].intersects(travel_line)]
+
+        # process the Exclusion areas from the closest to the start_point to the farthest
+        origin_point = Point(start_point)
+        hit.sort(key=lambda idx: origin_point.distance(self.areas[idx]['shape']))
+
+        travels = []
+        for idx in hit:
+            area = self.areas[idx]
+            outline = area['shape'].exterior
+            if not travel_line.intersects(outline):
+                continue
+
+            intersection_pts = travel_line.intersection(outline)
+            if isinstance(intersection_pts, Point):
+                # it's just a touch, continue
+                continue
+
+            if hasattr(intersection_pts, 'geoms'):
+                intersection_pts = [Point(c) for geo in intersection_pts.geoms for c in geo.coords]
+            else:
+                intersection_pts = [Point(c) for c in intersection_pts.coords]
+
+            entry_pt = nearest_point(origin_point, intersection_pts)
+            exit_pt = farthest_point(origin_point, intersection_pts)
+            travels += [[float(area['overz']), (entry_pt.x, entry_pt.y)], [None, (exit_pt.x, exit_pt.y)]]
+
+            # create a new LineString to test again for possible other Exclusion zones
+            travel_line = LineString([(exit_pt.x, exit_pt.y), end_point])
+        return travels
+
+    def travel_coordinates(self, start_point, end_point):
+        """
+        The path of the travel line from the start point to the end point, see ExclusionAreas.travel_coordinates().
+
+        :param start_point:     X,Y coordinates for the start point of the travel line
+        :type start_point:      tuple
+        :param end_point:       X,Y coordinates for the destination point of the travel line
+        :type end_point:        tuple
+        :return:                A list of [z, (x, y)] moves; None if there is no path around the 'around' areas
+        :rtype:                 list
+        """
+        start_point = tuple(start_point)
+        end_point = tuple(end_point)
+
+        if start_point == end_point:
+            return [[None, end_point]]
+
+        # fast path, the travel line does not hit any area
+        candidates = self.candidates(start_point, end_point)
+        if not candidates:
+            return [[None, end_point]]
+        travel_line = LineString([start_point, end_point])
+        if not any(self.areas[idx]['prepared'].intersects(travel_line) for idx in candidates):
+            return [[None, end_point]]
+
+        path = self.detour(start_point, end_point) if self.around else [start_point, end_point]
+        if path is None:
+            return None
+
+        travels = []
+        for leg_start, leg_end in zip(path[:-1], path[1:]):
+            travels += self.over_travels(leg_start, leg_end)
+            travels.append([None, leg_end])
+        return travels
+
+
 def farthest_point(origin, points_list):
     """
     Calculate the farthest Point in a list from another Point
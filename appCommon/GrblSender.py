@@ -0,0 +1,315 @@
+# ##########################################################
+# FlatCAM: 2D Post-processing for Manufacturing            #
+# Date: 10/18/2026                                         #
+# MIT Licence                                              #
+# ##########################################################
+
+"""
+Streaming of G-Code to a GRBL controller.
+
+GRBL keeps the received lines in a serial RX buffer (128 bytes) and answers with 'ok' or 'error:N' for each line
+after it was processed. The sender counts the characters of the lines that were sent and not yet answered and sends
+the next line as soon as it fits in the buffer, so the controller planner never runs out of moves (the
+character-counting protocol). The real-time commands (status report, feed hold, resume, reset) are single characters
+that GRBL executes when they arrive; they are sent at once and they do not use the buffer.
+
+The port is any object with the pySerial interface (write(), read(), in_waiting), like the ports made by
+serial.serial_for_url(), so the sender can work over a pty or a loopback port with a simulated controller.
+"""
+
+from PyQt5 import QtCore
+
+from collections import deque
+import threading
+import time
+import re
+
+import logging
+
+log = logging.getLogger('base')
+
+gcode_comment_re = re.compile(r'\(.*?\)|;.*$')
+
+
+class GrblSender(QtCore.QObject):
+    """
+    Streams G-Code lines to a GRBL controller on a background thread.
+    """
+
+    # GRBL serial RX buffer size
+    RX_BUFFER_SIZE = 128
+
+    # the real-time commands
+    REALTIME_COMMANDS = {
+        'status':       b'?',
+        'hold':         b'!',
+        'resume':       b'~',
+        'reset':        b'\x18',
+        'door':         b'\x84',
+        'jog_cancel':   b'\x85'
+    }
+
+    # how often the progress is reported, in seconds
+    PROGRESS_INTERVAL = 0.2
+
+    # the line as it was sent
+    line_sent = QtCore.pyqtSignal(str)
+    # the answers of the controller other than 'ok': status reports, messages, alarms
+    line_received = QtCore.pyqtSignal(str)
+    # the number of the line that made the error and the error
+    error = QtCore.pyqtSignal(int, str)
+    # lines answered, total lines (0 if not known), characters sent per second
+    progress = QtCore.pyqtSignal(int, int, float)
+    # True if all the lines were sent and answered, False if the streaming was stopped or failed
+    finished = QtCore.pyqtSignal(bool)
+
+    def __init__(self, port, rx_buffer_size=None, stop_on_error=True, parent=None):
+        """
+
+        :param port:            the serial port connected to GRBL (the pySerial interface); it should have a read
+                                timeout so the thread can check if it has to stop
+        :param rx_buffer_size:  the size of the GRBL RX buffer; RX_BUFFER_SIZE if None
+        :type rx_buffer_size:   int
+        :param stop_on_error:   if True the streaming stops when GRBL answers with an error
+        :type stop_on_error:    bool
+        :param parent:          the parent QObject
+        """
+        super().__init__(parent=parent)
+
+        self.port = port
+        self.rx_buffer_size = rx_buffer_size if rx_buffer_size else self.RX_BUFFER_SIZE
+        self.stop_on_error = stop_on_error
+
+        self.write_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        # the length of the lines that are in the GRBL buffer, in the order they were sent
+        self.pending = deque()
+        self.buffered = 0
+        self.received = b''
+
+        self.total_lines = 0
+        self.sent_lines = 0
+        self.acked_lines = 0
+        self.sent_chars = 0
+        self.errors = []
+        self.start_time = None
+        self.end_time = None
+        self.result = None
+
+    @staticmethod
+    def clean_line(line):
+        """
+        The line as it is sent to GRBL: without comments and spaces, which GRBL ignores anyway but which take space
+        in the RX buffer.
+
+        :param line:    a G-Code line
+        :type line:     str
+        :return:        the cleaned line; empty if there is nothing to send
+        :rtype:         str
+        """
+        if '(' in line or ';' in line:
+            line = gcode_comment_re.sub('', line)
+        return ''.join(line.split())
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, lines, total=None):
+        """
+        Start streaming the lines on a background thread.
+
+        :param lines:   iterable of G-Code lines; it is consumed on the sender thread
+        :param total:   the number of lines, for the progress report; if None and lines has a length that is used
+        :type total:    int
+        :return:        None
+        """
+        if self.is_running():
+            raise RuntimeError("The sender is already streaming.")
+
+        if total is None:
+            try:
+                total = len(lines)
+            except TypeError:
+                total = 0
+
+        self.total_lines = total
+        self.sent_lines = 0
+        self.acked_lines = 0
+        self.sent_chars = 0
+        self.errors = []
+        self.pending.clear()
+        self.buffered = 0
+        self.received = b''
+        self.result = None
+        self.stop_event.clear()
+
+        self.thread = threading.Thread(target=self.run, args=(lines,), name='GrblSender', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop the streaming. The lines that are already in the GRBL buffer are executed; to stop the machine send a
+        feed hold or a reset with realtime().
+
+        :return:    None
+        """
+        self.stop_event.set()
+
+    def wait(self, timeout=None):
+        """
+        Wait for the streaming to end.
+
+        :param timeout: seconds to wait, forever if None
+        :return:        True if the streaming ended
+        """
+        if self.thread is not None:
+            self.thread.join(timeout)
+        return not self.is_running()
+
+    def realtime(self, command):
+        """
+        Send a real-time command. It can be sent while streaming.
+
+        :param command:     a key of REALTIME_COMMANDS or the command character
+        :type command:      str | bytes
+        :return:            None
+        """
+        if command in self.REALTIME_COMMANDS:
+            data = self.REALTIME_COMMANDS[command]
+        elif isinstance(command, bytes):
+            data = command
+        else:
+            data = command.encode('latin-1')
+
+        with self.write_lock:
+            self.port.write(data)
+
+        if data == self.REALTIME_COMMANDS['reset']:
+            # GRBL empties its buffer on reset
+            self.stop()
+
+    def throughput(self):
+        """
+        :return:    the number of characters sent per second since the start of the streaming
+        """
+        if self.start_time is None:
+            return 0.0
+        elapsed = (self.end_time if self.end_time is not None else time.time()) - self.start_time
+        return self.sent_chars / elapsed if elapsed > 0 else 0.0
+
+    def run(self, lines):
+        """
+        The streaming loop, executed on the sender thread.
+
+        :param lines:   iterable of G-Code lines
+        :return:        None
+        """
+        self.start_time = time.time()
+        self.end_time = None
+
+        try:
+            success = self.stream(lines)
+        except Exception as err:
+            log.debug("GrblSender.run() --> %s" % str(err))
+            self.line_received.emit(str(err))
+            success = False
+
+        self.end_time = time.time()
+        self.result = success
+        self.progress.emit(self.acked_lines, self.total_lines, self.throughput())
+        self.finished.emit(success)
+
+    def stream(self, lines):
+        """
+        Send the lines, keeping the GRBL buffer full, and wait for the answers to all of them.
+
+        :param lines:   iterable of G-Code lines
+        :return:        True if all the lines were sent and answered without errors
+        """
+        last_report = 0.0
+
+        for line in lines:
+            line = self.clean_line(line)
+            if not line:
+                continue
+
+            data = (line + '\n').encode('utf-8')
+            if len(data) > self.rx_buffer_size:
+                self.errors.append((self.sent_lines + 1, 'line too long'))
+                self.error.emit(self.sent_lines + 1, "Line too long for the GRBL buffer: %s" % line)
+                return False
+
+            # wait for room in the GRBL buffer
+            while self.buffered + len(data) > self.rx_buffer_size:
+                if self.stop_event.is_set():
+                    return False
+                self.read_answers()
+
+            if self.stop_event.is_set():
+                return False
+
+            with self.write_lock:
+                self.port.write(data)
+            self.pending.append(len(data))
+            self.buffered += len(data)
+            self.sent_lines += 1
+            self.sent_chars += len(data)
+            self.line_sent.emit(line)
+
+            # read what is already there without waiting
+            if self.port.in_waiting:
+                self.read_answers()
+
+            now = time.time()
+            if now - last_report >= self.PROGRESS_INTERVAL:
+                last_report = now
+                self.progress.emit(self.acked_lines, self.total_lines, self.throughput())
+
+        # wait for the answers to the last lines
+        while self.pending:
+            if self.stop_event.is_set():
+                return False
+            self.read_answers()
+
+        return not self.errors
+
+    def read_answers(self):
+        """
+        Read the answers of GRBL that arrived (waiting up to the port timeout for at least one character) and free
+        the buffer space of the answered lines.
+
+        :return:    None
+        """
+        data = self.port.read(max(1, self.port.in_waiting))
+        if not data:
+            return
+
+        self.received += data
+        *answers, self.received = self.received.split(b'\n')
+        for answer in answers:
+            answer = answer.strip().decode('utf-8', 'replace')
+            if not answer:
+                continue
+
+            if answer == 'ok' or answer.startswith('error'):
+                if self.pending:
+                    self.buffered -= self.pending.popleft()
+                self.acked_lines += 1
+                if answer.startswith('error'):
+                    self.errors.append((self.acked_lines, answer))
+                    self.error.emit(self.acked_lines, answer)
+                    if self.stop_on_error:
+                        self.stop()
+                continue
+
+            self.line_received.emit(answer)
+            if answer.startswith('ALARM'):
+                self.errors.append((self.acked_lines, answer))
+                self.stop()
+            elif answer.startswith('Grbl '):
+                # the controller was reset; the lines in its buffer are lost
+                self.pending.clear()
+                self.buffered = 0
+                self.stop()
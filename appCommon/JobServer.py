@@ -0,0 +1,744 @@
+# ##########################################################
+# FlatCAM: 2D Post-processing for Manufacturing            #
+# Date: 10/18/2026                                         #
+# MIT Licence                                              #
+# ##########################################################
+
+"""
+A long running headless job server for Tcl scripts.
+
+Starting FlatCAM for each script (--headless=1 --shellfile=...) pays the Qt, VisPy and tools startup every time. The
+server starts a number of worker processes, each with its own headless FlatCAM application, once. The clients send Tcl
+scripts over a local socket (multiprocessing.connection, the same IPC used to forward the command line arguments to a
+running instance); the scripts are queued and each one is executed by the first free worker. Before a job the worker
+starts a new project and a new Tcl interpreter so the jobs do not see each other objects, variables or preferences
+changes. The result of a job holds the value returned by the script, the messages printed while it ran and the timing.
+
+Server:
+    python FlatCAM.py --server=/tmp/flatcam_jobs --workers=4
+
+multiprocessing.connection unpickles what the clients send, so whoever can connect can run code as the user of the
+server. The Unix socket is made readable only by its owner. A TCP address (--server=host:port) is never opened without
+a key: the key is read from the file given with --authkey=<key_file> (default: ~/.flatcam_jobserver.key) and a new
+random key is written to it, readable only by the user, when the file does not exist. The clients read the same file.
+
+Client:
+    with JobClient('/tmp/flatcam_jobs') as client:
+        job_id = client.submit('open_gerber board.gbr -outname board\\nisolate board -dia 0.2')
+        print(client.result(job_id))
+"""
+
+from PyQt5 import QtCore, QtWidgets
+
+from multiprocessing.connection import Listener, Client, wait
+import multiprocessing
+from collections import deque
+import tkinter as tk
+import threading
+import time
+import sys
+import os
+import re
+
+import logging
+
+log = logging.getLogger('base')
+
+if sys.platform == 'win32':
+    default_address = r'\\.\pipe\FlatCAMJobServer'
+else:
+    default_address = '/tmp/flatcam_jobserver'
+
+default_key_file = os.path.join(os.path.expanduser('~'), '.flatcam_jobserver.key')
+
+
+def parse_address(text):
+    """
+    The address of the server as given on the command line: 'host:port' (or ':port' for localhost) for a TCP socket,
+    otherwise a Unix socket path or a Windows named pipe.
+
+    :param text:    the address; the default address if empty or None
+    :type text:     str
+    :return:        an address for multiprocessing.connection
+    """
+    if not text:
+        return default_address
+
+    match = re.search(r'^([\w.\-]*):(\d+)$', str(text))
+    if match:
+        return match.group(1) or 'localhost', int(match.group(2))
+    return str(text)
+
+
+def load_authkey(filename=None, create=False):
+    """
+    The key used to authenticate the clients of a server listening on a TCP address, kept in a file that only the user
+    can read.
+
+    :param filename:    the key file; default_key_file if None or empty
+    :type filename:     str
+    :param create:      if True and the file does not exist, a new random key is written to it
+    :type create:       bool
+    :return:            the key
+    :rtype:             bytes
+    """
+    filename = filename or default_key_file
+
+    if create and not os.path.exists(filename):
+        fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(os.urandom(32).hex())
+        log.debug("load_authkey() --> new key written to %s" % filename)
+
+    if os.name == 'posix' and os.stat(filename).st_mode & 0o077:
+        raise PermissionError("The key file %s can be read or written by other users." % filename)
+
+    with open(filename) as f:
+        key = f.read().strip()
+    if not key:
+        raise ValueError("The key file %s is empty." % filename)
+    return key.encode('utf-8')
+
+
+class JobServer:
+    """
+    Queues the Tcl scripts received from the clients and runs them on worker processes.
+
+    The requests are dicts with a 'cmd' key:
+        {'cmd': 'submit', 'script': str, 'name': str, 'cwd': str}     -> {'id': int}
+        {'cmd': 'result', 'id': int, 'timeout': float}                -> the job result, see JobRunner.run()
+        {'cmd': 'status'}                                             -> the number of jobs in each state
+        {'cmd': 'shutdown'}                                           -> {'shutdown': True}
+    A failed request is answered with {'error': str}.
+    """
+
+    # how often the results thread checks if it has to stop, in seconds
+    WATCH_INTERVAL = 1.0
+
+    # a new project does not free everything the previous one used, so a worker is replaced after this many jobs
+    JOBS_PER_WORKER = 50
+
+    def __init__(self, address=None, workers=None, authkey=None, jobs_per_worker=None, key_file=None):
+        """
+
+        :param address:         the address to listen on; see parse_address()
+        :param workers:         the number of worker processes; half the number of CPU's if None
+        :type workers:          int
+        :param authkey:         if not None the clients have to use the same key
+        :type authkey:          bytes
+        :param jobs_per_worker: the number of jobs after which a worker is replaced; JOBS_PER_WORKER if None
+        :type jobs_per_worker:  int
+        :param key_file:        the file with the key for a TCP address without an authkey; see load_authkey()
+        :type key_file:         str
+        """
+        self.address = parse_address(address) if not isinstance(address, tuple) else address
+        self.nr_workers = workers if workers else max(1, multiprocessing.cpu_count() // 2)
+
+        # a TCP socket is never opened without a key since the requests are unpickled
+        if authkey is None and isinstance(self.address, tuple):
+            authkey = load_authkey(key_file, create=True)
+        self.authkey = authkey
+        self.jobs_per_worker = jobs_per_worker if jobs_per_worker else self.JOBS_PER_WORKER
+
+        # the workers are new processes (and not forks of this one) because each one starts a Qt application
+        self.context = multiprocessing.get_context('spawn')
+        self.workers = []
+
+        self.listener = None
+        self.stop_event = threading.Event()
+
+        # job id -> job record; a record is removed when its result is delivered
+        self.jobs = {}
+        # the jobs waiting for a free worker
+        self.pending = deque()
+        self.jobs_lock = threading.Condition()
+        self.last_id = 0
+        self.delivered = 0
+
+    def start(self):
+        """
+        Start the workers and open the listening socket.
+
+        :return:    None
+        """
+        if isinstance(self.address, str) and not self.address.startswith('\\\\') and os.path.exists(self.address):
+            # a socket left by a server that did not end cleanly
+            try:
+                Client(self.address, authkey=self.authkey).close()
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.remove(self.address)
+            else:
+                raise RuntimeError("A job server is already listening on %s." % str(self.address))
+
+        self.listener = Listener(self.address, authkey=self.authkey)
+        if isinstance(self.address, str) and os.name == 'posix' and not self.address.startswith('\0'):
+            # only the user of the server can connect to the Unix socket
+            os.chmod(self.address, 0o600)
+        self.stop_event.clear()
+
+        with self.jobs_lock:
+            for __ in range(self.nr_workers):
+                self.workers.append(JobWorker(self.context))
+
+        threading.Thread(target=self.collect_results, name='JobServerResults', daemon=True).start()
+        log.debug("JobServer.start() --> listening on %s with %d workers" % (str(self.address), self.nr_workers))
+
+    def serve_forever(self):
+        """
+        Start the server and serve the clients until a 'shutdown' request.
+
+        :return:    0, the process exit code
+        """
+        self.start()
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    conn = self.listener.accept()
+                except (OSError, multiprocessing.AuthenticationError) as err:
+                    if self.stop_event.is_set():
+                        break
+                    log.debug("JobServer.serve_forever() --> %s" % str(err))
+                    continue
+                threading.Thread(target=self.serve, args=(conn, ), name='JobServerClient', daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+        return 0
+
+    def serve(self, conn):
+        """
+        Answer the requests of one client until it closes the connection.
+
+        :param conn:    the client connection
+        :return:        None
+        """
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    break
+
+                try:
+                    answer = self.handle(request)
+                except Exception as err:
+                    answer = {'error': str(err)}
+                conn.send(answer)
+
+                if answer.get('shutdown'):
+                    self.stop()
+                    break
+        finally:
+            conn.close()
+
+    def handle(self, request):
+        """
+        :param request:     a request dict
+        :return:            the answer dict
+        """
+        cmd = request.get('cmd')
+        if cmd == 'submit':
+            return {'id': self.submit(request['script'], name=request.get('name'), cwd=request.get('cwd'))}
+        if cmd == 'result':
+            return self.result(request['id'], timeout=request.get('timeout'))
+        if cmd == 'status':
+            return self.status()
+        if cmd == 'shutdown':
+            return {'shutdown': True}
+        raise ValueError("Unknown request: %s" % str(cmd))
+
+    def submit(self, script, name=None, cwd=None):
+        """
+        Queue a Tcl script.
+
+        :param script:  the Tcl script
+        :type script:   str
+        :param name:    a name for the job, used in the results
+        :param cwd:     the directory where the script is run; the relative paths in the script are relative to it
+        :return:        the job id
+        """
+        with self.jobs_lock:
+            self.last_id += 1
+            job_id = self.last_id
+            self.jobs[job_id] = {
+                'id':           job_id,
+                'name':         name if name else 'job_%d' % job_id,
+                'state':        'queued',
+                'submitted':    time.time()
+            }
+            self.pending.append({'id': job_id, 'script': str(script), 'cwd': cwd})
+            self.dispatch()
+
+        return job_id
+
+    def result(self, job_id, timeout=None):
+        """
+        Wait for a job to end and return its result. The result is delivered only once.
+
+        :param job_id:  the job id returned by submit()
+        :param timeout: seconds to wait, forever if None
+        :return:        the job result; if the job did not end in time, the job record with its state
+        """
+        with self.jobs_lock:
+            def ended():
+                return job_id not in self.jobs or self.jobs[job_id]['state'] in ('done', 'failed')
+
+            self.jobs_lock.wait_for(ended, timeout=timeout)
+            if job_id not in self.jobs:
+                raise KeyError("Unknown job or result already delivered: %s" % str(job_id))
+
+            job = self.jobs[job_id]
+            if job['state'] not in ('done', 'failed'):
+                return dict(job)
+
+            self.delivered += 1
+            return self.jobs.pop(job_id)
+
+    def status(self):
+        """
+        :return:    the number of jobs in each state and the number of workers
+        """
+        with self.jobs_lock:
+            states = [job['state'] for job in self.jobs.values()]
+            nr_workers = len(self.workers)
+
+        return {
+            'queued':       states.count('queued'),
+            'running':      states.count('running'),
+            'finished':     states.count('done') + states.count('failed'),
+            'delivered':    self.delivered,
+            'workers':      nr_workers
+        }
+
+    def dispatch(self):
+        """
+        Send the queued jobs to the free workers. Called with the jobs_lock acquired.
+
+        :return:    None
+        """
+        if not self.workers and self.listener is not None:
+            while self.pending:
+                self.fail_job(self.pending.popleft()['id'], "No worker process could start the application.")
+
+        for worker in self.workers:
+            if not self.pending:
+                break
+            if not worker.ready or worker.job_id is not None:
+                continue
+
+            job = self.pending.popleft()
+            try:
+                worker.conn.send(job)
+            except OSError:
+                # the worker is gone; collect_results() replaces it
+                self.pending.appendleft(job)
+                worker.ready = False
+                continue
+
+            worker.job_id = job['id']
+            self.jobs[job['id']]['state'] = 'running'
+            self.jobs[job['id']]['worker'] = worker.process.pid
+
+    def collect_results(self):
+        """
+        Take the results from the workers and give them the next jobs. Runs on its own thread; it also replaces the
+        workers that ran their share of jobs and those that died, failing the job they were running.
+
+        :return:    None
+        """
+        while not self.stop_event.is_set():
+            with self.jobs_lock:
+                workers = list(self.workers)
+
+            try:
+                ready = wait([w.conn for w in workers] + [w.process.sentinel for w in workers],
+                             timeout=self.WATCH_INTERVAL)
+            except OSError:
+                # the pipes were closed by shutdown()
+                ready = []
+            if self.stop_event.is_set():
+                break
+
+            with self.jobs_lock:
+                for worker in workers:
+                    if worker.conn in ready:
+                        try:
+                            kind, data = worker.conn.recv()
+                        except (EOFError, OSError):
+                            kind, data = None, None
+
+                        if kind == 'ready':
+                            worker.ready = True
+                        elif kind == 'finished':
+                            self.finish_job(worker, data)
+
+                    if worker.process.sentinel in ready or not worker.process.is_alive():
+                        self.replace_worker(worker, died=True)
+                    elif worker.nr_jobs >= self.jobs_per_worker and worker.job_id is None:
+                        self.replace_worker(worker)
+
+                self.dispatch()
+
+    def finish_job(self, worker, result):
+        """
+        Store the result of a job. Called with the jobs_lock acquired.
+
+        :param worker:  the worker that ran the job
+        :param result:  the job result, see JobRunner.run()
+        :return:        None
+        """
+        worker.job_id = None
+        worker.nr_jobs += 1
+
+        job = self.jobs.get(result['id'])
+        if job is None:
+            return
+
+        job.update(result)
+        job['wait_time'] = job['started'] - job['submitted']
+        job['total_time'] = job['finished'] - job['submitted']
+        self.jobs_lock.notify_all()
+
+    def fail_job(self, job_id, error):
+        """
+        End a job that could not run. Called with the jobs_lock acquired.
+
+        :param job_id:  the job id
+        :param error:   the reason
+        :return:        None
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+
+        job.update({
+            'state':    'failed',
+            'result':   '',
+            'messages': [],
+            'error':    error,
+            'finished': time.time()
+        })
+        self.jobs_lock.notify_all()
+
+    def replace_worker(self, worker, died=False):
+        """
+        Stop a worker and start a new one in its place. Called with the jobs_lock acquired.
+
+        :param worker:  the worker to replace
+        :param died:    True if the worker process ended on its own; the job it was running fails
+        :return:        None
+        """
+        if worker not in self.workers:
+            return
+
+        if died:
+            log.debug("JobServer.replace_worker() --> worker %s ended with exit code %s" %
+                      (str(worker.process.pid), str(worker.process.exitcode)))
+
+            if worker.job_id is not None:
+                self.fail_job(worker.job_id,
+                              "The worker process died with exit code %s." % str(worker.process.exitcode))
+
+        worker.stop()
+        if died and not worker.ready:
+            # it failed to start; a new one would fail the same way
+            log.error("JobServer.replace_worker() --> the worker process could not start the application.")
+            self.workers.remove(worker)
+            self.dispatch()
+            return
+
+        self.workers[self.workers.index(worker)] = JobWorker(self.context)
+
+    def stop(self):
+        """
+        Stop serving. serve_forever() returns after the workers end.
+
+        :return:    None
+        """
+        if self.stop_event.is_set():
+            return
+        self.stop_event.set()
+
+        # wake up the accept() of serve_forever()
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except (OSError, EOFError, multiprocessing.AuthenticationError):
+            pass
+
+    def shutdown(self):
+        """
+        Stop the workers and close the listening socket. The jobs that are still queued are dropped.
+
+        :return:    None
+        """
+        self.stop_event.set()
+
+        with self.jobs_lock:
+            workers = self.workers
+            self.workers = []
+            self.jobs_lock.notify_all()
+
+        for worker in workers:
+            worker.stop()
+        for worker in workers:
+            worker.process.join(30)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+        if self.listener is not None:
+            try:
+                self.listener.close()
+            except OSError:
+                pass
+            self.listener = None
+
+
+class JobWorker:
+    """
+    The server side of a worker process: the process and the pipe used to send it the jobs and to get the results.
+    """
+
+    def __init__(self, context):
+        """
+
+        :param context:     the multiprocessing context used to start the process
+        """
+        self.conn, worker_conn = context.Pipe()
+        self.process = context.Process(target=job_worker, args=(worker_conn, ), name='FlatCAMJobWorker')
+        self.process.start()
+        worker_conn.close()
+
+        # True after the worker application started
+        self.ready = False
+        # the id of the job the worker is running
+        self.job_id = None
+        self.nr_jobs = 0
+
+        log.debug("JobWorker.__init__() --> worker %s started" % str(self.process.pid))
+
+    def stop(self):
+        """
+        Ask the worker to end after its current job.
+
+        :return:    None
+        """
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.conn.close()
+
+
+class JobClient:
+    """
+    Sends Tcl scripts to a JobServer.
+    """
+
+    def __init__(self, address=None, authkey=None, key_file=None):
+        """
+
+        :param address:     the server address; see parse_address()
+        :param authkey:     the key of the server, if it uses one
+        :type authkey:      bytes
+        :param key_file:    the file with the key of a server on a TCP address, used if authkey is None
+        :type key_file:     str
+        """
+        self.address = parse_address(address) if not isinstance(address, tuple) else address
+        if authkey is None and isinstance(self.address, tuple):
+            authkey = load_authkey(key_file)
+        self.conn = Client(self.address, authkey=authkey)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def request(self, **kwargs):
+        self.conn.send(kwargs)
+        answer = self.conn.recv()
+        if 'error' in answer and 'id' not in answer:
+            raise RuntimeError(answer['error'])
+        return answer
+
+    def submit(self, script, name=None, cwd=None):
+        """
+        Queue a Tcl script on the server.
+
+        :param script:  the Tcl script
+        :param name:    a name for the job
+        :param cwd:     the directory where the script is run; the current directory if None
+        :return:        the job id
+        """
+        cwd = cwd if cwd is not None else os.getcwd()
+        return self.request(cmd='submit', script=script, name=name, cwd=cwd)['id']
+
+    def result(self, job_id, timeout=None):
+        """
+        Wait for a job to end.
+
+        :param job_id:  the job id returned by submit()
+        :param timeout: seconds to wait, forever if None
+        :return:        the job result, see JobRunner.run()
+        """
+        return self.request(cmd='result', id=job_id, timeout=timeout)
+
+    def run(self, script, name=None, cwd=None):
+        """
+        Run a Tcl script on the server and wait for its result.
+
+        :return:    the job result, see JobRunner.run()
+        """
+        return self.result(self.submit(script, name=name, cwd=cwd))
+
+    def status(self):
+        return self.request(cmd='status')
+
+    def shutdown(self):
+        """
+        Stop the server.
+
+        :return:    None
+        """
+        self.request(cmd='shutdown')
+        self.close()
+
+    def close(self):
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+
+
+class JobRunner:
+    """
+    Runs the jobs inside a worker process, on its headless FlatCAM application.
+    """
+
+    def __init__(self, app):
+        """
+
+        :param app:     the headless FlatCAM application of the worker
+        """
+        self.app = app
+        self.messages = []
+
+    def record(self, msg, *args):
+        self.messages.append(str(msg))
+
+    def reset(self):
+        """
+        Return the application to its startup state: no objects, the saved preferences and a new Tcl interpreter.
+
+        :return:    None
+        """
+        self.app.f_handlers.on_file_new(cli=True)
+
+        # on_file_new() keeps the Tcl interpreter and with it the variables of the previous script
+        self.app.shell.tcl = None
+        self.app.shell.init_tcl()
+        # a job ends with its script, not with the worker
+        self.app.shell.tcl.eval('rename exit {}')
+
+        os.chdir(self.app.app_home)
+
+    def run(self, job):
+        """
+        :param job:     dict with the job 'id', the Tcl 'script' and the 'cwd' where it is run
+        :return:        dict with the job 'id', the 'state' ('done' or 'failed'), the 'result' of the script, the
+                        'messages' printed while it ran, the 'error' (the Tcl error info) if it failed, the 'worker'
+                        pid and the 'started', 'finished' times and the 'run_time'
+        """
+        started = time.time()
+        self.messages = []
+        state = 'done'
+        result = ''
+        error = None
+
+        try:
+            self.reset()
+        except Exception as err:
+            log.debug("JobRunner.run() reset --> %s" % str(err))
+
+        signals = [self.app.inform[str], self.app.inform[str, bool],
+                   self.app.inform_shell[str], self.app.inform_shell[str, bool]]
+        for signal in signals:
+            # direct connection: the messages of the commands running on other threads are recorded as they come
+            signal.connect(self.record, type=QtCore.Qt.DirectConnection)
+
+        tcl = self.app.shell.tcl
+        try:
+            if job.get('cwd'):
+                tcl.call('cd', job['cwd'])
+            result = tcl.eval(job['script'])
+            if result == 'None':
+                result = ''
+        except tk.TclError as err:
+            state = 'failed'
+            try:
+                error = tcl.eval('set errorInfo')
+            except tk.TclError:
+                error = str(err)
+        except Exception as err:
+            state = 'failed'
+            error = str(err)
+        finally:
+            # the queued signals of the finished tasks
+            QtWidgets.QApplication.processEvents()
+
+            for signal in signals:
+                try:
+                    signal.disconnect(self.record)
+                except TypeError:
+                    pass
+
+        finished = time.time()
+        return {
+            'id':           job['id'],
+            'state':        state,
+            'result':       result,
+            'messages':     self.messages,
+            'error':        error,
+            'worker':       os.getpid(),
+            'started':      started,
+            'finished':     finished,
+            'run_time':     finished - started
+        }
+
+
+def job_worker(conn):
+    """
+    The worker process: starts a headless FlatCAM application and runs the jobs received on the pipe until it gets
+    None or the server closes the pipe.
+
+    :param conn:    the worker end of the pipe to the server
+    :return:        None
+    """
+    if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    # the process gets the command line of the server; the application parses it when app_Main is imported
+    sys.argv = sys.argv[:1]
+    from app_Main import App
+
+    App.cmd_line_headless = 1
+    App.cmd_line_shellfile = ''
+    App.cmd_line_shellvar = ''
+    App.args = []
+
+    qapp = QtWidgets.QApplication(['FlatCAM'])
+    runner = JobRunner(App(qapp=qapp))
+
+    try:
+        conn.send(('ready', None))
+        while True:
+            job = conn.recv()
+            if job is None:
+                break
+            conn.send(('finished', runner.run(job)))
+    except (EOFError, OSError):
+        # the server is gone
+        pass
+
+    runner.app.pool.terminate()
@@ -0,0 +1,246 @@
+# ##########################################################
+# FlatCAM: 2D Post-processing for Manufacturing            #
+# Date: 10/18/2026                                         #
+# MIT Licence                                              #
+# ##########################################################
+
+"""
+Lazy loading of the FlatCAM tools and editors.
+
+At startup the application registers only the metadata of the tools (the module, the class and the menu entry) and of
+the editors. The menu entries are made from the metadata, without importing the tool. A tool or an editor is imported
+and made the first time the application attribute with its name is used (App.__getattr__()), for example when its menu
+entry, its toolbar button or a Tcl command that needs it is used.
+"""
+
+from PyQt5 import QtGui, QtWidgets
+
+import importlib
+import time
+
+import logging
+
+log = logging.getLogger('base')
+
+
+class Plugin:
+    """
+    The metadata of a tool or of an editor.
+    """
+
+    def __init__(self, name, module, class_name, kind='tool', title=None, shortcut=None, icon=None, pos=None,
+                 before=None, separator=None):
+        """
+
+        :param name:        the App attribute that holds the instance
+        :type name:         str
+        :param module:      the module where the class is
+        :type module:       str
+        :param class_name:  the class, made with the App as the only parameter
+        :type class_name:   str
+        :param kind:        'tool' or 'editor'
+        :type kind:         str
+        :param title:       the text of the menu entry; tools only
+        :type title:        str
+        :param shortcut:    the shortcut shown in the menu entry
+        :type shortcut:     str
+        :param icon:        the icon file of the menu entry, in the application resources folder
+        :type icon:         str
+        :param pos:         the menu where the entry is added; the Tool menu if None
+        :type pos:          QtWidgets.QMenu
+        :param before:      the menu action (or the name of the tool with the menu action) before which the entry
+                            is inserted; at the end of the menu if None
+        :type before:       QtWidgets.QAction | str
+        :param separator:   if True a separator is added to the menu after the entry
+        :type separator:    bool
+        """
+        self.name = name
+        self.module = module
+        self.class_name = class_name
+        self.kind = kind
+        self.title = title
+        self.shortcut = shortcut
+        self.icon = icon
+        self.pos = pos
+        self.before = before
+        self.separator = separator
+
+        # the menu entry
+        self.action = None
+        self.load_time = None
+
+
+class PluginRegistry:
+    """
+    Holds the metadata of the tools and editors of the application and makes them on demand.
+    """
+
+    def __init__(self, app):
+        """
+
+        :param app:     the application
+        :type app:      app_Main.App
+        """
+        self.app = app
+        self.plugins = {}
+        # the plugins that are being made; used to catch a plugin that needs itself while it is made
+        self.loading = set()
+
+    def __contains__(self, name):
+        return name in self.plugins
+
+    def add_tool(self, name, module, class_name, title, shortcut=None, icon=None, pos=None, before=None,
+                 separator=None):
+        """
+        Register a tool and add its menu entry. The tool is made when the entry is used for the first time.
+
+        :return:    the tool metadata
+        :rtype:     Plugin
+        """
+        self.unload(name)
+
+        plugin = Plugin(name, module, class_name, kind='tool', title=title, shortcut=shortcut, icon=icon, pos=pos,
+                        before=before, separator=separator)
+        self.plugins[name] = plugin
+        self.install(plugin)
+        return plugin
+
+    def add_editor(self, name, module, class_name):
+        """
+        Register an editor. The editor is made the first time it is used.
+
+        :return:    the editor metadata
+        :rtype:     Plugin
+        """
+        self.unload(name)
+
+        plugin = Plugin(name, module, class_name, kind='editor')
+        self.plugins[name] = plugin
+        return plugin
+
+    def install(self, plugin):
+        """
+        Add the menu entry of a tool, the same way as AppTool.install() does.
+
+        :param plugin:  the tool metadata
+        :type plugin:   Plugin
+        :return:        None
+        """
+        pos = plugin.pos if plugin.pos is not None else self.app.ui.menutool
+
+        before = plugin.before
+        if isinstance(before, str):
+            before = self.plugins[before].action
+
+        plugin.action = QtWidgets.QAction(pos)
+        if plugin.icon is not None:
+            plugin.action.setIcon(QtGui.QIcon(self.app.resource_location + '/' + plugin.icon))
+
+        if plugin.shortcut:
+            plugin.action.setText(plugin.title + '\t%s' % plugin.shortcut)
+        else:
+            plugin.action.setText(plugin.title)
+
+        pos.insertAction(before, plugin.action)
+
+        if plugin.separator is True:
+            pos.addSeparator()
+
+        plugin.action.triggered.connect(lambda checked, name=plugin.name: self.on_action_triggered(name, checked))
+
+    def on_action_triggered(self, name, checked):
+        # the first use of the menu entry; load() connects the entry to the tool so it gets the signal again
+        try:
+            self.load(name)
+        except Exception as err:
+            log.error("PluginRegistry.on_action_triggered() --> %s" % str(err))
+            self.app.inform.emit('[ERROR] %s: %s' % (self.plugins[name].title, str(err)))
+            return
+        self.plugins[name].action.triggered.emit(checked)
+
+    def is_loaded(self, name):
+        """
+        :param name:    the App attribute of the plugin
+        :type name:     str
+        :return:        True if the plugin was made
+        :rtype:         bool
+        """
+        return name in self.app.__dict__
+
+    def load(self, name):
+        """
+        Import and make a plugin and store it in the App attribute with its name.
+
+        :param name:    the App attribute of the plugin
+        :type name:     str
+        :return:        the tool or the editor; None if an editor failed to load
+        """
+        if self.is_loaded(name):
+            return self.app.__dict__[name]
+
+        plugin = self.plugins[name]
+        if name in self.loading:
+            raise RuntimeError("The plugin %s is used while it is made." % name)
+
+        self.loading.add(name)
+        start = time.perf_counter()
+        try:
+            plugin_class = getattr(importlib.import_module(plugin.module), plugin.class_name)
+            instance = plugin_class(self.app)
+        except Exception as err:
+            if plugin.kind != 'editor':
+                raise
+            # an editor that fails to load is None and the application goes on without it
+            log.debug("PluginRegistry.load() --> %s Error: %s" % (plugin.class_name, str(err)))
+            instance = None
+        finally:
+            self.loading.discard(name)
+        plugin.load_time = time.perf_counter() - start
+
+        setattr(self.app, name, instance)
+
+        if plugin.action is not None:
+            # from now on the menu entry is the tool menu entry
+            plugin.action.triggered.disconnect()
+            plugin.action.triggered.connect(instance.run)
+            instance.menuAction = plugin.action
+
+        log.debug("PluginRegistry.load() --> %s loaded in %.1f ms" % (plugin.class_name, plugin.load_time * 1000))
+        return instance
+
+    def unload(self, *names, kind=None):
+        """
+        Drop the instances of the plugins; they are made again when they are used. The menu entries of the tools are
+        removed; add the tools again to get them back.
+
+        :param names:   the App attributes of the plugins; all the plugins of the kind if none is given
+        :param kind:    'tool' or 'editor'; all the plugins if None
+        :return:        None
+        """
+        if not names:
+            names = [name for name, plugin in self.plugins.items() if kind is None or plugin.kind == kind]
+
+        for name in names:
+            plugin = self.plugins.get(name)
+            if plugin is None:
+                continue
+
+            if self.is_loaded(name):
+                delattr(self.app, name)
+
+            if plugin.action is not None:
+                try:
+                    plugin.action.triggered.disconnect()
+                except TypeError:
+                    pass
+                pos = plugin.pos if plugin.pos is not None else self.app.ui.menutool
+                pos.removeAction(plugin.action)
+                plugin.action.deleteLater()
+                plugin.action = None
+
+    def loaded(self):
+        """
+        :return:    the names of the plugins that were made and the time it took, in seconds
+        :rtype:     list
+        """
+        return [(name, plugin.load_time) for name, plugin in self.plugins.items() if self.is_loaded(name)]
@@ -0,0 +1,242 @@
+# ##########################################################
+# FlatCAM: 2D Post-processing for Manufacturing            #
+# Date: 10/18/2026                                         #
+# MIT Licence                                              #
+# ##########################################################
+
+"""
+Binary FlatCAM project container.
+
+The project file is an uncompressed ZIP archive with the following entries:
+
+================  ====================================================================
+Entry             Content
+================  ====================================================================
+manifest.json     format version, app version, project options and the objects index
+objs/<n>.json     the object dictionary (``to_dict()``) without the geometry
+objs/<n>.wkb      the geometry of the object as a block of WKB records
+================  ====================================================================
+
+The geometry block starts with the number of records followed by the records offsets,
+all as little endian int64 (a numpy array), then the WKB records. In the object dictionary
+each geometry is replaced by a reference to its record in the block.
+
+Each object entry is compressed on its own (LZMA) and the index holds a digest of its
+uncompressed content, so an object that did not change since the last save is copied as it is
+from the previous file, without being compressed again. Each object is decoded only when it is
+requested, so the objects are created one by one as they are read.
+"""
+
+import os
+import json
+import lzma
+import zipfile
+import hashlib
+import logging
+
+import numpy as np
+from shapely.geometry.base import BaseGeometry
+from shapely.wkb import dumps as wkb_dumps, loads as wkb_loads
+
+from camlib import ApertureMacro, dict2obj
+
+log = logging.getLogger('base')
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+
+
+def is_project_archive(filename):
+    """
+    Check if the file is a project saved in the binary format.
+
+    :param filename:    path to the project file
+    :return:            True if it is a binary project file
+    """
+    try:
+        with zipfile.ZipFile(filename) as zf:
+            return MANIFEST in zf.namelist()
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def encode_object(d):
+    """
+    Split an object dictionary in its JSON metadata and its WKB geometry block.
+
+    :param d:   the object dictionary as returned by the object to_dict()
+    :return:    tuple (metadata bytes, geometry block bytes)
+    """
+    records = []
+
+    def default(obj):
+        if isinstance(obj, BaseGeometry):
+            records.append(wkb_dumps(obj))
+            return {"__class__": "ShplRef", "__inst__": len(records) - 1}
+        if isinstance(obj, ApertureMacro):
+            return {"__class__": "ApertureMacro", "__inst__": obj.to_dict()}
+        if isinstance(obj, np.generic):
+            return obj.item()
+        raise TypeError("Object of type %s is not serializable" % type(obj).__name__)
+
+    meta = json.dumps(d, default=default, separators=(',', ':')).encode('utf-8')
+
+    offsets = np.zeros(len(records) + 1, dtype='<i8')
+    if records:
+        offsets[1:] = np.cumsum([len(r) for r in records])
+    block = np.array([len(records)], dtype='<i8').tobytes() + offsets.tobytes() + b''.join(records)
+    return meta, block
+
+
+def decode_object(meta, block):
+    """
+    Rebuild an object dictionary from its JSON metadata and its WKB geometry block.
+
+    :param meta:    metadata bytes as made by encode_object()
+    :param block:   geometry block bytes as made by encode_object()
+    :return:        the object dictionary
+    """
+    nr = int(np.frombuffer(block, dtype='<i8', count=1)[0])
+    offsets = np.frombuffer(block, dtype='<i8', count=nr + 1, offset=8)
+    start = 8 * (nr + 2)
+
+    def object_hook(d):
+        if d.get('__class__') == 'ShplRef' and '__inst__' in d:
+            idx = d['__inst__']
+            return wkb_loads(block[start + int(offsets[idx]):start + int(offsets[idx + 1])])
+        return dict2obj(d)
+
+    return json.loads(meta.decode('utf-8'), object_hook=object_hook)
+
+
+class ProjectReader:
+    """
+    Reads a binary project file. The objects are decoded only when requested.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.zf = zipfile.ZipFile(filename)
+        self.manifest = json.loads(self.zf.read(MANIFEST).decode('utf-8'))
+
+        if self.manifest.get('format', 0) > FORMAT_VERSION:
+            log.warning("ProjectReader -> The project file was saved in a newer format: %s" %
+                        str(self.manifest.get('format')))
+
+    @property
+    def options(self):
+        return self.manifest['options']
+
+    @property
+    def version(self):
+        return self.manifest.get('version')
+
+    @property
+    def index(self):
+        """
+        List of dicts, one for each object in the project: 'kind', 'name', 'entry', 'digest', 'compression'
+        """
+        return self.manifest['objs']
+
+    def read_raw(self, item):
+        return self.zf.read(item['entry'] + '.json'), self.zf.read(item['entry'] + '.wkb')
+
+    def load_object(self, item):
+        """
+        Decode an object of the project.
+
+        :param item:    an element of the index or the name of the object
+        :return:        the object dictionary, ready to be used by from_dict()
+        """
+        if isinstance(item, str):
+            item = next(it for it in self.index if it['name'] == item)
+
+        meta, block = self.read_raw(item)
+        if item.get('compression') == 'xz':
+            meta = lzma.decompress(meta)
+            block = lzma.decompress(block)
+        return decode_object(meta, block)
+
+    def close(self):
+        self.zf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def write_project(filename, objs, options, version, compress=True, compression_level=3):
+    """
+    Save a project in the binary format.
+
+    When ``filename`` is a binary project saved before, the objects that did not change
+    are copied from it without compressing them again.
+
+    :param filename:            path to the project file
+    :param objs:                list of object dictionaries (as returned by the objects to_dict())
+    :param options:             the project options
+    :param version:             the app version
+    :param compress:            if True the object entries are LZMA compressed
+    :param compression_level:   LZMA preset
+    :return:                    number of objects that were copied from the previous file
+    """
+    compression = 'xz' if compress else 'none'
+
+    # index of the previous file: digest -> item
+    previous = None
+    previous_items = {}
+    if is_project_archive(filename):
+        try:
+            previous = ProjectReader(filename)
+            previous_items = {it['digest']: it for it in previous.index if it.get('compression') == compression}
+        except Exception as e:
+            log.debug("write_project() -> Could not read the previous project file. %s" % str(e))
+            previous = None
+
+    tmp_filename = filename + '.tmp'
+    index = []
+    reused = 0
+    try:
+        with zipfile.ZipFile(tmp_filename, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for nr, d in enumerate(objs):
+                meta, block = encode_object(d)
+                digest = hashlib.sha1(meta + block).hexdigest()
+                entry = 'objs/%d' % nr
+
+                if digest in previous_items:
+                    meta, block = previous.read_raw(previous_items[digest])
+                    reused += 1
+                elif compress:
+                    meta = lzma.compress(meta, preset=int(compression_level))
+                    block = lzma.compress(block, preset=int(compression_level))
+
+                zf.writestr(entry + '.json', meta)
+                zf.writestr(entry + '.wkb', block)
+                index.append({
+                    'kind': d['kind'],
+                    'name': d['options']['name'],
+                    'entry': entry,
+                    'digest': digest,
+                    'compression': compression
+                })
+
+            manifest = {
+                'format': FORMAT_VERSION,
+                'version': version,
+                'options': options,
+                'objs': index
+            }
+            zf.writestr(MANIFEST, json.dumps(manifest, indent=2, default=str))
+    except Exception:
+        if previous is not None:
+            previous.close()
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+
+    if previous is not None:
+        previous.close()
+    os.replace(tmp_filename, filename)
+    return reused
@@ -0,0 +1,185 @@
+# ##########################################################
+# FlatCAM: 2D Post-processing for Manufacturing            #
+# Date: 10/18/2026                                         #
+# MIT Licence                                              #
+# ##########################################################
+
+"""
+Startup time report.
+
+Started with the --startup_report=1 command line option, before the application modules are imported. It keeps the
+time spent to import each module (on the main thread) and the time of the startup phases marked by the application,
+and it makes a text report with the slowest of them:
+
+    from appCommon.StartupReport import startup_report
+    startup_report.start()
+    ...
+    startup_report.mark("Main GUI")
+    ...
+    print(startup_report.report())
+"""
+
+import importlib.abc
+import threading
+import time
+import sys
+
+
+class LoaderProxy:
+    """
+    Wraps the loader of a module to time its execution. All the other attributes are taken from the wrapped loader.
+    """
+
+    def __init__(self, loader, report):
+        self.loader = loader
+        self.report = report
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        # the module sees its real loader
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+
+        self.report.enter(module.__name__)
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.report.leave(module.__name__)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    The first finder in sys.meta_path: it finds the module with the other finders and wraps its loader.
+    """
+
+    def __init__(self, report):
+        self.report = report
+        self.finding = set()
+
+    def find_spec(self, fullname, path, target=None):
+        if threading.current_thread() is not threading.main_thread() or fullname in self.finding:
+            return None
+
+        self.finding.add(fullname)
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                        spec.loader = LoaderProxy(spec.loader, self.report)
+                    return spec
+        finally:
+            self.finding.discard(fullname)
+        return None
+
+
+class StartupReport:
+    """
+    The import times of the modules and the startup phases of the application.
+    """
+
+    def __init__(self):
+        self.started = None
+        self.finder = None
+
+        # module name: [cumulative time, self time]
+        self.modules = {}
+        # the modules being imported with the start time and the time of the imports they made
+        self.stack = []
+
+        # (phase name, duration of the phase)
+        self.phases = []
+        self.last_mark = None
+
+    def is_active(self):
+        return self.started is not None
+
+    def start(self):
+        """
+        Start timing the imports. Has to be called before the modules of interest are imported.
+
+        :return: None
+        """
+        if self.started is not None:
+            return
+
+        self.started = time.perf_counter()
+        self.last_mark = self.started
+        self.finder = ImportTimer(self)
+        sys.meta_path.insert(0, self.finder)
+
+    def stop(self):
+        """
+        Stop timing the imports. The report keeps the times collected so far.
+
+        :return: None
+        """
+        if self.finder in sys.meta_path:
+            sys.meta_path.remove(self.finder)
+        self.finder = None
+
+    def enter(self, name):
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    def leave(self, name):
+        name, start, nested = self.stack.pop()
+        cumulative = time.perf_counter() - start
+        self.modules[name] = [cumulative, cumulative - nested]
+        if self.stack:
+            self.stack[-1][2] += cumulative
+
+    def mark(self, phase):
+        """
+        Mark the end of a startup phase. Does nothing if the report was not started.
+
+        :param phase:   the name of the phase that just ended
+        :type phase:    str
+        :return:        None
+        """
+        if self.started is None:
+            return
+
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last_mark))
+        self.last_mark = now
+
+    def report(self, top=25):
+        """
+        :param top: how many of the slowest modules are listed
+        :type top:  int
+        :return:    the report text
+        :rtype:     str
+        """
+        if self.started is None:
+            return "The startup report was not started."
+
+        total = time.perf_counter() - self.started
+        lines = ["Startup time: %.3f s" % total, "", "Phases:"]
+        for phase, duration in self.phases:
+            lines.append("  %8.1f ms  %s" % (duration * 1000, phase))
+
+        imports = sum(self_time for __, self_time in self.modules.values())
+        lines += ["", "Imports: %d modules in %.1f ms" % (len(self.modules), imports * 1000)]
+
+        lines += ["", "Slowest modules (self time):"]
+        by_self = sorted(self.modules.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        for name, (cumulative, self_time) in by_self:
+            lines.append("  %8.1f ms  %8.1f ms  %s" % (self_time * 1000, cumulative * 1000, name))
+
+        lines += ["", "Slowest modules (with their imports):"]
+        by_cumulative = sorted(self.modules.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        for name, (cumulative, self_time) in by_cumulative:
+            lines.append("  %8.1f ms  %8.1f ms  %s" % (cumulative * 1000, self_time * 1000, name))
+
+        return '\n'.join(lines)
+
+
+startup_report = StartupReport()
@@ -1,51 +1,60 @@
 # import csv
-import math
 import numpy as np
 
 
 class bilinearInterpolator:
     """
-    This class takes a collection of 3-dimensional points from a .csv file.  
+    This class takes a collection of 3-dimensional points from a .csv file or from an array.
     It contains a bilinear interpolator to find unknown points within the grid.
     """
+
+    # how many distances are calculated at once when aligning the grid with the probed points
+    align_chunk = 4000000
+
     @property
     def probedGrid(self):
         return self._probedGrid
 
     """
-    Constructor takes a file with a .csv extension and creates an evenly-spaced 'ideal' grid from the data points.
-    This is done to get around any floating point errors that may exist in the data
+    Constructor takes a file with a .csv extension (or a (N, 3) array of points) and creates an evenly-spaced 'ideal'
+    grid from the data points. This is done to get around any floating point errors that may exist in the data
     """
     def __init__(self, pointsFile):
-        
-        self.pointsFile = pointsFile
-        self.points = np.loadtxt(self.pointsFile, delimiter=',')
+
+        if isinstance(pointsFile, str):
+            self.pointsFile = pointsFile
+            self.points = np.loadtxt(self.pointsFile, delimiter=',')
+        else:
+            self.pointsFile = None
+            self.points = np.asarray(pointsFile, dtype=float)
+        self.points = self.points.reshape(-1, 3)
 
         self.xMin, self.xMax, self.xSpacing, self.xCount = self._axisParams(0)
         self.yMin, self.yMax, self.ySpacing, self.yCount = self._axisParams(1)
 
         # generate ideal grid to match actually probed points -- this is due to floating-point error issues
-        idealGrid = ([
-            [(x, y) for x in np.linspace(self.xMin, self.xMax, self.xCount, True)]
-            for y in np.linspace(self.yMin, self.yMax, self.yCount, True)
-            ])
-
-        self._probedGrid = [[0] * self.yCount for i in range(0, self.xCount)]
-
-        # align ideal grid indices with probed data points
-        for rowIndex, row in enumerate(idealGrid):
-            for colIndex, idealPoint in enumerate(row):
-                minSqDist = math.inf
-                for probed in self.points:
-                    # find closest point in ideal grid that corresponds to actual tested point
-                    # put z value in correct index
-                    sqDist = pow(probed[0] - idealPoint[0], 2) + pow(probed[1] - idealPoint[1], 2)
-                    if sqDist <= minSqDist:
-                        minSqDist = sqDist
-                        indexX = rowIndex
-                        indexY = colIndex
-                        closestProbed = probed
-                self.probedGrid[indexY][indexX] = closestProbed
+        ideal_x, ideal_y = np.meshgrid(
+            np.linspace(self.xMin, self.xMax, self.xCount, True),
+            np.linspace(self.yMin, self.yMax, self.yCount, True),
+            indexing='ij'
+        )
+        ideal_x = ideal_x.ravel()
+        ideal_y = ideal_y.ravel()
+
+        # align ideal grid indices with probed data points: find closest point in ideal grid that corresponds to
+        # actual tested point; on equal distances the last probed point is used
+        nr_points = len(self.points)
+        reversed_pts = self.points[::-1]
+        closest = np.empty(len(ideal_x), dtype=np.int64)
+        chunk = max(1, self.align_chunk // nr_points)
+        for start in range(0, len(ideal_x), chunk):
+            stop = start + chunk
+            sq_dist = (ideal_x[start:stop, None] - reversed_pts[None, :, 0]) ** 2 + \
+                      (ideal_y[start:stop, None] - reversed_pts[None, :, 1]) ** 2
+            closest[start:stop] = nr_points - 1 - np.argmin(sq_dist, axis=1)
+
+        # probedGrid[ix][iy] is the probed point (x, y, z) for the grid node ix, iy
+        self._probedGrid = self.points[closest].reshape(self.xCount, self.yCount, 3)
 
     def Interpolate(self, point):
         """
@@ -54,72 +63,67 @@ class bilinearInterpolator:
         NOTE: If one axis is outside the grid, linear interpolation is used instead.
         If both axes are outside of the grid, the z-value of the closest corner of the grid is returned.
         """
-        lin = False
-
-        if point[0] < self.xMin:
-            ix1 = 0
-            lin = True
-        elif point[0] > self.xMax:
-            ix1 = self.xCount-1
-            lin = True
-        else:
-            ix1 = math.floor((point[0] - self.xMin)/self.xSpacing)
-            ix2 = math.ceil((point[0] - self.xMin)/self.xSpacing)
-
-        def interpolatePoint(p1, p2, pt, axis):
-            return (p2[2]*(pt[axis] - p1[axis]) + p1[2]*(p2[axis] - pt[axis]))/(p2[axis] - p1[axis])
-
-        if point[1] < self.yMin:
-            if lin:
-                return self.probedGrid[ix1][0][2]
-            return interpolatePoint(self.probedGrid[ix1][0], self.probedGrid[ix2][0], point, 0)
-        elif point[1] > self.yMax:           
-            if lin:
-                return self.probedGrid[ix1][self.yCount - 1][2]
-            return interpolatePoint(
-                self.probedGrid[ix1][self.yCount - 1], self.probedGrid[ix2][self.yCount - 1], point, 0)
-        else:
-            iy1 = math.floor((point[1] - self.yMin)/self.ySpacing)
-            iy2 = math.ceil((point[1] - self.yMin)/self.ySpacing)
-            # if x was at an extrema, but y was not, perform linear interpolation on x axis
-            if lin:
-                return interpolatePoint(self.probedGrid[ix1][iy1], self.probedGrid[ix1][iy2], point, 1)
+        return float(self.interpolate(np.array([point[0]], dtype=float), np.array([point[1]], dtype=float))[0])
+
+    def interpolate(self, x, y):
+        """
+        The bilinear interpolation for many points at once. Same as Interpolate() but working on arrays of coordinates.
+
+        :param x:   array of X coordinates
+        :param y:   array of Y coordinates
+        :return:    array of z values
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+
+        # outside the grid the indexes are clamped to its edge so both neighbours are the same grid node; that makes
+        # a linear interpolation on the other axis or, outside on both axes, the z-value of the closest corner
+        ix1, ix2 = self._cellIndexes(x, self.xMin, self.xSpacing, self.xCount)
+        iy1, iy2 = self._cellIndexes(y, self.yMin, self.ySpacing, self.yCount)
+
+        grid = self._probedGrid
+        x1 = grid[ix1, iy1, 0]
+        x2 = grid[ix2, iy1, 0]
+        y1 = grid[ix2, iy1, 1]
+        y2 = grid[ix2, iy2, 1]
+
+        q11 = grid[ix1, iy1, 2]
+        q12 = grid[ix1, iy2, 2]
+        q21 = grid[ix2, iy1, 2]
+        q22 = grid[ix2, iy2, 2]
 
         def specialDiv(a, b):
-            if b == 0:
-                return 0.5
-            else:
-                return a/b      
-
-        x1 = self.probedGrid[ix1][iy1][0]
-        x2 = self.probedGrid[ix2][iy1][0]
-        y1 = self.probedGrid[ix2][iy1][1]
-        y2 = self.probedGrid[ix2][iy2][1]
-
-        Q11 = self.probedGrid[ix1][iy1][2]
-        Q12 = self.probedGrid[ix1][iy2][2]
-        Q21 = self.probedGrid[ix2][iy1][2]
-        Q22 = self.probedGrid[ix2][iy2][2]
-
-        r1 = specialDiv(point[0]-x1, x2-x1)*Q21 + specialDiv(x2-point[0], x2-x1)*Q11
-        r2 = specialDiv(point[0]-x1, x2-x1)*Q22 + specialDiv(x2-point[0], x2-x1)*Q12
-        p = specialDiv(point[1]-y1, y2-y1)*r2 + specialDiv(y2-point[1], y2-y1)*r1
-            
-        return p
+            safe_b = np.where(b == 0, 1.0, b)
+            return np.where(b == 0, 0.5, a / safe_b)
+
+        r1 = specialDiv(x - x1, x2 - x1) * q21 + specialDiv(x2 - x, x2 - x1) * q11
+        r2 = specialDiv(x - x1, x2 - x1) * q22 + specialDiv(x2 - x, x2 - x1) * q12
+        return specialDiv(y - y1, y2 - y1) * r2 + specialDiv(y2 - y, y2 - y1) * r1
+
+    @staticmethod
+    def _cellIndexes(coords, axisMin, axisSpacing, axisCount):
+        # Returns the indexes of the grid nodes on both sides of the coordinates, clamped to the grid
+        if axisCount < 2 or axisSpacing == 0:
+            zeros = np.zeros(len(coords), dtype=np.int64)
+            return zeros, zeros
+
+        pos = (coords - axisMin) / axisSpacing
+        idx1 = np.clip(np.floor(pos), 0, axisCount - 1).astype(np.int64)
+        idx2 = np.clip(np.ceil(pos), 0, axisCount - 1).astype(np.int64)
+        return idx1, idx2
 
     # Returns the min, max, spacing and size of one axis of the 2D grid
     def _axisParams(self, sortAxis):
         # sort the set and eliminate the previous, unsorted set
-        srtSet = sorted(self.points, key=lambda x: x[sortAxis])
-
-        dists = []
-        for item0, item1 in zip(srtSet[:(len(srtSet)-2)], srtSet[1:]):
-            dists.append(float(item1[sortAxis]) - float(item0[sortAxis]))
-        axisSpacing = max(dists)
+        srtSet = np.sort(self.points[:, sortAxis])
 
         # add an extra one for axisCount to account for the starting point
-        axisMin = float(min(srtSet, key=lambda x: x[sortAxis])[sortAxis])
-        axisMax = float(max(srtSet, key=lambda x: x[sortAxis])[sortAxis])
+        axisMin = float(srtSet[0])
+        axisMax = float(srtSet[-1])
+        axisSpacing = float(np.max(np.diff(srtSet))) if len(srtSet) > 1 else 0.0
+        if axisSpacing == 0:
+            return axisMin, axisMax, axisSpacing, 1
+
         axisRange = axisMax - axisMin
         axisCount = round((axisRange/axisSpacing) + 1)
 
@@ -14,7 +14,7 @@
 from PyQt5 import QtGui, QtCore, QtWidgets
 from PyQt5.QtCore import Qt
 
-from camlib import distance, arc, three_point_circle, Geometry, FlatCAMRTreeStorage
+from camlib import distance, arc, three_point_circle, Geometry, FlatCAMRTreeStorage, clear_polygon_task
 from appTool import AppTool
 from appGUI.GUIElements import OptionalInputSection, FCCheckBox, FCLabel, FCComboBox, FCTextAreaRich, \
     FCDoubleSpinner, FCButton, FCInputDoubleSpinner, FCTree, NumericalEvalTupleEntry
@@ -1282,7 +1282,7 @@ class TransformEditorTool(AppTool):
             try:
                 for sel_sha in shape_list:
                     sel_sha.rotate(-val, point=(px, py))
-                    self.draw_app.replot()
+                self.draw_app.replot()
 
                 self.app.inform.emit('[success] %s' % _("Done."))
             except Exception as e:
@@ -1316,7 +1316,7 @@ class TransformEditorTool(AppTool):
                     elif axis == 'Y':
                         sha.mirror('Y', (px, py))
                         self.app.inform.emit('[success] %s' % _('Flip on X axis done'))
-                    self.draw_app.replot()
+                self.draw_app.replot()
 
             except Exception as e:
                 self.app.inform.emit('[ERROR_NOTCL] %s: %s.' % (_("Action was not executed"), str(e)))
@@ -1344,8 +1344,7 @@ class TransformEditorTool(AppTool):
                 px, py = point
                 for sha in shape_list:
                     sha.skew(xval, yval, point=(px, py))
-
-                    self.draw_app.replot()
+                self.draw_app.replot()
 
                 if axis == 'X':
                     self.app.inform.emit('[success] %s...' % _('Skew on the X axis done'))
@@ -1380,7 +1379,7 @@ class TransformEditorTool(AppTool):
 
                 for sha in shape_list:
                     sha.scale(xfactor, yfactor, point=(px, py))
-                    self.draw_app.replot()
+                self.draw_app.replot()
 
                 if str(axis) == 'X':
                     self.app.inform.emit('[success] %s...' % _('Scale on the X axis done'))
@@ -1412,7 +1411,7 @@ class TransformEditorTool(AppTool):
                         sha.offset((num, 0))
                     elif axis == 'Y':
                         sha.offset((0, num))
-                    self.draw_app.replot()
+                self.draw_app.replot()
 
                 if axis == 'X':
                     self.app.inform.emit('[success] %s...' % _('Offset on the X axis done'))
@@ -1434,8 +1433,7 @@ class TransformEditorTool(AppTool):
                 try:
                     for sel_obj in shape_list:
                         sel_obj.buffer(value, join, factor)
-
-                        self.draw_app.replot()
+                    self.draw_app.replot()
 
                     self.app.inform.emit('[success] %s...' % _('Buffer done'))
 
@@ -2507,26 +2505,25 @@ class FCSelect(DrawTool):
         over_shape_list = []
 
         # pos[0] and pos[1] are the mouse click coordinates (x, y)
-        for ____ in self.storage.get_objects():
-            # first method of click selection -> inconvenient
-            # minx, miny, maxx, maxy = obj_shape.geo.bounds
-            # if (minx <= pos[0] <= maxx) and (miny <= pos[1] <= maxy):
-            #     over_shape_list.append(obj_shape)
-
-            # second method of click selection -> slow
-            # outside = obj_shape.geo.buffer(0.1)
-            # inside = obj_shape.geo.buffer(-0.1)
-            # shape_band = outside.difference(inside)
-            # if Point(pos).within(shape_band):
-            #     over_shape_list.append(obj_shape)
-
-            # 3rd method of click selection -> inconvenient
-            try:
-                __, closest_shape = self.storage.nearest(point)
-            except StopIteration:
-                return ""
+        # first method of click selection -> inconvenient
+        # minx, miny, maxx, maxy = obj_shape.geo.bounds
+        # if (minx <= pos[0] <= maxx) and (miny <= pos[1] <= maxy):
+        #     over_shape_list.append(obj_shape)
+
+        # second method of click selection -> slow
+        # outside = obj_shape.geo.buffer(0.1)
+        # inside = obj_shape.geo.buffer(-0.1)
+        # shape_band = outside.difference(inside)
+        # if Point(pos).within(shape_band):
+        #     over_shape_list.append(obj_shape)
+
+        # 3rd method of click selection -> the shape with the point nearest to the click, found in the index
+        try:
+            __, closest_shape = self.storage.nearest(point)
+        except StopIteration:
+            return ""
 
-            over_shape_list.append(closest_shape)
+        over_shape_list.append(closest_shape)
 
         try:
             # if there is no shape under our click then deselect all shapes
@@ -2563,25 +2560,7 @@ class FCSelect(DrawTool):
             log.error("[ERROR] AppGeoEditor.FCSelect.click_release() -> Something went bad. %s" % str(e))
 
         # if selection is done on canvas update the Tree in Selected Tab with the selection
-        try:
-            self.draw_app.tw.itemSelectionChanged.disconnect(self.draw_app.on_tree_selection_change)
-        except (AttributeError, TypeError):
-            pass
-
-        self.draw_app.tw.selectionModel().clearSelection()
-        for sel_shape in self.draw_app.selected:
-            iterator = QtWidgets.QTreeWidgetItemIterator(self.draw_app.tw)
-            while iterator.value():
-                item = iterator.value()
-                try:
-                    if int(item.text(1)) == id(sel_shape):
-                        item.setSelected(True)
-                except ValueError:
-                    pass
-
-                iterator += 1
-
-        self.draw_app.tw.itemSelectionChanged.connect(self.draw_app.on_tree_selection_change)
+        self.draw_app.update_tree_selection()
 
         return ""
 
@@ -3350,6 +3329,12 @@ class AppGeoEditor(QtCore.QObject):
         # List of selected shapes.
         self.selected = []
 
+        # the shapes drawn on the canvas: id(shape) -> (shape, its geometry when it was drawn, True if it was drawn
+        # as selected, the canvas keys of its elements); only the shapes that changed are drawn again
+        self.plotted_shapes = {}
+        # the canvas keys of the utility shapes
+        self.utility_keys = []
+
         self.flat_geo = []
 
         self.move_timer = QtCore.QTimer()
@@ -3612,12 +3597,12 @@ class AppGeoEditor(QtCore.QObject):
     def on_tree_selection_change(self):
         self.selected = []
         selected_tree_items = self.tw.selectedItems()
-        for sel in selected_tree_items:
-            for obj_shape in self.storage.get_objects():
+        if selected_tree_items:
+            stored = {id(obj_shape): obj_shape for obj_shape in self.storage.get_objects()}
+            for sel in selected_tree_items:
                 try:
-                    if id(obj_shape) == int(sel.text(0)):
-                        self.selected.append(obj_shape)
-                except ValueError:
+                    self.selected.append(stored[int(sel.text(0))])
+                except (ValueError, KeyError):
                     pass
         self.replot()
 
@@ -3926,22 +3911,25 @@ class AppGeoEditor(QtCore.QObject):
         except (TypeError, AttributeError):
             pass
 
-    def add_shape(self, shape):
+    def add_shape(self, shape, build_ui=True):
         """
         Adds a shape to the shape storage.
 
-        :param shape:   Shape to be added.
-        :type shape:    DrawToolShape
-        :return:        None
+        :param shape:       Shape to be added.
+        :type shape:        DrawToolShape
+        :param build_ui:    if True the appGUI in the Properties Tab is built again
+        :type build_ui:     bool
+        :return:            None
         """
 
         if shape is None:
             return
 
-        # List of DrawToolShape?
+        # List of DrawToolShape? The appGUI is built once for all of them.
         if isinstance(shape, list):
             for subshape in shape:
-                self.add_shape(subshape)
+                self.add_shape(subshape, build_ui=False)
+            self.build_ui()
             return
 
         assert isinstance(shape, DrawToolShape), "Expected a DrawToolShape, got %s" % type(shape)
@@ -3953,7 +3941,8 @@ class AppGeoEditor(QtCore.QObject):
             self.utility.append(shape)
         else:
             self.storage.insert(shape)  # TODO: Check performance
-            self.build_ui()
+            if build_ui:
+                self.build_ui()
 
     def delete_utility_geometry(self):
         """
@@ -3995,6 +3984,8 @@ class AppGeoEditor(QtCore.QObject):
         self.selected = []
         self.shapes.clear(update=True)
         self.tool_shape.clear(update=True)
+        self.plotted_shapes = {}
+        self.utility_keys = []
 
         # self.storage = AppGeoEditor.make_storage()
         self.replot()
@@ -4293,8 +4284,12 @@ class AppGeoEditor(QtCore.QObject):
 
         self.app.delete_selection_shape()
 
+        # only the shapes with the bounding box intersecting the selection area are tested; the indexed points of the
+        # shapes are simplified with DrawToolShape.tolerance so the area is enlarged with it
+        tol = DrawToolShape.tolerance if DrawToolShape.tolerance else 0.0
+        xmin, ymin, xmax, ymax = poly_selection.bounds
         sel_objects_list = []
-        for obj in self.storage.get_objects():
+        for obj in self.storage.objects_in_bounds((xmin - tol, ymin - tol, xmax + tol, ymax + tol)):
             if (sel_type is True and poly_selection.contains(obj.geo)) or (sel_type is False and
                                                                            poly_selection.intersects(obj.geo)):
                 sel_objects_list.append(obj)
@@ -4311,18 +4306,29 @@ class AppGeoEditor(QtCore.QObject):
             self.selected = sel_objects_list
 
         # if selection is done on canvas update the Tree in Selected Tab with the selection
+        self.update_tree_selection()
+
+        self.replot()
+
+    def update_tree_selection(self):
+        """
+        Selects the items of the selected shapes in the Tree in the Selected Tab.
+
+        :return:    None
+        """
         try:
             self.tw.itemSelectionChanged.disconnect(self.on_tree_selection_change)
         except (AttributeError, TypeError):
             pass
 
         self.tw.selectionModel().clearSelection()
-        for sel_shape in self.selected:
+        selected = set(id(sel_shape) for sel_shape in self.selected)
+        if selected:
             iterator = QtWidgets.QTreeWidgetItemIterator(self.tw)
             while iterator.value():
                 item = iterator.value()
                 try:
-                    if int(item.text(1)) == id(sel_shape):
+                    if int(item.text(0)) in selected:
                         item.setSelected(True)
                 except ValueError:
                     pass
@@ -4331,8 +4337,6 @@ class AppGeoEditor(QtCore.QObject):
 
         self.tw.itemSelectionChanged.connect(self.on_tree_selection_change)
 
-        self.replot()
-
     def draw_utility_geometry(self, geo):
         # Add the new utility shape
         try:
@@ -4472,32 +4476,49 @@ class AppGeoEditor(QtCore.QObject):
 
     def plot_all(self):
         """
-        Plots all shapes in the editor.
+        Plots all shapes in the editor. Only the shapes that were added, deleted, changed or (de)selected since the
+        last plot are drawn again.
 
         :return: None
         :rtype: None
         """
         # self.app.log.debug("plot_all()")
-        self.shapes.clear(update=True)
-
-        for shape in self.storage.get_objects():
+        selected = set(id(shape) for shape in self.selected)
+        stored = {id(shape): shape for shape in self.storage.get_objects() if shape.geo is not None}
 
-            if shape.geo is None:  # TODO: This shouldn't have happened
+        # remove from canvas the shapes that were deleted or changed since they were drawn
+        for shape_id, (shape, geo, is_selected, keys) in list(self.plotted_shapes.items()):
+            current = stored.get(shape_id)
+            if current is shape and shape.geo is geo and (shape_id in selected) == is_selected:
                 continue
 
-            if shape in self.selected:
-                self.plot_shape(geometry=shape.geo,
-                                color=self.app.defaults['global_sel_draw_color'] + 'FF',
-                                linewidth=2)
+            for key in keys:
+                self.shapes.remove(key)
+            del self.plotted_shapes[shape_id]
+
+            if current is shape and shape.geo is not geo:
+                # the geometry was replaced in place (e.g. by the transformations) so the shape is indexed again
+                self.storage.update(shape, DrawToolShape(geo))
+
+        for shape_id, shape in stored.items():
+            if shape_id in self.plotted_shapes:
                 continue
 
-            self.plot_shape(geometry=shape.geo,
-                            color=self.app.defaults['global_draw_color'] + "FF")
+            if shape_id in selected:
+                keys = self.plot_shape(geometry=shape.geo,
+                                       color=self.app.defaults['global_sel_draw_color'] + 'FF',
+                                       linewidth=2)
+            else:
+                keys = self.plot_shape(geometry=shape.geo,
+                                       color=self.app.defaults['global_draw_color'] + "FF")
+            self.plotted_shapes[shape_id] = (shape, shape.geo, shape_id in selected, keys)
 
+        for key in self.utility_keys:
+            self.shapes.remove(key)
+        self.utility_keys = []
         for shape in self.utility:
-            self.plot_shape(geometry=shape.geo,
-                            linewidth=1)
-            continue
+            self.utility_keys += self.plot_shape(geometry=shape.geo,
+                                                 linewidth=1)
 
         self.shapes.redraw()
 
@@ -4707,14 +4728,16 @@ class AppGeoEditor(QtCore.QObject):
         else:
             geo_to_edit = self.flatten(geometry=fcgeometry.solid_geometry, orient_val=milling_type)
 
+        shape_list = []
         for shape in geo_to_edit:
             if shape is not None:
                 if type(shape) == Polygon:
-                    self.add_shape(DrawToolShape(shape.exterior))
+                    shape_list.append(DrawToolShape(shape.exterior))
                     for inter in shape.interiors:
-                        self.add_shape(DrawToolShape(inter))
+                        shape_list.append(DrawToolShape(inter))
                 else:
-                    self.add_shape(DrawToolShape(shape))
+                    shape_list.append(DrawToolShape(shape))
+        self.add_shape(shape_list)
 
         self.replot()
 
@@ -5129,20 +5152,16 @@ class AppGeoEditor(QtCore.QObject):
                         poly_buf = Polygon(geo_obj).buffer(-margin)
 
                     if method == _("Seed"):
-                        cp = Geometry.clear_polygon2(self, polygon_to_clear=poly_buf, tooldia=tooldia,
-                                                     steps_per_circle=self.app.defaults["geometry_circle_steps"],
-                                                     overlap=overlap, contour=contour, connect=connect)
+                        clear_method = 'seed'
                     elif method == _("Lines"):
-                        cp = Geometry.clear_polygon3(self, polygon=poly_buf, tooldia=tooldia,
-                                                     steps_per_circle=self.app.defaults["geometry_circle_steps"],
-                                                     overlap=overlap, contour=contour, connect=connect)
+                        clear_method = 'lines'
                     else:
-                        cp = Geometry.clear_polygon(self, polygon=poly_buf, tooldia=tooldia,
-                                                    steps_per_circle=self.app.defaults["geometry_circle_steps"],
-                                                    overlap=overlap, contour=contour, connect=connect)
+                        clear_method = 'standard'
 
+                    cp, __ = clear_polygon_task((poly_buf, tooldia, self.app.defaults["geometry_circle_steps"],
+                                                 clear_method, overlap, connect, contour))
                     if cp is not None:
-                        local_results += list(cp.get_objects())
+                        local_results += cp
                 except Exception as e:
                     log.debug("Could not Paint the polygons. %s" % str(e))
                     self.app.inform.emit(
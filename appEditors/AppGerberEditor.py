@@ -10,14 +10,17 @@ from PyQt5.QtCore import Qt
 
 from shapely.geometry import LineString, LinearRing, MultiLineString, Point, Polygon, MultiPolygon, box
 from shapely.ops import unary_union
+from shapely.strtree import STRtree
+from shapely.prepared import prep
 import shapely.affinity as affinity
 
 from vispy.geometry import Rect
 
 from copy import copy, deepcopy
 import logging
+import warnings
 
-from camlib import distance, arc, three_point_circle
+from camlib import distance, arc, three_point_circle, flatten_polygons, PolygonIndex
 from appGUI.GUIElements import FCEntry, FCComboBox, FCTable, FCDoubleSpinner, FCSpinner, RadioSet, EvalEntry2, \
     FCInputDoubleSpinner, FCButton, OptionalInputSection, FCCheckBox, NumericalEvalTupleEntry, FCComboBox2, FCLabel
 from appTool import AppTool
@@ -880,7 +883,7 @@ class PoligonizeEditorGrb(ShapeToolEditorGrb):
         apcode_set = set()
         for elem in self.draw_app.selected:
             for apcode in self.draw_app.storage_dict:
-                if 'geometry' in self.draw_app.storage_dict[apcode]:
+                if 'geometry' in self.draw_app.storage_dict[apcode] and is_loaded(self.draw_app.storage_dict[apcode]):
                     if elem in self.draw_app.storage_dict[apcode]['geometry']:
                         apcode_set.add(apcode)
                         break
@@ -2430,6 +2433,9 @@ class EraserEditorGrb(ShapeToolEditorGrb):
             sel_aperture = set()
 
             for storage in self.draw_app.storage_dict:
+                if not may_intersect(self.draw_app.storage_dict[storage], Point(point)):
+                    continue
+
                 try:
                     for geo_el in self.draw_app.storage_dict[storage]['geometry']:
                         if 'solid' in geo_el.geo:
@@ -2482,6 +2488,9 @@ class EraserEditorGrb(ShapeToolEditorGrb):
         eraser_sel_shapes = unary_union(eraser_sel_shapes)
 
         for storage in self.draw_app.storage_dict:
+            if not may_intersect(self.draw_app.storage_dict[storage], eraser_sel_shapes):
+                continue
+
             try:
                 for geo_el in self.draw_app.storage_dict[storage]['geometry']:
                     if 'solid' in geo_el.geo:
@@ -2641,6 +2650,9 @@ class SelectEditorGrb(QtCore.QObject, DrawTool):
                 n_chunks = 77
 
                 for ap_key, storage_val in editor_obj.storage_dict.items():
+                    if not may_intersect(storage_val, Point(point)):
+                        continue
+
                     # divide in chunks of 77 elements
                     geo_list = list(divide_chunks(storage_val['geometry'], n_chunks))
                     for chunk, list30 in enumerate(geo_list):
@@ -2694,6 +2706,8 @@ class SelectEditorGrb(QtCore.QObject, DrawTool):
         brake_flag = False
         for shape_s in self.draw_app.selected:
             for storage in self.draw_app.storage_dict:
+                if not is_loaded(self.draw_app.storage_dict[storage]):
+                    continue
                 if shape_s in self.draw_app.storage_dict[storage]['geometry']:
                     self.sel_aperture.append(storage)
                     brake_flag = True
@@ -2738,6 +2752,239 @@ class TransformEditorGrb(ShapeToolEditorGrb):
         self.draw_app.plot_all()
 
 
+def make_strtree(geometry):
+    """
+    Makes a STRtree spatial index of the geometry. The items of the index are the positions in the geometry list.
+
+    :param geometry:    list of Shapely geometry
+    :return:            STRtree or None if there is no geometry
+    """
+    if not geometry:
+        return None
+    with warnings.catch_warnings():
+        # Shapely 1.8 warns that the STRtree interface changes in Shapely 2.0
+        warnings.simplefilter('ignore')
+        return STRtree(geometry)
+
+
+def query_strtree(tree, geom):
+    """
+    The positions of the geometry in a STRtree made by make_strtree() whose envelope intersects the envelope of geom.
+
+    :param tree:    STRtree or None
+    :param geom:    Shapely geometry
+    :return:        sorted list of positions in the indexed geometry list
+    """
+    if tree is None:
+        return []
+    try:
+        items = tree.query_items(geom)
+    except AttributeError:
+        # Shapely 2.0 returns the positions from query()
+        items = tree.query(geom)
+    return sorted(int(i) for i in items)
+
+
+class ClearGeometry:
+    """
+    The clear (LPC) polygons of a Gerber object, indexed so a solid polygon is cut only by the clear polygons that are
+    within it.
+    """
+
+    def __init__(self, polygons):
+        self.polygons = polygons
+        self.tree = make_strtree(polygons)
+
+    def cut(self, solid_geo):
+        """
+        Subtract from the solid geometry the clear polygons that are within it. Only the clear geometry that fits
+        inside the solid is subtracted, otherwise we may loose the solid.
+
+        :param solid_geo:   Shapely geometry
+        :return:            Shapely geometry
+        """
+        if solid_geo is None:
+            return solid_geo
+
+        for idx in query_strtree(self.tree, solid_geo):
+            clear_geo = self.polygons[idx]
+            if clear_geo.within(solid_geo):
+                solid_geo = solid_geo.difference(clear_geo)
+        return solid_geo
+
+    def cuts(self, solid_geo):
+        """
+        Checks if cut() would change the solid geometry.
+
+        :param solid_geo:   Shapely geometry
+        :return:            True if there are clear polygons within the solid geometry
+        """
+        if solid_geo is None:
+            return False
+        return any(self.polygons[idx].within(solid_geo) for idx in query_strtree(self.tree, solid_geo))
+
+
+class ApertureStorage(dict):
+    """
+    The editor storage of one aperture of the edited Gerber object: the aperture parameters and, under the 'geometry'
+    key, the list of DrawToolShape objects.
+
+    The DrawToolShape objects are made from the source aperture geometry the first time the 'geometry' key is used,
+    so opening a large Gerber object in the editor loads only the apertures that are plotted with clear geometry,
+    selected or edited. What was loaded is remembered so on exit only the changed apertures are rebuilt.
+    """
+
+    def __init__(self, params, source=None, clear_geometry=None):
+        """
+
+        :param params:          the aperture parameters; all the keys of the aperture dict except 'geometry'
+        :type params:           dict
+        :param source:          the geometry elements of the source aperture: dicts with the 'solid', 'follow' and
+                                'clear' keys. None if the aperture has no geometry.
+        :type source:           list
+        :param clear_geometry:  the clear polygons that are cut out of the solid geometry when it is loaded
+        :type clear_geometry:   ClearGeometry
+        """
+        super().__init__(params)
+
+        self.source = source
+        self.clear_geometry = clear_geometry
+        self.params = dict(params)
+
+        # for each loaded DrawToolShape: the shape, its geometry dict and the solid, follow and clear geometry it was
+        # loaded with and the source solid geometry
+        self.snapshot = None
+
+        self.source_solids = None
+        self.source_tree = None
+        # True if some of the clear geometry is within the solid geometry of the aperture; None until it is checked
+        self.has_clear = None
+
+    def __missing__(self, key):
+        if key != 'geometry' or self.source is None:
+            raise KeyError(key)
+        return self.load()
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or (key == 'geometry' and self.source is not None)
+
+    def is_loaded(self):
+        return self.source is None or dict.__contains__(self, 'geometry')
+
+    def load(self):
+        """
+        Makes the DrawToolShape objects from the source geometry.
+
+        :return:    list of DrawToolShape
+        """
+        shapes = []
+        self.snapshot = []
+        for geo_el in self.source:
+            if not geo_el:
+                continue
+
+            new_geo_el = dict(geo_el)
+            if 'solid' in new_geo_el and self.clear_geometry is not None:
+                new_geo_el['solid'] = self.clear_geometry.cut(new_geo_el['solid'])
+
+            shape = DrawToolShape(new_geo_el)
+            shapes.append(shape)
+            self.snapshot.append((shape, new_geo_el, new_geo_el.get('solid'), new_geo_el.get('follow'),
+                                  new_geo_el.get('clear'), geo_el.get('solid')))
+
+        dict.__setitem__(self, 'geometry', shapes)
+        return shapes
+
+    def needs_load(self):
+        """
+        :return:    True if the source geometry can't be plotted as it is because there is clear geometry to cut out
+        """
+        if self.is_loaded() or self.clear_geometry is None:
+            return False
+
+        if self.has_clear is None:
+            solids = self.get_source_solids()
+            self.has_clear = False
+            bounds = np.array([solid.bounds for solid in solids if not solid.is_empty])
+            if len(bounds):
+                # the clear polygons around the aperture, then the ones that are really cut out of a solid
+                aperture_box = box(*bounds[:, :2].min(axis=0), *bounds[:, 2:].max(axis=0))
+                if query_strtree(self.clear_geometry.tree, aperture_box):
+                    self.has_clear = any(self.clear_geometry.cuts(solid) for solid in solids)
+        return self.has_clear
+
+    def get_source_solids(self):
+        """
+        :return:    the solid geometry of the source aperture, indexed in self.source_tree
+        """
+        if self.source_solids is None:
+            self.source_solids = [geo_el['solid'] for geo_el in self.source
+                                  if geo_el and geo_el.get('solid') is not None]
+            self.source_tree = make_strtree(self.source_solids)
+        return self.source_solids
+
+    def elements(self):
+        """
+        :return:    the geometry dicts of the aperture, without loading it
+        """
+        if self.is_loaded():
+            return [shape.geo for shape in self.get('geometry', [])]
+        return [geo_el for geo_el in self.source if geo_el]
+
+    def may_intersect(self, geom):
+        """
+        Checks, without loading the aperture, if it has geometry whose envelope intersects the given geometry.
+
+        :param geom:    Shapely geometry
+        :return:        True if the aperture is loaded or if it has such geometry
+        """
+        if self.is_loaded():
+            return True
+
+        self.get_source_solids()
+        return bool(query_strtree(self.source_tree, geom))
+
+    def is_changed(self):
+        """
+        :return:    True if the aperture parameters or the loaded geometry were changed in the editor
+        """
+        params = {k: v for k, v in self.items() if k != 'geometry'}
+        if params != self.params:
+            return True
+
+        if self.source is None:
+            return bool(self.get('geometry'))
+        if not self.is_loaded():
+            return False
+
+        shapes = self.get('geometry')
+        if shapes is None or len(shapes) != len(self.snapshot):
+            return True
+
+        for shape, (old_shape, geo, solid, follow, clear, __) in zip(shapes, self.snapshot):
+            if shape is not old_shape or shape.geo is not geo or geo.get('solid') is not solid or \
+                    geo.get('follow') is not follow or geo.get('clear') is not clear:
+                return True
+        return False
+
+
+def is_loaded(storage):
+    """
+    :param storage: the editor storage of an aperture; a dict or an ApertureStorage
+    :return:        True if the DrawToolShape objects of the aperture were made
+    """
+    return not isinstance(storage, ApertureStorage) or storage.is_loaded()
+
+
+def may_intersect(storage, geom):
+    """
+    :param storage: the editor storage of an aperture; a dict or an ApertureStorage
+    :param geom:    Shapely geometry
+    :return:        False if the aperture is not loaded and it has no geometry around geom
+    """
+    return not isinstance(storage, ApertureStorage) or storage.may_intersect(geom)
+
+
 class AppGerberEditor(QtCore.QObject):
 
     draw_shape_idx = -1
@@ -2770,6 +3017,9 @@ class AppGerberEditor(QtCore.QObject):
         self.storage_dict = {}
         self.current_storage = []
 
+        # the ApertureStorage objects made when the Gerber object was loaded in the editor
+        self.source_storage = []
+
         self.sorted_apcode = []
 
         self.new_apertures = {}
@@ -3555,6 +3805,7 @@ class AppGerberEditor(QtCore.QObject):
         # init working objects
         self.storage_dict = {}
         self.current_storage = []
+        self.source_storage = []
         self.sorted_apcode = []
         self.new_apertures = {}
         self.new_aperture_macros = {}
@@ -3794,6 +4045,7 @@ class AppGerberEditor(QtCore.QObject):
         self.active_tool = None
         self.selected = []
         self.storage_dict.clear()
+        self.source_storage = []
         self.results.clear()
 
         self.shapes.clear(update=True)
@@ -3848,8 +4100,8 @@ class AppGerberEditor(QtCore.QObject):
         except Exception as e:
             log.debug("AppGerberEditor.edit_fcgerber() --> %s" % str(e))
 
-        # apply the conversion factor on the obj.apertures
-        conv_apertures = deepcopy(self.gerber_obj.apertures)
+        # apply the conversion factor on the obj.apertures; the geometry is not converted so it is not copied
+        conv_apertures = {apcode: dict(ap_dict) for apcode, ap_dict in self.gerber_obj.apertures.items()}
         for apcode in self.gerber_obj.apertures:
             for key in self.gerber_obj.apertures[apcode]:
                 if key == 'width':
@@ -3946,88 +4198,32 @@ class AppGerberEditor(QtCore.QObject):
                                     global_clear_geo.append(elem['clear'])
                     log.warning("Found %d clear polygons." % len(global_clear_geo))
 
+                    clear_geometry = None
                     if global_clear_geo:
                         global_clear_geo = unary_union(global_clear_geo)
                         if isinstance(global_clear_geo, Polygon):
                             global_clear_geo = [global_clear_geo]
+                        else:
+                            global_clear_geo = list(getattr(global_clear_geo, 'geoms', global_clear_geo))
 
-                    # we subtract the big "negative" (clear) geometry from each solid polygon but only the part of
-                    # clear geometry that fits inside the solid. otherwise we may loose the solid
-                    for ap_code in app_obj.gerber_obj.apertures:
-                        temp_solid_geometry = []
-                        if 'geometry' in app_obj.gerber_obj.apertures[ap_code]:
-                            # for elem in self.gerber_obj.apertures[apcode]['geometry']:
-                            #     if 'solid' in elem:
-                            #         solid_geo = elem['solid']
-                            #         for clear_geo in global_clear_geo:
-                            #             # Make sure that the clear_geo is within the solid_geo otherwise we loose
-                            #             # the solid_geometry. We want for clear_geometry just to cut
-                            #             # into solid_geometry not to delete it
-                            #             if clear_geo.within(solid_geo):
-                            #                 solid_geo = solid_geo.difference(clear_geo)
-                            #         try:
-                            #             for poly in solid_geo:
-                            #                 new_elem = {}
-                            #
-                            #                 new_elem['solid'] = poly
-                            #                 if 'clear' in elem:
-                            #                     new_elem['clear'] = poly
-                            #                 if 'follow' in elem:
-                            #                     new_elem['follow'] = poly
-                            #                 temp_elem.append(deepcopy(new_elem))
-                            #         except TypeError:
-                            #             new_elem = {}
-                            #             new_elem['solid'] = solid_geo
-                            #             if 'clear' in elem:
-                            #                 new_elem['clear'] = solid_geo
-                            #             if 'follow' in elem:
-                            #                 new_elem['follow'] = solid_geo
-                            #             temp_elem.append(deepcopy(new_elem))
-                            for elem in app_obj.gerber_obj.apertures[ap_code]['geometry']:
-                                new_elem = {}
-                                if 'solid' in elem:
-                                    solid_geo = elem['solid']
-                                    if not global_clear_geo or global_clear_geo.is_empty:
-                                        pass
-                                    else:
-                                        for clear_geo in global_clear_geo:
-                                            # Make sure that the clear_geo is within the solid_geo otherwise we loose
-                                            # Make sure that the clear_geo is within the solid_geo otherwise we loose
-                                            # the solid_geometry. We want for clear_geometry just to cut into
-                                            # solid_geometry not to delete it
-                                            if clear_geo.within(solid_geo):
-                                                solid_geo = solid_geo.difference(clear_geo)
-
-                                    new_elem['solid'] = solid_geo
-                                if 'clear' in elem:
-                                    new_elem['clear'] = elem['clear']
-                                if 'follow' in elem:
-                                    new_elem['follow'] = elem['follow']
-                                temp_solid_geometry.append(deepcopy(new_elem))
-
-                            app_obj.gerber_obj.apertures[ap_code]['geometry'] = deepcopy(temp_solid_geometry)
-
-                    log.warning("Polygon difference done for %d apertures." % len(app_obj.gerber_obj.apertures))
-
-                    try:
-                        # Loading the Geometry into Editor Storage
-                        for ap_code, ap_dict in app_obj.gerber_obj.apertures.items():
-                            app_obj.results.append(
-                                app_obj.pool.apply_async(app_obj.add_apertures, args=(ap_code, ap_dict))
-                            )
-                    except Exception as ee:
-                        log.debug(
-                            "AppGerberEditor.edit_fcgerber.worker_job() Adding processes to pool --> %s" % str(ee))
-                        traceback.print_exc()
+                        if global_clear_geo:
+                            # the clear geometry is subtracted from each solid polygon when its aperture is loaded,
+                            # but only the part of clear geometry that fits inside the solid
+                            clear_geometry = ClearGeometry(global_clear_geo)
 
-                    output = []
-                    for p in app_obj.results:
-                        output.append(p.get())
+                    # ###############################################################
+                    # Loading the Geometry into Editor Storage
+                    # ###############################################################
 
-                    for elem in output:
-                        app_obj.storage_dict[elem[0]] = deepcopy(elem[1])
+                    # the apertures are loaded in the editor storage as DrawToolShape objects when they are used
+                    for ap_code, ap_dict in app_obj.gerber_obj.apertures.items():
+                        params = {k: v for k, v in ap_dict.items() if k != 'geometry'}
+                        storage = ApertureStorage(params, source=ap_dict.get('geometry'),
+                                                  clear_geometry=clear_geometry)
+                        app_obj.storage_dict[ap_code] = storage
+                        app_obj.source_storage.append(storage)
 
-                    app_obj.mp_finished.emit(output)
+                    app_obj.mp_finished.emit([])
 
             def run(self):
                 self.worker_job(self.app)
@@ -4040,25 +4236,6 @@ class AppGerberEditor(QtCore.QObject):
 
         self.app.worker_task.emit({'fcn': executable_edit.run, 'params': []})
 
-    @staticmethod
-    def add_apertures(aperture_id, aperture_dict):
-        storage_elem = []
-        storage_dict = {}
-
-        for k, v in list(aperture_dict.items()):
-            try:
-                if k == 'geometry':
-                    for geo_el in v:
-                        if geo_el:
-                            storage_elem.append(DrawToolShape(geo_el))
-                    storage_dict[k] = storage_elem
-                else:
-                    storage_dict[k] = aperture_dict[k]
-            except Exception as e:
-                log.debug("AppGerberEditor.edit_fcgerber().job_thread() --> %s" % str(e))
-
-        return [aperture_id, storage_dict]
-
     def on_multiprocessing_finished(self):
         self.app.proc_container.update_view_text(' %s' % _("Setting up the UI"))
         self.app.inform.emit('[success] %s.' % _("Adding geometry finished. Preparing the GUI"))
@@ -4114,6 +4291,10 @@ class AppGerberEditor(QtCore.QObject):
         """
         Creates a new Gerber object for the edited Gerber. Thread-safe.
 
+        Only the apertures that were changed in the editor are rebuilt from the DrawToolShape objects, the others keep
+        the source geometry. The solid_geometry is the one of the source object patched in the area of the changed
+        geometry.
+
         :param outname:             Name of the resulting object. None causes the name to be that of the file.
         :type outname:              str
         :param aperture_storage:    a dictionary that holds all the objects geometry
@@ -4128,70 +4309,62 @@ class AppGerberEditor(QtCore.QObject):
         storage_dict = aperture_storage
 
         local_storage_dict = {}
-        for aperture in storage_dict:
-            if 'geometry' in storage_dict[aperture]:
-                # add aperture only if it has geometry
-                if len(storage_dict[aperture]['geometry']) > 0:
-                    local_storage_dict[aperture] = deepcopy(storage_dict[aperture])
+        changed_apertures = []
+        for aperture, storage_val in storage_dict.items():
+            if 'geometry' not in storage_val:
+                continue
+
+            if isinstance(storage_val, ApertureStorage) and not storage_val.is_changed():
+                # an aperture that was not changed keeps the source geometry
+                elements = [geo_el for geo_el in (storage_val.source or []) if geo_el]
+            else:
+                elements = [geo_el.geo for geo_el in storage_val['geometry']]
+                changed_apertures.append(aperture)
+
+            # add aperture only if it has geometry
+            if len(elements) > 0:
+                local_storage_dict[aperture] = (storage_val, elements)
+
+        self.app.log.debug("AppGerberEditor.new_edited_gerber() -> %d changed apertures: %s" %
+                           (len(changed_apertures), str(changed_apertures)))
 
         # How the object should be initialized
         def obj_init(grb_obj, app_obj):
 
-            poly_buffer = []
             follow_buffer = []
 
-            for storage_apcode, storage_val in local_storage_dict.items():
+            for storage_apcode, (storage_val, elements) in local_storage_dict.items():
                 grb_obj.apertures[storage_apcode] = {}
 
                 for k, val in storage_val.items():
-                    if k == 'geometry':
-                        grb_obj.apertures[storage_apcode][k] = []
-                        for geo_el in val:
-                            geometric_data = geo_el.geo
-                            new_geo_el = {}
-                            if 'solid' in geometric_data:
-                                new_geo_el['solid'] = geometric_data['solid']
-                                poly_buffer.append(deepcopy(new_geo_el['solid']))
-
-                            if 'follow' in geometric_data:
-                                # if isinstance(geometric_data['follow'], Polygon):
-                                #     buff_val = -(int(storage_val['size']) / 2)
-                                #     geo_f = (geometric_data['follow'].buffer(buff_val)).exterior
-                                #     new_geo_el['follow'] = geo_f
-                                # else:
-                                #     new_geo_el['follow'] = geometric_data['follow']
-                                new_geo_el['follow'] = geometric_data['follow']
-                                follow_buffer.append(deepcopy(new_geo_el['follow']))
-                            else:
-                                if 'solid' in geometric_data:
-                                    geo_f = geometric_data['solid'].exterior
-                                    new_geo_el['follow'] = geo_f
-                                    follow_buffer.append(deepcopy(new_geo_el['follow']))
+                    if k != 'geometry':
+                        grb_obj.apertures[storage_apcode][k] = val
 
-                            if 'clear' in geometric_data:
-                                new_geo_el['clear'] = geometric_data['clear']
+                grb_obj.apertures[storage_apcode]['geometry'] = []
+                for geometric_data in elements:
+                    new_geo_el = {}
+                    if 'solid' in geometric_data:
+                        new_geo_el['solid'] = geometric_data['solid']
 
-                            if new_geo_el:
-                                grb_obj.apertures[storage_apcode][k].append(deepcopy(new_geo_el))
+                    if 'follow' in geometric_data:
+                        new_geo_el['follow'] = geometric_data['follow']
+                        follow_buffer.append(new_geo_el['follow'])
                     else:
-                        grb_obj.apertures[storage_apcode][k] = val
-
-            grb_obj.aperture_macros = deepcopy(self.gerber_obj.aperture_macros)
+                        if 'solid' in geometric_data:
+                            geo_f = geometric_data['solid'].exterior
+                            new_geo_el['follow'] = geo_f
+                            follow_buffer.append(new_geo_el['follow'])
 
-            new_poly = MultiPolygon(poly_buffer)
-            new_poly = new_poly.buffer(0.00000001)
-            new_poly = new_poly.buffer(-0.00000001)
+                    if 'clear' in geometric_data:
+                        new_geo_el['clear'] = geometric_data['clear']
 
-            # for ad in grb_obj.apertures:
-            #     print(ad, grb_obj.apertures[ad])
+                    if new_geo_el:
+                        grb_obj.apertures[storage_apcode]['geometry'].append(new_geo_el)
 
-            try:
-                __ = iter(new_poly)
-            except TypeError:
-                new_poly = [new_poly]
+            grb_obj.aperture_macros = deepcopy(self.gerber_obj.aperture_macros)
 
-            grb_obj.solid_geometry = deepcopy(new_poly)
-            grb_obj.follow_geometry = deepcopy(follow_buffer)
+            grb_obj.solid_geometry = self.edited_solid_geometry(storage_dict)
+            grb_obj.follow_geometry = follow_buffer
 
             for k, v in self.gerber_obj_options.items():
                 if k == 'name':
@@ -4231,6 +4404,107 @@ class AppGerberEditor(QtCore.QObject):
             self.deactivate_grb_editor()
             self.app.inform.emit('[success] %s' % _("Done."))
 
+    def edited_solid_geometry(self, storage_dict):
+        """
+        The solid_geometry of the edited Gerber object. The solid geometry that was removed or added in the editor is
+        found by comparing the loaded apertures with what they were loaded with; the solid_geometry of the source
+        object is kept as it is outside the bounding boxes of that geometry and it is rebuilt inside them.
+
+        :param storage_dict:    the editor storage
+        :type storage_dict:     dict
+        :return:                list of Polygons
+        """
+        source_solid = flatten_polygons(self.gerber_obj.solid_geometry)
+
+        current_storage = set(id(storage_val) for storage_val in storage_dict.values())
+
+        # the solid geometry the loaded apertures were loaded with, and the source geometry it was made from
+        loaded_solids = {}
+        removed = []
+        for storage_val in self.source_storage:
+            if storage_val.is_loaded():
+                for __, __, solid, __, __, source_geo in (storage_val.snapshot or []):
+                    if solid is not None:
+                        loaded_solids[id(solid)] = source_geo if source_geo is not None else solid
+            elif id(storage_val) not in current_storage:
+                # deleted aperture that was never loaded
+                removed += [geo_el['solid'] for geo_el in storage_val.elements() if geo_el.get('solid') is not None]
+
+        # all the solid geometry of the edited object and, for the apertures that are not loaded, the clear geometry
+        # that has to be cut out of it
+        solids = []
+        clear_geos = []
+        added = []
+        kept_solids = set()
+        for storage_val in storage_dict.values():
+            if 'geometry' not in storage_val:
+                continue
+
+            if not is_loaded(storage_val):
+                for geo_el in storage_val.elements():
+                    if geo_el.get('solid') is not None:
+                        solids.append(geo_el['solid'])
+                        clear_geos.append(storage_val.clear_geometry)
+                continue
+
+            for geo_el in storage_val['geometry']:
+                solid = geo_el.geo.get('solid')
+                if solid is None or solid.is_empty:
+                    continue
+                solids.append(solid)
+                clear_geos.append(None)
+
+                if id(solid) in loaded_solids:
+                    kept_solids.add(id(solid))
+                else:
+                    added.append(solid)
+
+        removed += [geo for solid_id, geo in loaded_solids.items() if solid_id not in kept_solids]
+
+        if not removed and not added:
+            return source_solid
+
+        # the area where the solid geometry changed
+        tol = 10 ** -self.decimals
+        area_boxes = []
+        for geo in removed + added:
+            if geo.is_empty:
+                continue
+            xmin, ymin, xmax, ymax = geo.bounds
+            area_boxes.append(box(xmin - tol, ymin - tol, xmax + tol, ymax + tol))
+        changed_area = unary_union(area_boxes)
+        prepared_area = prep(changed_area)
+
+        self.app.log.debug("AppGerberEditor.edited_solid_geometry() -> %d removed and %d added polygons." %
+                           (len(removed), len(added)))
+
+        def in_changed_area(geometry):
+            # the positions of the geometry elements that intersect the changed area
+            tree = make_strtree(geometry)
+            found = set()
+            for area_box in area_boxes:
+                found.update(query_strtree(tree, area_box))
+            return [idx for idx in sorted(found) if prepared_area.intersects(geometry[idx])]
+
+        # the solid geometry in the changed area
+        inside = []
+        for idx in in_changed_area(solids):
+            solid = solids[idx]
+            if clear_geos[idx] is not None:
+                solid = clear_geos[idx].cut(solid)
+            inside.append(solid)
+        inside = unary_union(inside).intersection(changed_area)
+
+        # only the source polygons that intersect the changed area are patched
+        touched = in_changed_area(source_solid)
+        index = PolygonIndex([source_solid[idx] for idx in touched])
+        index.apply(changed_area, 'difference')
+        index.apply(inside, 'union')
+
+        touched = set(touched)
+        new_poly = [poly for idx, poly in enumerate(source_solid) if idx not in touched]
+        return new_poly + flatten_polygons(index.geometry())
+
     def on_tool_select(self, tool):
         """
         Behavior of the toolbar. Tool initialization.
@@ -4541,6 +4815,9 @@ class AppGerberEditor(QtCore.QObject):
 
         self.app.delete_selection_shape()
         for storage in self.storage_dict:
+            if not may_intersect(self.storage_dict[storage], poly_selection):
+                continue
+
             for obj in self.storage_dict[storage]['geometry']:
                 if 'solid' in obj.geo:
                     geometric_data = obj.geo['solid']
@@ -4716,16 +4993,29 @@ class AppGerberEditor(QtCore.QObject):
         with self.app.proc_container.new('%s ...' % _("Plotting")):
             self.shapes.clear(update=True)
 
+            selected = set(self.selected)
+
             for storage in self.storage_dict:
+                storage_val = self.storage_dict[storage]
+
+                # the apertures that are not loaded are plotted from the source geometry
+                if isinstance(storage_val, ApertureStorage) and not storage_val.is_loaded() and \
+                        not storage_val.needs_load():
+                    for geo_el in storage_val.elements():
+                        if geo_el.get('solid') is not None:
+                            self.plot_shape(geometry=geo_el['solid'],
+                                            color=self.app.defaults['global_draw_color'] + 'FF')
+                    continue
+
                 # fix for apertures with no geometry inside
-                if 'geometry' in self.storage_dict[storage]:
-                    for elem in self.storage_dict[storage]['geometry']:
+                if 'geometry' in storage_val:
+                    for elem in storage_val['geometry']:
                         if 'solid' in elem.geo:
                             geometric_data = elem.geo['solid']
                             if geometric_data is None:
                                 continue
 
-                            if elem in self.selected:
+                            if elem in selected:
                                 self.plot_shape(geometry=geometric_data,
                                                 color=self.app.defaults['global_sel_draw_color'] + 'FF',
                                                 linewidth=2)
@@ -4819,8 +5109,13 @@ class AppGerberEditor(QtCore.QObject):
         # calculate all the geometry in the edited Gerber object
         edit_geo = []
         for ap_code in self.storage_dict:
-            for geo_el in self.storage_dict[ap_code]['geometry']:
-                actual_geo = geo_el.geo
+            storage_val = self.storage_dict[ap_code]
+            if is_loaded(storage_val):
+                elements = [geo_el.geo for geo_el in storage_val['geometry']]
+            else:
+                elements = storage_val.elements()
+
+            for actual_geo in elements:
                 if 'solid' in actual_geo:
                     edit_geo.append(actual_geo['solid'])
 
@@ -4873,6 +5168,9 @@ class AppGerberEditor(QtCore.QObject):
             return
 
         for storage in self.storage_dict:
+            if not is_loaded(self.storage_dict[storage]):
+                continue
+
             try:
                 if geo_el in self.storage_dict[storage]['geometry']:
                     self.storage_dict[storage]['geometry'].remove(geo_el)
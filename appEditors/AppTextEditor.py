@@ -8,10 +8,6 @@
 from appGUI.GUIElements import FCFileSaveDialog, FCEntry, FCTextAreaExtended, FCTextAreaLineNumber, FCButton
 from PyQt5 import QtPrintSupport, QtWidgets, QtCore, QtGui
 
-from reportlab.platypus import SimpleDocTemplate, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch, mm
-
 # from io import StringIO
 
 import gettext
@@ -262,6 +258,11 @@ class AppTextEditor(QtWidgets.QWidget):
             try:
                 my_gcode = self.code_editor.toPlainText()
                 if filename.rpartition('.')[2].lower() == 'pdf':
+                    # reportlab is imported only when it is needed; it takes a good part of the startup time
+                    from reportlab.platypus import SimpleDocTemplate, Paragraph
+                    from reportlab.lib.styles import getSampleStyleSheet
+                    from reportlab.lib.units import inch, mm
+
                     page_size = (
                         self.app.plotcanvas.pagesize_dict[self.app.defaults['global_workspaceT']][0] * mm,
                         self.app.plotcanvas.pagesize_dict[self.app.defaults['global_workspaceT']][1] * mm
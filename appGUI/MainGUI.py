@@ -21,7 +21,6 @@ from appGUI.preferences.excellon.ExcellonPreferencesUI import ExcellonPreference
 from appGUI.preferences.general.GeneralPreferencesUI import GeneralPreferencesUI
 from appGUI.preferences.geometry.GeometryPreferencesUI import GeometryPreferencesUI
 from appGUI.preferences.gerber.GerberPreferencesUI import GerberPreferencesUI
-from appEditors.AppGeoEditor import FCShapeTool
 
 from matplotlib.backend_bases import KeyEvent as mpl_key_event
 
@@ -2987,6 +2986,8 @@ class MainGUI(QtWidgets.QMainWindow):
                 # Finish the current action. Use with tools that do not
                 # complete automatically, like a polygon or path.
                 if key == QtCore.Qt.Key_Enter or key == 'Enter':
+                    # imported here because the Geometry Editor module is loaded on demand
+                    from appEditors.AppGeoEditor import FCShapeTool
                     if isinstance(self.app.geo_editor.active_tool, FCShapeTool):
                         if self.app.geo_editor.active_tool.name == 'rotate':
                             self.app.geo_editor.active_tool.make()
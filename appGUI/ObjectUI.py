@@ -2560,6 +2560,27 @@ class CNCObjectUI(ObjectUI):
         )
         grbl_send_grid.addWidget(self.grbl_report_button, 10, 0, 1, 2)
 
+        stream_lay = QtWidgets.QHBoxLayout()
+        # STREAM the GCode
+        self.grbl_stream_button = FCButton(_("Send GCode"))
+        self.grbl_stream_button.setToolTip(
+            _("Will send the GCode of this object to the GRBL controller.\n"
+              "The lines are sent as soon as there is room for them\n"
+              "in the GRBL buffer so the machine does not wait for them.")
+        )
+        stream_lay.addWidget(self.grbl_stream_button, stretch=1)
+
+        self.grbl_stop_stream_button = QtWidgets.QToolButton()
+        self.grbl_stop_stream_button.setText(_("Stop"))
+        self.grbl_stop_stream_button.setToolTip(
+            _("Stop sending the GCode.\n"
+              "The lines already in the GRBL buffer are still executed.")
+        )
+        self.grbl_stop_stream_button.setDisabled(True)
+        stream_lay.addWidget(self.grbl_stop_stream_button, stretch=0, alignment=Qt.AlignRight)
+
+        grbl_send_grid.addLayout(stream_lay, 11, 0, 1, 2)
+
         hm_lay = QtWidgets.QHBoxLayout()
         # GET HEIGHT MAP
         self.grbl_get_heightmap_button = FCButton(_("Apply AutoLevelling"))
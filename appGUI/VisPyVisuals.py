@@ -12,6 +12,11 @@ from vispy.gloo import set_state
 from vispy.color import Color
 from shapely.geometry import Polygon, LineString, LinearRing
 import threading
+import bisect
+import hashlib
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
 import numpy as np
 from appGUI.VisPyTesselators import GLUTess
 
@@ -28,6 +33,24 @@ class FlatCAMLineVisual(LineVisual):
         self.update()
 
 
+@lru_cache(maxsize=256)
+def _cached_color_rgba(color):
+    return Color(color).rgba
+
+
+def _color_rgba(color):
+    """
+    Translates a color to a RGBA tuple; the shapes of a collection use only a few colors so they are cached
+    :param color: str, tuple
+        Color
+    :return: tuple
+        RGBA color
+    """
+    if isinstance(color, (list, np.ndarray)):
+        color = tuple(color)
+    return _cached_color_rgba(color)
+
+
 def _update_shape_buffers(data, triangulation='glu'):
     """
     Translates Shapely geometry to internal buffers for speedup redraws
@@ -38,9 +61,7 @@ def _update_shape_buffers(data, triangulation='glu'):
     """
     mesh_vertices = []                                              # Vertices for mesh
     mesh_tris = []                                                  # Faces for mesh
-    mesh_colors = []                                                # Face colors
     line_pts = []                                                   # Vertices for line
-    line_colors = []                                                # Line color
 
     geo, color, face_color, tolerance = data['geometry'], data['color'], data['face_color'], data['tolerance']
 
@@ -75,25 +96,17 @@ def _update_shape_buffers(data, triangulation='glu'):
 
         # Appending data for mesh
         if len(tri_pts) > 0 and len(tri_tris) > 0:
-            mesh_tris += tri_tris
-            mesh_vertices += tri_pts
-            face_color_rgba = Color(face_color).rgba
-            # mesh_colors += [face_color_rgba] * (len(tri_tris) // 3)
-            mesh_colors += [face_color_rgba for __ in range(len(tri_tris) // 3)]
+            mesh_tris = tri_tris
+            mesh_vertices = [pt[:2] for pt in tri_pts]
 
         # Appending data for line
         if len(pts) > 0:
-            line_pts += pts
-            colo_rgba = Color(color).rgba
-            # line_colors += [colo_rgba] * len(pts)
-            line_colors += [colo_rgba for __ in range(len(pts))]
-
-    # Store buffers
-    data['line_pts'] = line_pts
-    data['line_colors'] = line_colors
-    data['mesh_vertices'] = mesh_vertices
-    data['mesh_tris'] = mesh_tris
-    data['mesh_colors'] = mesh_colors
+            line_pts = [pt[:2] for pt in pts]
+
+    # Store buffers as arrays, they are copied as they are in the collection buffers
+    data['line_pts'] = np.array(line_pts, dtype=np.float32).reshape((-1, 2))
+    data['mesh_vertices'] = np.array(mesh_vertices, dtype=np.float32).reshape((-1, 2))
+    data['mesh_tris'] = np.array(mesh_tris, dtype=np.uint32).reshape((-1, 3))
 
     # Clear shapely geometry
     del data['geometry']
@@ -101,6 +114,28 @@ def _update_shape_buffers(data, triangulation='glu'):
     return data
 
 
+def _instance_buffers(vertices, tris, pts, offsets):
+    """
+    Repeats the buffers of a shape at each of the offsets.
+    :param vertices: np.ndarray
+        Mesh vertices, (N, 2)
+    :param tris: np.ndarray
+        Mesh faces, (M, 3) indexes in vertices
+    :param pts: np.ndarray
+        Line points, (K, 2)
+    :param offsets: np.ndarray
+        (dx, dy) translations, (C, 2)
+    :return: tuple
+        (vertices, tris, pts) of all the copies
+    """
+    # the faces of each copy use the vertices of that copy
+    first_vertex = np.arange(len(offsets), dtype=np.uint32) * len(vertices)
+    tris = (tris[None, :, :] + first_vertex[:, None, None]).reshape((-1, 3))
+    vertices = (vertices[None, :, :] + offsets[:, None, :]).reshape((-1, 2))
+    pts = (pts[None, :, :] + offsets[:, None, :]).reshape((-1, 2))
+    return vertices, tris, pts
+
+
 def _linearring_to_segments(arr):
     # Close linear ring
     """
@@ -127,6 +162,357 @@ def _linestring_to_segments(arr):
     return [arr[i // 2] for i in range(0, len(arr) * 2)][1:-1]
 
 
+class ToolpathLOD(object):
+    """
+    The buffers of a set of polylines drawn with a width (the toolpaths of a CNCJob) and of filled circles (the drill
+    holes), made directly from the coordinates arrays, for several levels of detail.
+
+    A level is chosen for the size of a screen pixel: the vertices closer than a pixel are merged (the coordinates are
+    snapped on a grid with the pixel size and the consecutive vertices in the same cell are dropped), a path narrower
+    than a pixel is drawn as a line, a wider one as a quad for each segment and, when it is a few pixels wide, a
+    polygon is added in each vertex for the joins. The buffers of the last used levels are kept.
+    """
+
+    # number of levels kept
+    max_levels = 4
+    # number of sides of the polygons used for the joins and for the holes
+    join_sides = 8
+    hole_sides = 32
+
+    def __init__(self, xy, breaks, width=0.0, circles=None, fill=True):
+        """
+        :param xy:          (N, 2) array with the vertices of all the paths, one path after the other
+        :param breaks:      (M, ) array with the index in xy of the first vertex of each path
+        :param width:       the width of the paths; when 0 the paths are lines
+        :param circles:     (K, 3) array with the x, y and the radius of each hole, or None
+        :param fill:        if False the holes are drawn only with their outline
+        """
+        self.xy = np.asarray(xy, dtype=np.float64).reshape((-1, 2))
+        self.width = float(width)
+        self.fill = fill
+        self.circles = np.zeros((0, 3)) if circles is None else np.asarray(circles, dtype=np.float64).reshape((-1, 3))
+
+        breaks = np.asarray(breaks, dtype=np.int64)
+        lengths = np.diff(np.append(breaks, len(self.xy)))
+        self.path_id = np.repeat(np.arange(len(breaks)), lengths)
+        self.ends = np.zeros(len(self.xy), dtype=bool)
+        self.ends[breaks[lengths > 0]] = True
+        self.ends[(breaks + lengths - 1)[lengths > 0]] = True
+
+        points = [self.xy, self.circles[:, :2] - self.circles[:, 2:], self.circles[:, :2] + self.circles[:, 2:]]
+        points = np.concatenate(points) if len(self.xy) or len(self.circles) else np.zeros((1, 2))
+        extent = max(float((points.max(axis=0) - points.min(axis=0)).max()), 1e-9)
+        # the levels with a grid smaller than this are drawn with all the vertices
+        self.base_tolerance = extent / 65536.0
+        # the size of a pixel used until the view is known
+        self.default_pixel_size = extent / 1000.0
+
+        self._levels = OrderedDict()
+
+    def level(self, pixel_size):
+        """
+        :param pixel_size:  the size of a screen pixel in the units of the coordinates, None if it is not known
+        :return:            the level of detail for this pixel size: tuple (decimation, mode) where the mode is
+                            0 for lines, 1 for quads and 2 for quads and joins
+        """
+        if pixel_size is None or pixel_size <= 0:
+            pixel_size = self.default_pixel_size
+
+        decimation = 0
+        if pixel_size > self.base_tolerance:
+            decimation = int(np.log2(pixel_size / self.base_tolerance)) + 1
+
+        ratio = self.width / pixel_size
+        mode = 0 if ratio < 1.0 else (1 if ratio < 3.0 else 2)
+        return decimation, mode
+
+    def buffers(self, level):
+        """
+        :param level:   a level returned by level()
+        :return:        tuple (line_pts, mesh_vertices, mesh_tris) as the buffers of the shapes of a collection
+        """
+        if level in self._levels:
+            self._levels.move_to_end(level)
+            return self._levels[level]
+
+        decimation, mode = level
+        xy, path_id = self.xy, self.path_id
+        if decimation > 0 and len(xy):
+            cells = np.floor(xy / (self.base_tolerance * 2 ** (decimation - 1))).astype(np.int64)
+            keep = self.ends.copy()
+            keep[1:] |= (cells[1:] != cells[:-1]).any(axis=1)
+            xy, path_id = xy[keep], path_id[keep]
+
+        same_path = path_id[1:] == path_id[:-1]
+        p0, p1 = xy[:-1][same_path], xy[1:][same_path]
+
+        line_pts = [np.stack((p0, p1), axis=1).reshape((-1, 2))]
+        mesh_vertices = []
+        mesh_tris = []
+        nr_vertices = 0
+
+        if mode > 0:
+            # a quad for each segment
+            delta = p1 - p0
+            length = np.hypot(delta[:, 0], delta[:, 1])
+            segments = length > 0
+            delta, length = delta[segments], length[segments]
+            normal = np.column_stack((-delta[:, 1], delta[:, 0])) * (self.width / 2.0 / length)[:, None]
+            a, b = p0[segments], p1[segments]
+            mesh_vertices.append(np.stack((a + normal, a - normal, b - normal, b + normal), axis=1).reshape((-1, 2)))
+            quad = np.arange(len(a))[:, None] * 4
+            mesh_tris.append(np.hstack((quad, quad + 1, quad + 2, quad, quad + 2, quad + 3)).reshape((-1, 3)))
+            nr_vertices += 4 * len(a)
+
+        if mode > 1 and len(xy):
+            # a polygon in each vertex for the joins
+            vertices, tris = self._polygons(xy, np.full(len(xy), self.width / 2.0), self.join_sides)
+            mesh_vertices.append(vertices)
+            mesh_tris.append(tris + nr_vertices)
+            nr_vertices += len(vertices)
+
+        if len(self.circles):
+            vertices, tris = self._polygons(self.circles[:, :2], self.circles[:, 2], self.hole_sides)
+            rims = vertices.reshape((len(self.circles), self.hole_sides, 2))
+            line_pts.append(np.stack((rims, np.roll(rims, -1, axis=1)), axis=2).reshape((-1, 2)))
+            if self.fill:
+                mesh_vertices.append(vertices)
+                mesh_tris.append(tris + nr_vertices)
+                nr_vertices += len(vertices)
+
+        result = (
+            np.concatenate(line_pts).astype(np.float32),
+            np.concatenate(mesh_vertices).astype(np.float32) if mesh_vertices else np.zeros((0, 2), np.float32),
+            np.concatenate(mesh_tris).astype(np.uint32) if mesh_tris else np.zeros((0, 3), np.uint32)
+        )
+
+        self._levels[level] = result
+        if len(self._levels) > self.max_levels:
+            self._levels.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _polygons(centers, radius, sides):
+        """
+        Regular polygons, triangulated as fans.
+
+        :param centers:     (P, 2) array with the centers
+        :param radius:      (P, ) array with the radius of each polygon
+        :param sides:       number of sides of the polygons
+        :return:            tuple (vertices, triangles); the vertices of each polygon are consecutive
+        """
+        angles = np.linspace(0, 2 * np.pi, sides, endpoint=False)
+        rim = np.column_stack((np.cos(angles), np.sin(angles)))
+        vertices = (centers[:, None, :] + radius[:, None, None] * rim[None, :, :]).reshape((-1, 2))
+
+        fan = np.column_stack((np.zeros(sides - 2, dtype=np.int64), np.arange(1, sides - 1), np.arange(2, sides)))
+        tris = (np.arange(len(centers))[:, None, None] * sides + fan[None, :, :]).reshape((-1, 3))
+        return vertices, tris
+
+
+class TessellationCache(object):
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        """
+        Keeps the buffers made by _update_shape_buffers() so a shape that is plotted again (after a color change,
+        a replot or a project reload) is not triangulated again. The entries are keyed on the geometry content, the
+        tolerance and on what is drawn (faces / edges) and the least recently used ones are dropped over max_bytes.
+        :param max_bytes: int
+            Maximum size of the cached buffers
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+
+        # geometry identity -> (weak reference, digest); the same geometry objects are plotted again by a replot
+        # so the digest of their content is not computed again
+        self.digests = {}
+        self.lock = threading.Lock()
+
+    def _digest(self, geo):
+        geo_id = id(geo)
+        known = self.digests.get(geo_id)
+        if known is not None and known[0]() is geo:
+            return known[1]
+
+        digest = hashlib.sha1(geo.wkb).digest()
+        try:
+            ref = weakref.ref(geo, lambda r, i=geo_id: self._forget(i, r))
+        except TypeError:
+            return digest
+        self.digests[geo_id] = (ref, digest)
+        return digest
+
+    def _forget(self, geo_id, ref):
+        known = self.digests.get(geo_id)
+        if known is not None and known[0] is ref:
+            del self.digests[geo_id]
+
+    def key(self, data):
+        """
+        :param data: dict
+            Shape data, as made by ShapeCollectionVisual.add()
+        :return: tuple
+            Cache key of the shape
+        """
+        return (self._digest(data['geometry']), data['tolerance'],
+                data['face_color'] is not None, data['color'] is not None)
+
+    def get(self, key):
+        """
+        :param key: tuple
+            Cache key
+        :return: tuple
+            (line_pts, mesh_vertices, mesh_tris) arrays or None if the key is not in cache
+        """
+        with self.lock:
+            buffers = self.entries.get(key)
+            if buffers is not None:
+                self.entries.move_to_end(key)
+            return buffers
+
+    def put(self, key, data):
+        """
+        :param key: tuple
+            Cache key
+        :param data: dict
+            Shape data, translated by _update_shape_buffers()
+        """
+        buffers = (data['line_pts'], data['mesh_vertices'], data['mesh_tris'])
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = buffers
+            self.size += sum(arr.nbytes for arr in buffers)
+
+            while self.size > self.max_bytes and self.entries:
+                __, old_buffers = self.entries.popitem(last=False)
+                self.size -= sum(arr.nbytes for arr in old_buffers)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.digests.clear()
+            self.size = 0
+
+
+tessellation_cache = TessellationCache()
+
+
+class _RowBuffer(object):
+    def __init__(self, **columns):
+        """
+        Contiguous numpy arrays with the same number of rows, allocated in ranges. The released ranges are kept in
+        a free list and reused, so adding and removing shapes does not move the rest of the data
+        :param columns: keyword arguments
+            name=(width, dtype) for each array
+        """
+        self.columns = columns
+        self.arrays = {}
+        self.size = 0       # rows in use, including the free ranges in between
+        self.live = 0       # rows allocated
+        self.free = []      # sorted list of released (start, count) ranges
+        self.clear()
+
+    def clear(self):
+        self.arrays = {name: np.zeros((0, width), dtype=dtype) for name, (width, dtype) in self.columns.items()}
+        self.size = 0
+        self.live = 0
+        self.free = []
+
+    def _reserve(self, rows):
+        capacity = len(self.arrays[next(iter(self.arrays))])
+        if rows <= capacity:
+            return
+
+        capacity = max(rows, 2 * capacity, 256)
+        for name, arr in list(self.arrays.items()):
+            new_arr = np.zeros((capacity, arr.shape[1]), dtype=arr.dtype)
+            new_arr[:len(arr)] = arr
+            self.arrays[name] = new_arr
+
+    def allocate(self, count):
+        """
+        Allocates a range of rows
+        :param count: int
+            Number of rows
+        :return: int
+            First row of the range
+        """
+        self.live += count
+
+        # first fit in the released ranges
+        for i, (start, n) in enumerate(self.free):
+            if n >= count:
+                if n == count:
+                    del self.free[i]
+                else:
+                    self.free[i] = (start + count, n - count)
+                return start
+
+        start = self.size
+        self._reserve(start + count)
+        self.size += count
+        return start
+
+    def release(self, start, count):
+        """
+        Releases a range of rows. The rows are zeroed: the faces become degenerate and the lines transparent.
+        :param start: int
+            First row of the range
+        :param count: int
+            Number of rows
+        """
+        if count == 0:
+            return
+
+        for arr in self.arrays.values():
+            arr[start:start + count] = 0
+        self.live -= count
+
+        # merge with the neighbour ranges
+        idx = bisect.bisect(self.free, (start, count))
+        if idx < len(self.free) and self.free[idx][0] == start + count:
+            count += self.free[idx][1]
+            del self.free[idx]
+        if idx > 0 and self.free[idx - 1][0] + self.free[idx - 1][1] == start:
+            start, prev_count = self.free[idx - 1]
+            count += prev_count
+            del self.free[idx - 1]
+            idx -= 1
+
+        if start + count == self.size:
+            self.size = start
+        else:
+            self.free.insert(idx, (start, count))
+
+    def view(self, name):
+        return self.arrays[name][:self.size]
+
+    @property
+    def fragmented(self):
+        return self.size > 1024 and (self.size - self.live) > self.live
+
+
+class _LayerBuffers(object):
+    def __init__(self):
+        """
+        Buffers of a collection layer: mesh vertices, mesh faces with their colors and line segments with their colors
+        """
+        self.vertices = _RowBuffer(pos=(2, np.float32))
+        self.faces = _RowBuffer(idx=(3, np.uint32), color=(4, np.float32))
+        self.lines = _RowBuffer(pos=(2, np.float32), color=(4, np.float32))
+
+    def clear(self):
+        self.vertices.clear()
+        self.faces.clear()
+        self.lines.clear()
+
+    @property
+    def fragmented(self):
+        return self.vertices.fragmented or self.faces.fragmented or self.lines.fragmented
+
+
 class ShapeGroup(object):
     def __init__(self, collection):
         """
@@ -149,6 +535,16 @@ class ShapeGroup(object):
         self._indexes.append(key)
         return key
 
+    def add_lod(self, **kwargs):
+        """
+        Adds a level of detail shape to collection and store index in group
+        :param kwargs: keyword arguments
+            Arguments for ShapeCollection.add_lod function
+        """
+        key = self._collection.add_lod(**kwargs)
+        self._indexes.append(key)
+        return key
+
     def remove(self, idx, update=False):
         self._indexes.remove(idx)
         self._collection.remove(idx, False)
@@ -193,19 +589,16 @@ class ShapeGroup(object):
         :param value: bool
         """
         self._visible = value
-        for i in self._indexes:
-            self._collection.data[i]['visible'] = value
+        self._collection.update_visibility(value, indexes=self._indexes)
 
         self._collection.redraw([])
 
     def update_visibility(self, state, indexes=None):
         if indexes:
-            for i in indexes:
-                if i in self._indexes:
-                    self._collection.data[i]['visible'] = state
+            own_indexes = set(self._indexes)
+            self._collection.update_visibility(state, indexes=[i for i in indexes if i in own_indexes])
         else:
-            for i in self._indexes:
-                self._collection.data[i]['visible'] = state
+            self._collection.update_visibility(state, indexes=self._indexes)
 
         self._collection.redraw([])
 
@@ -238,6 +631,19 @@ class ShapeCollectionVisual(CompoundVisual):
         self.pool = pool
         self.results = {}
 
+        # Shapes waiting to be sent to the process pool, they are sent in batches
+        self._pending = {}
+        self.batch_size = 200
+
+        # Per layer buffers of the visible shapes and the rows used by each shape in them
+        self._buffers = [_LayerBuffers() for _ in range(0, layers)]
+        self._slots = {}
+        self._dirty = set()
+
+        # Shapes drawn with a level of detail (ToolpathLOD) and the pixel size of the last draw
+        self._lod_keys = set()
+        self._pixel_size = None
+
         self._meshes = [MeshVisual() for _ in range(0, layers)]
         # self._lines = [LineVisual(antialias=True) for _ in range(0, layers)]
         self._lines = [FlatCAMLineVisual(antialias=True) for _ in range(0, layers)]
@@ -260,7 +666,7 @@ class ShapeCollectionVisual(CompoundVisual):
         self.freeze()
 
     def add(self, shape=None, color=None, face_color=None, alpha=None, visible=True,
-            update=False, layer=1, tolerance=0.01, linewidth=None):
+            update=False, layer=1, tolerance=0.01, linewidth=None, offsets=None):
         """
         Adds shape to collection
         :return:
@@ -282,6 +688,9 @@ class ShapeCollectionVisual(CompoundVisual):
             Geometry simplifying tolerance
         :param linewidth: int
             Width of the line
+        :param offsets: list
+            (dx, dy) translations; the shape is drawn once at each of them (the copies of a panel). It is triangulated
+            only once.
         :return: int
             Index of shape
         """
@@ -294,21 +703,127 @@ class ShapeCollectionVisual(CompoundVisual):
         # Prepare data for translation
         self.data[key] = {'geometry': shape, 'color': color, 'alpha': alpha, 'face_color': face_color,
                           'visible': visible, 'layer': layer, 'tolerance': tolerance}
+        if offsets is not None:
+            self.data[key]['offsets'] = np.array(offsets, dtype=np.float32).reshape((-1, 2))
 
         if linewidth:
             self._line_width = linewidth
 
-        # Add data to process pool if pool exists
-        try:
-            self.results[key] = self.pool.map_async(_update_shape_buffers, [self.data[key]])
-        except Exception:
-            self.data[key] = _update_shape_buffers(self.data[key])
+        data = self.data[key]
+        cached = None
+        if shape is not None and not shape.is_empty:
+            data['cache_key'] = tessellation_cache.key(data)
+            cached = tessellation_cache.get(data['cache_key'])
+
+        if cached is not None:
+            # Already triangulated
+            data['line_pts'], data['mesh_vertices'], data['mesh_tris'] = cached
+            del data['geometry']
+        elif self.pool is not None and 'cache_key' in data:
+            # Add data to process pool, in batches
+            self.results_lock.acquire(True)
+            self._pending[key] = None
+            if len(self._pending) >= self.batch_size:
+                self._send_pending()
+            self.results_lock.release()
+        else:
+            _update_shape_buffers(data)
+            if 'cache_key' in data:
+                tessellation_cache.put(data['cache_key'], data)
+
+        if 'line_pts' in data:
+            self.update_lock.acquire(True)
+            self._place(key)
+            self.update_lock.release()
 
         if update:
             self.redraw()   # redraw() waits for pool process end
 
         return key
 
+    def add_lod(self, lod, color=None, face_color=None, visible=True, update=False, layer=1):
+        """
+        Adds a shape made of buffers that depend on the zoom level. The level is chosen again when the size of a
+        screen pixel changes enough, on draw.
+
+        :param lod: ToolpathLOD
+            The source of the buffers
+        :param color: str, tuple
+            Line/edge color
+        :param face_color: str, tuple
+            Mesh color
+        :param visible: bool
+            Shape visibility
+        :param update: bool
+            Set True to redraw collection
+        :param layer: int
+            Layer number. 0 - lowest.
+        :return: int
+            Index of shape
+        """
+        # Get new key
+        self.key_lock.acquire(True)
+        self.last_key += 1
+        key = self.last_key
+        self.key_lock.release()
+
+        level = lod.level(self._pixel_size)
+        line_pts, mesh_vertices, mesh_tris = lod.buffers(level)
+        self.data[key] = {'color': color, 'alpha': None, 'face_color': face_color, 'visible': visible,
+                          'layer': layer, 'tolerance': None, 'lod': lod, 'lod_level': level,
+                          'line_pts': line_pts, 'mesh_vertices': mesh_vertices, 'mesh_tris': mesh_tris}
+
+        self.update_lock.acquire(True)
+        self._lod_keys.add(key)
+        self._place(key)
+        self.update_lock.release()
+
+        if update:
+            self.redraw()
+
+        return key
+
+    def _prepare_draw(self, view):
+        """
+        Changes the buffers of the level of detail shapes when the zoom changed their level.
+        """
+        if not self._lod_keys:
+            return
+
+        try:
+            tr = view.transforms.get_transform('visual', 'canvas')
+            pts = tr.map(np.array([[0.0, 0.0], [1.0, 0.0]]))
+            pts = pts[:, :2] / pts[:, 3:4]
+            pixel_size = 1.0 / float(np.hypot(*(pts[1] - pts[0])))
+        except Exception:
+            return
+
+        if pixel_size == self._pixel_size:
+            return
+        self._pixel_size = pixel_size
+
+        self.update_lock.acquire(True)
+        for key in list(self._lod_keys):
+            data = self.data.get(key)
+            if data is None:
+                self._lod_keys.discard(key)
+                continue
+
+            level = data['lod'].level(pixel_size)
+            if level == data['lod_level']:
+                continue
+
+            data['lod_level'] = level
+            data['line_pts'], data['mesh_vertices'], data['mesh_tris'] = data['lod'].buffers(level)
+            if key in self._slots:
+                self._release(key)
+                self._place(key)
+        changed = bool(self._dirty)
+        self.update_lock.release()
+
+        if changed:
+            self.__update()
+
     def remove(self, key, update=False):
         """
         Removes shape from collection
@@ -319,11 +834,16 @@ class ShapeCollectionVisual(CompoundVisual):
         """
         # Remove process result
         self.results_lock.acquire(True)
+        self._pending.pop(key, None)
         if key in list(self.results.copy().keys()):
             del self.results[key]
         self.results_lock.release()
 
         # Remove data
+        self.update_lock.acquire(True)
+        self._release(key)
+        self._lod_keys.discard(key)
+        self.update_lock.release()
         del self.data[key]
 
         if update:
@@ -335,20 +855,145 @@ class ShapeCollectionVisual(CompoundVisual):
         :param update: bool
             Set True to redraw collection
         """
+        self.results_lock.acquire(True)
+        self._pending.clear()
+        self.results.clear()
+        self.results_lock.release()
+
+        self.update_lock.acquire(True)
         self.data.clear()
+        self._slots.clear()
+        self._lod_keys.clear()
+        for i, buffers in enumerate(self._buffers):
+            buffers.clear()
+            self._dirty.add(i)
+        self.update_lock.release()
+
         if update:
             self.__update()
 
+    def _send_pending(self):
+        """
+        Sends the shapes waiting for triangulation to the process pool as one task. Must be called with the results
+        lock acquired.
+        """
+        keys = [k for k in self._pending if k in self.data]
+        self._pending.clear()
+        if not keys:
+            return
+
+        try:
+            result = self.pool.map_async(_update_shape_buffers, [self.data[k] for k in keys], chunksize=len(keys))
+        except Exception as e:
+            print("VisPyVisuals.ShapeCollectionVisual._send_pending() --> Process pool error. %s" % str(e))
+            for k in keys:
+                _update_shape_buffers(self.data[k])
+                tessellation_cache.put(self.data[k]['cache_key'], self.data[k])
+                self.update_lock.acquire(True)
+                self._place(k)
+                self.update_lock.release()
+            return
+
+        for pos, k in enumerate(keys):
+            self.results[k] = (result, pos)
+
+    def _place(self, key):
+        """
+        Copies the buffers of a translated and visible shape in the rows allocated for it in its layer buffers.
+        Must be called with the update lock acquired.
+        :param key: int
+            Shape index
+        """
+        data = self.data[key]
+        if key in self._slots or not data['visible'] or 'line_pts' not in data:
+            return
+
+        try:
+            buffers = self._buffers[data['layer']]
+        except (IndexError, TypeError) as e:
+            print("VisPyVisuals.ShapeCollectionVisual._place() --> Data error. %s" % str(e))
+            return
+
+        vertices, tris, pts = data['mesh_vertices'], data['mesh_tris'], data['line_pts']
+        if data.get('offsets') is not None:
+            vertices, tris, pts = _instance_buffers(vertices, tris, pts, data['offsets'])
+        slot = {'layer': data['layer'], 'vertices': (0, 0), 'faces': (0, 0), 'lines': (0, 0), 'bounds': None}
+        bounds = []
+
+        if len(vertices) > 0 and len(tris) > 0:
+            v_start = buffers.vertices.allocate(len(vertices))
+            buffers.vertices.arrays['pos'][v_start:v_start + len(vertices)] = vertices
+
+            f_start = buffers.faces.allocate(len(tris))
+            buffers.faces.arrays['idx'][f_start:f_start + len(tris)] = tris + v_start
+            buffers.faces.arrays['color'][f_start:f_start + len(tris)] = _color_rgba(data['face_color'])
+
+            slot['vertices'] = (v_start, len(vertices))
+            slot['faces'] = (f_start, len(tris))
+            bounds.append(vertices)
+
+        if len(pts) > 0:
+            l_start = buffers.lines.allocate(len(pts))
+            buffers.lines.arrays['pos'][l_start:l_start + len(pts)] = pts
+            buffers.lines.arrays['color'][l_start:l_start + len(pts)] = _color_rgba(data['color'])
+
+            slot['lines'] = (l_start, len(pts))
+            bounds.append(pts)
+
+        if bounds:
+            bounds = np.concatenate(bounds)
+            slot['bounds'] = (bounds.min(axis=0), bounds.max(axis=0))
+
+        self._slots[key] = slot
+        self._dirty.add(slot['layer'])
+
+    def _release(self, key):
+        """
+        Releases the rows used by a shape in its layer buffers. Must be called with the update lock acquired.
+        :param key: int
+            Shape index
+        """
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+
+        buffers = self._buffers[slot['layer']]
+        buffers.vertices.release(*slot['vertices'])
+        buffers.faces.release(*slot['faces'])
+        buffers.lines.release(*slot['lines'])
+        self._dirty.add(slot['layer'])
+
+    def _compact(self, layer):
+        """
+        Rebuilds the buffers of a layer without the released rows. Must be called with the update lock acquired.
+        :param layer: int
+            Layer number
+        """
+        keys = [k for k in sorted(self._slots) if self._slots[k]['layer'] == layer]
+        for k in keys:
+            del self._slots[k]
+        self._buffers[layer].clear()
+        for k in keys:
+            self._place(k)
+        self._dirty.add(layer)
+
+    def _compute_bounds(self, axis, view):
+        # the released rows are kept in the buffers (zeroed) so the bounds are taken from the shapes
+        bounds = [slot['bounds'] for slot in list(self._slots.values()) if slot['bounds'] is not None]
+        if not bounds or axis > 1:
+            return None
+        return (float(min(b[0][axis] for b in bounds)), float(max(b[1][axis] for b in bounds)))
+
     def update_visibility(self, state: bool, indexes=None) -> None:
         # Lock sub-visuals updates
         self.update_lock.acquire(True)
-        if indexes is None:
-            for k, data in list(self.data.items()):
+        for k in list(self.data.keys()) if indexes is None else indexes:
+            if k in self.data and self.data[k]['visible'] != state:
                 self.data[k]['visible'] = state
-        else:
-            for k, data in list(self.data.items()):
-                if k in indexes:
-                    self.data[k]['visible'] = state
+                if state:
+                    self._place(k)
+                else:
+                    self._release(k)
 
         self.update_lock.release()
 
@@ -364,169 +1009,104 @@ class ShapeCollectionVisual(CompoundVisual):
         mesh_color_rgba = None
         line_color_rgba = None
         if new_mesh_color:
-            if new_mesh_color != '':
-                mesh_color_rgba = Color(new_mesh_color).rgba
-            else:
-                new_mesh_color = None
+            mesh_color_rgba = _color_rgba(new_mesh_color)
         if new_line_color:
-            if new_line_color != '':
-                line_color_rgba = Color(new_line_color).rgba
-            else:
-                new_line_color = None
-
-        mesh_colors = [[] for _ in range(0, len(self._meshes))]     # Face colors
-        line_colors = [[] for _ in range(0, len(self._meshes))]     # Line colors
-        line_pts = [[] for _ in range(0, len(self._lines))]         # Vertices for line
+            line_color_rgba = _color_rgba(new_line_color)
 
         # Lock sub-visuals updates
         self.update_lock.acquire(True)
-        # Merge shapes buffers
-
-        if indexes is None:
-            for k, data in list(self.data.items()):
-                if data['visible'] and 'line_pts' in data:
-                    if new_mesh_color and new_mesh_color != '':
-                        dim_mesh_tris = (len(data['mesh_tris']) // 3)
-                        if dim_mesh_tris != 0:
-                            try:
-                                mesh_colors[data['layer']] += [mesh_color_rgba] * dim_mesh_tris
-                                self.data[k]['face_color'] = new_mesh_color
-
-                                data['mesh_colors'] = [mesh_color_rgba for __ in range(len(data['mesh_colors']))]
-                            except Exception as e:
-                                print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                      "Create mesh colors --> Data error. %s" % str(e))
-
-                    if new_line_color and new_line_color != '':
-                        dim_line_pts = (len(data['line_pts']))
-                        if dim_line_pts != 0:
-                            try:
-                                line_pts[data['layer']] += data['line_pts']
-                                line_colors[data['layer']] += [line_color_rgba] * dim_line_pts
-                                self.data[k]['color'] = new_line_color
-
-                                data['line_colors'] = [mesh_color_rgba for __ in range(len(data['line_colors']))]
-                            except Exception as e:
-                                print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                      "Create line colors --> Data error. %s" % str(e))
-        else:
-            for k, data in list(self.data.items()):
-                if data['visible'] and 'line_pts' in data:
-                    dim_mesh_tris = (len(data['mesh_tris']) // 3)
-                    dim_line_pts = (len(data['line_pts']))
-
-                    if k in indexes:
-                        if new_mesh_color and new_mesh_color != '':
-                            if dim_mesh_tris != 0:
-                                try:
-                                    mesh_colors[data['layer']] += [mesh_color_rgba] * dim_mesh_tris
-                                    self.data[k]['face_color'] = new_mesh_color
-
-                                    data['mesh_colors'] = [mesh_color_rgba for __ in range(len(data['mesh_colors']))]
-                                except Exception as e:
-                                    print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                          "Create mesh colors --> Data error. %s" % str(e))
-                        if new_line_color and new_line_color != '':
-                            if dim_line_pts != 0:
-                                try:
-                                    line_pts[data['layer']] += data['line_pts']
-                                    line_colors[data['layer']] += [line_color_rgba] * dim_line_pts
-                                    self.data[k]['color'] = new_line_color
-
-                                    data['line_colors'] = [mesh_color_rgba for __ in range(len(data['line_colors']))]
-                                except Exception as e:
-                                    print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                          "Create line colors --> Data error. %s" % str(e))
-                    else:
-                        if dim_mesh_tris != 0:
-                            try:
-                                mesh_colors[data['layer']] += [Color(data['face_color']).rgba] * dim_mesh_tris
-                            except Exception as e:
-                                print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                      "Create mesh colors --> Data error. %s" % str(e))
-
-                        if dim_line_pts != 0:
-                            try:
-                                line_pts[data['layer']] += data['line_pts']
-                                line_colors[data['layer']] += [Color(data['color']).rgba] * dim_line_pts
-                            except Exception as e:
-                                print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                                      "Create line colors --> Data error. %s" % str(e))
-
-        # Updating meshes
-        if new_mesh_color and new_mesh_color != '':
-            for i, mesh in enumerate(self._meshes):
-                if mesh_colors[i]:
-                    try:
-                        mesh._meshdata.set_face_colors(colors=np.asarray(mesh_colors[i]))
-                        mesh.mesh_data_changed()
-                    except Exception as e:
-                        print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                              "Apply mesh colors --> Data error. %s" % str(e))
-
-        # Updating lines
-        if new_line_color and new_line_color != '':
-            for i, line in enumerate(self._lines):
-                if len(line_pts[i]) > 0:
-                    try:
-                        line._color = np.asarray(line_colors[i])
-                        line._changed['color'] = True
-                        line.update()
-                    except Exception as e:
-                        print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
-                              "Apply line colors --> Data error. %s" % str(e))
-                else:
-                    line.clear_data()
+
+        # Patch the color rows of the shapes
+        recolored = set()
+        for k in list(self.data.keys()) if indexes is None else indexes:
+            if k not in self.data:
+                continue
+
+            if mesh_color_rgba is not None:
+                self.data[k]['face_color'] = new_mesh_color
+            if line_color_rgba is not None:
+                self.data[k]['color'] = new_line_color
+
+            slot = self._slots.get(k)
+            if slot is None:
+                continue
+
+            buffers = self._buffers[slot['layer']]
+            if mesh_color_rgba is not None and slot['faces'][1] != 0:
+                start, count = slot['faces']
+                buffers.faces.arrays['color'][start:start + count] = mesh_color_rgba
+                recolored.add(slot['layer'])
+            if line_color_rgba is not None and slot['lines'][1] != 0:
+                start, count = slot['lines']
+                buffers.lines.arrays['color'][start:start + count] = line_color_rgba
+                recolored.add(slot['layer'])
 
         self.update_lock.release()
 
-    def __update(self):
-        """
-        Merges internal buffers, sets data to visuals, redraws collection on scene
-        """
-        mesh_vertices = [[] for _ in range(0, len(self._meshes))]       # Vertices for mesh
-        mesh_tris = [[] for _ in range(0, len(self._meshes))]           # Faces for mesh
-        mesh_colors = [[] for _ in range(0, len(self._meshes))]         # Face colors
-        line_pts = [[] for _ in range(0, len(self._lines))]             # Vertices for line
-        line_colors = [[] for _ in range(0, len(self._lines))]          # Line color
+        # the layers with other changes are uploaded entirely
+        if self._dirty:
+            self.__update()
+            return
 
-        # Lock sub-visuals updates
         self.update_lock.acquire(True)
 
-        # Merge shapes buffers
-        for data in list(self.data.values()):
-            if data['visible'] and 'line_pts' in data:
+        for i in recolored:
+            buffers = self._buffers[i]
+
+            # Updating meshes
+            if mesh_color_rgba is not None and buffers.faces.live > 0:
                 try:
-                    line_pts[data['layer']] += data['line_pts']
-                    line_colors[data['layer']] += data['line_colors']
+                    self._meshes[i]._meshdata.set_face_colors(colors=buffers.faces.view('color').copy())
+                    self._meshes[i].mesh_data_changed()
+                except Exception as e:
+                    print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
+                          "Apply mesh colors --> Data error. %s" % str(e))
 
-                    mesh_tris[data['layer']] += [x + len(mesh_vertices[data['layer']]) for x in data['mesh_tris']]
-                    mesh_vertices[data['layer']] += data['mesh_vertices']
-                    mesh_colors[data['layer']] += data['mesh_colors']
+            # Updating lines
+            if line_color_rgba is not None and buffers.lines.live > 0:
+                try:
+                    self._lines[i]._color = buffers.lines.view('color').copy()
+                    self._lines[i]._changed['color'] = True
+                    self._lines[i].update()
                 except Exception as e:
-                    print("VisPyVisuals.ShapeCollectionVisual._update() --> Data error. %s" % str(e))
+                    print("VisPyVisuals.ShapeCollectionVisual.update_color(). "
+                          "Apply line colors --> Data error. %s" % str(e))
+
+        self.update_lock.release()
 
-        # Updating meshes
-        for i, mesh in enumerate(self._meshes):
-            if len(mesh_vertices[i]) > 0:
+    def __update(self):
+        """
+        Sets the changed layer buffers to visuals, redraws collection on scene
+        """
+        # Lock sub-visuals updates
+        self.update_lock.acquire(True)
+
+        for i in sorted(self._dirty):
+            buffers = self._buffers[i]
+            if buffers.fragmented:
+                self._compact(i)
+
+            # the visuals get copies, the buffers are changed in place by the next add / remove
+            # Updating meshes
+            mesh = self._meshes[i]
+            if buffers.faces.live > 0:
                 set_state(polygon_offset_fill=False)
-                faces_array = np.asarray(mesh_tris[i], dtype=np.uint32)
                 mesh.set_data(
-                    vertices=np.asarray(mesh_vertices[i]),
-                    faces=faces_array.reshape((-1, 3)),
-                    face_colors=np.asarray(mesh_colors[i])
+                    vertices=buffers.vertices.view('pos').copy(),
+                    faces=buffers.faces.view('idx').copy(),
+                    face_colors=buffers.faces.view('color').copy()
                 )
             else:
                 mesh.set_data()
 
             mesh._bounds_changed()
 
-        # Updating lines
-        for i, line in enumerate(self._lines):
-            if len(line_pts[i]) > 0:
+            # Updating lines
+            line = self._lines[i]
+            if buffers.lines.live > 0:
                 line.set_data(
-                    pos=np.asarray(line_pts[i]),
-                    color=np.asarray(line_colors[i]),
+                    pos=buffers.lines.view('pos').copy(),
+                    color=buffers.lines.view('color').copy(),
                     width=self._line_width,
                     connect='segments')
             else:
@@ -534,6 +1114,7 @@ class ShapeCollectionVisual(CompoundVisual):
 
             line._bounds_changed()
 
+        self._dirty.clear()
         self._bounds_changed()
         self.update_lock.release()
 
@@ -547,13 +1128,25 @@ class ShapeCollectionVisual(CompoundVisual):
         # Only one thread can update data
         self.results_lock.acquire(True)
 
+        self._send_pending()
+
         for i in list(self.data.keys()) if not indexes else indexes:
             if i in list(self.results.keys()):
                 try:
-                    self.results[i].wait()                                  # Wait for process results
+                    async_result, pos = self.results[i]
+                    async_result.wait()                                     # Wait for process results
                     if i in self.data:
-                        self.data[i] = self.results[i].get()[0]             # Store translated data
+                        # Store translated data, keeping the visibility and the colors set in the meantime
+                        result = async_result.get()[pos]
+                        for attr in ('visible', 'color', 'face_color'):
+                            result[attr] = self.data[i][attr]
+                        self.data[i] = result
                         del self.results[i]
+                        tessellation_cache.put(result['cache_key'], result)
+
+                        self.update_lock.acquire(True)
+                        self._place(i)
+                        self.update_lock.release()
                 except Exception as e:
                     print("VisPyVisuals.ShapeCollectionVisual.redraw() --> Data error = %s. Indexes = %s" %
                           (str(e), str(indexes)))
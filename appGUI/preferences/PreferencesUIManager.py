@@ -69,6 +69,8 @@ class PreferencesUIManager:
             "global_save_compressed": self.ui.general_defaults_form.general_app_group.save_type_cb,
             "global_autosave": self.ui.general_defaults_form.general_app_group.autosave_cb,
             "global_autosave_timeout": self.ui.general_defaults_form.general_app_group.autosave_entry,
+            "global_parse_cache": self.ui.general_defaults_form.general_app_group.parse_cache_cb,
+            "global_parse_cache_size": self.ui.general_defaults_form.general_app_group.parse_cache_size_entry,
 
             "global_tpdf_tmargin": self.ui.general_defaults_form.general_app_group.tmargin_entry,
             "global_tpdf_bmargin": self.ui.general_defaults_form.general_app_group.bmargin_entry,
@@ -145,6 +147,7 @@ class PreferencesUIManager:
             "gerber_delayed_buffering": self.ui.gerber_defaults_form.gerber_adv_opt_group.delayed_buffer_cb,
             "gerber_simplification": self.ui.gerber_defaults_form.gerber_adv_opt_group.simplify_cb,
             "gerber_simp_tolerance": self.ui.gerber_defaults_form.gerber_adv_opt_group.simplification_tol_spinner,
+            "gerber_parallel_parsing": self.ui.gerber_defaults_form.gerber_adv_opt_group.parallel_parsing_cb,
 
             # Gerber Export
             "gerber_exp_units": self.ui.gerber_defaults_form.gerber_exp_group.gerber_units_radio,
@@ -559,6 +562,7 @@ class PreferencesUIManager:
 
             # Optimal Tool
             "tools_opt_precision": self.ui.tools2_defaults_form.tools2_optimal_group.precision_sp,
+            "tools_opt_distances": self.ui.tools2_defaults_form.tools2_optimal_group.distances_sp,
 
             # Check Rules Tool
             "tools_cr_trace_size": self.ui.tools2_defaults_form.tools2_checkrules_group.trace_size_cb,
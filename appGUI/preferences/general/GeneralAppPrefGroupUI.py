@@ -302,16 +302,41 @@ class GeneralAppPrefGroupUI(OptionsGroupUI):
 
         # self.as_ois = OptionalInputSection(self.autosave_cb, [self.autosave_label, self.autosave_entry], True)
 
+        # Parse Cache CB
+        self.parse_cache_cb = FCCheckBox(_('Parse Cache'))
+        self.parse_cache_cb.setToolTip(
+            _("Check to keep the result of parsing Gerber and Excellon files\n"
+              "in a cache on disk. Opening again a file that was not changed,\n"
+              "with the same parsing settings, will load it from the cache.")
+        )
+
+        grid0.addWidget(self.parse_cache_cb, 33, 0, 1, 2)
+
+        # Parse Cache Size
+        self.parse_cache_size_entry = FCSpinner()
+        self.parse_cache_size_entry.set_range(1, 100000)
+        self.parse_cache_size_label = QtWidgets.QLabel('%s:' % _('Cache Size'))
+        self.parse_cache_size_label.setToolTip(
+            _("Maximum size of the parse cache. In MB.\n"
+              "When the size is exceeded, the least recently used files are removed.")
+        )
+
+        grid0.addWidget(self.parse_cache_size_label, 34, 0)
+        grid0.addWidget(self.parse_cache_size_entry, 34, 1)
+
+        self.parse_cache_ois = OptionalInputSection(
+            self.parse_cache_cb, [self.parse_cache_size_label, self.parse_cache_size_entry], True)
+
         separator_line = QtWidgets.QFrame()
         separator_line.setFrameShape(QtWidgets.QFrame.HLine)
         separator_line.setFrameShadow(QtWidgets.QFrame.Sunken)
-        grid0.addWidget(separator_line, 33, 0, 1, 2)
+        grid0.addWidget(separator_line, 35, 0, 1, 2)
 
         self.pdf_param_label = QtWidgets.QLabel('<B>%s:</b>' % _("Text to PDF parameters"))
         self.pdf_param_label.setToolTip(
             _("Used when saving text in Code Editor or in FlatCAM Document objects.")
         )
-        grid0.addWidget(self.pdf_param_label, 34, 0, 1, 2)
+        grid0.addWidget(self.pdf_param_label, 36, 0, 1, 2)
 
         # Top Margin value
         self.tmargin_entry = FCDoubleSpinner()
@@ -323,8 +348,8 @@ class GeneralAppPrefGroupUI(OptionsGroupUI):
             _("Distance between text body and the top of the PDF file.")
         )
 
-        grid0.addWidget(self.tmargin_label, 35, 0)
-        grid0.addWidget(self.tmargin_entry, 35, 1)
+        grid0.addWidget(self.tmargin_label, 37, 0)
+        grid0.addWidget(self.tmargin_entry, 37, 1)
 
         # Bottom Margin value
         self.bmargin_entry = FCDoubleSpinner()
@@ -336,8 +361,8 @@ class GeneralAppPrefGroupUI(OptionsGroupUI):
             _("Distance between text body and the bottom of the PDF file.")
         )
 
-        grid0.addWidget(self.bmargin_label, 36, 0)
-        grid0.addWidget(self.bmargin_entry, 36, 1)
+        grid0.addWidget(self.bmargin_label, 38, 0)
+        grid0.addWidget(self.bmargin_entry, 38, 1)
 
         # Left Margin value
         self.lmargin_entry = FCDoubleSpinner()
@@ -349,8 +374,8 @@ class GeneralAppPrefGroupUI(OptionsGroupUI):
             _("Distance between text body and the left of the PDF file.")
         )
 
-        grid0.addWidget(self.lmargin_label, 37, 0)
-        grid0.addWidget(self.lmargin_entry, 37, 1)
+        grid0.addWidget(self.lmargin_label, 39, 0)
+        grid0.addWidget(self.lmargin_entry, 39, 1)
 
         # Right Margin value
         self.rmargin_entry = FCDoubleSpinner()
@@ -362,8 +387,8 @@ class GeneralAppPrefGroupUI(OptionsGroupUI):
             _("Distance between text body and the right of the PDF file.")
         )
 
-        grid0.addWidget(self.rmargin_label, 38, 0)
-        grid0.addWidget(self.rmargin_entry, 38, 1)
+        grid0.addWidget(self.rmargin_label, 40, 0)
+        grid0.addWidget(self.rmargin_entry, 40, 1)
 
         self.layout.addStretch()
 
@@ -108,6 +108,14 @@ class GerberAdvOptPrefGroupUI(OptionsGroupUI):
             ],
             logic=True)
 
+        # Parallel Parsing
+        self.parallel_parsing_cb = FCCheckBox(label=_('Parallel Parsing'))
+        self.parallel_parsing_cb.setToolTip(
+            _("When checked, the geometry of large Gerber files\n"
+              "is built in parallel, using all the CPU cores.")
+        )
+        grid0.addWidget(self.parallel_parsing_cb, 13, 0, 1, 2)
+
         self.layout.addStretch()
 
         # signals
@@ -19,7 +19,11 @@ from appObjects.FlatCAMObj import *
 
 from matplotlib.backend_bases import KeyEvent as mpl_key_event
 
-from camlib import CNCjob
+from camlib import CNCjob, GCodeSink
+from appCommon.GrblSender import GrblSender
+from appCommon.AutoLevelling import make_interpolator, probe_spacing, level_gcode, parse_grbl_probes, \
+    parse_grbl_offset
+from appGUI.VisPyVisuals import ToolpathLOD
 
 from shapely.ops import unary_union
 from shapely.geometry import Point, MultiPoint, Polygon, LineString, box
@@ -214,8 +218,16 @@ class CNCJobObject(FlatCAMObj, CNCjob):
         '''
         self.al_bilinear_geo_storage = []
 
+        '''
+        the GCode before the autolevelling, so the autolevelling is always done over the original GCode:
+        {'gcode': str, 'cnc_tools': {tool: str}, 'exc_cnc_tools': {tool: str}}
+        '''
+        self.al_source_gcode = None
+
         self.solid_geo = None
         self.grbl_ser_port = None
+        # streams the GCode to the GRBL controller connected on grbl_ser_port
+        self.grbl_sender = None
 
         self.pressed_button = None
 
@@ -634,6 +646,8 @@ class CNCJobObject(FlatCAMObj, CNCjob):
         self.ui.pause_resume_button.clicked.connect(self.on_grbl_pause_resume)
         self.ui.grbl_get_heightmap_button.clicked.connect(self.on_grbl_autolevel)
         self.ui.grbl_save_height_map_button.clicked.connect(self.on_grbl_heightmap_save)
+        self.ui.grbl_stream_button.clicked.connect(self.on_grbl_stream_gcode)
+        self.ui.grbl_stop_stream_button.clicked.connect(self.on_grbl_stop_stream)
 
         self.build_al_table_sig.connect(self.build_al_table)
 
@@ -1140,24 +1154,56 @@ class CNCJobObject(FlatCAMObj, CNCjob):
         self.ui.al_frame.show() if state else self.ui.al_frame.hide()
         self.app.defaults["cncjob_al_status"] = True if state else False
 
-    def autolevell_gcode(self):
-        pass
-
-    def autolevell_gcode_line(self, gcode_line):
-        al_method = self.ui.al_method_radio.get_value()
-
-        coords = ()
+    def autolevell_gcode(self, probes=None):
+        """
+        Level the GCode of this object over the probed height map: the Z of the moves is offset by the height of the
+        surface and the feed moves are split (by the segmentation on X and Y of the object or, if there is none, by the
+        spacing of the probe points) so the tool follows the surface. The heights are interpolated with the method
+        selected in the UI: bilinear over the grid of probe points or the height of the nearest probe point (Voronoi).
+
+        :param probes:  (N, 3) array of probed points (x, y, height); if None the heights from the probing points
+                        storage are used
+        :type probes:   numpy.ndarray
+        :return:        'fail' in case of failure, None otherwise
+        :rtype:         str
+        """
+        if probes is None:
+            probes = [
+                (value['point'].x, value['point'].y, value['height'])
+                for value in self.al_voronoi_geo_storage.values() if 'point' in value and 'height' in value
+            ]
+        probes = np.array(probes, dtype=float).reshape(-1, 3)
+        if not len(probes):
+            self.app.inform.emit('[WARNING_NOTCL] %s' % _("Empty height map."))
+            return 'fail'
+
+        interpolator = make_interpolator(probes, self.ui.al_method_radio.get_value())
+        step_x, step_y = self.segx, self.segy
+        if step_x <= 0 and step_y <= 0:
+            step_x, step_y = probe_spacing(probes)
+
+        if self.al_source_gcode is None:
+            self.al_source_gcode = {
+                'gcode': self.gcode,
+                'cnc_tools': {tool: tool_dict.get('gcode') for tool, tool_dict in self.cnc_tools.items()},
+                'exc_cnc_tools': {tool: tool_dict.get('gcode') for tool, tool_dict in self.exc_cnc_tools.items()}
+            }
 
-        if al_method == 'v':
-            self.autolevell_voronoi(gcode_line, coords)
-        elif al_method == 'b':
-            self.autolevell_bilinear(gcode_line, coords)
+        def level(code):
+            levelled = GCodeSink()
+            text = code.getvalue() if isinstance(code, GCodeSink) else code
+            for block in level_gcode(StringIO(text), interpolator, step_x, step_y, self.coords_decimals):
+                levelled += block
+            return levelled.getvalue()
 
-    def autolevell_bilinear(self, gcode_line, coords):
-        pass
+        if self.al_source_gcode['gcode']:
+            self.gcode = level(self.al_source_gcode['gcode'])
+        for tools, source in ((self.cnc_tools, 'cnc_tools'), (self.exc_cnc_tools, 'exc_cnc_tools')):
+            for tool, code in self.al_source_gcode[source].items():
+                if code and tool in tools:
+                    tools[tool]['gcode'] = level(code)
 
-    def autolevell_voronoi(self, gcode_line, coords):
-        pass
+        self.app.inform.emit('[success] %s' % _("Finished autolevelling."))
 
     def on_show_al_table(self, state):
         self.ui.al_probe_points_table.show() if state else self.ui.al_probe_points_table.hide()
@@ -1311,6 +1357,13 @@ class CNCJobObject(FlatCAMObj, CNCjob):
                         if self.ui.al_toolbar.tabText(idx) == _("Sender"):
                             self.ui.al_toolbar.tabBar.setTabEnabled(idx, True)
 
+                    self.grbl_sender = GrblSender(self.grbl_ser_port)
+                    self.grbl_sender.line_received.connect(
+                        lambda answer: self.app.inform_shell.emit('\t\t\t: ' + answer.upper()))
+                    self.grbl_sender.error.connect(self.on_grbl_stream_error)
+                    self.grbl_sender.progress.connect(self.on_grbl_stream_progress)
+                    self.grbl_sender.finished.connect(self.on_grbl_stream_finished)
+
                     self.app.inform.emit("%s: %s" % (_("Port connected"), port_name))
                     return
 
@@ -1318,6 +1371,9 @@ class CNCJobObject(FlatCAMObj, CNCjob):
             self.app.inform.emit("[ERROR_NOTCL] %s: %s" % (_("Could not connect to GRBL on port"), port_name))
 
         except serial.SerialException:
+            if self.grbl_sender is not None:
+                self.grbl_sender.stop()
+                self.grbl_sender = None
             self.grbl_ser_port = serial.Serial()
             self.grbl_ser_port.port = port_name
             self.grbl_ser_port.close()
@@ -1379,6 +1435,11 @@ class CNCJobObject(FlatCAMObj, CNCjob):
         :return:        the text returned by the GRBL controller after each command
         :rtype:         str
         """
+        if self.grbl_sender is not None and self.grbl_sender.is_running():
+            # the answers belong to the sender while it is streaming
+            self.app.inform.emit('[WARNING_NOTCL] %s' % _("GRBL is busy. Sending GCode ..."))
+            return ''
+
         cmd = command.strip()
         if echo:
             self.app.inform_shell[str, bool].emit(cmd, False)
@@ -1391,35 +1452,103 @@ class CNCJobObject(FlatCAMObj, CNCjob):
             self.app.inform_shell[str, bool].emit('\t\t\t: No answer\n', False)
 
         result = ''
+        grbl_out = [line.decode('utf-8', 'replace') if isinstance(line, bytes) else line for line in grbl_out]
         for line in grbl_out:
             if echo:
                 try:
-                    self.app.inform_shell.emit('\t\t\t: ' + line.decode('utf-8').strip().upper())
+                    self.app.inform_shell.emit('\t\t\t: ' + line.strip().upper())
                 except Exception as e:
                     log.debug("CNCJobObject.send_grbl_command() --> %s" % str(e))
             if 'ok' in line:
-                result = grbl_out
+                result = ''.join(grbl_out)
 
         return result
 
     def send_grbl_block(self, command, echo=True):
-        stripped_cmd = command.strip()
+        """
+        Stream a block of GCode to GRBL and wait until all the lines are executed.
 
-        for grbl_line in stripped_cmd.split('\n'):
-            if echo:
+        :param command: GCode block, lines separated by new lines
+        :type command:  str
+        :param echo:    if to show the sent lines in the Tcl Shell
+        :type echo:     bool
+        :return:        True if all the lines were accepted by GRBL
+        :rtype:         bool
+        """
+        if self.grbl_sender is None or self.grbl_sender.is_running():
+            return False
+
+        stripped_cmd = command.strip()
+        if echo:
+            for grbl_line in stripped_cmd.split('\n'):
                 self.app.inform_shell[str, bool].emit(grbl_line, False)
 
-            # Send Gcode block to GRBL
-            snd = grbl_line + '\n'
-            self.grbl_ser_port.write(snd.encode('utf-8'))
-            grbl_out = self.grbl_ser_port.readlines()
+        self.grbl_sender.start(stripped_cmd.split('\n'))
+        self.grbl_sender.wait()
+        return self.grbl_sender.result
+
+    def send_grbl_realtime(self, command):
+        """
+        Send a GRBL real-time command: 'status', 'hold', 'resume' or 'reset'. While streaming, it goes in between the
+        streamed lines.
+
+        :param command: the name of the command, see GrblSender.REALTIME_COMMANDS
+        :type command:  str
+        :return:        None
+        """
+        if self.grbl_sender is not None and self.grbl_sender.is_running():
+            self.grbl_sender.realtime(command)
+        else:
+            self.send_grbl_command(command=GrblSender.REALTIME_COMMANDS[command].decode('latin-1'))
+
+    def on_grbl_stream_gcode(self):
+        """
+        Stream the GCode of this object to the GRBL controller. The streaming is done on a separate thread.
+
+        :return:    None
+        """
+        if self.grbl_sender is None:
+            self.app.inform.emit('[ERROR_NOTCL] %s' % _("Not connected to GRBL."))
+            return
+        if self.grbl_sender.is_running():
+            self.app.inform.emit('[WARNING_NOTCL] %s' % _("GRBL is busy. Sending GCode ..."))
+            return
+
+        gcode = self.export_gcode(preamble='', postamble='', to_file=True)
+        if not isinstance(gcode, GCodeSink):
+            return
+        lines = gcode.getvalue().splitlines()
+
+        # show the Shell Dock
+        self.app.ui.shell_dock.show()
+
+        self.ui.grbl_stream_button.setDisabled(True)
+        self.ui.grbl_stop_stream_button.setDisabled(False)
+        self.app.inform.emit('%s' % _("Sending GCode to the GRBL controller."))
+        self.grbl_sender.start(lines)
+
+    def on_grbl_stop_stream(self):
+        if self.grbl_sender is not None:
+            self.grbl_sender.stop()
 
-            for line in grbl_out:
-                if echo:
-                    try:
-                        self.app.inform_shell.emit(' : ' + line.decode('utf-8').strip().upper())
-                    except Exception as e:
-                        log.debug("CNCJobObject.send_grbl_block() --> %s" % str(e))
+    def on_grbl_stream_progress(self, done, total, rate):
+        if total:
+            self.app.inform.emit('%s: %d/%d (%d%%) - %.0f %s' % (
+                _("Sending GCode"), done, total, int(done * 100 / total), rate, _("chars/s")))
+        else:
+            self.app.inform.emit('%s: %d - %.0f %s' % (_("Sending GCode"), done, rate, _("chars/s")))
+
+    def on_grbl_stream_error(self, line_nr, error_text):
+        self.app.inform_shell.emit('%s %d: %s' % (_("GRBL error on line"), line_nr, error_text))
+        self.app.inform.emit('[ERROR_NOTCL] %s %d: %s' % (_("GRBL error on line"), line_nr, error_text))
+
+    def on_grbl_stream_finished(self, success):
+        self.ui.grbl_stream_button.setDisabled(False)
+        self.ui.grbl_stop_stream_button.setDisabled(True)
+        if success:
+            self.app.inform.emit('[success] %s' % _("GCode sent to the GRBL controller."))
+        else:
+            self.app.inform.emit('[WARNING_NOTCL] %s' % _("Sending GCode to the GRBL controller was stopped."))
 
     def on_grbl_get_parameter(self, param):
         if '$' in param:
@@ -1498,19 +1627,19 @@ class CNCJobObject(FlatCAMObj, CNCjob):
         self.send_grbl_command(command=cmd)
 
     def on_grbl_reset(self):
-        cmd = '\x18'
         self.app.inform.emit("%s" % _("GRBL software reset was sent."))
+        if self.grbl_sender is not None and self.grbl_sender.is_running():
+            self.grbl_sender.realtime('reset')
+            return
         self.on_grbl_wake()
-        self.send_grbl_command(command=cmd)
+        self.send_grbl_realtime('reset')
 
     def on_grbl_pause_resume(self, checked):
         if checked is False:
-            cmd = '~'
-            self.send_grbl_command(command=cmd)
+            self.send_grbl_realtime('resume')
             self.app.inform.emit("%s" % _("GRBL resumed."))
         else:
-            cmd = '!'
-            self.send_grbl_command(command=cmd)
+            self.send_grbl_realtime('hold')
             self.app.inform.emit("%s" % _("GRBL paused."))
 
     def probing_gcode(self, storage):
@@ -1790,6 +1919,7 @@ class CNCJobObject(FlatCAMObj, CNCjob):
                         self.al_voronoi_geo_storage[idx]['point'] = Point((x, y))
 
             self.build_al_table_sig.emit()
+            self.autolevell_gcode()
 
     def on_grbl_autolevel(self):
         # show the Shell Dock
@@ -1806,6 +1936,9 @@ class CNCJobObject(FlatCAMObj, CNCjob):
                 self.send_grbl_command(command=cmd)
                 cmd = 'G90\n'
                 self.send_grbl_command(command=cmd)
+                # the coordinate offsets; the probed points are reported in machine coordinates
+                cmd = '$#\n'
+                self.grbl_probe_result += self.send_grbl_command(command=cmd) + '\n'
 
                 for pt_key in self.al_voronoi_geo_storage:
                     x = str(self.al_voronoi_geo_storage[pt_key]['point'].x)
@@ -1873,8 +2006,24 @@ class CNCJobObject(FlatCAMObj, CNCjob):
             self.app.inform.emit('[ERROR_NOTCL] %s' % _("Empty GRBL heightmap."))
 
     def on_grbl_apply_autolevel(self):
-        # TODO here we call the autolevell method
-        self.app.inform.emit('%s' % _("Finished autolevelling."))
+        """
+        Store the heights probed by the GRBL controller in the probing points storage and level the GCode with them.
+        The probed Z is in machine coordinates and it is converted to work coordinates with the G54 offset.
+
+        :return:    None
+        """
+        probed = parse_grbl_probes(self.grbl_probe_result)
+        if len(probed) != len(self.al_voronoi_geo_storage):
+            self.app.inform.emit('[ERROR_NOTCL] %s' % _("The number of probed points is not the same as the number "
+                                                        "of probing points."))
+            return
+
+        work_offset = parse_grbl_offset(self.grbl_probe_result, 'G54')
+        for pt_key, height in zip(self.al_voronoi_geo_storage, probed[:, 2] - work_offset[2]):
+            self.al_voronoi_geo_storage[pt_key]['height'] = float(height)
+
+        self.build_al_table_sig.emit()
+        self.autolevell_gcode()
 
     def on_updateplot_button_click(self, *args):
         """
@@ -2149,7 +2298,7 @@ class CNCJobObject(FlatCAMObj, CNCjob):
         :param postamble:   a custom Gcode block to be added at the end of the Gcode file
         :param to_file:     if False then no actual file is saved but the app will know that a file was created
         :param from_tcl:    True if run from Tcl Shell
-        :return:            None
+        :return:            None or, if filename is None and to_file is True, a GCodeSink holding the GCode
         """
         # gcode = ''
         # roland = False
@@ -2185,7 +2334,8 @@ class CNCJobObject(FlatCAMObj, CNCjob):
                 self.exc_cnc_tools[first_key]['data']['tools_drill_ppname_e']
             ].include_header
 
-        gcode = ''
+        # the G-Code of the tools is collected in chunks and written to the file chunk by chunk
+        gcode = GCodeSink()
         if include_header is False:
             # detect if using multi-tool and make the Gcode summation correctly for each case
             if self.multitool is True:
@@ -2197,7 +2347,7 @@ class CNCJobObject(FlatCAMObj, CNCjob):
             else:
                 gcode += self.gcode
 
-            g = preamble + '\n' + gcode + '\n' + postamble
+            g = GCodeSink(preamble, '\n', gcode, '\n', postamble)
         else:
             # search for the GCode beginning which is usually a G20 or G21
             # fix so the preamble gets inserted in between the comments header and the actual start of GCODE
@@ -2247,11 +2397,11 @@ class CNCJobObject(FlatCAMObj, CNCjob):
                             break
 
             if hpgl:
-                processed_body_gcode = ''
+                processed_body_gcode = GCodeSink()
                 pa_re = re.compile(r"^PA\s*(-?\d+\.\d*),?\s*(-?\d+\.\d*)*;?$")
 
                 # process body gcode
-                for gline in gcode.splitlines():
+                for gline in gcode.getvalue().splitlines():
                     match = pa_re.search(gline)
                     if match:
                         x_int = int(float(match.group(1)))
@@ -2262,8 +2412,8 @@ class CNCJobObject(FlatCAMObj, CNCjob):
                         processed_body_gcode += gline + '\n'
 
                 gcode = processed_body_gcode
-                g = self.gc_header + '\n' + self.gc_start + '\n' + preamble + '\n' + \
-                    gcode + '\n' + postamble + end_gcode
+                g = GCodeSink(self.gc_header, '\n', self.gc_start, '\n', preamble, '\n',
+                              gcode, '\n', postamble, end_gcode)
             else:
                 # try:
                 #     g_idx = gcode.index('G94')
@@ -2283,16 +2433,14 @@ class CNCJobObject(FlatCAMObj, CNCjob):
                 #                          _("G-code does not have a G94 code.\n"
                 #                            "Append Code snippet will not be used.."))
                 #     g = self.gc_header + '\n' + gcode + postamble + end_gcode
-                g = ''
-                if preamble != '' and postamble != '':
-                    g = self.gc_header + self.gc_start + '\n' + preamble + '\n' + gcode + '\n' + \
-                        postamble + '\n' + end_gcode
-                if preamble == '':
-                    g = self.gc_header + self.gc_start + '\n' + gcode + '\n' + postamble + '\n' + end_gcode
-                if postamble == '':
-                    g = self.gc_header + self.gc_start + '\n' + preamble + '\n' + gcode + '\n' + end_gcode
-                if preamble == '' and postamble == '':
-                    g = self.gc_header + self.gc_start + '\n' + gcode + '\n' + end_gcode
+                g = GCodeSink(self.gc_header, self.gc_start, '\n')
+                if preamble != '':
+                    g += preamble + '\n'
+                g += gcode
+                g += '\n'
+                if postamble != '':
+                    g += postamble + '\n'
+                g += end_gcode
 
         # if toolchange custom is used, replace M6 code with the code from the Toolchange Custom Text box
         # if self.ui.toolchange_cb.get_value() is True:
@@ -2308,20 +2456,16 @@ class CNCJobObject(FlatCAMObj, CNCjob):
         #         g = g.replace('M6', m6_code)
         #         self.app.inform.emit('[success] %s' % _("Toolchange G-code was replaced by a custom code."))
 
-        lines = StringIO(g)
-
         # Write
         if filename is not None:
             try:
                 force_windows_line_endings = self.app.defaults['cncjob_line_ending']
                 if force_windows_line_endings and sys.platform != 'win32':
                     with open(filename, 'w', newline='\r\n') as f:
-                        for line in lines:
-                            f.write(line)
+                        g.write_to(f)
                 else:
                     with open(filename, 'w') as f:
-                        for line in lines:
-                            f.write(line)
+                        g.write_to(f)
             except FileNotFoundError:
                 self.app.inform.emit('[WARNING_NOTCL] %s' % _("No such file or directory"))
                 return
@@ -2339,7 +2483,7 @@ class CNCJobObject(FlatCAMObj, CNCjob):
 
             self.app.inform.emit('[success] %s: %s' % (_("Saved to"), filename))
         else:
-            return lines
+            return g
 
     # def on_toolchange_custom_clicked(self, signal):
     #     """
@@ -2459,6 +2603,23 @@ class CNCJobObject(FlatCAMObj, CNCjob):
             self.ui.plot_cb.setChecked(True)
         self.ui_connect()
 
+    def add_toolpath(self, xy, breaks, width=0.0, circles=None, **kwargs):
+        """
+        Adds to the object shapes the toolpaths given as coordinates arrays. See appGUI.VisPyVisuals.ToolpathLOD.
+
+        :param xy:          (N, 2) array with the vertices of all the paths, one path after the other
+        :param breaks:      array with the index in xy of the first vertex of each path
+        :param width:       the width of the paths (the tool diameter); when 0 the paths are drawn as lines
+        :param circles:     (K, 3) array with the x, y and the radius of each hole, or None
+        :param kwargs:      color, face_color, visible, layer; see ShapeCollection.add_lod()
+        :return:            the key of the shape
+        """
+        if self.deleted:
+            raise ObjectDeleted()
+
+        lod = ToolpathLOD(xy, breaks, width=width, circles=circles, fill=kwargs.get('face_color') is not None)
+        return self.shapes.add_lod(lod=lod, **kwargs)
+
     def plot(self, visible=None, kind='all'):
         """
         # Does all the required setup and returns False
@@ -254,14 +254,14 @@ class ExcellonObject(FlatCAMObj, Excellon):
 
             # Find no of drills for the current tool
             try:
-                drill_cnt = len(self.tools[tool_no]['drills'])
+                drill_cnt = self.panel_count('drills', self.tools[tool_no])
             except KeyError:
                 drill_cnt = 0
             self.tot_drill_cnt += drill_cnt
 
             # Find no of slots for the current tool
             try:
-                slot_cnt = len(self.tools[tool_no]['slots'])
+                slot_cnt = self.panel_count('slots', self.tools[tool_no])
             except KeyError:
                 slot_cnt = 0
             self.tot_slot_cnt += slot_cnt
@@ -421,7 +421,7 @@ class ExcellonObject(FlatCAMObj, Excellon):
         # find if we have drills:
         has_drills = None
         for tt in self.tools:
-            if 'drills' in self.tools[tt] and self.tools[tt]['drills']:
+            if 'drills' in self.tools[tt] and self.panel_count('drills', self.tools[tt]):
                 has_drills = True
                 break
         if has_drills is None:
@@ -434,7 +434,7 @@ class ExcellonObject(FlatCAMObj, Excellon):
         # find if we have slots
         has_slots = None
         for tt in self.tools:
-            if 'slots' in self.tools[tt] and self.tools[tt]['slots']:
+            if 'slots' in self.tools[tt] and self.panel_count('slots', self.tools[tt]):
                 has_slots = True
                 break
         if has_slots is None:
@@ -528,11 +528,11 @@ class ExcellonObject(FlatCAMObj, Excellon):
                     tool_dia = self.app.dec_format(float(self.tools[tt]['tooldia']), self.decimals)
                     if tool_dia == row_dia:
                         # find if we have drills:
-                        if 'drills' not in self.tools[tt] or not self.tools[tt]['drills']:
+                        if 'drills' not in self.tools[tt] or not self.panel_count('drills', self.tools[tt]):
                             has_drills = None
 
                         # find if we have slots
-                        if 'slots' not in self.tools[tt] or not self.tools[tt]['slots']:
+                        if 'slots' not in self.tools[tt] or not self.panel_count('slots', self.tools[tt]):
                             has_slots = None
 
             if has_drills is None:
@@ -652,23 +652,53 @@ class ExcellonObject(FlatCAMObj, Excellon):
         :rtype:             tuple
         """
 
-        excellon_code = ''
+        excellon_code = ''.join(self.iter_excellon(whole, fract, e_zeros=e_zeros, form=form, factor=factor,
+                                                   slot_type=slot_type))
 
-        # store here if the file has slots, return 1 if any slots, 0 if only drills
+        if not excellon_code:
+            log.debug("FlatCAMObj.ExcellonObject.export_excellon() --> Excellon Object is empty: no drills, no slots.")
+            return 'fail'
+
+        # return 1 if the file has any slots, 0 if only drills
         slots_in_file = 0
+        for tt in self.tools:
+            if 'slots' in self.tools[tt] and self.panel_count('slots', self.tools[tt]):
+                slots_in_file = 1
+                break
+
+        return slots_in_file, excellon_code
+
+    def iter_excellon(self, whole, fract, e_zeros=None, form='dec', factor=1, slot_type='routing'):
+        """
+        Generates the Excellon code, in pieces, so it can be written to a file as it is made. The drills and the slots
+        of a panel are copied one at a time.
+
+        :param whole:       Integer part digits
+        :type whole:        int
+        :param fract:       Fractional part digits
+        :type fract:        int
+        :param e_zeros:     Excellon zeros suppression: LZ or TZ
+        :type e_zeros:      str
+        :param form:        Excellon format: 'dec',
+        :type form:         str
+        :param factor:      Conversion factor
+        :type factor:       float
+        :param slot_type:   How to treat slots: "routing" or "drilling"
+        :type slot_type:    str
+        :return:            generator of Excellon code strings; nothing if there are no drills and no slots
+        """
 
         # find if we have drills:
         has_drills = None
         for tt in self.tools:
-            if 'drills' in self.tools[tt] and self.tools[tt]['drills']:
+            if 'drills' in self.tools[tt] and self.panel_count('drills', self.tools[tt]):
                 has_drills = True
                 break
         # find if we have slots:
         has_slots = None
         for tt in self.tools:
-            if 'slots' in self.tools[tt] and self.tools[tt]['slots']:
+            if 'slots' in self.tools[tt] and self.panel_count('slots', self.tools[tt]):
                 has_slots = True
-                slots_in_file = 1
                 break
 
         # drills processing
@@ -676,13 +706,13 @@ class ExcellonObject(FlatCAMObj, Excellon):
             if has_drills:
                 length = whole + fract
                 for tool in self.tools:
-                    excellon_code += 'T0%s\n' % str(tool) if int(tool) < 10 else 'T%s\n' % str(tool)
+                    yield 'T0%s\n' % str(tool) if int(tool) < 10 else 'T%s\n' % str(tool)
 
-                    for drill in self.tools[tool]['drills']:
+                    for drill in self.panel_elements('drills', self.tools[tool]):
                         if form == 'dec':
                             drill_x = drill.x * factor
                             drill_y = drill.y * factor
-                            excellon_code += "X{:.{dec}f}Y{:.{dec}f}\n".format(drill_x, drill_y, dec=fract)
+                            yield "X{:.{dec}f}Y{:.{dec}f}\n".format(drill_x, drill_y, dec=fract)
                         elif e_zeros == 'LZ':
                             drill_x = drill.x * factor
                             drill_y = drill.y * factor
@@ -703,8 +733,8 @@ class ExcellonObject(FlatCAMObj, Excellon):
                             exc_x_formatted = x_whole + exc_x_formatted[2]
                             exc_y_formatted = y_whole + exc_y_formatted[2]
 
-                            excellon_code += "X{xform}Y{yform}\n".format(xform=exc_x_formatted,
-                                                                         yform=exc_y_formatted)
+                            yield "X{xform}Y{yform}\n".format(xform=exc_x_formatted,
+                                                              yform=exc_y_formatted)
                         else:
                             drill_x = drill.x * factor
                             drill_y = drill.y * factor
@@ -716,8 +746,8 @@ class ExcellonObject(FlatCAMObj, Excellon):
                             exc_x_formatted.ljust(length, '0')
                             exc_y_formatted.ljust(length, '0')
 
-                            excellon_code += "X{xform}Y{yform}\n".format(xform=exc_x_formatted,
-                                                                         yform=exc_y_formatted)
+                            yield "X{xform}Y{yform}\n".format(xform=exc_x_formatted,
+                                                              yform=exc_y_formatted)
         except Exception as e:
             log.debug(str(e))
 
@@ -725,28 +755,28 @@ class ExcellonObject(FlatCAMObj, Excellon):
         try:
             if has_slots:
                 for tool in self.tools:
-                    excellon_code += 'G05\n'
+                    yield 'G05\n'
 
                     if int(tool) < 10:
-                        excellon_code += 'T0' + str(tool) + '\n'
+                        yield 'T0' + str(tool) + '\n'
                     else:
-                        excellon_code += 'T' + str(tool) + '\n'
+                        yield 'T' + str(tool) + '\n'
 
-                    for slot in self.tools[tool]['slots']:
+                    for slot in self.panel_elements('slots', self.tools[tool]):
                         if form == 'dec':
                             start_slot_x = slot.x * factor
                             start_slot_y = slot.y * factor
                             stop_slot_x = slot.x * factor
                             stop_slot_y = slot.y * factor
                             if slot_type == 'routing':
-                                excellon_code += "G00X{:.{dec}f}Y{:.{dec}f}\nM15\n".format(start_slot_x,
-                                                                                           start_slot_y,
-                                                                                           dec=fract)
-                                excellon_code += "G01X{:.{dec}f}Y{:.{dec}f}\nM16\n".format(stop_slot_x,
-                                                                                           stop_slot_y,
-                                                                                           dec=fract)
+                                yield "G00X{:.{dec}f}Y{:.{dec}f}\nM15\n".format(start_slot_x,
+                                                                                start_slot_y,
+                                                                                dec=fract)
+                                yield "G01X{:.{dec}f}Y{:.{dec}f}\nM16\n".format(stop_slot_x,
+                                                                                stop_slot_y,
+                                                                                dec=fract)
                             elif slot_type == 'drilling':
-                                excellon_code += "X{:.{dec}f}Y{:.{dec}f}G85X{:.{dec}f}Y{:.{dec}f}\nG05\n".format(
+                                yield "X{:.{dec}f}Y{:.{dec}f}G85X{:.{dec}f}Y{:.{dec}f}\nG05\n".format(
                                     start_slot_x, start_slot_y, stop_slot_x, stop_slot_y, dec=fract
                                 )
 
@@ -781,12 +811,12 @@ class ExcellonObject(FlatCAMObj, Excellon):
                             stop_slot_y_formatted = stop_y_whole + stop_slot_y_formatted[2]
 
                             if slot_type == 'routing':
-                                excellon_code += "G00X{xstart}Y{ystart}\nM15\n".format(xstart=start_slot_x_formatted,
-                                                                                       ystart=start_slot_y_formatted)
-                                excellon_code += "G01X{xstop}Y{ystop}\nM16\n".format(xstop=stop_slot_x_formatted,
-                                                                                     ystop=stop_slot_y_formatted)
+                                yield "G00X{xstart}Y{ystart}\nM15\n".format(xstart=start_slot_x_formatted,
+                                                                            ystart=start_slot_y_formatted)
+                                yield "G01X{xstop}Y{ystop}\nM16\n".format(xstop=stop_slot_x_formatted,
+                                                                          ystop=stop_slot_y_formatted)
                             elif slot_type == 'drilling':
-                                excellon_code += "{xstart}Y{ystart}G85X{xstop}Y{ystop}\nG05\n".format(
+                                yield "{xstart}Y{ystart}G85X{xstop}Y{ystop}\nG05\n".format(
                                     xstart=start_slot_x_formatted, ystart=start_slot_y_formatted,
                                     xstop=stop_slot_x_formatted, ystop=stop_slot_y_formatted
                                 )
@@ -809,24 +839,18 @@ class ExcellonObject(FlatCAMObj, Excellon):
                             stop_slot_y_formatted.ljust(length, '0')
 
                             if slot_type == 'routing':
-                                excellon_code += "G00X{xstart}Y{ystart}\nM15\n".format(xstart=start_slot_x_formatted,
-                                                                                       ystart=start_slot_y_formatted)
-                                excellon_code += "G01X{xstop}Y{ystop}\nM16\n".format(xstop=stop_slot_x_formatted,
-                                                                                     ystop=stop_slot_y_formatted)
+                                yield "G00X{xstart}Y{ystart}\nM15\n".format(xstart=start_slot_x_formatted,
+                                                                            ystart=start_slot_y_formatted)
+                                yield "G01X{xstop}Y{ystop}\nM16\n".format(xstop=stop_slot_x_formatted,
+                                                                          ystop=stop_slot_y_formatted)
                             elif slot_type == 'drilling':
-                                excellon_code += "{xstart}Y{ystart}G85X{xstop}Y{ystop}\nG05\n".format(
+                                yield "{xstart}Y{ystart}G85X{xstop}Y{ystop}\nG05\n".format(
                                     xstart=start_slot_x_formatted, ystart=start_slot_y_formatted,
                                     xstop=stop_slot_x_formatted, ystop=stop_slot_y_formatted
                                 )
         except Exception as e:
             log.debug(str(e))
 
-        if not has_drills and not has_slots:
-            log.debug("FlatCAMObj.ExcellonObject.export_excellon() --> Excellon Object is empty: no drills, no slots.")
-            return 'fail'
-
-        return slots_in_file, excellon_code
-
     def generate_milling_drills(self, tools=None, outname=None, tooldia=None, plot=False, use_thread=False):
         """
         Will generate an Geometry Object allowing to cut a drill hole instead of drilling it.
@@ -1172,10 +1196,11 @@ class ExcellonObject(FlatCAMObj, Excellon):
                 return new_color
 
         # this stays for compatibility reasons, in case we try to open old projects
-        try:
-            __ = iter(self.solid_geometry)
-        except TypeError:
-            self.solid_geometry = [self.solid_geometry]
+        if self.panel_board('solid_geometry') is None:
+            try:
+                __ = iter(self.solid_geometry)
+            except TypeError:
+                self.solid_geometry = [self.solid_geometry]
 
         visible = visible if visible else self.ui.plot_cb.get_value()
 
@@ -1192,26 +1217,29 @@ class ExcellonObject(FlatCAMObj, Excellon):
                         self.tools[tool]['multicolor'] = None
 
                     # tool is a dict also
-                    for geo in self.tools[tool]["solid_geometry"]:
+                    tool_geo, offsets = self.plot_geometry('solid_geometry', self.tools[tool])
+                    for geo in tool_geo:
                         idx = self.add_shape(shape=geo,
                                              color=geo_color if multicolored else self.outline_color,
                                              face_color=geo_color if multicolored else self.fill_color,
                                              visible=visible,
-                                             layer=2)
+                                             layer=2,
+                                             offsets=offsets)
                         try:
                             self.shape_indexes_dict[tool].append(idx)
                         except KeyError:
                             self.shape_indexes_dict[tool] = [idx]
             else:
                 for tool in self.tools:
-                    for geo in self.tools[tool]['solid_geometry']:
-                        idx = self.add_shape(shape=geo.exterior, color='red', visible=visible)
+                    tool_geo, offsets = self.plot_geometry('solid_geometry', self.tools[tool])
+                    for geo in tool_geo:
+                        idx = self.add_shape(shape=geo.exterior, color='red', visible=visible, offsets=offsets)
                         try:
                             self.shape_indexes_dict[tool].append(idx)
                         except KeyError:
                             self.shape_indexes_dict[tool] = [idx]
                         for ints in geo.interiors:
-                            idx = self.add_shape(shape=ints, color='orange', visible=visible)
+                            idx = self.add_shape(shape=ints, color='orange', visible=visible, offsets=offsets)
                             try:
                                 self.shape_indexes_dict[tool].append(idx)
                             except KeyError:
@@ -2218,7 +2218,8 @@ class GeometryObject(FlatCAMObj, Geometry):
                 job_obj.toolchange_xy_type = "geometry"
 
                 self.app.inform.emit('[success] %s' % _("G-Code parsing in progress..."))
-                dia_cnc_dict['gcode_parsed'] = job_obj.gcode_parse()
+                job_obj.gcode_parse()
+                dia_cnc_dict['gcode_parsed'] = job_obj.gcode_parsed
                 app_obj.inform.emit('[success] %s' % _("G-Code parsing finished..."))
 
                 # commented this; there is no need for the actual GCode geometry - the original one will serve as well
@@ -2368,7 +2369,8 @@ class GeometryObject(FlatCAMObj, Geometry):
                     job_obj.gc_start = start_gcode
 
                 app_obj.inform.emit('[success] %s' % _("G-Code parsing in progress..."))
-                dia_cnc_dict['gcode_parsed'] = job_obj.gcode_parse()
+                job_obj.gcode_parse()
+                dia_cnc_dict['gcode_parsed'] = job_obj.gcode_parsed
                 app_obj.inform.emit('[success] %s' % _("G-Code parsing finished..."))
 
                 # commented this; there is no need for the actual GCode geometry - the original one will serve as well
@@ -2611,7 +2613,7 @@ class GeometryObject(FlatCAMObj, Geometry):
                         # graceful abort requested by the user
                         raise grace
 
-                    # Type(cpoly) == FlatCAMRTreeStorage | None
+                    # Type(cpoly) == FlatCAMEndpointStorage | None
                     cpoly = None
                     if paint_method == 0:       # Standard
                         cpoly = self.clear_polygon(bbox,
@@ -3044,7 +3046,7 @@ class GeometryObject(FlatCAMObj, Geometry):
             self.ui.exclusion_table.selectAll()
             self.draw_sel_shape()
 
-    def plot_element(self, element, color=None, visible=None):
+    def plot_element(self, element, color=None, visible=None, offsets=None):
 
         if color is None:
             color = '#FF0000FF'
@@ -3052,11 +3054,11 @@ class GeometryObject(FlatCAMObj, Geometry):
         visible = visible if visible else self.options['plot']
         try:
             for sub_el in element:
-                self.plot_element(sub_el, color=color)
+                self.plot_element(sub_el, color=color, offsets=offsets)
 
         except TypeError:  # Element is not iterable...
             # if self.app.is_legacy is False:
-            self.add_shape(shape=element, color=color, visible=visible, layer=0)
+            self.add_shape(shape=element, color=color, visible=visible, layer=0, offsets=offsets)
 
     def plot(self, visible=None, kind=None, plot_tool=None):
         """
@@ -3102,31 +3104,31 @@ class GeometryObject(FlatCAMObj, Geometry):
             if self.multigeo is True:  # geo multi tool usage
                 if plot_tool is None:
                     for tooluid_key in self.tools:
-                        solid_geometry = self.tools[tooluid_key]['solid_geometry']
+                        solid_geometry, offsets = self.plot_geometry('solid_geometry', self.tools[tooluid_key])
                         if 'override_color' in self.tools[tooluid_key]['data']:
                             color = self.tools[tooluid_key]['data']['override_color']
                         else:
                             color = random_color() if self.options['multicolored'] else \
                                 self.app.defaults["geometry_plot_line"]
 
-                        self.plot_element(solid_geometry, visible=visible, color=color)
+                        self.plot_element(solid_geometry, visible=visible, color=color, offsets=offsets)
                 else:
-                    solid_geometry = self.tools[plot_tool]['solid_geometry']
+                    solid_geometry, offsets = self.plot_geometry('solid_geometry', self.tools[plot_tool])
                     if 'override_color' in self.tools[plot_tool]['data']:
                         color = self.tools[plot_tool]['data']['override_color']
                     else:
                         color = random_color() if self.options['multicolored'] else \
                             self.app.defaults["geometry_plot_line"]
 
-                    self.plot_element(solid_geometry, visible=visible, color=color)
+                    self.plot_element(solid_geometry, visible=visible, color=color, offsets=offsets)
             else:
                 # plot solid geometry that may be an direct attribute of the geometry object
                 # for SingleGeo
-                if self.solid_geometry:
-                    solid_geometry = self.solid_geometry
+                solid_geometry, offsets = self.plot_geometry('solid_geometry')
+                if solid_geometry:
                     color = self.app.defaults["geometry_plot_line"]
 
-                    self.plot_element(solid_geometry, visible=visible, color=color)
+                    self.plot_element(solid_geometry, visible=visible, color=color, offsets=offsets)
 
             # self.plot_element(self.solid_geometry, visible=self.options['plot'])
 
@@ -886,9 +886,9 @@ class GerberObject(FlatCAMObj, Gerber):
 
         # if the Follow Geometry checkbox is checked then plot only the follow geometry
         if self.ui.follow_cb.get_value():
-            geometry = self.follow_geometry
+            geometry, offsets = self.plot_geometry('follow_geometry')
         else:
-            geometry = self.solid_geometry
+            geometry, offsets = self.plot_geometry('solid_geometry')
 
         # Make sure geometry is iterable.
         try:
@@ -923,7 +923,7 @@ class GerberObject(FlatCAMObj, Gerber):
                     if type(g) == Polygon or type(g) == LineString:
                         self.add_shape(shape=g, color=color,
                                        face_color=random_color() if self.options['multicolored']
-                                       else face_color, visible=visible)
+                                       else face_color, visible=visible, offsets=offsets)
                     elif type(g) == Point:
                         pass
                     else:
@@ -931,22 +931,22 @@ class GerberObject(FlatCAMObj, Gerber):
                             for el in g:
                                 self.add_shape(shape=el, color=color,
                                                face_color=random_color() if self.options['multicolored']
-                                               else face_color, visible=visible)
+                                               else face_color, visible=visible, offsets=offsets)
                         except TypeError:
                             self.add_shape(shape=g, color=color,
                                            face_color=random_color() if self.options['multicolored']
-                                           else face_color, visible=visible)
+                                           else face_color, visible=visible, offsets=offsets)
             else:
                 for g in geometry:
                     if type(g) == Polygon or type(g) == LineString:
                         self.add_shape(shape=g, color=random_color() if self.options['multicolored'] else 'black',
-                                       visible=visible)
+                                       visible=visible, offsets=offsets)
                     elif type(g) == Point:
                         pass
                     else:
                         for el in g:
                             self.add_shape(shape=el, color=random_color() if self.options['multicolored'] else 'black',
-                                           visible=visible)
+                                           visible=visible, offsets=offsets)
             self.shapes.redraw(
                 # update_colors=(self.fill_color, self.outline_color),
                 # indexes=self.app.plotcanvas.shape_collection.data.keys()
@@ -1132,7 +1132,24 @@ class GerberObject(FlatCAMObj, Gerber):
         :param factor: factor to be applied onto the Gerber coordinates
         :return: Gerber_code
         """
-        log.debug("GerberObject.export_gerber() --> Generating the Gerber code from the selected Gerber file")
+        if not self.apertures:
+            log.debug("FlatCAMObj.GerberObject.export_gerber() --> Gerber Object is empty: no apertures.")
+            return 'fail'
+
+        return ''.join(self.iter_gerber(whole, fract, g_zeros=g_zeros, factor=factor))
+
+    def iter_gerber(self, whole, fract, g_zeros='L', factor=1):
+        """
+        Generates the Gerber file content, in pieces, so it can be written to a file as it is made. The geometry of a
+        panel is copied one element at a time.
+
+        :param whole: how many digits in the whole part of coordinates
+        :param fract: how many decimals in coordinates
+        :param g_zeros: type of the zero suppression used: LZ or TZ; string
+        :param factor: factor to be applied onto the Gerber coordinates
+        :return: generator of Gerber code strings
+        """
+        log.debug("GerberObject.iter_gerber() --> Generating the Gerber code from the selected Gerber file")
 
         def tz_format(x, y, fac):
             x_c = x * fac
@@ -1168,77 +1185,74 @@ class GerberObject(FlatCAMObj, Gerber):
 
             return x_form, y_form
 
-        # Gerber code is stored here
-        gerber_code = ''
-
         # apertures processing
         try:
             length = whole + fract
             if '0' in self.apertures:
                 if 'geometry' in self.apertures['0']:
-                    for geo_elem in self.apertures['0']['geometry']:
+                    for geo_elem in self.panel_elements('geometry', self.apertures['0']):
                         if 'solid' in geo_elem:
                             geo = geo_elem['solid']
                             if not geo.is_empty and not isinstance(geo, LineString) and \
                                     not isinstance(geo, MultiLineString) and not isinstance(geo, Point):
-                                gerber_code += 'G36*\n'
+                                yield 'G36*\n'
                                 geo_coords = list(geo.exterior.coords)
                                 # first command is a move with pen-up D02 at the beginning of the geo
                                 if g_zeros == 'T':
                                     x_formatted, y_formatted = tz_format(geo_coords[0][0], geo_coords[0][1], factor)
-                                    gerber_code += "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
-                                                                                   yform=y_formatted)
+                                    yield "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
+                                                                          yform=y_formatted)
                                 else:
                                     x_formatted, y_formatted = lz_format(geo_coords[0][0], geo_coords[0][1], factor)
-                                    gerber_code += "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
-                                                                                   yform=y_formatted)
+                                    yield "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
+                                                                          yform=y_formatted)
                                 for coord in geo_coords[1:]:
                                     if g_zeros == 'T':
                                         x_formatted, y_formatted = tz_format(coord[0], coord[1], factor)
-                                        gerber_code += "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
-                                                                                       yform=y_formatted)
+                                        yield "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
+                                                                              yform=y_formatted)
                                     else:
                                         x_formatted, y_formatted = lz_format(coord[0], coord[1], factor)
-                                        gerber_code += "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
-                                                                                       yform=y_formatted)
-                                gerber_code += 'D02*\n'
-                                gerber_code += 'G37*\n'
+                                        yield "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
+                                                                              yform=y_formatted)
+                                yield 'D02*\n'
+                                yield 'G37*\n'
 
                                 clear_list = list(geo.interiors)
                                 if clear_list:
-                                    gerber_code += '%LPC*%\n'
+                                    yield '%LPC*%\n'
                                     for clear_geo in clear_list:
-                                        gerber_code += 'G36*\n'
+                                        yield 'G36*\n'
                                         geo_coords = list(clear_geo.coords)
 
                                         # first command is a move with pen-up D02 at the beginning of the geo
                                         if g_zeros == 'T':
                                             x_formatted, y_formatted = tz_format(
                                                 geo_coords[0][0], geo_coords[0][1], factor)
-                                            gerber_code += "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
-                                                                                           yform=y_formatted)
+                                            yield "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
+                                                                                  yform=y_formatted)
                                         else:
                                             x_formatted, y_formatted = lz_format(
                                                 geo_coords[0][0], geo_coords[0][1], factor)
-                                            gerber_code += "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
-                                                                                           yform=y_formatted)
+                                            yield "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
+                                                                                  yform=y_formatted)
 
                                         prev_coord = geo_coords[0]
                                         for coord in geo_coords[1:]:
                                             if coord != prev_coord:
                                                 if g_zeros == 'T':
                                                     x_formatted, y_formatted = tz_format(coord[0], coord[1], factor)
-                                                    gerber_code += "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
-                                                                                                   yform=y_formatted)
+                                                    yield "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
+                                                                                          yform=y_formatted)
                                                 else:
                                                     x_formatted, y_formatted = lz_format(coord[0], coord[1], factor)
-                                                    gerber_code += "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
-                                                                                                   yform=y_formatted)
+                                                    yield "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
+                                                                                          yform=y_formatted)
                                             prev_coord = coord
 
-                                        gerber_code += 'D02*\n'
-                                        gerber_code += 'G37*\n'
-                                    gerber_code += '%LPD*%\n'
+                                        yield 'D02*\n'
+                                        yield 'G37*\n'
+                                    yield '%LPD*%\n'
                             elif isinstance(geo, LineString) or isinstance(geo, MultiLineString) or \
                                     isinstance(geo, Point):
                                 try:
@@ -1246,25 +1260,25 @@ class GerberObject(FlatCAMObj, Gerber):
                                         if isinstance(geo, Point):
                                             if g_zeros == 'T':
                                                 x_formatted, y_formatted = tz_format(geo.x, geo.y, factor)
-                                                gerber_code += "X{xform}Y{yform}D03*\n".format(xform=x_formatted,
-                                                                                               yform=y_formatted)
+                                                yield "X{xform}Y{yform}D03*\n".format(xform=x_formatted,
+                                                                                      yform=y_formatted)
                                             else:
                                                 x_formatted, y_formatted = lz_format(geo.x, geo.y, factor)
-                                                gerber_code += "X{xform}Y{yform}D03*\n".format(xform=x_formatted,
-                                                                                               yform=y_formatted)
+                                                yield "X{xform}Y{yform}D03*\n".format(xform=x_formatted,
+                                                                                      yform=y_formatted)
                                         else:
                                             geo_coords = list(geo.coords)
                                             # first command is a move with pen-up D02 at the beginning of the geo
                                             if g_zeros == 'T':
                                                 x_formatted, y_formatted = tz_format(
                                                     geo_coords[0][0], geo_coords[0][1], factor)
-                                                gerber_code += "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
-                                                                                               yform=y_formatted)
+                                                yield "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
+                                                                                      yform=y_formatted)
                                             else:
                                                 x_formatted, y_formatted = lz_format(
                                                     geo_coords[0][0], geo_coords[0][1], factor)
-                                                gerber_code += "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
-                                                                                               yform=y_formatted)
+                                                yield "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
+                                                                                      yform=y_formatted)
 
                                             prev_coord = geo_coords[0]
                                             for coord in geo_coords[1:]:
@@ -1272,13 +1286,13 @@ class GerberObject(FlatCAMObj, Gerber):
                                                     if g_zeros == 'T':
                                                         x_formatted, y_formatted = tz_format(coord[0], coord[1],
                                                                                              factor)
-                                                        gerber_code += "X{xform}Y{yform}D01*\n".format(
+                                                        yield "X{xform}Y{yform}D01*\n".format(
                                                             xform=x_formatted,
                                                             yform=y_formatted)
                                                     else:
                                                         x_formatted, y_formatted = lz_format(coord[0], coord[1],
                                                                                              factor)
-                                                        gerber_code += "X{xform}Y{yform}D01*\n".format(
+                                                        yield "X{xform}Y{yform}D01*\n".format(
                                                             xform=x_formatted,
                                                             yform=y_formatted)
                                                 prev_coord = coord
@@ -1289,35 +1303,35 @@ class GerberObject(FlatCAMObj, Gerber):
                         if 'clear' in geo_elem:
                             geo = geo_elem['clear']
                             if not geo.is_empty:
-                                gerber_code += '%LPC*%\n'
-                                gerber_code += 'G36*\n'
+                                yield '%LPC*%\n'
+                                yield 'G36*\n'
                                 geo_coords = list(geo.exterior.coords)
                                 # first command is a move with pen-up D02 at the beginning of the geo
                                 if g_zeros == 'T':
                                     x_formatted, y_formatted = tz_format(geo_coords[0][0], geo_coords[0][1], factor)
-                                    gerber_code += "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
-                                                                                   yform=y_formatted)
+                                    yield "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
+                                                                          yform=y_formatted)
                                 else:
                                     x_formatted, y_formatted = lz_format(geo_coords[0][0], geo_coords[0][1], factor)
-                                    gerber_code += "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
-                                                                                   yform=y_formatted)
+                                    yield "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
+                                                                          yform=y_formatted)
 
                                 prev_coord = geo_coords[0]
                                 for coord in geo_coords[1:]:
                                     if coord != prev_coord:
                                         if g_zeros == 'T':
                                             x_formatted, y_formatted = tz_format(coord[0], coord[1], factor)
-                                            gerber_code += "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
-                                                                                           yform=y_formatted)
+                                            yield "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
+                                                                                  yform=y_formatted)
                                         else:
                                             x_formatted, y_formatted = lz_format(coord[0], coord[1], factor)
-                                            gerber_code += "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
-                                                                                           yform=y_formatted)
+                                            yield "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
+                                                                                  yform=y_formatted)
                                     prev_coord = coord
 
-                                gerber_code += 'D02*\n'
-                                gerber_code += 'G37*\n'
-                                gerber_code += '%LPD*%\n'
+                                yield 'D02*\n'
+                                yield 'G37*\n'
+                                yield '%LPD*%\n'
         except Exception as e:
             log.debug("FlatCAMObj.GerberObject.export_gerber() '0' aperture --> %s" % str(e))
 
@@ -1325,9 +1339,9 @@ class GerberObject(FlatCAMObj, Gerber):
             if apid == '0':
                 continue
             else:
-                gerber_code += 'D%s*\n' % str(apid)
+                yield 'D%s*\n' % str(apid)
                 if 'geometry' in self.apertures[apid]:
-                    for geo_elem in self.apertures[apid]['geometry']:
+                    for geo_elem in self.panel_elements('geometry', self.apertures[apid]):
                         try:
                             if 'follow' in geo_elem:
                                 geo = geo_elem['follow']
@@ -1335,37 +1349,37 @@ class GerberObject(FlatCAMObj, Gerber):
                                     if isinstance(geo, Point):
                                         if g_zeros == 'T':
                                             x_formatted, y_formatted = tz_format(geo.x, geo.y, factor)
-                                            gerber_code += "X{xform}Y{yform}D03*\n".format(xform=x_formatted,
-                                                                                           yform=y_formatted)
+                                            yield "X{xform}Y{yform}D03*\n".format(xform=x_formatted,
+                                                                                  yform=y_formatted)
                                         else:
                                             x_formatted, y_formatted = lz_format(geo.x, geo.y, factor)
-                                            gerber_code += "X{xform}Y{yform}D03*\n".format(xform=x_formatted,
-                                                                                           yform=y_formatted)
+                                            yield "X{xform}Y{yform}D03*\n".format(xform=x_formatted,
+                                                                                  yform=y_formatted)
                                     else:
                                         geo_coords = list(geo.coords)
                                         # first command is a move with pen-up D02 at the beginning of the geo
                                         if g_zeros == 'T':
                                             x_formatted, y_formatted = tz_format(
                                                 geo_coords[0][0], geo_coords[0][1], factor)
-                                            gerber_code += "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
-                                                                                           yform=y_formatted)
+                                            yield "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
+                                                                                  yform=y_formatted)
                                         else:
                                             x_formatted, y_formatted = lz_format(
                                                 geo_coords[0][0], geo_coords[0][1], factor)
-                                            gerber_code += "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
-                                                                                           yform=y_formatted)
+                                            yield "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
+                                                                                  yform=y_formatted)
 
                                         prev_coord = geo_coords[0]
                                         for coord in geo_coords[1:]:
                                             if coord != prev_coord:
                                                 if g_zeros == 'T':
                                                     x_formatted, y_formatted = tz_format(coord[0], coord[1], factor)
-                                                    gerber_code += "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
-                                                                                                   yform=y_formatted)
+                                                    yield "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
+                                                                                          yform=y_formatted)
                                                 else:
                                                     x_formatted, y_formatted = lz_format(coord[0], coord[1], factor)
-                                                    gerber_code += "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
-                                                                                                   yform=y_formatted)
+                                                    yield "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
+                                                                                          yform=y_formatted)
                                             prev_coord = coord
 
                                         # gerber_code += "D02*\n"
@@ -1374,44 +1388,44 @@ class GerberObject(FlatCAMObj, Gerber):
 
                         try:
                             if 'clear' in geo_elem:
-                                gerber_code += '%LPC*%\n'
+                                yield '%LPC*%\n'
 
                                 geo = geo_elem['clear']
                                 if not geo.is_empty:
                                     if isinstance(geo, Point):
                                         if g_zeros == 'T':
                                             x_formatted, y_formatted = tz_format(geo.x, geo.y, factor)
-                                            gerber_code += "X{xform}Y{yform}D03*\n".format(xform=x_formatted,
-                                                                                           yform=y_formatted)
+                                            yield "X{xform}Y{yform}D03*\n".format(xform=x_formatted,
+                                                                                  yform=y_formatted)
                                         else:
                                             x_formatted, y_formatted = lz_format(geo.x, geo.y, factor)
-                                            gerber_code += "X{xform}Y{yform}D03*\n".format(xform=x_formatted,
-                                                                                           yform=y_formatted)
+                                            yield "X{xform}Y{yform}D03*\n".format(xform=x_formatted,
+                                                                                  yform=y_formatted)
                                     elif isinstance(geo, Polygon):
                                         geo_coords = list(geo.exterior.coords)
                                         # first command is a move with pen-up D02 at the beginning of the geo
                                         if g_zeros == 'T':
                                             x_formatted, y_formatted = tz_format(
                                                 geo_coords[0][0], geo_coords[0][1], factor)
-                                            gerber_code += "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
-                                                                                           yform=y_formatted)
+                                            yield "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
+                                                                                  yform=y_formatted)
                                         else:
                                             x_formatted, y_formatted = lz_format(
                                                 geo_coords[0][0], geo_coords[0][1], factor)
-                                            gerber_code += "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
-                                                                                           yform=y_formatted)
+                                            yield "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
+                                                                                  yform=y_formatted)
 
                                         prev_coord = geo_coords[0]
                                         for coord in geo_coords[1:]:
                                             if coord != prev_coord:
                                                 if g_zeros == 'T':
                                                     x_formatted, y_formatted = tz_format(coord[0], coord[1], factor)
-                                                    gerber_code += "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
-                                                                                                   yform=y_formatted)
+                                                    yield "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
+                                                                                          yform=y_formatted)
                                                 else:
                                                     x_formatted, y_formatted = lz_format(coord[0], coord[1], factor)
-                                                    gerber_code += "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
-                                                                                                   yform=y_formatted)
+                                                    yield "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
+                                                                                          yform=y_formatted)
 
                                             prev_coord = coord
 
@@ -1421,25 +1435,25 @@ class GerberObject(FlatCAMObj, Gerber):
                                             if g_zeros == 'T':
                                                 x_formatted, y_formatted = tz_format(
                                                     geo_coords[0][0], geo_coords[0][1], factor)
-                                                gerber_code += "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
-                                                                                               yform=y_formatted)
+                                                yield "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
+                                                                                      yform=y_formatted)
                                             else:
                                                 x_formatted, y_formatted = lz_format(
                                                     geo_coords[0][0], geo_coords[0][1], factor)
-                                                gerber_code += "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
-                                                                                               yform=y_formatted)
+                                                yield "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
+                                                                                      yform=y_formatted)
 
                                             prev_coord = geo_coords[0]
                                             for coord in geo_coords[1:]:
                                                 if coord != prev_coord:
                                                     if g_zeros == 'T':
                                                         x_formatted, y_formatted = tz_format(coord[0], coord[1], factor)
-                                                        gerber_code += "X{xform}Y{yform}D01*\n".format(
+                                                        yield "X{xform}Y{yform}D01*\n".format(
                                                             xform=x_formatted,
                                                             yform=y_formatted)
                                                     else:
                                                         x_formatted, y_formatted = lz_format(coord[0], coord[1], factor)
-                                                        gerber_code += "X{xform}Y{yform}D01*\n".format(
+                                                        yield "X{xform}Y{yform}D01*\n".format(
                                                             xform=x_formatted,
                                                             yform=y_formatted)
 
@@ -1450,38 +1464,32 @@ class GerberObject(FlatCAMObj, Gerber):
                                         if g_zeros == 'T':
                                             x_formatted, y_formatted = tz_format(
                                                 geo_coords[0][0], geo_coords[0][1], factor)
-                                            gerber_code += "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
-                                                                                           yform=y_formatted)
+                                            yield "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
+                                                                                  yform=y_formatted)
                                         else:
                                             x_formatted, y_formatted = lz_format(
                                                 geo_coords[0][0], geo_coords[0][1], factor)
-                                            gerber_code += "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
-                                                                                           yform=y_formatted)
+                                            yield "X{xform}Y{yform}D02*\n".format(xform=x_formatted,
+                                                                                  yform=y_formatted)
 
                                         prev_coord = geo_coords[0]
                                         for coord in geo_coords[1:]:
                                             if coord != prev_coord:
                                                 if g_zeros == 'T':
                                                     x_formatted, y_formatted = tz_format(coord[0], coord[1], factor)
-                                                    gerber_code += "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
-                                                                                                   yform=y_formatted)
+                                                    yield "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
+                                                                                          yform=y_formatted)
                                                 else:
                                                     x_formatted, y_formatted = lz_format(coord[0], coord[1], factor)
-                                                    gerber_code += "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
-                                                                                                   yform=y_formatted)
+                                                    yield "X{xform}Y{yform}D01*\n".format(xform=x_formatted,
+                                                                                          yform=y_formatted)
 
                                             prev_coord = coord
                                         # gerber_code += "D02*\n"
-                                    gerber_code += '%LPD*%\n'
+                                    yield '%LPD*%\n'
                         except Exception as e:
                             log.debug("FlatCAMObj.GerberObject.export_gerber() 'clear' --> %s" % str(e))
 
-        if not self.apertures:
-            log.debug("FlatCAMObj.GerberObject.export_gerber() --> Gerber Object is empty: no apertures.")
-            return 'fail'
-
-        return gerber_code
-
     @staticmethod
     def merge(grb_list, grb_final):
         """
@@ -17,6 +17,7 @@ from appGUI.ObjectUI import *
 from appCommon.Common import LoudDict
 from appGUI.PlotCanvasLegacy import ShapeCollectionLegacy
 from appGUI.VisPyVisuals import ShapeCollection
+from camlib import PanelDict
 
 from shapely.ops import unary_union
 from shapely.geometry import Polygon, MultiPolygon
@@ -125,6 +126,20 @@ class FlatCAMObj(QtCore.QObject):
 
         self.plot_single_object.connect(self.single_object_plot)
 
+        # for a panel object: the placements of the board copies (PanelInstances) and the geometry attributes of the
+        # board whose copies were not made yet (attribute name -> board geometry), see set_panel()
+        self.panel = None
+        self.panel_source = {}
+
+    def __getattr__(self, name):
+        # called only for the attributes that are not set; the geometry attributes of a panel are made on first use
+        source = self.__dict__.get('panel_source')
+        if source and name in source:
+            value = self.panel.expand(source.pop(name))
+            setattr(self, name, value)
+            return value
+        return QtCore.QObject.__getattr__(self, name)
+
     def __del__(self):
         pass
 
@@ -425,6 +440,8 @@ class FlatCAMObj(QtCore.QObject):
         if self.deleted:
             raise ObjectDeleted()
         else:
+            if kwargs.get('offsets') is None:
+                kwargs.pop('offsets', None)
             key = self.shapes.add(tolerance=self.drawing_tolerance, **kwargs)
         return key
 
@@ -435,6 +452,92 @@ class FlatCAMObj(QtCore.QObject):
             key = self.mark_shapes.add(tolerance=self.drawing_tolerance, layer=0, **kwargs)
         return key
 
+    def set_panel(self, instances, geometry, tables=None):
+        """
+        Makes this object a panel of copies of one board. The board geometry is stored once and the copies are made
+        only when the geometry is used. The plot and the Gerber / Excellon export work on the board geometry so they
+        do not need the copies.
+
+        :param instances:   the placements of the copies
+        :type instances:    camlib.PanelInstances
+        :param geometry:    attribute name -> the board geometry, e.g. {'solid_geometry': [...]}
+        :type geometry:     dict
+        :param tables:      attribute name -> (dict of tools or apertures, the geometry keys of their dicts), e.g.
+                            {'apertures': (apertures, ['geometry'])}. The geometry keys hold the board geometry.
+        :type tables:       dict
+        :return:            None
+        """
+        self.panel = instances
+        self.panel_source = {}
+
+        for name, geo in geometry.items():
+            self.__dict__.pop(name, None)
+            self.panel_source[name] = geo
+
+        for name, (table, keys) in (tables or {}).items():
+            panel_table = {}
+            for table_key, table_dict in table.items():
+                params = {k: v for k, v in table_dict.items() if k not in keys}
+                source = {k: table_dict[k] for k in keys if k in table_dict}
+                panel_table[table_key] = PanelDict(params, source, instances)
+            setattr(self, name, panel_table)
+
+    def panel_board(self, name, table_dict=None):
+        """
+        :param name:        the geometry attribute or, with table_dict, the geometry key of a tool / aperture dict
+        :param table_dict:  the dict of a tool / aperture
+        :return:            the board geometry if this is a panel whose copies of the geometry were not made, else None
+        """
+        if self.panel is None:
+            return None
+        source = self.panel_source if table_dict is None else getattr(table_dict, 'panel_source', {})
+        return source.get(name)
+
+    def plot_geometry(self, name, table_dict=None):
+        """
+        The geometry to be plotted and the offsets at which it is placed. For a panel that is the board geometry and
+        the offsets of the copies, so the copies do not have to be made (and triangulated) to be plotted.
+
+        :param name:        the geometry attribute or, with table_dict, the geometry key of a tool / aperture dict
+        :param table_dict:  the dict of a tool / aperture
+        :return:            (geometry, offsets); offsets is None when the geometry is plotted as it is
+        """
+        board = self.panel_board(name, table_dict)
+        if board is not None and self.app.is_legacy is False:
+            return board, self.panel.offsets
+        return (getattr(self, name) if table_dict is None else table_dict[name]), None
+
+    def panel_elements(self, name, table_dict=None):
+        """
+        Iterates over the elements of the geometry. The copies of a panel are made one at a time and they are not
+        kept, so the exports work with the memory needed for one board.
+
+        :param name:        the geometry attribute or, with table_dict, the geometry key of a tool / aperture dict
+        :param table_dict:  the dict of a tool / aperture
+        :return:            iterator over the geometry elements
+        """
+        board = self.panel_board(name, table_dict)
+        if board is not None:
+            return self.panel.iterate(board)
+        return iter(getattr(self, name) if table_dict is None else table_dict[name])
+
+    def panel_count(self, name, table_dict=None):
+        """
+        :param name:        the geometry attribute or, with table_dict, the geometry key of a tool / aperture dict
+        :param table_dict:  the dict of a tool / aperture
+        :return:            the number of elements of the geometry, without making the copies of a panel
+        """
+        board = self.panel_board(name, table_dict)
+        if board is not None:
+            return (len(board) if isinstance(board, list) else 1) * len(self.panel)
+        return len(getattr(self, name) if table_dict is None else table_dict[name])
+
+    def bounds(self, *args, **kwargs):
+        # the bounds of a panel are found from the board bounds until its geometry is used
+        if self.panel is not None and 'solid_geometry' in self.panel_source:
+            return self.panel.bounds()
+        return super().bounds(*args, **kwargs)
+
     def update_filters(self, last_ext, filter_string):
         """
         Will modify the filter string that is used when saving a file (a list of file extensions) to have the last
@@ -782,17 +782,24 @@ class ObjectCollection(QtCore.QAbstractItemModel):
         try:
             self.app.all_objects_list.clear()
 
-            self.app.geo_editor.clear()
+            # the editors and the tools that were not used yet (they are made on first use) have nothing to clear
+            if self.app.plugins.is_loaded('geo_editor'):
+                self.app.geo_editor.clear()
 
-            self.app.exc_editor.clear()
+            if self.app.plugins.is_loaded('exc_editor'):
+                self.app.exc_editor.clear()
 
-            self.app.dblsidedtool.reset_fields()
+            if self.app.plugins.is_loaded('dblsidedtool'):
+                self.app.dblsidedtool.reset_fields()
 
-            self.app.panelize_tool.reset_fields()
+            if self.app.plugins.is_loaded('panelize_tool'):
+                self.app.panelize_tool.reset_fields()
 
-            self.app.cutout_tool.reset_fields()
+            if self.app.plugins.is_loaded('cutout_tool'):
+                self.app.cutout_tool.reset_fields()
 
-            self.app.film_tool.reset_fields()
+            if self.app.plugins.is_loaded('film_tool'):
+                self.app.film_tool.reset_fields()
 
             self.beginResetModel()
 
@@ -0,0 +1,205 @@
+# ##########################################################
+# FlatCAM: 2D Post-processing for Manufacturing            #
+# Date: 10/18/2026                                         #
+# MIT Licence                                              #
+# ##########################################################
+
+import os
+import json
+import pickle
+import hashlib
+import logging
+from copy import deepcopy
+
+from appParsers.ParseExcellon import Excellon
+
+log = logging.getLogger('base')
+
+
+class ParseCache:
+    """
+    On-disk cache for the result of parsing Gerber and Excellon files.
+
+    The entries are keyed on the SHA1 of the file content, the application version and the
+    preferences that change the parser result, so any change in one of them makes a new entry.
+    Each entry is a pickle of the parsed attributes of the object (the Shapely geometry is stored as WKB).
+    When the cache folder grows over the set size, the least recently used entries are deleted.
+    """
+
+    extension = '.fcache'
+
+    # preferences that change the parsing result
+    settings_keys = {
+        'gerber': ['units', 'gerber_def_units', 'gerber_def_zeros', 'gerber_circle_steps', 'gerber_simplification',
+                   'gerber_simp_tolerance', 'gerber_buffering', 'gerber_use_buffer_for_union',
+                   'gerber_extra_buffering', 'gerber_clean_apertures'],
+        'excellon': ['units', 'geometry_circle_steps']
+    }
+
+    # attributes of the parsed object that are saved in the cache
+    attributes = {
+        'gerber': ['units', 'int_digits', 'frac_digits', 'gerber_zeros', 'apertures', 'aperture_macros',
+                   'solid_geometry', 'follow_geometry', 'source_file'],
+        'excellon': ['units', 'units_found', 'zeros', 'zeros_found', 'excellon_format_upper_mm',
+                     'excellon_format_lower_mm', 'excellon_format_upper_in', 'excellon_format_lower_in',
+                     'excellon_units', 'excellon_units_found', 'excellon_format', 'diameterless', 'toolless_diam',
+                     'tools', 'solid_geometry', 'source_file']
+    }
+
+    def __init__(self, app):
+        self.app = app
+        self.cache_path = os.path.join(self.app.data_path, 'parse_cache')
+
+    @property
+    def enabled(self):
+        return bool(self.app.defaults['global_parse_cache'])
+
+    def make_key(self, kind, filename):
+        """
+        Make the key of the cache entry for a file.
+
+        :param kind:        'gerber' or 'excellon'
+        :param filename:    path to the file to be parsed
+        :return:            a hex digest string or None if the file can't be read
+        """
+
+        try:
+            with open(filename, 'rb') as f:
+                content = f.read()
+        except IOError:
+            return None
+
+        settings = {k: self.app.defaults[k] for k in self.settings_keys[kind]}
+        if kind == 'excellon':
+            # the Excellon format defaults are class attributes of the parser
+            settings.update(Excellon.defaults)
+
+        h = hashlib.sha1()
+        h.update(content)
+        h.update(json.dumps([kind, str(self.app.version), settings], sort_keys=True, default=str).encode('utf-8'))
+        return h.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_path, key + self.extension)
+
+    def load(self, kind, key, obj):
+        """
+        Load a cache entry into the object.
+
+        :param kind:    'gerber' or 'excellon'
+        :param key:     key of the cache entry as returned by make_key()
+        :param obj:     the object to be loaded with the cached attributes
+        :return:        True on a cache hit, False otherwise
+        """
+
+        if key is None:
+            return False
+
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                stored = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            log.debug("ParseCache.load() -> Removing unreadable cache entry %s. %s" % (path, str(e)))
+            self.remove(path)
+            return False
+
+        for attr in self.attributes[kind]:
+            setattr(obj, attr, stored[attr])
+
+        if kind == 'excellon':
+            # the tools data is made from the current object options, not cached; as in the parser, every tool has
+            # a 'data' key but only the tools with geometry get the default data
+            for tool in obj.tools:
+                obj.tools[tool]['data'] = deepcopy(obj.default_data) if obj.tools[tool].get('solid_geometry') else {}
+
+        # mark the entry as the most recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        log.debug("ParseCache.load() -> Loaded %s from cache entry %s" % (kind, key))
+        return True
+
+    def store(self, kind, key, obj):
+        """
+        Save the parsed attributes of the object as a cache entry then evict the old entries if needed.
+
+        :param kind:    'gerber' or 'excellon'
+        :param key:     key of the cache entry as returned by make_key()
+        :param obj:     the parsed object
+        :return:        None
+        """
+
+        if key is None:
+            return
+
+        stored = {attr: getattr(obj, attr) for attr in self.attributes[kind]}
+        if kind == 'excellon':
+            stored['tools'] = {
+                tool: {k: v for k, v in tool_dict.items() if k != 'data'} for tool, tool_dict in obj.tools.items()
+            }
+
+        path = self.entry_path(key)
+        tmp_path = path + '.tmp'
+        try:
+            if not os.path.exists(self.cache_path):
+                os.makedirs(self.cache_path)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(stored, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            log.debug("ParseCache.store() -> Could not save the cache entry. %s" % str(e))
+            self.remove(tmp_path)
+            return
+
+        self.evict()
+
+    def evict(self):
+        """
+        Delete the least recently used entries until the cache is under the size set in Preferences.
+
+        :return: None
+        """
+
+        limit = float(self.app.defaults['global_parse_cache_size']) * 1024 * 1024
+
+        try:
+            entries = []
+            with os.scandir(self.cache_path) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.endswith(self.extension):
+                        st = entry.stat()
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+        except OSError:
+            return
+
+        total = sum(e[1] for e in entries)
+        for __, size, path in sorted(entries):
+            if total <= limit:
+                break
+            self.remove(path)
+            total -= size
+
+    def clear(self):
+        """
+        Delete all the cache entries.
+
+        :return: None
+        """
+
+        if not os.path.exists(self.cache_path):
+            return
+        for name in os.listdir(self.cache_path):
+            if name.endswith(self.extension):
+                self.remove(os.path.join(self.cache_path, name))
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -1,14 +1,15 @@
 from PyQt5 import QtWidgets
-from camlib import Geometry, arc, arc_angle, ApertureMacro, grace
+from camlib import Geometry, arc, arc_angle, ApertureMacro, grace, tiled_union, local_boolean, PolygonIndex
 
 import numpy as np
 import traceback
+import os
 from copy import deepcopy
 
 from shapely.ops import unary_union, linemerge
 import shapely.affinity as affinity
 from shapely.geometry import box as shply_box
-from shapely.geometry import Point
+from shapely.geometry import Point, LinearRing
 
 from lxml import etree as ET
 import ezdxf
@@ -72,6 +73,15 @@ class Gerber(Geometry):
 
     app = None
 
+    # minimum number of primitives for which the geometry is built in the process pool
+    parallel_threshold = 2000
+    # minimum number of primitives sent to a pool worker in one go
+    parallel_chunk_size = 500
+
+    # aperture shapes made in origin, used to make the flashes; they are shared between all the Gerber objects
+    flash_templates = {}
+    flash_templates_limit = 4096
+
     def __init__(self, steps_per_circle=None):
         """
         The constructor takes no parameters. Use ``gerber.parse_files()``
@@ -365,20 +375,53 @@ class Gerber(Geometry):
         # Coordinates of the current path, each is [x, y]
         path = []
 
-        # this is for temporary storage of solid geometry until it is added to poly_buffer
-        geo_s = None
-
-        # this is for temporary storage of follow geometry until it is added to follow_buffer
-        geo_f = None
-
-        # Polygons are stored here until there is a change in polarity.
-        # Only then they are combined via unary_union and added or
-        # subtracted from solid_geometry. This is ~100 times faster than
-        # applying a union for every new polygon.
-        poly_buffer = []
+        # The parsing is done in two passes. The first one (the loop below) only tokenizes the Gerber file into
+        # primitive records (strokes, flashes, regions and polarity changes), each tagged with the aperture that
+        # made it. The expensive Shapely geometry is then built from those records, optionally in parallel over the
+        # application process pool, and finally the records are assembled in order into the apertures storage.
+        primitives = []
+
+        # index in primitives of the records that set the last follow/solid geometry; needed by the G37 handling
+        last_follow_idx = None
+        last_solid_idx = None
+
+        # cache of the aperture descriptions used by the flash records, aperture id -> descriptor key
+        flash_descriptors = {}
+        flash_descriptors_cache = {}
+
+        def add_primitive(kind, aperture, data, follow='buffer', solid=1, store='always'):
+            """
+            :param kind:        type of the primitive: 'stroke', 'flash', 'box', 'region', 'poly', 'repeat', 'polarity'
+            :param aperture:    the aperture key where the geometry is stored
+            :param data:        parameters needed to build the geometry
+            :param follow:      'buffer' -> follow geo is stored in follow_geometry and aperture, 'dict' -> only in
+                                the aperture, None -> follow geometry is discarded
+            :param solid:       0 -> solid geo is discarded, 1 -> stored if not empty, 2 -> stored if not empty and valid
+            :param store:       when to store the aperture geometry dict: 'always', 'solid' -> only if the solid geo
+                                was stored, 'any' -> if either the solid or the follow geo was stored
+            :return:            index of the record
+            """
+            primitives.append((kind, aperture, self.is_lpc, data, follow, solid, store))
+            return len(primitives) - 1
+
+        def flash_descriptor(aperture):
+            # the aperture dict without the (growing) geometry list; a new key is made on each aperture (re)definition
+            if aperture not in flash_descriptors_cache:
+                desc_key = len(flash_descriptors)
+                flash_descriptors[desc_key] = {
+                    k: v for k, v in self.apertures[aperture].items() if k != 'geometry'
+                }
+                flash_descriptors_cache[aperture] = desc_key
+            return flash_descriptors_cache[aperture]
+
+        def is_not_rect(aperture):
+            try:
+                return self.apertures[aperture]["type"] != 'R'
+            except Exception as err:
+                log.debug("camlib.Gerber.parse_lines() --> %s" % str(err))
+                return True
 
-        # store here the follow geometry
-        follow_buffer = []
+        source_lines = []
 
         last_path_aperture = None
         current_aperture = None
@@ -429,7 +472,7 @@ class Gerber(Geometry):
                     raise grace
 
                 line_num += 1
-                self.source_file += gline + '\n'
+                source_lines.append(gline + '\n')
 
                 # Cleanup #
                 gline = gline.strip(' \r\n')
@@ -464,50 +507,15 @@ class Gerber(Geometry):
                         # finish the current path and add it to the storage
                         # --- Buffered ----
                         width = self.apertures[last_path_aperture]["size"]
-
-                        geo_dict = {}
-                        geo_f = LineString(path)
-                        if not geo_f.is_empty:
-                            follow_buffer.append(geo_f)
-                            geo_dict['follow'] = geo_f
-
-                        geo_s = LineString(path).buffer(width / 1.999, int(self.steps_per_circle / 4))
-                        if not geo_s.is_empty and geo_s.is_valid:
-                            if self.app.defaults['gerber_simplification']:
-                                poly_buffer.append(geo_s.simplify(s_tol))
-                            else:
-                                poly_buffer.append(geo_s)
-
-                            if self.is_lpc is True:
-                                geo_dict['clear'] = geo_s
-                            else:
-                                geo_dict['solid'] = geo_s
-
-                        if last_path_aperture not in self.apertures:
-                            self.apertures[last_path_aperture] = {}
-                        if 'geometry' not in self.apertures[last_path_aperture]:
-                            self.apertures[last_path_aperture]['geometry'] = []
-                        self.apertures[last_path_aperture]['geometry'].append(deepcopy(geo_dict))
+                        last_follow_idx = last_solid_idx = add_primitive(
+                            'stroke', last_path_aperture, (path[:], width / 1.999, int(self.steps_per_circle / 4)),
+                            solid=2)
 
                         path = [path[-1]]
 
                     # --- Apply buffer ---
-                    # If added for testing of bug #83
-                    # TODO: Remove when bug fixed
-                    try:
-                        buff_length = len(poly_buffer)
-                    except TypeError:
-                        buff_length = 1
-
-                    if buff_length > 0:
-                        if current_polarity == 'D':
-                            self.solid_geometry = self.solid_geometry.union(unary_union(poly_buffer))
-
-                        else:
-                            self.solid_geometry = self.solid_geometry.difference(unary_union(poly_buffer))
-
-                        # follow_buffer = []
-                        poly_buffer = []
+                    # the geometry accumulated so far is added or subtracted when the primitives are assembled
+                    add_primitive('polarity', None, current_polarity)
 
                     current_polarity = new_polarity
                     continue
@@ -657,7 +665,8 @@ class Gerber(Geometry):
                 match = self.ad_re.search(gline)
                 if match:
                     # log.info("Found aperture definition. Line %d: %s" % (line_num, gline))
-                    self.aperture_parse(match.group(1), match.group(2), match.group(3))
+                    apid = self.aperture_parse(match.group(1), match.group(2), match.group(3))
+                    flash_descriptors_cache.pop(apid, None)
                     continue
 
                 # ################################################################
@@ -675,29 +684,9 @@ class Gerber(Geometry):
                         # --- Buffered ---
                         try:
                             # log.debug("Bare op-code %d." % current_operation_code)
-                            geo_dict = {}
-                            flash = self.create_flash_geometry(
-                                Point(current_x, current_y), self.apertures[current_aperture],
-                                self.steps_per_circle)
-
-                            geo_dict['follow'] = Point([current_x, current_y])
-
-                            if not flash.is_empty:
-                                if self.app.defaults['gerber_simplification']:
-                                    poly_buffer.append(flash.simplify(s_tol))
-                                else:
-                                    poly_buffer.append(flash)
-                                if self.is_lpc is True:
-                                    geo_dict['clear'] = flash
-                                else:
-                                    geo_dict['solid'] = flash
-
-                                if current_aperture not in self.apertures:
-                                    self.apertures[current_aperture] = {}
-                                if 'geometry' not in self.apertures[current_aperture]:
-                                    self.apertures[current_aperture]['geometry'] = []
-                                self.apertures[current_aperture]['geometry'].append(deepcopy(geo_dict))
-
+                            add_primitive('flash', current_aperture,
+                                          ((current_x, current_y), flash_descriptor(current_aperture)),
+                                          follow='dict', store='solid')
                         except IndexError:
                             log.warning("Line %d: %s -> Nothing there to flash!" % (line_num, gline))
 
@@ -719,6 +708,7 @@ class Gerber(Geometry):
                     if self.apertures[current_aperture]["type"] != "AM":
                         if self.apertures[current_aperture]["size"] == 0:
                             self.apertures[current_aperture]["size"] = 1e-12
+                            flash_descriptors_cache.pop(current_aperture, None)
                     # log.debug(self.apertures[current_aperture])
 
                     # Take care of the current path with the previous tool
@@ -732,30 +722,10 @@ class Gerber(Geometry):
                             # do nothing because 'R' type moving aperture is none at once
                             pass
                         else:
-                            geo_dict = {}
-                            geo_f = LineString(path)
-                            if not geo_f.is_empty:
-                                follow_buffer.append(geo_f)
-                                geo_dict['follow'] = geo_f
-
                             # --- Buffered ----
                             width = self.apertures[last_path_aperture]["size"]
-                            geo_s = LineString(path).buffer(width / 1.999, int(self.steps_per_circle / 4))
-                            if not geo_s.is_empty:
-                                if self.app.defaults['gerber_simplification']:
-                                    poly_buffer.append(geo_s.simplify(s_tol))
-                                else:
-                                    poly_buffer.append(geo_s)
-                                if self.is_lpc is True:
-                                    geo_dict['clear'] = geo_s
-                                else:
-                                    geo_dict['solid'] = geo_s
-
-                            if last_path_aperture not in self.apertures:
-                                self.apertures[last_path_aperture] = {}
-                            if 'geometry' not in self.apertures[last_path_aperture]:
-                                self.apertures[last_path_aperture]['geometry'] = []
-                            self.apertures[last_path_aperture]['geometry'].append(deepcopy(geo_dict))
+                            last_follow_idx = last_solid_idx = add_primitive(
+                                'stroke', last_path_aperture, (path[:], width / 1.999, int(self.steps_per_circle / 4)))
 
                             path = [path[-1]]
                     continue
@@ -771,31 +741,10 @@ class Gerber(Geometry):
 
                     if path_length > 1:
                         # Take care of what is left in the path
-
-                        geo_dict = {}
-                        geo_f = LineString(path)
-                        if not geo_f.is_empty:
-                            follow_buffer.append(geo_f)
-                            geo_dict['follow'] = geo_f
-
                         # --- Buffered ----
                         width = self.apertures[last_path_aperture]["size"]
-                        geo_s = LineString(path).buffer(width / 1.999, int(self.steps_per_circle / 4))
-                        if not geo_s.is_empty:
-                            if self.app.defaults['gerber_simplification']:
-                                poly_buffer.append(geo_s.simplify(s_tol))
-                            else:
-                                poly_buffer.append(geo_s)
-                            if self.is_lpc is True:
-                                geo_dict['clear'] = geo_s
-                            else:
-                                geo_dict['solid'] = geo_s
-
-                        if last_path_aperture not in self.apertures:
-                            self.apertures[last_path_aperture] = {}
-                        if 'geometry' not in self.apertures[last_path_aperture]:
-                            self.apertures[last_path_aperture]['geometry'] = []
-                        self.apertures[last_path_aperture]['geometry'].append(deepcopy(geo_dict))
+                        last_follow_idx = last_solid_idx = add_primitive(
+                            'stroke', last_path_aperture, (path[:], width / 1.999, int(self.steps_per_circle / 4)))
 
                         path = [path[-1]]
 
@@ -824,24 +773,7 @@ class Gerber(Geometry):
 
                         if path_length == 1:
                             # this means that the geometry was prepared previously and we just need to add it
-                            geo_dict = {}
-                            if geo_f:
-                                if not geo_f.is_empty:
-                                    follow_buffer.append(geo_f)
-                                    geo_dict['follow'] = geo_f
-                            if geo_s:
-                                if not geo_s.is_empty:
-                                    if self.app.defaults['gerber_simplification']:
-                                        poly_buffer.append(geo_s.simplify(s_tol))
-                                    else:
-                                        poly_buffer.append(geo_s)
-                                    if self.is_lpc is True:
-                                        geo_dict['clear'] = geo_s
-                                    else:
-                                        geo_dict['solid'] = geo_s
-
-                            if geo_s or geo_f:
-                                self.apertures['0']['geometry'].append(deepcopy(geo_dict))
+                            add_primitive('repeat', '0', (last_follow_idx, last_solid_idx), store='any')
 
                             path = [[current_x, current_y]]  # Start new path
 
@@ -861,36 +793,11 @@ class Gerber(Geometry):
                     # For regions we may ignore an aperture that is None
 
                     # --- Buffered ---
-                    geo_dict = {}
-                    if current_aperture in self.apertures:
-                        # the following line breaks loading of Circuit Studio Gerber files
-                        # buff_value = float(self.apertures[current_aperture]['size']) / 2.0
-                        # region_geo = Polygon(path).buffer(buff_value, int(self.steps_per_circle))
-                        region_geo = Polygon(path)  # Sprint Layout Gerbers with ground fill are crashed with above
-                    else:
-                        region_geo = Polygon(path)
-
-                    region_f = region_geo.exterior
-                    if not region_f.is_empty:
-                        follow_buffer.append(region_f)
-                        geo_dict['follow'] = region_f
-
-                    region_s = region_geo
-                    if not region_s.is_valid:
-                        region_s = region_s.buffer(0, int(self.steps_per_circle))
-                    if not region_s.is_empty:
-                        if self.app.defaults['gerber_simplification']:
-                            poly_buffer.append(region_s.simplify(s_tol))
-                        else:
-                            poly_buffer.append(region_s)
-
-                        if self.is_lpc is True:
-                            geo_dict['clear'] = region_s
-                        else:
-                            geo_dict['solid'] = region_s
-
-                    if not region_s.is_empty or not region_f.is_empty:
-                        self.apertures['0']['geometry'].append(deepcopy(geo_dict))
+                    # the following line breaks loading of Circuit Studio Gerber files
+                    # buff_value = float(self.apertures[current_aperture]['size']) / 2.0
+                    # region_geo = Polygon(path).buffer(buff_value, int(self.steps_per_circle))
+                    # Sprint Layout Gerbers with ground fill are crashed with above so the region is not buffered
+                    add_primitive('region', '0', path[:], store='any')
 
                     path = [[current_x, current_y]]  # Start new path
                     continue
@@ -960,34 +867,8 @@ class Gerber(Geometry):
                                 else:
                                     # --- BUFFERED ---
                                     # Draw the flash
-                                    # this treats the case when we are storing geometry as paths
-                                    geo_dict = {}
-                                    geo_flash = Point([current_x, current_y])
-                                    follow_buffer.append(geo_flash)
-                                    geo_dict['follow'] = geo_flash
-
-                                    # this treats the case when we are storing geometry as solids
-                                    flash = self.create_flash_geometry(
-                                        Point([current_x, current_y]),
-                                        self.apertures[current_aperture],
-                                        self.steps_per_circle
-                                    )
-                                    if not flash.is_empty:
-                                        if self.app.defaults['gerber_simplification']:
-                                            poly_buffer.append(flash.simplify(s_tol))
-                                        else:
-                                            poly_buffer.append(flash)
-
-                                        if self.is_lpc is True:
-                                            geo_dict['clear'] = flash
-                                        else:
-                                            geo_dict['solid'] = flash
-
-                                    if current_aperture not in self.apertures:
-                                        self.apertures[current_aperture] = {}
-                                    if 'geometry' not in self.apertures[current_aperture]:
-                                        self.apertures[current_aperture]['geometry'] = []
-                                    self.apertures[current_aperture]['geometry'].append(deepcopy(geo_dict))
+                                    add_primitive('flash', current_aperture,
+                                                  ((current_x, current_y), flash_descriptor(current_aperture)))
 
                             if making_region is False:
                                 # if the aperture is rectangle then add a rectangular shape having as parameters the
@@ -1003,27 +884,8 @@ class Gerber(Geometry):
                                         maxy = max(path[0][1], path[1][1]) + height / 2
                                         log.debug("Coords: %s - %s - %s - %s" % (minx, miny, maxx, maxy))
 
-                                        geo_dict = {}
-                                        geo_f = Point([current_x, current_y])
-                                        follow_buffer.append(geo_f)
-                                        geo_dict['follow'] = geo_f
-
-                                        geo_s = shply_box(minx, miny, maxx, maxy)
-                                        if self.app.defaults['gerber_simplification']:
-                                            poly_buffer.append(geo_s.simplify(s_tol))
-                                        else:
-                                            poly_buffer.append(geo_s)
-
-                                        if self.is_lpc is True:
-                                            geo_dict['clear'] = geo_s
-                                        else:
-                                            geo_dict['solid'] = geo_s
-
-                                        if current_aperture not in self.apertures:
-                                            self.apertures[current_aperture] = {}
-                                        if 'geometry' not in self.apertures[current_aperture]:
-                                            self.apertures[current_aperture]['geometry'] = []
-                                        self.apertures[current_aperture]['geometry'].append(deepcopy(geo_dict))
+                                        last_follow_idx = last_solid_idx = add_primitive(
+                                            'box', current_aperture, (minx, miny, maxx, maxy, current_x, current_y))
                                 except Exception:
                                     pass
                             last_path_aperture = current_aperture
@@ -1048,36 +910,9 @@ class Gerber(Geometry):
                             path_length = 1
 
                         if path_length > 1:
-                            geo_s = None
-
-                            geo_dict = {}
                             # --- BUFFERED ---
-                            # this treats the case when we are storing geometry as paths only
-                            if making_region:
-                                # we do this for the case that a region is done without having defined any aperture
-                                if last_path_aperture is None:
-                                    if '0' not in self.apertures:
-                                        self.apertures['0'] = {}
-                                        self.apertures['0']['type'] = 'REG'
-                                        self.apertures['0']['size'] = 0.0
-                                        self.apertures['0']['geometry'] = []
-                                    last_path_aperture = '0'
-                                geo_f = Polygon()
-                            else:
-                                geo_f = LineString(path)
-
-                            try:
-                                if self.apertures[last_path_aperture]["type"] != 'R':
-                                    if not geo_f.is_empty:
-                                        follow_buffer.append(geo_f)
-                                        geo_dict['follow'] = geo_f
-                            except Exception as e:
-                                log.debug("camlib.Gerber.parse_lines() --> %s" % str(e))
-                                if not geo_f.is_empty:
-                                    follow_buffer.append(geo_f)
-                                    geo_dict['follow'] = geo_f
-
-                            # this treats the case when we are storing geometry as solids
+                            # the 'R' apertures made their geometry already, when the pen was down
+                            not_rect = is_not_rect(last_path_aperture)
                             if making_region:
                                 # we do this for the case that a region is done without having defined any aperture
                                 if last_path_aperture is None:
@@ -1087,50 +922,28 @@ class Gerber(Geometry):
                                         self.apertures['0']['size'] = 0.0
                                         self.apertures['0']['geometry'] = []
                                     last_path_aperture = '0'
+                                    not_rect = True
 
-                                try:
-                                    geo_s = Polygon(path)
-                                except ValueError:
+                                # the region contour is stored here only as solid, the follow geometry is empty
+                                if len(path) < 3:
                                     log.warning("Problem %s %s" % (gline, line_num))
                                     self.app.inform.emit('[ERROR] %s: %s' %
                                                          (_("Region does not have enough points. "
                                                             "File will be processed but there are parser errors. "
                                                             "Line number"), str(line_num)))
+                                    last_follow_idx = add_primitive('poly', last_path_aperture, None, solid=0)
+                                    last_solid_idx = None
+                                else:
+                                    last_follow_idx = last_solid_idx = add_primitive(
+                                        'poly', last_path_aperture, path[:], solid=1 if not_rect else 0)
                             else:
                                 if last_path_aperture is None:
                                     log.warning("No aperture defined for curent path. (%d)" % line_num)
                                 width = self.apertures[last_path_aperture]["size"]  # TODO: WARNING this should fail!
-                                geo_s = LineString(path).buffer(width / 1.999, int(self.steps_per_circle / 4))
-
-                            try:
-                                if self.apertures[last_path_aperture]["type"] != 'R':
-                                    if not geo_s.is_empty:
-                                        if self.app.defaults['gerber_simplification']:
-                                            poly_buffer.append(geo_s.simplify(s_tol))
-                                        else:
-                                            poly_buffer.append(geo_s)
-
-                                        if self.is_lpc is True:
-                                            geo_dict['clear'] = geo_s
-                                        else:
-                                            geo_dict['solid'] = geo_s
-                            except Exception as e:
-                                log.debug("camlib.Gerber.parse_lines() --> %s" % str(e))
-                                if self.app.defaults['gerber_simplification']:
-                                    poly_buffer.append(geo_s.simplify(s_tol))
-                                else:
-                                    poly_buffer.append(geo_s)
-
-                                if self.is_lpc is True:
-                                    geo_dict['clear'] = geo_s
-                                else:
-                                    geo_dict['solid'] = geo_s
-
-                            if last_path_aperture not in self.apertures:
-                                self.apertures[last_path_aperture] = {}
-                            if 'geometry' not in self.apertures[last_path_aperture]:
-                                self.apertures[last_path_aperture]['geometry'] = []
-                            self.apertures[last_path_aperture]['geometry'].append(deepcopy(geo_dict))
+                                last_follow_idx = last_solid_idx = add_primitive(
+                                    'stroke', last_path_aperture,
+                                    (path[:], width / 1.999, int(self.steps_per_circle / 4)),
+                                    follow='buffer' if not_rect else None, solid=1 if not_rect else 0)
 
                         # if linear_x or linear_y are None, ignore those
                         if linear_x is not None and linear_y is not None:
@@ -1153,85 +966,20 @@ class Gerber(Geometry):
 
                         if path_length > 1:
                             # --- Buffered ----
-                            geo_dict = {}
-
-                            # this treats the case when we are storing geometry as paths
-                            geo_f = LineString(path)
-                            if not geo_f.is_empty:
-                                try:
-                                    if self.apertures[last_path_aperture]["type"] != 'R':
-                                        follow_buffer.append(geo_f)
-                                        geo_dict['follow'] = geo_f
-                                except Exception as e:
-                                    log.debug("camlib.Gerber.parse_lines() --> G01 match D03 --> %s" % str(e))
-                                    follow_buffer.append(geo_f)
-                                    geo_dict['follow'] = geo_f
-
-                            # this treats the case when we are storing geometry as solids
+                            # the 'R' apertures made their geometry already, when the pen was down
+                            not_rect = is_not_rect(last_path_aperture)
                             width = self.apertures[last_path_aperture]["size"]
-                            geo_s = LineString(path).buffer(width / 1.999, int(self.steps_per_circle / 4))
-                            if not geo_s.is_empty:
-                                try:
-                                    if self.apertures[last_path_aperture]["type"] != 'R':
-                                        if self.app.defaults['gerber_simplification']:
-                                            poly_buffer.append(geo_s.simplify(s_tol))
-                                        else:
-                                            poly_buffer.append(geo_s)
-
-                                        if self.is_lpc is True:
-                                            geo_dict['clear'] = geo_s
-                                        else:
-                                            geo_dict['solid'] = geo_s
-                                except Exception:
-                                    if self.app.defaults['gerber_simplification']:
-                                        poly_buffer.append(geo_s.simplify(s_tol))
-                                    else:
-                                        poly_buffer.append(geo_s)
-
-                                    if self.is_lpc is True:
-                                        geo_dict['clear'] = geo_s
-                                    else:
-                                        geo_dict['solid'] = geo_s
-
-                            if last_path_aperture not in self.apertures:
-                                self.apertures[last_path_aperture] = {}
-                            if 'geometry' not in self.apertures[last_path_aperture]:
-                                self.apertures[last_path_aperture]['geometry'] = []
-                            self.apertures[last_path_aperture]['geometry'].append(deepcopy(geo_dict))
+                            last_follow_idx = last_solid_idx = add_primitive(
+                                'stroke', last_path_aperture, (path[:], width / 1.999, int(self.steps_per_circle / 4)),
+                                follow='buffer' if not_rect else None, solid=1 if not_rect else 0)
 
                         # Reset path starting point
                         path = [[linear_x, linear_y]]
 
                         # --- BUFFERED ---
                         # Draw the flash
-                        # this treats the case when we are storing geometry as paths
-                        geo_dict = {}
-                        geo_flash = Point([linear_x, linear_y])
-                        follow_buffer.append(geo_flash)
-                        geo_dict['follow'] = geo_flash
-
-                        # this treats the case when we are storing geometry as solids
-                        flash = self.create_flash_geometry(
-                            Point([linear_x, linear_y]),
-                            self.apertures[current_aperture],
-                            self.steps_per_circle
-                        )
-                        if not flash.is_empty:
-                            if self.app.defaults['gerber_simplification']:
-                                poly_buffer.append(flash.simplify(s_tol))
-                            else:
-                                poly_buffer.append(flash)
-
-                            if self.is_lpc is True:
-                                geo_dict['clear'] = flash
-                            else:
-                                geo_dict['solid'] = flash
-
-                        if current_aperture not in self.apertures:
-                            self.apertures[current_aperture] = {}
-                        if 'geometry' not in self.apertures[current_aperture]:
-                            self.apertures[current_aperture]['geometry'] = []
-                        self.apertures[current_aperture]['geometry'].append(deepcopy(geo_dict))
+                        add_primitive('flash', current_aperture,
+                                      ((linear_x, linear_y), flash_descriptor(current_aperture)))
 
                     # maybe those lines are not exactly needed but it is easier to read the program as those coordinates
                     # are used in case that circular interpolation is encountered within the Gerber file
@@ -1313,38 +1061,13 @@ class Gerber(Geometry):
                             path_length = 1
 
                         if path_length > 1:
-                            geo_dict = {}
-
                             if last_path_aperture is None:
                                 log.warning("No aperture defined for curent path. (%d)" % line_num)
 
                             # --- BUFFERED ---
                             width = self.apertures[last_path_aperture]["size"]
-
-                            # this treats the case when we are storing geometry as paths
-                            geo_f = LineString(path)
-                            if not geo_f.is_empty:
-                                follow_buffer.append(geo_f)
-                                geo_dict['follow'] = geo_f
-
-                            # this treats the case when we are storing geometry as solids
-                            buffered = LineString(path).buffer(width / 1.999, int(self.steps_per_circle))
-                            if not buffered.is_empty:
-                                if self.app.defaults['gerber_simplification']:
-                                    poly_buffer.append(buffered.simplify(s_tol))
-                                else:
-                                    poly_buffer.append(buffered)
-
-                                if self.is_lpc is True:
-                                    geo_dict['clear'] = buffered
-                                else:
-                                    geo_dict['solid'] = buffered
-
-                            if last_path_aperture not in self.apertures:
-                                self.apertures[last_path_aperture] = {}
-                            if 'geometry' not in self.apertures[last_path_aperture]:
-                                self.apertures[last_path_aperture]['geometry'] = []
-                            self.apertures[last_path_aperture]['geometry'].append(deepcopy(geo_dict))
+                            last_follow_idx = add_primitive(
+                                'stroke', last_path_aperture, (path[:], width / 1.999, int(self.steps_per_circle)))
 
                         current_x = circular_x
                         current_y = circular_y
@@ -1471,33 +1194,18 @@ class Gerber(Geometry):
                 else:
                     # EOF, create shapely LineString if something still in path
                     # ## --- Buffered ---
-
-                    geo_dict = {}
-                    # this treats the case when we are storing geometry as paths
-                    geo_f = LineString(path)
-                    if not geo_f.is_empty:
-                        follow_buffer.append(geo_f)
-                        geo_dict['follow'] = geo_f
-
-                    # this treats the case when we are storing geometry as solids
                     width = self.apertures[last_path_aperture]["size"]
-                    geo_s = LineString(path).buffer(width / 1.999, int(self.steps_per_circle / 4))
-                    if not geo_s.is_empty:
-                        if self.app.defaults['gerber_simplification']:
-                            poly_buffer.append(geo_s.simplify(s_tol))
-                        else:
-                            poly_buffer.append(geo_s)
+                    add_primitive('stroke', last_path_aperture,
+                                  (path[:], width / 1.999, int(self.steps_per_circle / 4)))
 
-                        if self.is_lpc is True:
-                            geo_dict['clear'] = geo_s
-                        else:
-                            geo_dict['solid'] = geo_s
+            self.source_file += ''.join(source_lines)
+
+            # --- Build the geometry ---
+            simplify_tol = s_tol if self.app.defaults['gerber_simplification'] else None
+            solids = self.build_primitives(primitives, flash_descriptors, simplify_tol)
 
-                    if last_path_aperture not in self.apertures:
-                        self.apertures[last_path_aperture] = {}
-                    if 'geometry' not in self.apertures[last_path_aperture]:
-                        self.apertures[last_path_aperture]['geometry'] = []
-                    self.apertures[last_path_aperture]['geometry'].append(deepcopy(geo_dict))
+            # --- Assemble the geometry ---
+            poly_buffer, follow_buffer = self.assemble_primitives(primitives, solids)
 
             # --- Apply buffer ---
             # this treats the case when we are storing geometry as paths
@@ -1525,25 +1233,27 @@ class Gerber(Geometry):
             log.warning("Joining %d polygons." % buff_length)
             self.app.inform.emit('%s: %d.' % (_("Gerber processing. Joining polygons"), buff_length))
 
+            # the polygons are merged in tiles, in parallel if the parallel parsing is enabled
+            pool = self.app.pool if self.app.defaults['gerber_parallel_parsing'] else None
             if self.use_buffer_for_union:
                 log.debug("Union by buffer...")
 
-                new_poly = MultiPolygon(poly_buffer)
                 if self.app.defaults["gerber_buffering"] == 'full':
-                    new_poly = new_poly.buffer(0.00000001)
-                    new_poly = new_poly.buffer(-0.00000001)
+                    new_poly = tiled_union(poly_buffer, pool, method='buffer')
                     log.warning("Union(buffer) done.")
+                else:
+                    new_poly = MultiPolygon(poly_buffer)
 
             else:
                 log.debug("Union by union()...")
-                new_poly = unary_union(poly_buffer)
+                new_poly = tiled_union(poly_buffer, pool)
                 new_poly = new_poly.buffer(0, int(self.steps_per_circle / 4))
                 log.warning("Union done.")
 
             if current_polarity == 'D':
                 self.app.inform.emit('%s' % _("Gerber processing. Applying Gerber polarity."))
                 if new_poly.is_valid:
-                    self.solid_geometry = self.solid_geometry.union(new_poly)
+                    self.solid_geometry = local_boolean(self.solid_geometry, new_poly, 'union')
                 else:
                     # I do this so whenever the parsed geometry of the file is not valid (intersections) it is still
                     # loaded. Instead of applying a union I add to a list of polygons.
@@ -1584,7 +1294,7 @@ class Gerber(Geometry):
                 #         except Exception:
                 #             pass
             else:
-                self.solid_geometry = self.solid_geometry.difference(new_poly)
+                self.solid_geometry = local_boolean(self.solid_geometry, new_poly, 'difference')
 
             if self.app.defaults['gerber_clean_apertures']:
                 # clean the Gerber file of apertures with no geometry
@@ -1605,8 +1315,234 @@ class Gerber(Geometry):
             self.app.inform.emit('[ERROR] %s\n%s:' %
                                  (_("Gerber Parser ERROR"), loc))
 
+    def build_primitives(self, primitives, descriptors, simplify_tol=None):
+        """
+        Build the solid geometry for the primitive records made by parse_lines(). If the parallel parsing is enabled
+        and there are enough records, the work is split in chunks that are processed by the application process pool.
+
+        :param primitives:      list of primitive records as made by parse_lines()
+        :param descriptors:     dict of the apertures used by the flash records
+        :param simplify_tol:    if not None, the solid geometry is also simplified with this tolerance
+        :return:                a list with a tuple (solid geometry, simplified solid geometry) for each record
+        """
+        jobs = [(kind, data) for kind, __, __, data, __, __, __ in primitives]
+
+        pool = getattr(self.app, 'pool', None)
+        use_pool = self.app.defaults['gerber_parallel_parsing'] and pool is not None and \
+            len(jobs) >= self.parallel_threshold
+
+        if use_pool:
+            nr_chunks = 4 * (os.cpu_count() or 1)
+            chunk_size = max(self.parallel_chunk_size, int(len(jobs) / nr_chunks) + 1)
+            chunks = []
+            for start in range(0, len(jobs), chunk_size):
+                chunk = jobs[start:start + chunk_size]
+                # send to the workers only the aperture descriptions used in this chunk
+                chunk_desc = {data[1]: descriptors[data[1]] for kind, data in chunk if kind == 'flash'}
+                chunks.append((chunk, chunk_desc, self.steps_per_circle, simplify_tol))
+
+            self.app.inform.emit('%s: %d.' % (_("Gerber processing. Building geometry in parallel"), len(jobs)))
+            log.debug("Gerber.build_primitives() -> %d records in %d chunks" % (len(jobs), len(chunks)))
+            try:
+                solids = []
+                # imap() keeps the chunks in order and allows to abort between chunks
+                for chunk_result in pool.imap(build_gerber_primitives, chunks):
+                    if self.app.abort_flag:
+                        # graceful abort requested by the user
+                        raise grace
+                    solids += chunk_result
+                return solids
+            except grace:
+                raise
+            except Exception as err:
+                log.error("Gerber.build_primitives() -> parallel build failed, fallback to serial. %s" % str(err))
+
+        return build_gerber_primitives((jobs, descriptors, self.steps_per_circle, simplify_tol))
+
+    def assemble_primitives(self, primitives, solids):
+        """
+        Walk the primitive records in file order and store their geometry in the apertures storage. On each polarity
+        change the accumulated polygons are added to or subtracted from the solid_geometry.
+
+        :param primitives:      list of primitive records as made by parse_lines()
+        :param solids:          list of tuples (solid, simplified solid), one for each record
+        :return:                a tuple (poly_buffer, follow_buffer) with the geometry left after the last polarity
+                                change and with the follow geometry
+        """
+        poly_buffer = []
+        follow_buffer = []
+
+        # follow geometry of each record, the G37 handling may need it again
+        follows = []
+
+        pool = self.app.pool if self.app.defaults['gerber_parallel_parsing'] else None
+
+        # while the polarity changes are applied the solid geometry is kept in an index of polygons, building a large
+        # MultiPolygon and its R-tree on each change would cost more than the change itself
+        solid = None
+
+        for idx, (kind, aperture, lpc, data, follow_mode, solid_mode, store) in enumerate(primitives):
+            if kind == 'polarity':
+                follows.append(None)
+                if poly_buffer:
+                    if solid is None:
+                        solid = PolygonIndex(self.solid_geometry)
+
+                    # only the solid polygons close to the new layer are touched
+                    operation = 'union' if data == 'D' else 'difference'
+                    solid.apply(tiled_union(poly_buffer, pool), operation)
+                    poly_buffer = []
+                continue
+
+            if kind == 'repeat':
+                f_idx, s_idx = data
+                geo_f = follows[f_idx] if f_idx is not None else None
+                geo_s, geo_s_simple = solids[s_idx] if s_idx is not None else (None, None)
+            else:
+                geo_s, geo_s_simple = solids[idx]
+                if kind == 'stroke':
+                    geo_f = LineString(data[0])
+                elif kind == 'flash':
+                    geo_f = Point(data[0])
+                elif kind == 'box':
+                    geo_f = Point(data[4], data[5])
+                elif kind == 'region':
+                    geo_f = LinearRing(data)
+                else:
+                    geo_f = None
+            follows.append(geo_f)
+
+            geo_dict = {}
+            if follow_mode and geo_f is not None and not geo_f.is_empty:
+                if follow_mode == 'buffer':
+                    follow_buffer.append(geo_f)
+                geo_dict['follow'] = geo_f
+
+            if solid_mode and geo_s is not None and not geo_s.is_empty and (solid_mode != 2 or geo_s.is_valid):
+                poly_buffer.append(geo_s_simple if geo_s_simple is not None else geo_s)
+                if lpc is True:
+                    geo_dict['clear'] = geo_s
+                else:
+                    geo_dict['solid'] = geo_s
+
+            if store == 'solid' and 'solid' not in geo_dict and 'clear' not in geo_dict:
+                continue
+            if store == 'any' and not geo_dict:
+                continue
+
+            if aperture not in self.apertures:
+                self.apertures[aperture] = {}
+            if 'geometry' not in self.apertures[aperture]:
+                self.apertures[aperture]['geometry'] = []
+            self.apertures[aperture]['geometry'].append(geo_dict)
+
+        if solid is not None:
+            self.solid_geometry = solid.geometry()
+
+        return poly_buffer, follow_buffer
+
     @staticmethod
     def create_flash_geometry(location, aperture, steps_per_circle=None):
+        """
+        Make the geometry of a flash. For the apertures that are expensive to make (obround, polygon and macro), the
+        aperture shape is made only once, in the origin, for each aperture definition and then it is stored in
+        Gerber.flash_templates. The flashes are made as translated copies of it.
+
+        :param location:            location of the flash, a Shapely Point or a list [x, y]
+        :param aperture:            the aperture dict
+        :param steps_per_circle:    number of steps used to approximate a circle
+        :return:                    Shapely geometry or None if the aperture type is not known
+        """
+
+        if type(location) == list:
+            location = Point(location)
+
+        key = Gerber.flash_template_key(aperture, steps_per_circle)
+        if key is None:
+            return Gerber.make_flash_geometry(location, aperture, steps_per_circle)
+
+        try:
+            template = Gerber.flash_templates[key]
+        except KeyError:
+            template = Gerber.make_flash_template(
+                Gerber.make_flash_geometry(Point(0, 0), aperture, steps_per_circle))
+            if len(Gerber.flash_templates) >= Gerber.flash_templates_limit:
+                Gerber.flash_templates.clear()
+            Gerber.flash_templates[key] = template
+
+        loc = location.coords[0]
+        return Gerber.translate_flash_template(template, loc[0], loc[1])
+
+    @staticmethod
+    def flash_template_key(aperture, steps_per_circle):
+        """
+        :param aperture:            the aperture dict
+        :param steps_per_circle:    number of steps used to approximate a circle
+        :return:                    a hashable key that identify the aperture shape or None if it can't be made
+        """
+        # the circles and the rectangles are made by a single GEOS call which is faster than copying a template
+        ap_type = aperture['type']
+        try:
+            if ap_type == 'O':
+                return ap_type, steps_per_circle, aperture['width'], aperture['height']
+            if ap_type == 'P':
+                return ap_type, steps_per_circle, aperture['diam'], aperture['nVertices'], aperture.get('rotation')
+            if ap_type == 'AM':
+                # the same macro used with the same modifiers will make the same shape
+                macro = aperture['macro']
+                modifiers = tuple(aperture['modifiers']) if aperture['modifiers'] else ()
+                return ap_type, steps_per_circle, macro.name, macro.raw, modifiers
+        except (KeyError, TypeError):
+            pass
+        return None
+
+    @staticmethod
+    def make_flash_template(geo):
+        """
+        Store the aperture geometry made in origin as coordinates arrays, so the flashes are made fast.
+
+        :param geo:     Shapely geometry of the aperture, made in origin
+        :return:        a tuple ('poly', [(exterior, [interiors])]) or ('geo', geo) when the geometry is not polygonal
+        """
+        if isinstance(geo, Polygon) and not geo.is_empty:
+            polys = [geo]
+        elif isinstance(geo, MultiPolygon) and not geo.is_empty:
+            polys = list(geo.geoms)
+        else:
+            return 'geo', geo
+
+        return 'poly', [
+            (np.array(p.exterior.coords), [np.array(interior.coords) for interior in p.interiors]) for p in polys
+        ]
+
+    @staticmethod
+    def translate_flash_template(template, xoff, yoff):
+        """
+        :param template:    a template made by make_flash_template()
+        :param xoff:        x coordinate of the flash
+        :param yoff:        y coordinate of the flash
+        :return:            a Shapely geometry, the template moved in the flash location
+        """
+        kind, data = template
+        if kind == 'geo':
+            if data is None or data.is_empty:
+                return data
+            return affinity.translate(data, xoff=xoff, yoff=yoff)
+
+        offset = np.array([xoff, yoff])
+        polys = [Polygon(ext + offset, [interior + offset for interior in interiors]) for ext, interiors in data]
+        return polys[0] if len(polys) == 1 else MultiPolygon(polys)
+
+    @staticmethod
+    def make_flash_geometry(location, aperture, steps_per_circle=None):
+        """
+        Make the geometry of the aperture, in the given location.
+
+        :param location:            location of the flash, a Shapely Point
+        :param aperture:            the aperture dict
+        :param steps_per_circle:    number of steps used to approximate a circle
+        :return:                    Shapely geometry or None if the aperture type is not known
+        """
 
         # log.debug('Flashing @%s, Aperture: %s' % (location, aperture))
 
@@ -2535,3 +2471,40 @@ def parse_gerber_number(strnumber, int_digits, frac_digits, zeros):
         ret_val = (int_val * (10 ** ((int_digits + frac_digits) - len(strnumber)))) * (10 ** (-frac_digits))
 
     return ret_val
+
+
+def build_gerber_primitives(job):
+    """
+    Build the solid geometry for a chunk of Gerber primitive records. It is a module level function so it can be
+    sent to the process pool.
+
+    :param job:     a tuple (records, descriptors, steps_per_circle, simplify_tol) where records is a list of
+                    (kind, data) tuples and descriptors is a dict with the apertures used by the flash records
+    :return:        a list with a tuple (solid geometry, simplified solid geometry or None) for each record
+    """
+    records, descriptors, steps_per_circle, simplify_tol = job
+
+    result = []
+    for kind, data in records:
+        geo_s = None
+        if kind == 'stroke':
+            coords, radius, resolution = data
+            geo_s = LineString(coords).buffer(radius, resolution)
+        elif kind == 'flash':
+            location, desc_key = data
+            geo_s = Gerber.create_flash_geometry(Point(location), descriptors[desc_key], steps_per_circle)
+        elif kind == 'box':
+            geo_s = shply_box(data[0], data[1], data[2], data[3])
+        elif kind == 'region':
+            geo_s = Polygon(data)
+            if not geo_s.is_valid:
+                geo_s = geo_s.buffer(0, int(steps_per_circle))
+        elif kind == 'poly':
+            if data is not None:
+                geo_s = Polygon(data)
+
+        if geo_s is not None and simplify_tol is not None and not geo_s.is_empty:
+            result.append((geo_s, geo_s.simplify(simplify_tol)))
+        else:
+            result.append((geo_s, None))
+    return result
@@ -75,6 +75,45 @@ class PreProc(object, metaclass=ABCPreProcRegister):
     def spindle_stop_code(self, p):
         pass
 
+    def compile_code(self, fun, p):
+        """
+        Make a formatter for one of the per-move methods (rapid_code, linear_code) to be used for a run of moves
+        that share all the parameters except the coordinates.
+
+        This adapter works for all the preprocessors: it calls the preprocessor method for each move. A preprocessor
+        can override it to bind once the parameters that do not change and format only the coordinates.
+
+        :param fun:     name of the preprocessor method
+        :type fun:      str
+        :param p:       the parameters shared by all the moves, made for this run of moves (the formatter can set
+                        the move parameters in it)
+        :type p:        dict
+        :return:        a function taking the X and Y coordinates of a move and returning its G-code line
+        """
+        method = getattr(self, fun)
+
+        def formatter(x, y):
+            p['x'] = x
+            p['y'] = y
+            return method(p)
+
+        return formatter
+
+    def format_batch(self, fun, p, coords):
+        """
+        Format the same per-move method for each of the points in coords.
+
+        :param fun:     name of the preprocessor method
+        :type fun:      str
+        :param p:       the parameters shared by all the moves, made for this run of moves
+        :type p:        dict
+        :param coords:  sequence of points, (x, y) or (x, y, z)
+        :return:        list of G-code lines
+        :rtype:         list
+        """
+        formatter = self.compile_code(fun, p)
+        return [formatter(pt[0], pt[1]) for pt in coords]
+
 
 class AppPreProcTools(object, metaclass=ABCPreProcRegister):
     @abstractmethod
@@ -1708,7 +1708,7 @@ class ToolDrilling(AppTool, Excellon):
         # #############################################################################################################
         used_excellon_optimization_type = self.app.defaults["excellon_optimization_type"]
         current_platform = platform.architecture()[0]
-        if current_platform != '64bit':
+        if current_platform != '64bit' and used_excellon_optimization_type in ['M', 'B']:
             used_excellon_optimization_type = 'T'
 
         # #############################################################################################################
@@ -1911,6 +1911,14 @@ class ToolDrilling(AppTool, Excellon):
 
             # ####################### TOOLCHANGE ACTIVE ######################################################
             else:
+                # the drill orders of the tools are calculated in advance, all the tools at once, in parallel
+                drill_tools = [tool for tool in sel_tools if points.get(tool)]
+                drill_paths = dict(zip(drill_tools, job_obj.drill_orders(
+                    [job_obj.create_tool_data_array(points=points[tool]) for tool in drill_tools],
+                    used_excellon_optimization_type,
+                    start=first_drill_point,
+                    opt_time=self.app.defaults["excellon_search_time"])))
+
                 for tool in sel_tools:
                     tool_points = points[tool]
                     used_tooldia = self.excellon_tools[tool]['tooldia']
@@ -1941,7 +1949,8 @@ class ToolDrilling(AppTool, Excellon):
                         is_first=is_first_tool,
                         is_last=is_last_tool,
                         opt_type=used_excellon_optimization_type,
-                        toolchange=True)
+                        toolchange=True,
+                        optimized_order=drill_paths.get(tool))
 
                     # parse Gcode for the current tool
                     tool_gcode_parsed = job_obj.excellon_tool_gcode_parse(used_tooldia, gcode=tool_gcode,
@@ -1978,6 +1987,9 @@ class ToolDrilling(AppTool, Excellon):
                 log.debug(
                     "The total travel distance with Travelling Salesman Algorithm is: %s" %
                     str(job_obj.measured_distance))
+            elif used_excellon_optimization_type == 'N':
+                log.debug("The total travel distance with Native optimization is: %s" %
+                          str(job_obj.measured_distance))
             else:
                 log.debug("The total travel distance with with no optimization is: %s" %
                           str(job_obj.measured_distance))
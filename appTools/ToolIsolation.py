@@ -11,7 +11,7 @@ from appTool import AppTool
 from appGUI.GUIElements import FCCheckBox, FCDoubleSpinner, RadioSet, FCTable, FCButton, \
     FCComboBox, OptionalInputSection, FCSpinner, FCLabel, FCInputDialogSpinnerButton, FCComboBox2
 from appParsers.ParseGerber import Gerber
-from camlib import grace
+from camlib import grace, min_distances
 
 from copy import deepcopy
 
@@ -19,7 +19,7 @@ import numpy as np
 import simplejson as json
 import sys
 
-from shapely.ops import unary_union, nearest_points
+from shapely.ops import unary_union
 from shapely.geometry import MultiPolygon, Polygon, MultiLineString, LineString, LinearRing, Point
 
 from matplotlib.backend_bases import KeyEvent as mpl_key_event
@@ -922,35 +922,19 @@ class ToolIsolation(AppTool, Gerber):
 
         try:
             __ = iter(total_geo)
-            geo_len = len(total_geo)
         except TypeError:
             msg = ('[ERROR_NOTCL] %s' % _("The Gerber object has one Polygon as geometry.\n"
                                           "There are no distances between geometry elements to be found."))
+            return msg, None
 
-        min_dict = {}
-        idx = 1
-        for geo in total_geo:
-            for s_geo in total_geo[idx:]:
-                # minimize the number of distances by not taking into considerations
-                # those that are too small
-                dist = geo.distance(s_geo)
-                dist = float('%.*f' % (decimals, dist))
-                loc_1, loc_2 = nearest_points(geo, s_geo)
-
-                proc_loc = (
-                    (float('%.*f' % (decimals, loc_1.x)), float('%.*f' % (decimals, loc_1.y))),
-                    (float('%.*f' % (decimals, loc_2.x)), float('%.*f' % (decimals, loc_2.y)))
-                )
-
-                if dist in min_dict:
-                    min_dict[dist].append(proc_loc)
-                else:
-                    min_dict[dist] = [proc_loc]
-
-            idx += 1
-
-        min_list = list(min_dict.keys())
-        min_dist = min(min_list)
+        # we are already in a process of the pool so the distances are measured here
+        min_dict = min_distances(list(total_geo.geoms), decimals)
+        if not min_dict:
+            # e.g. the geometry elements are coincident
+            msg = ('[ERROR_NOTCL] %s' % _("The Gerber object has one Polygon as geometry.\n"
+                                          "There are no distances between geometry elements to be found."))
+            return msg, None
+        min_dist = min(list(min_dict.keys()))
 
         return msg, min_dist
 
@@ -1040,9 +1024,6 @@ class ToolIsolation(AppTool, Gerber):
         def job_thread(app_obj):
             with self.app.proc_container.new(_("Checking ...")):
                 try:
-                    old_disp_number = 0
-                    pol_nr = 0
-                    app_obj.proc_container.update_view_text(' %d%%' % 0)
                     total_geo = []
 
                     for ap in list(fcobj.apertures.keys()):
@@ -1060,46 +1041,26 @@ class ToolIsolation(AppTool, Gerber):
 
                     try:
                         __ = iter(total_geo)
-                        geo_len = len(total_geo)
-                        geo_len = (geo_len * (geo_len - 1)) / 2
                     except TypeError:
                         msg = _("The Gerber object has one Polygon as geometry.\n"
                                 "There are no distances between geometry elements to be found.")
                         app_obj.inform.emit('[ERROR_NOTCL] %s' % msg)
                         return 'fail'
 
-                    min_dict = {}
-                    idx = 1
-                    for geo in total_geo:
-                        for s_geo in total_geo[idx:]:
-                            if self.app.abort_flag:
-                                # graceful abort requested by the user
-                                raise grace
-
-                            # minimize the number of distances by not taking into considerations those
-                            # that are too small
-                            dist = geo.distance(s_geo)
-                            dist = float('%.*f' % (self.decimals, dist))
-                            loc_1, loc_2 = nearest_points(geo, s_geo)
-
-                            proc_loc = (
-                                (float('%.*f' % (self.decimals, loc_1.x)), float('%.*f' % (self.decimals, loc_1.y))),
-                                (float('%.*f' % (self.decimals, loc_2.x)), float('%.*f' % (self.decimals, loc_2.y)))
-                            )
-
-                            if dist in min_dict:
-                                min_dict[dist].append(proc_loc)
-                            else:
-                                min_dict[dist] = [proc_loc]
-
-                            pol_nr += 1
-                            disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-
-                            if old_disp_number < disp_number <= 100:
-                                app_obj.proc_container.update_view_text(' %d%%' % disp_number)
-                                old_disp_number = disp_number
-                        idx += 1
-
+                    def progress(disp_number):
+                        if self.app.abort_flag:
+                            # graceful abort requested by the user
+                            raise grace
+                        app_obj.proc_container.update_view_text(' %d%%' % disp_number)
+
+                    progress(0)
+                    min_dict = min_distances(list(total_geo.geoms), self.decimals, pool=app_obj.pool,
+                                             progress=progress)
+                    if not min_dict:
+                        app_obj.inform.emit('[ERROR_NOTCL] %s' %
+                                            _("The Gerber object has one Polygon as geometry.\n"
+                                              "There are no distances between geometry elements to be found."))
+                        return 'fail'
                     min_list = list(min_dict.keys())
                     min_dist = min(min_list)
 
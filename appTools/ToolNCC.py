@@ -12,13 +12,13 @@ from appGUI.GUIElements import FCCheckBox, FCDoubleSpinner, RadioSet, FCTable, F
     FCComboBox, OptionalInputSection, FCLabel, FCInputDialogSpinnerButton, FCComboBox2
 from appParsers.ParseGerber import Gerber
 
-from camlib import grace
+from camlib import grace, min_distances
 
 from copy import deepcopy
 
 import numpy as np
 from shapely.geometry import base
-from shapely.ops import unary_union, nearest_points
+from shapely.ops import unary_union
 from shapely.geometry import MultiPolygon, Polygon, MultiLineString, LineString, LinearRing
 
 from matplotlib.backend_bases import KeyEvent as mpl_key_event
@@ -863,35 +863,19 @@ class NonCopperClear(AppTool, Gerber):
 
         try:
             __ = iter(total_geo)
-            geo_len = len(total_geo)
         except TypeError:
             msg = ('[ERROR_NOTCL] %s' % _("The Gerber object has one Polygon as geometry.\n"
                                           "There are no distances between geometry elements to be found."))
+            return msg, None
 
-        min_dict = {}
-        idx = 1
-        for geo in total_geo:
-            for s_geo in total_geo[idx:]:
-                # minimize the number of distances by not taking into considerations
-                # those that are too small
-                dist = geo.distance(s_geo)
-                dist = float('%.*f' % (decimals, dist))
-                loc_1, loc_2 = nearest_points(geo, s_geo)
-
-                proc_loc = (
-                    (float('%.*f' % (decimals, loc_1.x)), float('%.*f' % (decimals, loc_1.y))),
-                    (float('%.*f' % (decimals, loc_2.x)), float('%.*f' % (decimals, loc_2.y)))
-                )
-
-                if dist in min_dict:
-                    min_dict[dist].append(proc_loc)
-                else:
-                    min_dict[dist] = [proc_loc]
-
-            idx += 1
-
-        min_list = list(min_dict.keys())
-        min_dist = min(min_list)
+        # we are already in a process of the pool so the distances are measured here
+        min_dict = min_distances(list(total_geo.geoms), decimals)
+        if not min_dict:
+            # e.g. the geometry elements are coincident
+            msg = ('[ERROR_NOTCL] %s' % _("The Gerber object has one Polygon as geometry.\n"
+                                          "There are no distances between geometry elements to be found."))
+            return msg, None
+        min_dist = min(list(min_dict.keys()))
 
         return msg, min_dist
 
@@ -985,9 +969,6 @@ class NonCopperClear(AppTool, Gerber):
         def job_thread(app_obj):
             with self.app.proc_container.new(_("Checking ...")):
                 try:
-                    old_disp_number = 0
-                    pol_nr = 0
-                    app_obj.proc_container.update_view_text(' %d%%' % 0)
                     total_geo = []
 
                     for ap in list(fcobj.apertures.keys()):
@@ -1005,46 +986,26 @@ class NonCopperClear(AppTool, Gerber):
 
                     try:
                         __ = iter(total_geo)
-                        geo_len = len(total_geo)
-                        geo_len = (geo_len * (geo_len - 1)) / 2
                     except TypeError:
                         app_obj.inform.emit('[ERROR_NOTCL] %s' %
                                             _("The Gerber object has one Polygon as geometry.\n"
                                               "There are no distances between geometry elements to be found."))
                         return 'fail'
 
-                    min_dict = {}
-                    idx = 1
-                    for geo in total_geo:
-                        for s_geo in total_geo[idx:]:
-                            if self.app.abort_flag:
-                                # graceful abort requested by the user
-                                raise grace
-
-                            # minimize the number of distances by not taking into considerations
-                            # those that are too small
-                            dist = geo.distance(s_geo)
-                            dist = float('%.*f' % (self.decimals, dist))
-                            loc_1, loc_2 = nearest_points(geo, s_geo)
-
-                            proc_loc = (
-                                (float('%.*f' % (self.decimals, loc_1.x)), float('%.*f' % (self.decimals, loc_1.y))),
-                                (float('%.*f' % (self.decimals, loc_2.x)), float('%.*f' % (self.decimals, loc_2.y)))
-                            )
-
-                            if dist in min_dict:
-                                min_dict[dist].append(proc_loc)
-                            else:
-                                min_dict[dist] = [proc_loc]
-
-                            pol_nr += 1
-                            disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-
-                            if old_disp_number < disp_number <= 100:
-                                app_obj.proc_container.update_view_text(' %d%%' % disp_number)
-                                old_disp_number = disp_number
-                        idx += 1
+                    def progress(disp_number):
+                        if self.app.abort_flag:
+                            # graceful abort requested by the user
+                            raise grace
+                        app_obj.proc_container.update_view_text(' %d%%' % disp_number)
 
+                    progress(0)
+                    min_dict = min_distances(list(total_geo.geoms), self.decimals, pool=app_obj.pool,
+                                             progress=progress)
+                    if not min_dict:
+                        app_obj.inform.emit('[ERROR_NOTCL] %s' %
+                                            _("The Gerber object has one Polygon as geometry.\n"
+                                              "There are no distances between geometry elements to be found."))
+                        return 'fail'
                     min_list = list(min_dict.keys())
                     min_dist = min(min_list)
 
@@ -2061,82 +2022,45 @@ class NonCopperClear(AppTool, Gerber):
 
         return empty, warning_flag
 
-    def clear_polygon_worker(self, pol, tooldia, ncc_method, ncc_overlap, ncc_connect, ncc_contour, prog_plot):
+    def clear_polygon_worker(self, polygons, tooldia, ncc_method, ncc_overlap, ncc_connect, ncc_contour, prog_plot):
+        """
+        Clears the polygons with the selected method. The polygons are cleared in the process pool when possible;
+        see camlib.Geometry.clear_polygons().
+
+        :param polygons:        list of Polygons to clear
+        :param tooldia:         the tool diameter
+        :param ncc_method:      index of the method: 0 = standard, 1 = seed, 2 = lines, 3 = combo
+        :param ncc_overlap:     the overlap of the passes, as a fraction of the tool diameter
+        :param ncc_connect:     connect the toolpaths to minimize the tool lifts
+        :param ncc_contour:     cut around the inside edges of the polygons
+        :param prog_plot:       if True the progressive plotting is used
+        :return:                tuple (list of the toolpaths, number of polygons that could not be cleared)
+        """
+        method = ['standard', 'seed', 'lines', 'combo'][int(ncc_method)]
+
+        messages = None
+        if method == 'combo':
+            messages = {
+                'lines': _("Clearing the polygon with the method: lines."),
+                'seed': _("Failed. Clearing the polygon with the method: seed."),
+                'standard': _("Failed. Clearing the polygon with the method: standard.")
+            }
 
-        cp = None
+        results = self.clear_polygons(polygons, tooldia, steps_per_circle=self.circle_steps, method=method,
+                                      overlap=ncc_overlap, connect=ncc_connect, contour=ncc_contour,
+                                      prog_plot=prog_plot, messages=messages)
 
-        if ncc_method == 0:     # standard
-            try:
-                cp = self.clear_polygon(pol, tooldia,
-                                        steps_per_circle=self.circle_steps,
-                                        overlap=ncc_overlap, contour=ncc_contour,
-                                        connect=ncc_connect,
-                                        prog_plot=prog_plot)
-            except grace:
-                return "fail"
-            except Exception as ee:
-                log.debug("NonCopperClear.clear_polygon_worker() Standard --> %s" % str(ee))
-        elif ncc_method == 1:   # seed
-            try:
-                cp = self.clear_polygon2(pol, tooldia,
-                                         steps_per_circle=self.circle_steps,
-                                         overlap=ncc_overlap, contour=ncc_contour,
-                                         connect=ncc_connect,
-                                         prog_plot=prog_plot)
-            except grace:
-                return "fail"
-            except Exception as ee:
-                log.debug("NonCopperClear.clear_polygon_worker() Seed --> %s" % str(ee))
-        elif ncc_method == 2:   # Lines
-            try:
-                cp = self.clear_polygon3(pol, tooldia,
-                                         steps_per_circle=self.circle_steps,
-                                         overlap=ncc_overlap, contour=ncc_contour,
-                                         connect=ncc_connect,
-                                         prog_plot=prog_plot)
-            except grace:
-                return "fail"
-            except Exception as ee:
-                log.debug("NonCopperClear.clear_polygon_worker() Lines --> %s" % str(ee))
-        elif ncc_method == 3:   # Combo
-            try:
-                self.app.inform.emit(_("Clearing the polygon with the method: lines."))
-                cp = self.clear_polygon3(pol, tooldia,
-                                         steps_per_circle=self.circle_steps,
-                                         overlap=ncc_overlap, contour=ncc_contour,
-                                         connect=ncc_connect,
-                                         prog_plot=prog_plot)
-
-                if cp and cp.objects:
-                    pass
-                else:
-                    self.app.inform.emit(_("Failed. Clearing the polygon with the method: seed."))
-                    cp = self.clear_polygon2(pol, tooldia,
-                                             steps_per_circle=self.circle_steps,
-                                             overlap=ncc_overlap, contour=ncc_contour,
-                                             connect=ncc_connect,
-                                             prog_plot=prog_plot)
-                    if cp and cp.objects:
-                        pass
-                    else:
-                        self.app.inform.emit(_("Failed. Clearing the polygon with the method: standard."))
-                        cp = self.clear_polygon(pol, tooldia,
-                                                steps_per_circle=self.circle_steps,
-                                                overlap=ncc_overlap, contour=ncc_contour,
-                                                connect=ncc_connect,
-                                                prog_plot=prog_plot)
-            except grace:
-                return "fail"
-            except Exception as ee:
-                log.debug("NonCopperClear.clear_polygon_worker() Combo --> %s" % str(ee))
-
-        if cp and cp.objects:
-            return list(cp.get_objects())
-        else:
-            pt = pol.representative_point()
-            coords = (pt.x, pt.y)
-            self.app.inform_shell.emit('%s %s' % (_('Polygon could not be cleared. Location:'), str(coords)))
-            return None
+        cleared_geo = []
+        poly_failed = 0
+        for pol, res in zip(polygons, results):
+            if res:
+                cleared_geo += res
+            else:
+                poly_failed += 1
+                pt = pol.representative_point()
+                coords = (pt.x, pt.y)
+                self.app.inform_shell.emit('%s %s' % (_('Polygon could not be cleared. Location:'), str(coords)))
+        return cleared_geo, poly_failed
 
     def clear_copper(self, ncc_obj, ncctooldia, isotooldia, sel_obj=None, outname=None, order=None,
                      tools_storage=None, run_threaded=True):
@@ -2285,12 +2209,11 @@ class NonCopperClear(AppTool, Gerber):
                 # variables to display the percentage of work done
                 geo_len = len(area.geoms)
 
-                old_disp_number = 0
                 log.warning("Total number of polygons to be cleared. %s" % str(geo_len))
 
                 if area.geoms:
                     if len(area.geoms) > 0:
-                        pol_nr = 0
+                        polygons = []
                         for p in area.geoms:
                             # provide the app with a way to process the GUI events when in a blocking loop
                             if not run_threaded:
@@ -2304,51 +2227,27 @@ class NonCopperClear(AppTool, Gerber):
                             p = p.buffer(0)
 
                             if p is not None and p.is_valid:
-                                poly_failed = 0
                                 try:
                                     for pol in p:
-                                        # provide the app with a way to process the GUI events when in a blocking loop
-                                        QtWidgets.QApplication.processEvents()
-
                                         if pol is not None and isinstance(pol, Polygon):
-                                            res = self.clear_polygon_worker(pol=pol, tooldia=tool,
-                                                                            ncc_method=ncc_method,
-                                                                            ncc_overlap=ncc_overlap,
-                                                                            ncc_connect=ncc_connect,
-                                                                            ncc_contour=ncc_contour,
-                                                                            prog_plot=prog_plot)
-                                            if res is not None:
-                                                cleared_geo += res
-                                            else:
-                                                poly_failed += 1
+                                            polygons.append(pol)
                                         else:
                                             log.warning("Expected geo is a Polygon. Instead got a %s" % str(type(pol)))
                                 except TypeError:
                                     if isinstance(p, Polygon):
-                                        res = self.clear_polygon_worker(pol=p, tooldia=tool,
-                                                                        ncc_method=ncc_method,
-                                                                        ncc_overlap=ncc_overlap,
-                                                                        ncc_connect=ncc_connect,
-                                                                        ncc_contour=ncc_contour,
-                                                                        prog_plot=prog_plot)
-                                        if res is not None:
-                                            cleared_geo += res
-                                        else:
-                                            poly_failed += 1
+                                        polygons.append(p)
                                     else:
                                         log.warning("Expected geo is a Polygon. Instead got a %s" % str(type(p)))
 
-                                if poly_failed > 0:
-                                    app_obj.poly_not_cleared = True
-
-                                pol_nr += 1
-                                disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-                                # log.debug("Polygons cleared: %d" % pol_nr)
-
-                                if old_disp_number < disp_number <= 100:
-                                    self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                                    old_disp_number = disp_number
-                                    # log.debug("Polygons cleared: %d. Percentage done: %d%%" % (pol_nr, disp_number))
+                        # the polygons are cleared in the process pool and the results come in the polygons order
+                        cleared_geo, poly_failed = self.clear_polygon_worker(polygons, tooldia=tool,
+                                                                             ncc_method=ncc_method,
+                                                                             ncc_overlap=ncc_overlap,
+                                                                             ncc_connect=ncc_connect,
+                                                                             ncc_contour=ncc_contour,
+                                                                             prog_plot=prog_plot)
+                        if poly_failed > 0:
+                            app_obj.poly_not_cleared = True
 
                         # check if there is a geometry at all in the cleared geometry
                         if cleared_geo:
@@ -2522,7 +2421,6 @@ class NonCopperClear(AppTool, Gerber):
 
                 # variables to display the percentage of work done
                 geo_len = len(area.geoms)
-                old_disp_number = 0
                 log.warning("Total number of polygons to be cleared: %s" % str(geo_len))
 
                 # def random_color():
@@ -2535,7 +2433,7 @@ class NonCopperClear(AppTool, Gerber):
 
                 poly_failed = 0
                 if area.geoms and len(area.geoms) > 0:
-                    pol_nr = 0
+                    polygons = []
                     for p in area.geoms:
                         if self.app.abort_flag:
                             # graceful abort requested by the user
@@ -2562,33 +2460,20 @@ class NonCopperClear(AppTool, Gerber):
                             #                              update=True, layer=0, tolerance=None)
                             #     # -------------------------------------------------------
 
-                            # actual copper clearing is done here
                             if isinstance(p, Polygon):
-                                res = self.clear_polygon_worker(pol=p, tooldia=tool,
-                                                                ncc_method=ncc_method,
-                                                                ncc_overlap=ncc_overlap,
-                                                                ncc_connect=ncc_connect,
-                                                                ncc_contour=ncc_contour,
-                                                                prog_plot=prog_plot)
-
-                                if res is not None:
-                                    cleared_geo += res
-                                else:
-                                    poly_failed += 1
+                                polygons.append(p)
                             else:
                                 log.warning("Expected geo is a Polygon. Instead got a %s" % str(type(p)))
 
-                            if poly_failed > 0:
-                                app_obj.poly_not_cleared = True
-
-                            pol_nr += 1
-                            disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-                            # log.debug("Polygons cleared: %d" % pol_nr)
-
-                            if old_disp_number < disp_number <= 100:
-                                self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                                old_disp_number = disp_number
-                                # log.debug("Polygons cleared: %d. Percentage done: %d%%" % (pol_nr, disp_number))
+                    # actual copper clearing is done here, in the process pool
+                    cleared_geo, poly_failed = self.clear_polygon_worker(polygons, tooldia=tool,
+                                                                         ncc_method=ncc_method,
+                                                                         ncc_overlap=ncc_overlap,
+                                                                         ncc_connect=ncc_connect,
+                                                                         ncc_contour=ncc_contour,
+                                                                         prog_plot=prog_plot)
+                    if poly_failed > 0:
+                        app_obj.poly_not_cleared = True
 
                     if self.app.abort_flag:
                         raise grace     # graceful abort requested by the user
@@ -10,12 +10,9 @@ from PyQt5 import QtWidgets, QtCore, QtGui
 from appTool import AppTool
 from appGUI.GUIElements import OptionalHideInputSection, FCTextArea, FCEntry, FCSpinner, FCCheckBox, FCComboBox, \
     FCLabel, FCButton
-from camlib import grace
+from camlib import grace, min_distances
 
 from shapely.geometry import MultiPolygon
-from shapely.ops import nearest_points
-
-import numpy as np
 
 import logging
 import gettext
@@ -107,6 +104,7 @@ class ToolOptimal(AppTool):
         self.ui.freq_entry.set_value('0')
 
         self.ui.precision_spinner.set_value(int(self.app.defaults["tools_opt_precision"]))
+        self.ui.distances_spinner.set_value(int(self.app.defaults["tools_opt_distances"]))
         self.ui.locations_textb.clear()
         # new cursor - select all document
         cursor = self.ui.locations_textb.textCursor()
@@ -147,9 +145,6 @@ class ToolOptimal(AppTool):
         def job_thread(app_obj):
             app_obj.inform.emit(_("Optimal Tool. Started to search for the minimum distance between copper features."))
             try:
-                old_disp_number = 0
-                pol_nr = 0
-                app_obj.proc_container.update_view_text(' %d%%' % 0)
                 total_geo = []
 
                 for ap in list(fcobj.apertures.keys()):
@@ -172,48 +167,31 @@ class ToolOptimal(AppTool):
 
                 try:
                     __ = iter(total_geo)
-                    geo_len = len(total_geo)
-                    geo_len = (geo_len * (geo_len - 1)) / 2
                 except TypeError:
                     app_obj.inform.emit('[ERROR_NOTCL] %s' %
                                         _("The Gerber object has one Polygon as geometry.\n"
                                           "There are no distances between geometry elements to be found."))
                     return 'fail'
 
-                app_obj.inform.emit(
-                    '%s: %s' % (_("Optimal Tool. Finding the distances between each two elements. Iterations"),
-                                str(geo_len)))
-
-                self.min_dict = {}
-                idx = 1
-                for geo in total_geo:
-                    for s_geo in total_geo[idx:]:
-                        if self.app.abort_flag:
-                            # graceful abort requested by the user
-                            raise grace
-
-                        # minimize the number of distances by not taking into considerations those that are too small
-                        dist = geo.distance(s_geo)
-                        dist = float('%.*f' % (self.decimals, dist))
-                        loc_1, loc_2 = nearest_points(geo, s_geo)
-
-                        proc_loc = (
-                            (float('%.*f' % (self.decimals, loc_1.x)), float('%.*f' % (self.decimals, loc_1.y))),
-                            (float('%.*f' % (self.decimals, loc_2.x)), float('%.*f' % (self.decimals, loc_2.y)))
-                        )
-
-                        if dist in self.min_dict:
-                            self.min_dict[dist].append(proc_loc)
-                        else:
-                            self.min_dict[dist] = [proc_loc]
+                app_obj.inform.emit(_("Optimal Tool. Finding the distances between the closest elements."))
 
-                        pol_nr += 1
-                        disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
+                def progress(disp_number):
+                    if self.app.abort_flag:
+                        # graceful abort requested by the user
+                        raise grace
+                    app_obj.proc_container.update_view_text(' %d%%' % disp_number)
 
-                        if old_disp_number < disp_number <= 100:
-                            app_obj.proc_container.update_view_text(' %d%%' % disp_number)
-                            old_disp_number = disp_number
-                    idx += 1
+                progress(0)
+                # only the elements that are close enough are measured, in the process pool
+                self.min_dict = min_distances(list(total_geo.geoms), self.decimals,
+                                              top_k=int(self.ui.distances_spinner.get_value()), pool=app_obj.pool,
+                                              progress=progress)
+                if not self.min_dict:
+                    app_obj.inform.emit('[ERROR_NOTCL] %s' %
+                                        _("The Gerber object has one Polygon as geometry.\n"
+                                          "There are no distances between geometry elements to be found."))
+                    proc.done()
+                    return 'fail'
 
                 app_obj.inform.emit(_("Optimal Tool. Finding the minimum distance."))
 
@@ -439,6 +417,14 @@ class OptimalUI:
         self.precision_spinner.setWrapping(True)
         form_lay.addRow(self.precision_label, self.precision_spinner)
 
+        # Number of distances to be found
+        self.distances_spinner_label = FCLabel('%s:' % _("Distances"))
+        self.distances_spinner_label.setToolTip(_("How many distances are found, starting with the minimum distance."))
+
+        self.distances_spinner = FCSpinner(callback=self.confirmation_message_int)
+        self.distances_spinner.set_range(1, 1000)
+        form_lay.addRow(self.distances_spinner_label, self.distances_spinner)
+
         # Results Title
         self.title_res_label = FCLabel('<b>%s:</b>' % _("Minimum distance"))
         self.title_res_label.setToolTip(_("Display minimum distance between copper features."))
@@ -12,7 +12,7 @@ from appTool import AppTool
 from copy import deepcopy
 
 from appParsers.ParseGerber import Gerber
-from camlib import Geometry, FlatCAMRTreeStorage, grace
+from camlib import Geometry, FlatCAMEndpointStorage, grace
 from appGUI.GUIElements import FCTable, FCDoubleSpinner, FCCheckBox, FCInputDoubleSpinner, RadioSet, \
     FCButton, FCComboBox, FCLabel, FCComboBox2
 
@@ -1464,7 +1464,7 @@ class ToolPaint(AppTool, Gerber):
 
         if paint_method == 0:   # _("Standard")
             try:
-                # Type(cp) == FlatCAMRTreeStorage | None
+                # Type(cp) == FlatCAMEndpointStorage | None
                 cpoly = self.clear_polygon(polyg,
                                            tooldia=tooldiameter,
                                            steps_per_circle=self.circle_steps,
@@ -1478,7 +1478,7 @@ class ToolPaint(AppTool, Gerber):
                 log.debug("ToolPaint.paint_polygon_worker() Standard --> %s" % str(ee))
         elif paint_method == 1:  # _("Seed")
             try:
-                # Type(cp) == FlatCAMRTreeStorage | None
+                # Type(cp) == FlatCAMEndpointStorage | None
                 cpoly = self.clear_polygon2(polyg,
                                             tooldia=tooldiameter,
                                             steps_per_circle=self.circle_steps,
@@ -1492,7 +1492,7 @@ class ToolPaint(AppTool, Gerber):
                 log.debug("ToolPaint.paint_polygon_worker() Seed --> %s" % str(ee))
         elif paint_method == 2:  # _("Lines")
             try:
-                # Type(cp) == FlatCAMRTreeStorage | None
+                # Type(cp) == FlatCAMEndpointStorage | None
                 cpoly = self.clear_polygon3(polyg,
                                             tooldia=tooldiameter,
                                             steps_per_circle=self.circle_steps,
@@ -1548,7 +1548,7 @@ class ToolPaint(AppTool, Gerber):
                                 else:
                                     traces_el_dict[aperture_size] = [geo_el]
 
-                cpoly = FlatCAMRTreeStorage()
+                cpoly = FlatCAMEndpointStorage()
                 pads_lines_list = []
 
                 # process the flashes found in the selected polygon with the 'lines' method for rectangular
@@ -1699,6 +1699,53 @@ class ToolPaint(AppTool, Gerber):
             self.app.inform.emit('[ERROR_NOTCL] %s' % _('Geometry could not be painted completely'))
             return None
 
+    def paint_polygons_worker(self, polygons, tooldiameter, paint_method, over, conn, cont, prog_plot, obj):
+        """
+        Paints the polygons with the selected method. Except the Laser Lines method that needs the painted object,
+        the polygons are painted in the process pool when possible; see camlib.Geometry.clear_polygons().
+
+        :param polygons:        list of Polygons to paint
+        :param tooldiameter:    the tool diameter
+        :param paint_method:    index of the method: 0 = standard, 1 = seed, 2 = lines, 3 = laser lines, 4 = combo
+        :param over:            the overlap of the passes, as a fraction of the tool diameter
+        :param conn:            connect the toolpaths to minimize the tool lifts
+        :param cont:            cut around the inside edges of the polygons
+        :param prog_plot:       if True the progressive plotting is used
+        :param obj:             the painted object
+        :return:                for each polygon, a list of toolpaths or None if it could not be painted
+        :rtype:                 list
+        """
+        paint_method = int(paint_method)
+        if paint_method == 3:
+            results = []
+            for polyg in polygons:
+                if self.app.abort_flag:
+                    # graceful abort requested by the user
+                    raise grace
+                cpoly = self.paint_polygon_worker(polyg, tooldiameter=tooldiameter, paint_method=paint_method,
+                                                  over=over, conn=conn, cont=cont, prog_plot=prog_plot, obj=obj)
+                if cpoly == "fail":
+                    raise grace
+                results.append(list(cpoly.get_objects()) if cpoly else None)
+            return results
+
+        method = {0: 'standard', 1: 'seed', 2: 'lines', 4: 'combo'}[paint_method]
+
+        messages = None
+        if method == 'combo':
+            messages = {
+                'lines': _("Painting polygon with method: lines."),
+                'seed': _("Failed. Painting polygon with method: seed."),
+                'standard': _("Failed. Painting polygon with method: standard.")
+            }
+
+        results = self.clear_polygons(polygons, tooldiameter, steps_per_circle=self.circle_steps, method=method,
+                                      overlap=over, connect=conn, contour=cont, prog_plot=prog_plot,
+                                      messages=messages)
+        if None in results:
+            self.app.inform.emit('[ERROR_NOTCL] %s' % _('Geometry could not be painted completely'))
+        return results
+
     def paint_geo(self, obj, geometry, tooldia=None, order=None, method=None, outname=None,
                   tools_storage=None, plot=True, run_threaded=True):
         """
@@ -1758,7 +1805,6 @@ class ToolPaint(AppTool, Gerber):
             tool_dia = None
             current_uid = None
             final_solid_geometry = []
-            old_disp_number = 0
 
             # sort the tools if we have an order selected in the UI
             if order == 'fwd':
@@ -1807,49 +1853,20 @@ class ToolPaint(AppTool, Gerber):
 
                 log.warning("Total number of polygons to be cleared. %s" % str(geo_len))
 
-                pol_nr = 0
-
                 # -----------------------------
                 # effective polygon clearing job
                 # -----------------------------
                 try:
-                    cp = []
-                    try:
-                        for pp in poly_buf:
-                            # provide the app with a way to process the GUI events when in a blocking loop
-                            QtWidgets.QApplication.processEvents()
-                            if self.app.abort_flag:
-                                # graceful abort requested by the user
-                                raise grace
-                            geo_res = self.paint_polygon_worker(pp, tooldiameter=tool_dia, over=over, conn=conn,
-                                                                cont=cont, paint_method=paint_method, obj=obj,
-                                                                prog_plot=prog_plot)
-                            if geo_res:
-                                cp.append(geo_res)
-                            pol_nr += 1
-                            disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-                            # log.debug("Polygons cleared: %d" % pol_nr)
-
-                            if old_disp_number < disp_number <= 100:
-                                self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                                old_disp_number = disp_number
-                    except TypeError:
-                        # provide the app with a way to process the GUI events when in a blocking loop
-                        QtWidgets.QApplication.processEvents()
-                        if self.app.abort_flag:
-                            # graceful abort requested by the user
-                            raise grace
-
-                        geo_res = self.paint_polygon_worker(poly_buf, tooldiameter=tool_dia, over=over, conn=conn,
-                                                            cont=cont, paint_method=paint_method, obj=obj,
-                                                            prog_plot=prog_plot)
-                        if geo_res:
-                            cp.append(geo_res)
+                    # the polygons are painted in the process pool and the results come in the polygons order
+                    cp = self.paint_polygons_worker(poly_buf, tooldiameter=tool_dia, over=over, conn=conn,
+                                                    cont=cont, paint_method=paint_method, obj=obj,
+                                                    prog_plot=prog_plot)
 
                     total_geometry = []
                     if cp:
                         for x in cp:
-                            total_geometry += list(x.get_objects())
+                            if x:
+                                total_geometry += x
 
                         # clean the geometry
                         new_geo = [g for g in total_geometry if g and not g.is_empty]
@@ -1927,7 +1944,6 @@ class ToolPaint(AppTool, Gerber):
         def job_rest_clear(geo_obj, app_obj):
             current_uid = None
             final_solid_geometry = []
-            old_disp_number = 0
 
             # sort the tools reversed for the rest machining
             sorted_tools.sort(reverse=True)
@@ -1980,8 +1996,6 @@ class ToolPaint(AppTool, Gerber):
                 conn = tools_storage[current_uid]['data']['tools_paint_connect']
                 cont = tools_storage[current_uid]['data']['tools_paint_contour']
 
-                pol_nr = 0
-
                 # store here the parts of polygons that could not be cleared; actually those are parts of polygons
                 rest_list = []
 
@@ -1990,68 +2004,28 @@ class ToolPaint(AppTool, Gerber):
                 # -----------------------------
                 try:
                     cleared_geo = []
+
                     try:
-                        for pp in poly_buf:
-                            # provide the app with a way to process the GUI events when in a blocking loop
-                            QtWidgets.QApplication.processEvents()
-                            if self.app.abort_flag:
-                                # graceful abort requested by the user
-                                raise grace
-
-                            # speedup the clearing by not trying to clear polygons that is clear they can't be
-                            # cleared with the current tool. this tremendously reduce the clearing time
-                            check_dist = -tool_dia / 2.0
-                            check_buff = pp.buffer(check_dist)
-                            if not check_buff or check_buff.is_empty:
-                                continue
-
-                            geo_res = self.paint_polygon_worker(pp, tooldiameter=tool_dia, over=over, conn=conn,
-                                                                cont=cont, paint_method=paint_method, obj=obj,
-                                                                prog_plot=prog_plot)
-                            geo_elems = list(geo_res.get_objects())
-                            # See if the polygon was completely cleared
-                            pp_cleared = unary_union(geo_elems).buffer(tool_dia / 2.0)
-                            rest = pp.difference(pp_cleared)
-                            if rest and not rest.is_empty:
-                                try:
-                                    for r in rest:
-                                        if r.is_valid:
-                                            rest_list.append(r)
-                                except TypeError:
-                                    if rest.is_valid:
-                                        rest_list.append(rest)
-
-                            if geo_res:
-                                cleared_geo += geo_elems
-                            pol_nr += 1
-                            disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-                            # log.debug("Polygons cleared: %d" % pol_nr)
-
-                            if old_disp_number < disp_number <= 100:
-                                self.app.proc_container.update_view_text(' %d%%' % disp_number)
-                                old_disp_number = disp_number
+                        polygons = list(poly_buf)
                     except TypeError:
-                        # provide the app with a way to process the GUI events when in a blocking loop
-                        QtWidgets.QApplication.processEvents()
-                        if self.app.abort_flag:
-                            # graceful abort requested by the user
-                            raise grace
-
-                        # speedup the clearing by not trying to clear polygons that is clear they can't be
-                        # cleared with the current tool. this tremendously reduce the clearing time
-                        check_dist = -tool_dia / 2.0
-                        check_buff = poly_buf.buffer(check_dist)
-                        if not check_buff or check_buff.is_empty:
+                        polygons = [poly_buf]
+
+                    # speedup the clearing by not trying to clear polygons that is clear they can't be
+                    # cleared with the current tool. this tremendously reduce the clearing time
+                    check_dist = -tool_dia / 2.0
+                    polygons = [pp for pp in polygons if not pp.buffer(check_dist).is_empty]
+
+                    # the polygons are painted in the process pool and the results come in the polygons order
+                    results = self.paint_polygons_worker(polygons, tooldiameter=tool_dia, over=over, conn=conn,
+                                                         cont=cont, paint_method=paint_method, obj=obj,
+                                                         prog_plot=prog_plot)
+                    for pp, geo_elems in zip(polygons, results):
+                        if not geo_elems:
                             continue
 
-                        geo_res = self.paint_polygon_worker(poly_buf, tooldiameter=tool_dia, over=over, conn=conn,
-                                                            cont=cont, paint_method=paint_method, obj=obj,
-                                                            prog_plot=prog_plot)
-                        geo_elems = list(geo_res.get_objects())
-
                         # See if the polygon was completely cleared
                         pp_cleared = unary_union(geo_elems).buffer(tool_dia / 2.0)
-                        rest = poly_buf.difference(pp_cleared)
+                        rest = pp.difference(pp_cleared)
                         if rest and not rest.is_empty:
                             try:
                                 for r in rest:
@@ -2061,8 +2035,7 @@ class ToolPaint(AppTool, Gerber):
                                 if rest.is_valid:
                                     rest_list.append(rest)
 
-                        if geo_res:
-                            cleared_geo += geo_elems
+                        cleared_geo += geo_elems
 
                 except grace:
                     return "fail"
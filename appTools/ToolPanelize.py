@@ -10,12 +10,10 @@ from appTool import AppTool
 
 from appGUI.GUIElements import FCSpinner, FCDoubleSpinner, RadioSet, FCCheckBox, OptionalInputSection, FCComboBox, \
     FCButton, FCLabel
-from camlib import grace
+from camlib import PanelInstances
 
 from copy import deepcopy
-import numpy as np
 
-import shapely.affinity as affinity
 from shapely.ops import unary_union, linemerge, snap
 from shapely.geometry import LineString, MultiLineString
 
@@ -275,15 +273,14 @@ class Panelize(AppTool):
             if panel_source_obj is not None:
                 self.app.inform.emit(_("Generating panel ... "))
 
-                def job_init_excellon(obj_fin, app_obj):
-                    currenty = 0.0
-                    # init the storage for drills and for slots
-                    for tool in copied_tools:
-                        copied_tools[tool]['drills'] = []
-                        copied_tools[tool]['slots'] = []
-                    obj_fin.tools = copied_tools
-                    obj_fin.solid_geometry = []
+                # the panel objects keep the geometry of the source board once and the placements of the copies;
+                # the copies are made only when the geometry is used, for the plot and the Gerber / Excellon export
+                # the board geometry is used directly
+                instances = PanelInstances.grid(rows, columns, lenghtx, lenghty,
+                                                source_bounds=panel_source_obj.bounds())
+                board_solid = PanelInstances.board_elements(panel_source_obj.solid_geometry)
 
+                def job_init_excellon(obj_fin, app_obj):
                     for option in panel_source_obj.options:
                         if option != 'name':
                             try:
@@ -291,256 +288,32 @@ class Panelize(AppTool):
                             except KeyError:
                                 log.warning("Failed to copy option. %s" % str(option))
 
-                    # calculate the total number of drills and slots
-                    geo_len_drills = 0
-                    geo_len_slots = 0
-                    for tool in copied_tools:
-                        geo_len_drills += len(copied_tools[tool]['drills'])
-                        geo_len_slots += len(copied_tools[tool]['slots'])
-
-                    # panelization
-                    element = 0
-                    for row in range(rows):
-                        currentx = 0.0
-                        for col in range(columns):
-                            element += 1
-                            old_disp_number = 0
-
-                            for tool in panel_source_obj.tools:
-                                if panel_source_obj.tools[tool]['drills']:
-                                    drill_nr = 0
-                                    for drill in panel_source_obj.tools[tool]['drills']:
-                                        # graceful abort requested by the user
-                                        if self.app.abort_flag:
-                                            raise grace
-
-                                        # offset / panelization
-                                        point_offseted = affinity.translate(drill, currentx, currenty)
-                                        obj_fin.tools[tool]['drills'].append(point_offseted)
-
-                                        # update progress
-                                        drill_nr += 1
-                                        disp_number = int(np.interp(drill_nr, [0, geo_len_drills], [0, 100]))
-                                        if old_disp_number < disp_number <= 100:
-                                            self.app.proc_container.update_view_text(' %s: %d D:%d%%' %
-                                                                                     (_("Copy"),
-                                                                                      int(element),
-                                                                                      disp_number))
-                                            old_disp_number = disp_number
-
-                                if panel_source_obj.tools[tool]['slots']:
-                                    slot_nr = 0
-                                    for slot in panel_source_obj.tools[tool]['slots']:
-                                        # graceful abort requested by the user
-                                        if self.app.abort_flag:
-                                            raise grace
-
-                                        # offset / panelization
-                                        start_offseted = affinity.translate(slot[0], currentx, currenty)
-                                        stop_offseted = affinity.translate(slot[1], currentx, currenty)
-                                        offseted_slot = (
-                                            start_offseted,
-                                            stop_offseted
-                                        )
-                                        obj_fin.tools[tool]['slots'].append(offseted_slot)
-
-                                        # update progress
-                                        slot_nr += 1
-                                        disp_number = int(np.interp(slot_nr, [0, geo_len_slots], [0, 100]))
-                                        if old_disp_number < disp_number <= 100:
-                                            self.app.proc_container.update_view_text(' %s: %d S:%d%%' %
-                                                                                     (_("Copy"),
-                                                                                      int(element),
-                                                                                      disp_number))
-                                            old_disp_number = disp_number
-
-                            currentx += lenghtx
-                        currenty += lenghty
-
-                    obj_fin.create_geometry()
+                    obj_fin.set_panel(instances, {'solid_geometry': board_solid},
+                                      {'tools': (copied_tools, ['drills', 'slots', 'solid_geometry'])})
                     obj_fin.zeros = panel_source_obj.zeros
                     obj_fin.units = panel_source_obj.units
-                    app_obj.inform.emit('%s' % _("Generating panel ... Adding the source code."))
-                    obj_fin.source_file = self.app.f_handlers.export_excellon(obj_name=self.outname, filename=None,
-                                                                          local_use=obj_fin, use_thread=False)
-                    app_obj.proc_container.update_view_text('')
 
                 def job_init_geometry(obj_fin, app_obj):
-                    currentx = 0.0
-                    currenty = 0.0
-
-                    def translate_recursion(geom):
-                        if type(geom) == list:
-                            geoms = []
-                            for local_geom in geom:
-                                res_geo = translate_recursion(local_geom)
-                                try:
-                                    geoms += res_geo
-                                except TypeError:
-                                    geoms.append(res_geo)
-                            return geoms
-                        else:
-                            return affinity.translate(geom, xoff=currentx, yoff=currenty)
-
-                    obj_fin.solid_geometry = []
+                    panel_geometry = {}
+                    panel_tables = {}
 
                     # create the initial structure on which to create the panel
                     if panel_source_obj.kind == 'geometry':
                         obj_fin.multigeo = panel_source_obj.multigeo
                         obj_fin.tools = copied_tools
                         if panel_source_obj.multigeo is True:
-                            for tool in panel_source_obj.tools:
-                                obj_fin.tools[tool]['solid_geometry'] = []
+                            obj_fin.solid_geometry = []
+                            panel_tables['tools'] = (copied_tools, ['solid_geometry'])
+                        else:
+                            panel_geometry['solid_geometry'] = board_solid
                     elif panel_source_obj.kind == 'gerber':
-                        obj_fin.apertures = copied_apertures
-                        for ap in obj_fin.apertures:
-                            obj_fin.apertures[ap]['geometry'] = []
+                        panel_geometry['solid_geometry'] = board_solid
+                        if panel_type == 'gerber':
+                            panel_geometry['follow_geometry'] = PanelInstances.board_elements(
+                                panel_source_obj.follow_geometry)
+                        panel_tables['apertures'] = (copied_apertures, ['geometry'])
 
-                    # find the number of polygons in the source solid_geometry
-                    geo_len = 0
-                    if panel_source_obj.kind == 'geometry':
-                        if panel_source_obj.multigeo is True:
-                            for tool in panel_source_obj.tools:
-                                try:
-                                    geo_len += len(panel_source_obj.tools[tool]['solid_geometry'])
-                                except TypeError:
-                                    geo_len += 1
-                    elif panel_source_obj.kind == 'gerber':
-                        for ap in panel_source_obj.apertures:
-                            if 'geometry' in panel_source_obj.apertures[ap]:
-                                try:
-                                    geo_len += len(panel_source_obj.apertures[ap]['geometry'])
-                                except TypeError:
-                                    geo_len += 1
-
-                    element = 0
-                    for row in range(rows):
-                        currentx = 0.0
-
-                        for col in range(columns):
-                            element += 1
-                            old_disp_number = 0
-
-                            # Will panelize a Geometry Object
-                            if panel_source_obj.kind == 'geometry':
-                                if panel_source_obj.multigeo is True:
-                                    for tool in panel_source_obj.tools:
-                                        # graceful abort requested by the user
-                                        if app_obj.abort_flag:
-                                            raise grace
-
-                                        # calculate the number of polygons
-                                        try:
-                                            geo_len = len(panel_source_obj.tools[tool]['solid_geometry'])
-                                        except TypeError:
-                                            geo_len = 1
-
-                                        # panelization
-                                        pol_nr = 0
-                                        for geo_el in panel_source_obj.tools[tool]['solid_geometry']:
-                                            trans_geo = translate_recursion(geo_el)
-                                            obj_fin.tools[tool]['solid_geometry'].append(trans_geo)
-
-                                            # update progress
-                                            pol_nr += 1
-                                            disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-                                            if old_disp_number < disp_number <= 100:
-                                                app_obj.proc_container.update_view_text(
-                                                    ' %s: %d %d%%' % (_("Copy"), int(element), disp_number))
-                                                old_disp_number = disp_number
-                                else:
-                                    # graceful abort requested by the user
-                                    if app_obj.abort_flag:
-                                        raise grace
-
-                                    # calculate the number of polygons
-                                    try:
-                                        geo_len = len(panel_source_obj.solid_geometry)
-                                    except TypeError:
-                                        geo_len = 1
-
-                                    # panelization
-                                    pol_nr = 0
-                                    try:
-                                        for geo_el in panel_source_obj.solid_geometry:
-                                            if app_obj.abort_flag:
-                                                # graceful abort requested by the user
-                                                raise grace
-
-                                            trans_geo = translate_recursion(geo_el)
-                                            obj_fin.solid_geometry.append(trans_geo)
-
-                                            # update progress
-                                            pol_nr += 1
-                                            disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-                                            if old_disp_number < disp_number <= 100:
-                                                app_obj.proc_container.update_view_text(
-                                                    ' %s: %d %d%%' % (_("Copy"), int(element), disp_number))
-                                                old_disp_number = disp_number
-
-                                    except TypeError:
-                                        trans_geo = translate_recursion(panel_source_obj.solid_geometry)
-                                        obj_fin.solid_geometry.append(trans_geo)
-                            # Will panelize a Gerber Object
-                            else:
-                                # graceful abort requested by the user
-                                if self.app.abort_flag:
-                                    raise grace
-
-                                # panelization solid_geometry
-                                try:
-                                    for geo_el in panel_source_obj.solid_geometry:
-                                        # graceful abort requested by the user
-                                        if app_obj.abort_flag:
-                                            raise grace
-
-                                        trans_geo = translate_recursion(geo_el)
-                                        obj_fin.solid_geometry.append(trans_geo)
-                                except TypeError:
-                                    trans_geo = translate_recursion(panel_source_obj.solid_geometry)
-                                    obj_fin.solid_geometry.append(trans_geo)
-
-                                for apid in panel_source_obj.apertures:
-                                    # graceful abort requested by the user
-                                    if app_obj.abort_flag:
-                                        raise grace
-
-                                    if 'geometry' in panel_source_obj.apertures[apid]:
-                                        # calculate the number of polygons
-                                        try:
-                                            geo_len = len(panel_source_obj.apertures[apid]['geometry'])
-                                        except TypeError:
-                                            geo_len = 1
-
-                                        # panelization -> tools
-                                        pol_nr = 0
-                                        for el in panel_source_obj.apertures[apid]['geometry']:
-                                            if app_obj.abort_flag:
-                                                # graceful abort requested by the user
-                                                raise grace
-
-                                            new_el = {}
-                                            if 'solid' in el:
-                                                geo_aper = translate_recursion(el['solid'])
-                                                new_el['solid'] = geo_aper
-                                            if 'clear' in el:
-                                                geo_aper = translate_recursion(el['clear'])
-                                                new_el['clear'] = geo_aper
-                                            if 'follow' in el:
-                                                geo_aper = translate_recursion(el['follow'])
-                                                new_el['follow'] = geo_aper
-                                            obj_fin.apertures[apid]['geometry'].append(deepcopy(new_el))
-
-                                            # update progress
-                                            pol_nr += 1
-                                            disp_number = int(np.interp(pol_nr, [0, geo_len], [0, 100]))
-                                            if old_disp_number < disp_number <= 100:
-                                                app_obj.proc_container.update_view_text(
-                                                    ' %s: %d %d%%' % (_("Copy"), int(element), disp_number))
-                                                old_disp_number = disp_number
-
-                            currentx += lenghtx
-                        currenty += lenghty
+                    obj_fin.set_panel(instances, panel_geometry, panel_tables)
 
                     if panel_source_obj.kind == 'geometry' and panel_source_obj.multigeo is True:
                         # I'm going to do this only here as a fix for panelizing cutouts
@@ -582,18 +355,6 @@ class Panelize(AppTool):
                         if to_optimize is True:
                             app_obj.inform.emit('%s' % _("Optimization complete."))
 
-                    app_obj.inform.emit('%s' % _("Generating panel ... Adding the source code."))
-                    if panel_type == 'gerber':
-                        obj_fin.source_file = self.app.f_handlers.export_gerber(obj_name=self.outname, filename=None,
-                                                                                local_use=obj_fin, use_thread=False)
-                    if panel_type == 'geometry':
-                        obj_fin.source_file = self.app.f_handlers.export_dxf(obj_name=self.outname, filename=None,
-                                                                             local_use=obj_fin, use_thread=False)
-
-                    # obj_fin.solid_geometry = unary_union(obj_fin.solid_geometry)
-                    # app_obj.log.debug("Finished creating a unary_union for the panel.")
-                    app_obj.proc_container.update_view_text('')
-
                 self.app.inform.emit('%s: %d' % (_("Generating panel... Spawning copies"), (int(rows * columns))))
                 if panel_source_obj.kind == 'excellon':
                     self.app.app_obj.new_object(
@@ -16,6 +16,8 @@ from appPool import *
 from shapely.ops import nearest_points
 from shapely.geometry import MultiPolygon, Polygon
 
+from camlib import close_pairs
+
 import logging
 import gettext
 import appTranslation as fcTranslate
@@ -199,29 +201,31 @@ class RulesCheck(AppTool):
         if isinstance(total_geo, Polygon):
             obj_violations['points'] = ['Failed. Only one polygon.']
             return rule_title, [obj_violations]
-        else:
-            iterations = len(total_geo)
-            iterations = (iterations * (iterations - 1)) / 2
-        log.debug("RulesCheck.check_gerber_clearance(). Iterations: %s" % str(iterations))
 
+        total_geo = list(total_geo.geoms) if isinstance(total_geo, MultiPolygon) else total_geo
+
+        # only the polygons that are within the clearance distance (by their bounds) are measured
         min_dict = {}
-        idx = 1
-        for geo in total_geo:
-            for s_geo in total_geo[idx:]:
-                # minimize the number of distances by not taking into considerations those that are too small
-                dist = geo.distance(s_geo)
-                if float(dist) < float(size):
-                    loc_1, loc_2 = nearest_points(geo, s_geo)
+        iterations = 0
+        for idx, s_idx in close_pairs(total_geo, float(size)):
+            geo = total_geo[idx]
+            s_geo = total_geo[s_idx]
+            iterations += 1
+
+            dist = geo.distance(s_geo)
+            if float(dist) < float(size):
+                loc_1, loc_2 = nearest_points(geo, s_geo)
 
-                    dx = loc_1.x - loc_2.x
-                    dy = loc_1.y - loc_2.y
-                    loc = min(loc_1.x, loc_2.x) + (abs(dx) / 2), min(loc_1.y, loc_2.y) + (abs(dy) / 2)
+                dx = loc_1.x - loc_2.x
+                dy = loc_1.y - loc_2.y
+                loc = min(loc_1.x, loc_2.x) + (abs(dx) / 2), min(loc_1.y, loc_2.y) + (abs(dy) / 2)
+
+                if dist in min_dict:
+                    min_dict[dist].append(loc)
+                else:
+                    min_dict[dist] = [loc]
+        log.debug("RulesCheck.check_inside_gerber_clearance(). Iterations: %s" % str(iterations))
 
-                    if dist in min_dict:
-                        min_dict[dist].append(loc)
-                    else:
-                        min_dict[dist] = [loc]
-            idx += 1
         points_list = set()
         for dist in min_dict.keys():
             for location in min_dict[dist]:
@@ -289,36 +293,36 @@ class RulesCheck(AppTool):
         total_geo_grb_3 = total_geo_grb_3.buffer(0)
 
         if isinstance(total_geo_grb_1, Polygon):
-            len_1 = 1
             total_geo_grb_1 = [total_geo_grb_1]
         else:
-            len_1 = len(total_geo_grb_1)
+            total_geo_grb_1 = list(total_geo_grb_1.geoms)
 
         if isinstance(total_geo_grb_3, Polygon):
-            len_3 = 1
             total_geo_grb_3 = [total_geo_grb_3]
         else:
-            len_3 = len(total_geo_grb_3)
-
-        iterations = len_1 * len_3
-        log.debug("RulesCheck.check_gerber_clearance(). Iterations: %s" % str(iterations))
+            total_geo_grb_3 = list(total_geo_grb_3.geoms)
 
+        # only the polygons that are within the clearance distance (by their bounds) are measured
         min_dict = {}
-        for geo in total_geo_grb_1:
-            for s_geo in total_geo_grb_3:
-                # minimize the number of distances by not taking into considerations those that are too small
-                dist = geo.distance(s_geo)
-                if float(dist) < float(size):
-                    loc_1, loc_2 = nearest_points(geo, s_geo)
+        iterations = 0
+        for idx, s_idx in close_pairs(total_geo_grb_1, float(size), other=total_geo_grb_3):
+            geo = total_geo_grb_1[idx]
+            s_geo = total_geo_grb_3[s_idx]
+            iterations += 1
+
+            dist = geo.distance(s_geo)
+            if float(dist) < float(size):
+                loc_1, loc_2 = nearest_points(geo, s_geo)
 
-                    dx = loc_1.x - loc_2.x
-                    dy = loc_1.y - loc_2.y
-                    loc = min(loc_1.x, loc_2.x) + (abs(dx) / 2), min(loc_1.y, loc_2.y) + (abs(dy) / 2)
+                dx = loc_1.x - loc_2.x
+                dy = loc_1.y - loc_2.y
+                loc = min(loc_1.x, loc_2.x) + (abs(dx) / 2), min(loc_1.y, loc_2.y) + (abs(dy) / 2)
 
-                    if dist in min_dict:
-                        min_dict[dist].append(loc)
-                    else:
-                        min_dict[dist] = [loc]
+                if dist in min_dict:
+                    min_dict[dist].append(loc)
+                else:
+                    min_dict[dist] = [loc]
+        log.debug("RulesCheck.check_gerber_clearance(). Iterations: %s" % str(iterations))
 
         points_list = set()
         for dist in min_dict.keys():
@@ -386,13 +390,14 @@ class RulesCheck(AppTool):
                     for geo in geometry:
                         total_geo.append(geo)
 
+        # only the holes that are within the clearance distance (by their bounds) are measured
         min_dict = {}
-        idx = 1
-        for geo in total_geo:
-            for s_geo in total_geo[idx:]:
+        for idx, s_idx in close_pairs(total_geo, float(size)):
+            geo = total_geo[idx]
+            s_geo = total_geo[s_idx]
 
-                # minimize the number of distances by not taking into considerations those that are too small
-                dist = geo.distance(s_geo)
+            dist = geo.distance(s_geo)
+            if float(dist) < float(size):
                 loc_1, loc_2 = nearest_points(geo, s_geo)
 
                 dx = loc_1.x - loc_2.x
@@ -403,7 +408,6 @@ class RulesCheck(AppTool):
                     min_dict[dist].append(loc)
                 else:
                     min_dict[dist] = [loc]
-            idx += 1
 
         points_list = set()
         for dist in min_dict.keys():
@@ -541,47 +545,42 @@ class RulesCheck(AppTool):
                         total_geo_exc.append(geo)
 
         if isinstance(total_geo_grb, Polygon):
-            len_1 = 1
             total_geo_grb = [total_geo_grb]
         else:
-            len_1 = len(total_geo_grb)
-
-        if isinstance(total_geo_exc, Polygon):
-            len_2 = 1
-            total_geo_exc = [total_geo_exc]
-        else:
-            len_2 = len(total_geo_exc)
-
-        iterations = len_1 * len_2
-        log.debug("RulesCheck.check_gerber_annular_ring(). Iterations: %s" % str(iterations))
+            total_geo_grb = list(total_geo_grb.geoms)
 
+        # only the holes that are within the ring size from a copper polygon (by their bounds) are measured
         min_dict = {}
-        dist = None
-        for geo in total_geo_grb:
-            for s_geo in total_geo_exc:
-                try:
-                    # minimize the number of distances by not taking into considerations those that are too small
-                    dist = abs(geo.exterior.distance(s_geo))
-                except Exception as e:
-                    log.debug("RulesCheck.check_gerber_annular_ring() --> %s" % str(e))
-
-                if dist > 0:
-                    if float(dist) < float(size):
-                        loc_1, loc_2 = nearest_points(geo.exterior, s_geo)
+        iterations = 0
+        for idx, s_idx in close_pairs(total_geo_grb, float(size), other=total_geo_exc):
+            geo = total_geo_grb[idx]
+            s_geo = total_geo_exc[s_idx]
+            iterations += 1
+
+            try:
+                dist = abs(geo.exterior.distance(s_geo))
+            except Exception as e:
+                log.debug("RulesCheck.check_gerber_annular_ring() --> %s" % str(e))
+                continue
+
+            if dist > 0:
+                if float(dist) < float(size):
+                    loc_1, loc_2 = nearest_points(geo.exterior, s_geo)
 
-                        dx = loc_1.x - loc_2.x
-                        dy = loc_1.y - loc_2.y
-                        loc = min(loc_1.x, loc_2.x) + (abs(dx) / 2), min(loc_1.y, loc_2.y) + (abs(dy) / 2)
+                    dx = loc_1.x - loc_2.x
+                    dy = loc_1.y - loc_2.y
+                    loc = min(loc_1.x, loc_2.x) + (abs(dx) / 2), min(loc_1.y, loc_2.y) + (abs(dy) / 2)
 
-                        if dist in min_dict:
-                            min_dict[dist].append(loc)
-                        else:
-                            min_dict[dist] = [loc]
-                else:
                     if dist in min_dict:
-                        min_dict[dist].append(s_geo.representative_point())
+                        min_dict[dist].append(loc)
                     else:
-                        min_dict[dist] = [s_geo.representative_point()]
+                        min_dict[dist] = [loc]
+            else:
+                if dist in min_dict:
+                    min_dict[dist].append(s_geo.representative_point())
+                else:
+                    min_dict[dist] = [s_geo.representative_point()]
+        log.debug("RulesCheck.check_gerber_annular_ring(). Iterations: %s" % str(iterations))
 
         points_list = []
         for dist in min_dict.keys():
@@ -1057,6 +1056,14 @@ class RulesCheck(AppTool):
                 drill_size = float(self.ui.drill_size_entry.get_value())
                 self.results.append(self.pool.apply_async(self.check_holes_size, args=(exc_list, drill_size)))
 
+            # report each rule as soon as it is finished, the results document is made when all are finished
+            pending = list(self.results)
+            while pending:
+                pending[0].wait(0.1)
+                for p in [p for p in pending if p.ready()]:
+                    pending.remove(p)
+                    self.report_rule(p.get())
+
             output = []
             for p in self.results:
                 output.append(p.get())
@@ -1068,6 +1075,24 @@ class RulesCheck(AppTool):
 
         self.app.worker_task.emit({'fcn': worker_job, 'params': [self.app]})
 
+    def report_rule(self, res):
+        """
+        Show in the status bar the number of violations found for a finished rule.
+
+        :param res:     result of a check method: a tuple (rule title, list of violations dicts)
+        :return:        None
+        """
+        try:
+            rule_title, violations = res
+            nr_violations = sum(len(v['points'] if 'points' in v else v['dia']) for v in violations)
+        except (TypeError, ValueError, KeyError):
+            return
+
+        if nr_violations:
+            self.app.inform.emit('[WARNING_NOTCL] %s: %s %s' % (rule_title, str(nr_violations), _("violations")))
+        else:
+            self.app.inform.emit('[success] %s: %s' % (rule_title, _("PASSED")))
+
     def on_tool_finished(self, res):
         def init(new_obj, app_obj):
             txt = ''
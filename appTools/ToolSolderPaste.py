@@ -939,7 +939,8 @@ class SolderPaste(AppTool):
                 total_gcode += res
 
                 # ## PARSE GCODE # ##
-                tool_cnc_dict['gcode_parsed'] = job_obj.gcode_parse()
+                job_obj.gcode_parse()
+                tool_cnc_dict['gcode_parsed'] = job_obj.gcode_parsed
 
                 # TODO this serve for bounding box creation only; should be optimized
                 tool_cnc_dict['solid_geometry'] = unary_union([geo['geom'] for geo in tool_cnc_dict['gcode_parsed']])
@@ -1,47 +1,2 @@
-
-from appTools.ToolCalculators import ToolCalculator
-from appTools.ToolCalibration import ToolCalibration
-
-from appTools.ToolDblSided import DblSidedTool
-from appTools.ToolExtractDrills import ToolExtractDrills
-from appTools.ToolAlignObjects import AlignObjects
-
-from appTools.ToolFilm import Film
-
-from appTools.ToolImage import ToolImage
-
-from appTools.ToolDistance import Distance
-from appTools.ToolDistanceMin import DistanceMin
-
-from appTools.ToolMove import ToolMove
-
-from appTools.ToolCutOut import CutOut
-from appTools.ToolNCC import NonCopperClear
-from appTools.ToolPaint import ToolPaint
-from appTools.ToolIsolation import ToolIsolation
-from appTools.ToolDrilling import ToolDrilling
-from appTools.ToolMilling import ToolMilling
-
-from appTools.ToolOptimal import ToolOptimal
-
-from appTools.ToolPanelize import Panelize
-from appTools.ToolPcbWizard import PcbWizard
-from appTools.ToolPDF import ToolPDF
-from appTools.ToolProperties import Properties
-
-from appTools.ToolQRCode import QRCode
-from appTools.ToolRulesCheck import RulesCheck
-
-from appTools.ToolCopperThieving import ToolCopperThieving
-from appTools.ToolFiducials import ToolFiducials
-
-from appTools.ToolShell import FCShell
-from appTools.ToolSolderPaste import SolderPaste
-from appTools.ToolSub import ToolSub
-
-from appTools.ToolTransform import ToolTransform
-from appTools.ToolPunchGerber import ToolPunchGerber
-
-from appTools.ToolInvertGerber import ToolInvertGerber
-from appTools.ToolCorners import ToolCorners
-from appTools.ToolEtchCompensation import ToolEtchCompensation
\ No newline at end of file
+# The tools are not imported here: the application registers them in App.install_tools() and each one is imported
+# and made the first time it is used (see appCommon/PluginRegistry.py).
@@ -25,12 +25,6 @@ from shapely.geometry import Point, MultiPolygon
 from shapely.ops import unary_union
 from io import StringIO
 
-from reportlab.graphics import renderPDF
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch, mm
-from reportlab.lib.pagesizes import landscape, portrait
-from svglib.svglib import svg2rlg
-
 import gc
 
 from xml.dom.minidom import parseString as parse_xml_string
@@ -47,6 +41,9 @@ import socket
 from appCommon.Common import LoudDict
 from appCommon.Common import color_variant
 from appCommon.Common import ExclusionAreas
+from appCommon.ProjectFile import is_project_archive, ProjectReader, write_project
+from appCommon.PluginRegistry import PluginRegistry
+from appCommon.StartupReport import startup_report
 
 from Bookmark import BookmarkManager
 from appDatabase import ToolsDB2
@@ -67,6 +64,7 @@ from appObjects.AppObject import AppObject
 # FlatCAM Parsing files
 from appParsers.ParseExcellon import Excellon
 from appParsers.ParseGerber import Gerber
+from appParsers.ParseCache import ParseCache
 from camlib import to_dict, dict2obj, ET, ParseError, Geometry, CNCjob
 
 # FlatCAM appGUI
@@ -78,20 +76,15 @@ from appGUI.GUIElements import FCFileSaveDialog, message_dialog, FlatCAMSystemTr
 # FlatCAM Pre-processors
 from appPreProcessor import load_preprocessors
 
-# FlatCAM appEditors
-from appEditors.AppGeoEditor import AppGeoEditor
-from appEditors.AppExcEditor import AppExcEditor
-from appEditors.AppGerberEditor import AppGerberEditor
+# FlatCAM appEditors; the Geometry, Excellon, Gerber and GCode editors are loaded on demand (see PluginRegistry)
 from appEditors.AppTextEditor import AppTextEditor
-from appEditors.appGCodeEditor import AppGCodeEditor
-from appParsers.ParseHPGL2 import HPGL2
 
 # FlatCAM Workers
 from appProcess import *
 from appWorkerStack import WorkerStack
 
-# FlatCAM Tools
-from appTools import *
+# FlatCAM Tools; the other tools are loaded on demand (see App.install_tools())
+from appTools.ToolShell import FCShell
 
 # FlatCAM Translation
 import gettext
@@ -133,15 +126,25 @@ class App(QtCore.QObject):
     cmd_line_shellfile = ''
     cmd_line_shellvar = ''
     cmd_line_headless = None
+    cmd_line_server = None
+    cmd_line_workers = None
+    cmd_line_authkey = None
 
     cmd_line_help = "FlatCam.py --shellfile=<cmd_line_shellfile>\n" \
                     "FlatCam.py --shellvar=<1,'C:\\path',23>\n" \
-                    "FlatCam.py --headless=1"
+                    "FlatCam.py --headless=1\n" \
+                    "FlatCam.py --server=<socket_path or host:port> --workers=<nr_of_workers> " \
+                    "--authkey=<key_file>\n" \
+                    "FlatCam.py --startup_report=1"
     try:
         # Multiprocessing pool will spawn additional processes with 'multiprocessing-fork' flag
         cmd_line_options, args = getopt.getopt(sys.argv[1:], "h:", ["shellfile=",
                                                                     "shellvar=",
                                                                     "headless=",
+                                                                    "server=",
+                                                                    "workers=",
+                                                                    "authkey=",
+                                                                    "startup_report=",
                                                                     "multiprocessing-fork="])
     except getopt.GetoptError:
         print(cmd_line_help)
@@ -160,6 +163,17 @@ class App(QtCore.QObject):
                 cmd_line_headless = eval(arg)
             except NameError:
                 pass
+        elif opt == '--server':
+            cmd_line_server = arg
+        elif opt == '--workers':
+            try:
+                cmd_line_workers = int(arg)
+            except ValueError:
+                print(cmd_line_help)
+                sys.exit(2)
+        elif opt == '--authkey':
+            # the key file of a server on a TCP address; a key is made if the file does not exist
+            cmd_line_authkey = arg
 
     # ###############################################################################################################
     # ################################### Version and VERSION DATE ##################################################
@@ -277,19 +291,21 @@ class App(QtCore.QObject):
 
         super().__init__()
 
+        startup_report.mark("Imports and Qt application")
         log.info("FlatCAM Starting...")
 
         self.qapp = qapp
 
-        # App Editors will be instantiated further below
-        self.exc_editor = None
-        self.grb_editor = None
-        self.geo_editor = None
+        # the FlatCAM tools and editors are registered further below and they are made the first time they are used
+        # (see App.__getattr__())
+        self.plugins = PluginRegistry(self)
 
         # ############################################################################################################
         # ################# Setup the listening thread for another instance launching with args ######################
         # ############################################################################################################
-        if sys.platform == 'win32' or sys.platform == 'linux':
+        # a headless instance runs its own script (or the jobs of a job server) and it does not take the arguments of
+        # the instances launched after it
+        if (sys.platform == 'win32' or sys.platform == 'linux') and self.cmd_line_headless != 1:
             # make sure the thread is stored by using a self. otherwise it's garbage collected
             self.listen_th = QtCore.QThread()
             self.listen_th.start(priority=QtCore.QThread.LowestPriority)
@@ -504,6 +520,8 @@ class App(QtCore.QObject):
             self.splash = None
             show_splash = 0
 
+        startup_report.mark("Folders, defaults and process pool")
+
         # ###########################################################################################################
         # ######################################### Initialize GUI ##################################################
         # ###########################################################################################################
@@ -536,6 +554,8 @@ class App(QtCore.QObject):
         # set FlatCAM units in the Status bar
         self.set_screen_units(self.defaults['units'])
 
+        startup_report.mark("Main GUI")
+
         # ###########################################################################################################
         # ########################################### AUTOSAVE SETUP ################################################
         # ###########################################################################################################
@@ -676,6 +696,8 @@ class App(QtCore.QObject):
 
         # ### End of Data ####
 
+        startup_report.mark("Preprocessors, preferences and language")
+
         # ###########################################################################################################
         # #################################### SETUP OBJECT COLLECTION ##############################################
         # ###########################################################################################################
@@ -740,6 +762,8 @@ class App(QtCore.QObject):
                                     color=QtGui.QColor("gray"))
         self.ui.splitter.setStretchFactor(1, 2)
 
+        startup_report.mark("Object collection and plot area")
+
         # ###########################################################################################################
         # ############################################### Worker SETUP ##############################################
         # ###########################################################################################################
@@ -1010,44 +1034,14 @@ class App(QtCore.QObject):
         self.autocomplete_kw_list = self.defaults['util_autocomplete_keywords'].replace(' ', '').split(',')
         self.myKeywords = self.tcl_commands_list + self.autocomplete_kw_list + self.tcl_keywords
 
+        startup_report.mark("Workers and keywords")
+
         # ###########################################################################################################
         # ########################################## Tools and Plugins ##############################################
         # ###########################################################################################################
 
+        # the tools are registered in install_tools(); each one is made the first time it is used (App.__getattr__())
         self.shell = None
-        self.dblsidedtool = None
-        self.distance_tool = None
-        self.distance_min_tool = None
-        self.panelize_tool = None
-        self.film_tool = None
-        self.paste_tool = None
-        self.calculator_tool = None
-        self.rules_tool = None
-        self.sub_tool = None
-        self.move_tool = None
-
-        self.cutout_tool = None
-        self.ncclear_tool = None
-        self.paint_tool = None
-        self.isolation_tool = None
-        self.drilling_tool = None
-
-        self.optimal_tool = None
-        self.transform_tool = None
-        self.properties_tool = None
-        self.pdf_tool = None
-        self.image_tool = None
-        self.pcb_wizard_tool = None
-        self.cal_exc_tool = None
-        self.qrcode_tool = None
-        self.copper_thieving_tool = None
-        self.fiducial_tool = None
-        self.edrills_tool = None
-        self.align_objects_tool = None
-        self.punch_tool = None
-        self.invert_tool = None
-        self.corners_tool = None
-        self.etch_tool = None
 
         # always install tools only after the shell is initialized because the self.inform.emit() depends on shell
         try:
@@ -1055,6 +1049,8 @@ class App(QtCore.QObject):
         except AttributeError as e:
             self.log.debug("App.__init__() install_tools() --> %s" % str(e))
 
+        startup_report.mark("Shell and tools")
+
         # ###########################################################################################################
         # ######################################### BookMarks Manager ###############################################
         # ###########################################################################################################
@@ -1240,31 +1236,20 @@ class App(QtCore.QObject):
         # used in the delayed shutdown self.start_delayed_quit() method
         self.save_timer = None
 
+        startup_report.mark("Bookmarks, tools database and shell setup")
+
         # ###########################################################################################################
         # ################################## ADDING FlatCAM EDITORS section #########################################
         # ###########################################################################################################
 
         # watch out for the position of the editors instantiation ... if it is done before a save of the default values
         # at the first launch of the App , the editors will not be functional.
-        try:
-            self.geo_editor = AppGeoEditor(self)
-        except Exception as es:
-            self.log.debug("app_Main.__init__() --> Geo Editor Error: %s" % str(es))
-
-        try:
-            self.exc_editor = AppExcEditor(self)
-        except Exception as es:
-            self.log.debug("app_Main.__init__() --> Excellon Editor Error: %s" % str(es))
-
-        try:
-            self.grb_editor = AppGerberEditor(self)
-        except Exception as es:
-            self.log.debug("app_Main.__init__() --> Gerber Editor Error: %s" % str(es))
-
-        try:
-            self.gcode_editor = AppGCodeEditor(self)
-        except Exception as es:
-            self.log.debug("app_Main.__init__() --> GCode Editor Error: %s" % str(es))
+        # The editors are made the first time they are used, which is always after this point. An editor that fails to
+        # load is None.
+        self.plugins.add_editor('geo_editor', 'appEditors.AppGeoEditor', 'AppGeoEditor')
+        self.plugins.add_editor('exc_editor', 'appEditors.AppExcEditor', 'AppExcEditor')
+        self.plugins.add_editor('grb_editor', 'appEditors.AppGerberEditor', 'AppGerberEditor')
+        self.plugins.add_editor('gcode_editor', 'appEditors.appGCodeEditor', 'AppGCodeEditor')
 
         self.log.debug("Finished adding FlatCAM Editor's.")
 
@@ -1289,6 +1274,11 @@ class App(QtCore.QObject):
         # ###########################################################################################################
         self.exc_areas = ExclusionAreas(app=self)
 
+        # ###########################################################################################################
+        # ########################################### PARSE CACHE ###################################################
+        # ###########################################################################################################
+        self.parse_cache = ParseCache(app=self)
+
         # ###########################################################################################################
         # ###########################################################################################################
         # ###################################### INSTANTIATE CLASSES THAT HOLD THE MENU HANDLERS ####################
@@ -1342,6 +1332,8 @@ class App(QtCore.QObject):
         self.setup_recent_items()
 
         # ###########################################################################################################
+        startup_report.mark("Editors and menu handlers")
+
         # ###########################################################################################################
         # ############################################# Signal handling #############################################
         # ###########################################################################################################
@@ -1643,6 +1635,8 @@ class App(QtCore.QObject):
 
         self.log.debug("Finished connecting Signals.")
 
+        startup_report.mark("Signals")
+
         # ###########################################################################################################
         # ##################################### Finished the CONSTRUCTOR ############################################
         # ###########################################################################################################
@@ -1673,6 +1667,12 @@ class App(QtCore.QObject):
         else:
             log.warning("*******************  RUNNING HEADLESS  *******************")
 
+        startup_report.mark("Show the GUI")
+        if startup_report.is_active():
+            # the import times of the tools and editors loaded later are not part of the startup
+            startup_report.stop()
+            self.log.info("Startup report:\n%s" % startup_report.report())
+
         # ###########################################################################################################
         # ######################################## START-UP ARGUMENTS ###############################################
         # ###########################################################################################################
@@ -1922,10 +1922,17 @@ class App(QtCore.QObject):
 
         gc.collect()
 
+    def __getattr__(self, name):
+        # called only for the attributes that are not set; the tools and the editors are made on first use
+        plugins = self.__dict__.get('plugins')
+        if plugins is not None and name in plugins:
+            return plugins.load(name)
+        return QtCore.QObject.__getattr__(self, name)
+
     def install_tools(self):
         """
         This installs the FlatCAM tools (plugin-like) which reside in their own classes.
-        Instantiation of the Tools classes.
+        Only the menu entries are made here; the Tools classes are instantiated the first time they are used.
         The order that the tools are installed is important as they can depend on each other install position.
 
         :return: None
@@ -1934,124 +1941,81 @@ class App(QtCore.QObject):
         # shell tool has t obe initialized always first because other tools print messages in the Shell Dock
         self.shell = FCShell(app=self, version=self.version)
 
-        self.distance_tool = Distance(self)
-        self.distance_tool.install(icon=QtGui.QIcon(self.resource_location + '/distance16.png'), pos=self.ui.menuedit,
-                                   before=self.ui.menueditorigin,
-                                   separator=False)
-
-        self.distance_min_tool = DistanceMin(self)
-        self.distance_min_tool.install(icon=QtGui.QIcon(self.resource_location + '/distance_min16.png'),
-                                       pos=self.ui.menuedit,
-                                       before=self.ui.menueditorigin,
-                                       separator=True)
-
-        self.dblsidedtool = DblSidedTool(self)
-        self.dblsidedtool.install(icon=QtGui.QIcon(self.resource_location + '/doubleside16.png'), separator=False)
-
-        self.cal_exc_tool = ToolCalibration(self)
-        self.cal_exc_tool.install(icon=QtGui.QIcon(self.resource_location + '/calibrate_16.png'), pos=self.ui.menutool,
-                                  before=self.dblsidedtool.menuAction,
-                                  separator=False)
-
-        self.align_objects_tool = AlignObjects(self)
-        self.align_objects_tool.install(icon=QtGui.QIcon(self.resource_location + '/align16.png'), separator=False)
-
-        self.edrills_tool = ToolExtractDrills(self)
-        self.edrills_tool.install(icon=QtGui.QIcon(self.resource_location + '/drill16.png'), separator=True)
-
-        self.panelize_tool = Panelize(self)
-        self.panelize_tool.install(icon=QtGui.QIcon(self.resource_location + '/panelize16.png'))
-
-        self.film_tool = Film(self)
-        self.film_tool.install(icon=QtGui.QIcon(self.resource_location + '/film16.png'))
-
-        self.paste_tool = SolderPaste(self)
-        self.paste_tool.install(icon=QtGui.QIcon(self.resource_location + '/solderpastebis32.png'))
-
-        self.calculator_tool = ToolCalculator(self)
-        self.calculator_tool.install(icon=QtGui.QIcon(self.resource_location + '/calculator16.png'), separator=True)
-
-        self.sub_tool = ToolSub(self)
-        self.sub_tool.install(icon=QtGui.QIcon(self.resource_location + '/sub32.png'),
-                              pos=self.ui.menutool, separator=True)
-
-        self.rules_tool = RulesCheck(self)
-        self.rules_tool.install(icon=QtGui.QIcon(self.resource_location + '/rules32.png'),
-                                pos=self.ui.menutool, separator=False)
-
-        self.optimal_tool = ToolOptimal(self)
-        self.optimal_tool.install(icon=QtGui.QIcon(self.resource_location + '/open_excellon32.png'),
-                                  pos=self.ui.menutool, separator=True)
-
-        self.move_tool = ToolMove(self)
-        self.move_tool.install(icon=QtGui.QIcon(self.resource_location + '/move16.png'), pos=self.ui.menuedit,
-                               before=self.ui.menueditorigin, separator=True)
-
-        self.cutout_tool = CutOut(self)
-        self.cutout_tool.install(icon=QtGui.QIcon(self.resource_location + '/cut16_bis.png'), pos=self.ui.menutool,
-                                 before=self.sub_tool.menuAction)
-
-        self.ncclear_tool = NonCopperClear(self)
-        self.ncclear_tool.install(icon=QtGui.QIcon(self.resource_location + '/ncc16.png'), pos=self.ui.menutool,
-                                  before=self.sub_tool.menuAction, separator=True)
-
-        self.paint_tool = ToolPaint(self)
-        self.paint_tool.install(icon=QtGui.QIcon(self.resource_location + '/paint16.png'), pos=self.ui.menutool,
-                                before=self.sub_tool.menuAction, separator=True)
-
-        self.isolation_tool = ToolIsolation(self)
-        self.isolation_tool.install(icon=QtGui.QIcon(self.resource_location + '/iso_16.png'), pos=self.ui.menutool,
-                                    before=self.sub_tool.menuAction, separator=True)
-
-        self.drilling_tool = ToolDrilling(self)
-        self.drilling_tool.install(icon=QtGui.QIcon(self.resource_location + '/drill16.png'), pos=self.ui.menutool,
-                                   before=self.sub_tool.menuAction, separator=True)
-
-        self.copper_thieving_tool = ToolCopperThieving(self)
-        self.copper_thieving_tool.install(icon=QtGui.QIcon(self.resource_location + '/copperfill32.png'),
-                                          pos=self.ui.menutool)
-
-        self.fiducial_tool = ToolFiducials(self)
-        self.fiducial_tool.install(icon=QtGui.QIcon(self.resource_location + '/fiducials_32.png'),
-                                   pos=self.ui.menutool)
-
-        self.qrcode_tool = QRCode(self)
-        self.qrcode_tool.install(icon=QtGui.QIcon(self.resource_location + '/qrcode32.png'),
-                                 pos=self.ui.menutool)
-
-        self.punch_tool = ToolPunchGerber(self)
-        self.punch_tool.install(icon=QtGui.QIcon(self.resource_location + '/punch32.png'), pos=self.ui.menutool)
-
-        self.invert_tool = ToolInvertGerber(self)
-        self.invert_tool.install(icon=QtGui.QIcon(self.resource_location + '/invert32.png'), pos=self.ui.menutool)
-
-        self.corners_tool = ToolCorners(self)
-        self.corners_tool.install(icon=QtGui.QIcon(self.resource_location + '/corners_32.png'), pos=self.ui.menutool)
-
-        self.etch_tool = ToolEtchCompensation(self)
-        self.etch_tool.install(icon=QtGui.QIcon(self.resource_location + '/etch_32.png'), pos=self.ui.menutool)
-
-        self.transform_tool = ToolTransform(self)
-        self.transform_tool.install(icon=QtGui.QIcon(self.resource_location + '/transform.png'),
-                                    pos=self.ui.menuoptions, separator=True)
-
-        self.properties_tool = Properties(self)
-        self.properties_tool.install(icon=QtGui.QIcon(self.resource_location + '/properties32.png'),
-                                     pos=self.ui.menuoptions)
-
-        self.pdf_tool = ToolPDF(self)
-        self.pdf_tool.install(icon=QtGui.QIcon(self.resource_location + '/pdf32.png'),
-                              pos=self.ui.menufileimport,
-                              separator=True)
-
-        self.image_tool = ToolImage(self)
-        self.image_tool.install(icon=QtGui.QIcon(self.resource_location + '/image32.png'),
-                                pos=self.ui.menufileimport,
-                                separator=True)
-
-        self.pcb_wizard_tool = PcbWizard(self)
-        self.pcb_wizard_tool.install(icon=QtGui.QIcon(self.resource_location + '/drill32.png'),
-                                     pos=self.ui.menufileimport)
+        # only the menu entries of the tools are made here; a tool is imported and made the first time it is used
+        self.plugins.unload(kind='tool')
+        add_tool = self.plugins.add_tool
+
+        add_tool('distance_tool', 'appTools.ToolDistance', 'Distance', _("Distance Tool"), shortcut='Ctrl+M',
+                 icon='distance16.png', pos=self.ui.menuedit, before=self.ui.menueditorigin, separator=False)
+        add_tool('distance_min_tool', 'appTools.ToolDistanceMin', 'DistanceMin', _("Minimum Distance Tool"),
+                 shortcut='Shift+M', icon='distance_min16.png', pos=self.ui.menuedit, before=self.ui.menueditorigin,
+                 separator=True)
+
+        add_tool('dblsidedtool', 'appTools.ToolDblSided', 'DblSidedTool', _("2-Sided PCB"), shortcut='Alt+D',
+                 icon='doubleside16.png', separator=False)
+        add_tool('cal_exc_tool', 'appTools.ToolCalibration', 'ToolCalibration', _("Calibration Tool"),
+                 shortcut='Alt+E', icon='calibrate_16.png', pos=self.ui.menutool, before='dblsidedtool',
+                 separator=False)
+        add_tool('align_objects_tool', 'appTools.ToolAlignObjects', 'AlignObjects', _("Align Objects"),
+                 shortcut='Alt+A', icon='align16.png', separator=False)
+        add_tool('edrills_tool', 'appTools.ToolExtractDrills', 'ToolExtractDrills', _("Extract Drills"),
+                 shortcut='Alt+I', icon='drill16.png', separator=True)
+
+        add_tool('panelize_tool', 'appTools.ToolPanelize', 'Panelize', _("Panelize PCB"), shortcut='Alt+Z',
+                 icon='panelize16.png')
+        add_tool('film_tool', 'appTools.ToolFilm', 'Film', _("Film PCB"), shortcut='Alt+L', icon='film16.png')
+        add_tool('paste_tool', 'appTools.ToolSolderPaste', 'SolderPaste', _("Solder Paste Tool"), shortcut='Alt+K',
+                 icon='solderpastebis32.png')
+        add_tool('calculator_tool', 'appTools.ToolCalculators', 'ToolCalculator', _("Calculators"), shortcut='Alt+C',
+                 icon='calculator16.png', separator=True)
+
+        add_tool('sub_tool', 'appTools.ToolSub', 'ToolSub', _("Subtract Tool"), shortcut='Alt+W', icon='sub32.png',
+                 pos=self.ui.menutool, separator=True)
+        add_tool('rules_tool', 'appTools.ToolRulesCheck', 'RulesCheck', _("Check Rules"), shortcut='Alt+R',
+                 icon='rules32.png', pos=self.ui.menutool, separator=False)
+        add_tool('optimal_tool', 'appTools.ToolOptimal', 'ToolOptimal', _("Optimal Tool"), shortcut='Alt+O',
+                 icon='open_excellon32.png', pos=self.ui.menutool, separator=True)
+
+        add_tool('move_tool', 'appTools.ToolMove', 'ToolMove', _("Move"), shortcut='M', icon='move16.png',
+                 pos=self.ui.menuedit, before=self.ui.menueditorigin, separator=True)
+
+        add_tool('cutout_tool', 'appTools.ToolCutOut', 'CutOut', _("Cutout PCB"), shortcut='Alt+X',
+                 icon='cut16_bis.png', pos=self.ui.menutool, before='sub_tool')
+        add_tool('ncclear_tool', 'appTools.ToolNCC', 'NonCopperClear', _("Non-Copper Clearing"), shortcut='Alt+N',
+                 icon='ncc16.png', pos=self.ui.menutool, before='sub_tool', separator=True)
+        add_tool('paint_tool', 'appTools.ToolPaint', 'ToolPaint', _("Paint Tool"), shortcut='Alt+P',
+                 icon='paint16.png', pos=self.ui.menutool, before='sub_tool', separator=True)
+        add_tool('isolation_tool', 'appTools.ToolIsolation', 'ToolIsolation', _("Isolation Tool"), shortcut='Alt+I',
+                 icon='iso_16.png', pos=self.ui.menutool, before='sub_tool', separator=True)
+        add_tool('drilling_tool', 'appTools.ToolDrilling', 'ToolDrilling', _("Drilling Tool"), shortcut='Alt+D',
+                 icon='drill16.png', pos=self.ui.menutool, before='sub_tool', separator=True)
+
+        add_tool('copper_thieving_tool', 'appTools.ToolCopperThieving', 'ToolCopperThieving',
+                 _("Copper Thieving Tool"), shortcut='Alt+J', icon='copperfill32.png', pos=self.ui.menutool)
+        add_tool('fiducial_tool', 'appTools.ToolFiducials', 'ToolFiducials', _("Fiducials Tool"), shortcut='Alt+F',
+                 icon='fiducials_32.png', pos=self.ui.menutool)
+        add_tool('qrcode_tool', 'appTools.ToolQRCode', 'QRCode', _("QRCode Tool"), shortcut='Alt+Q',
+                 icon='qrcode32.png', pos=self.ui.menutool)
+        add_tool('punch_tool', 'appTools.ToolPunchGerber', 'ToolPunchGerber', _("Punch Gerber"), shortcut='Alt+H',
+                 icon='punch32.png', pos=self.ui.menutool)
+        add_tool('invert_tool', 'appTools.ToolInvertGerber', 'ToolInvertGerber', _("Invert Gerber Tool"),
+                 shortcut='ALT+G', icon='invert32.png', pos=self.ui.menutool)
+        add_tool('corners_tool', 'appTools.ToolCorners', 'ToolCorners', _("Corner Markers Tool"), shortcut='Alt+M',
+                 icon='corners_32.png', pos=self.ui.menutool)
+        add_tool('etch_tool', 'appTools.ToolEtchCompensation', 'ToolEtchCompensation', _("Etch Compensation Tool"),
+                 icon='etch_32.png', pos=self.ui.menutool)
+
+        add_tool('transform_tool', 'appTools.ToolTransform', 'ToolTransform', _("Object Transform"),
+                 shortcut='Alt+T', icon='transform.png', pos=self.ui.menuoptions, separator=True)
+        add_tool('properties_tool', 'appTools.ToolProperties', 'Properties', _("Properties"), shortcut='P',
+                 icon='properties32.png', pos=self.ui.menuoptions)
+
+        add_tool('pdf_tool', 'appTools.ToolPDF', 'ToolPDF', _("PDF Import Tool"), shortcut='Ctrl+Q',
+                 icon='pdf32.png', pos=self.ui.menufileimport, separator=True)
+        add_tool('image_tool', 'appTools.ToolImage', 'ToolImage', _("Image as Object"), icon='image32.png',
+                 pos=self.ui.menufileimport, separator=True)
+        add_tool('pcb_wizard_tool', 'appTools.ToolPcbWizard', 'PcbWizard', _("PcbWizard Import Tool"),
+                 icon='drill32.png', pos=self.ui.menufileimport)
 
         self.log.debug("Tools are installed.")
 
@@ -2144,14 +2108,19 @@ class App(QtCore.QObject):
     def connect_editors_toolbar_signals(self):
         self.log.debug(" -> Connecting Editors Toolbar Signals")
 
+        # the editors that are not made yet connect their toolbar when they are made
+
         # Geometry Editor Toolbar Signals
-        self.geo_editor.connect_geo_toolbar_signals()
+        if self.plugins.is_loaded('geo_editor'):
+            self.geo_editor.connect_geo_toolbar_signals()
 
         # Gerber Editor Toolbar Signals
-        self.grb_editor.connect_grb_toolbar_signals()
+        if self.plugins.is_loaded('grb_editor'):
+            self.grb_editor.connect_grb_toolbar_signals()
 
         # Excellon Editor Toolbar Signals
-        self.exc_editor.connect_exc_toolbar_signals()
+        if self.plugins.is_loaded('exc_editor'):
+            self.exc_editor.connect_exc_toolbar_signals()
 
     def connect_toolbar_signals(self):
         """
@@ -7371,11 +7340,6 @@ class App(QtCore.QObject):
 
         }
 
-        try:
-            image_opener = self.image_tool.import_image
-        except AttributeError:
-            image_opener = None
-
         openers = {
             'gerber': lambda fname: self.worker_task.emit({'fcn': self.f_handlers.open_gerber, 'params': [fname]}),
             'excellon': lambda fname: self.worker_task.emit({'fcn': self.f_handlers.open_excellon, 'params': [fname]}),
@@ -7386,7 +7350,7 @@ class App(QtCore.QObject):
             'project': self.f_handlers.open_project,
             'svg': self.f_handlers.import_svg,
             'dxf': self.f_handlers.import_dxf,
-            'image': image_opener,
+            'image': lambda fname: self.image_tool.import_image(fname),
             'pdf': lambda fname: self.worker_task.emit({'fcn': self.pdf_tool.open_pdf, 'params': [fname]})
         }
 
@@ -9031,10 +8995,8 @@ class MenuFileHandlers(QtCore.QObject):
         # close any editor that might be open
         if self.app.call_source != 'app':
             self.app.editor2object(cleanup=True)
-            # ## EDITOR section
-            self.app.geo_editor = AppGeoEditor(self.app)
-            self.app.exc_editor = AppExcEditor(self.app)
-            self.app.grb_editor = AppGerberEditor(self.app)
+            # ## EDITOR section; the editors are made again when they are used
+            self.app.plugins.unload('geo_editor', 'exc_editor', 'grb_editor')
 
         # Clear pool
         self.app.clear_pool()
@@ -9373,6 +9335,12 @@ class MenuFileHandlers(QtCore.QObject):
         self.app.file_saved.emit("pdf", filename)
 
     def save_pdf(self, file_name, obj_selection):
+        # reportlab and svglib are needed only here; importing them takes a good part of the startup time
+        from reportlab.graphics import renderPDF
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.units import inch, mm
+        from reportlab.lib.pagesizes import landscape, portrait
+        from svglib.svglib import svg2rlg
 
         p_size = self.defaults['global_workspaceT']
         orientation = self.defaults['global_workspace_orientation']
@@ -9741,7 +9709,7 @@ class MenuFileHandlers(QtCore.QObject):
                 header += ';Created on : %s' % time_str + '\n'
 
                 if eformat == 'dec':
-                    has_slots, excellon_code = obj.export_excellon(ewhole, efract, factor=factor, slot_type=slot_type)
+                    excellon_code = obj.iter_excellon(ewhole, efract, factor=factor, slot_type=slot_type)
                     header += eunits + '\n'
 
                     for tool in obj.tools:
@@ -9755,9 +9723,8 @@ class MenuFileHandlers(QtCore.QObject):
                                                                           dec=4)
                 else:
                     if ezeros == 'LZ':
-                        has_slots, excellon_code = obj.export_excellon(ewhole, efract,
-                                                                       form='ndec', e_zeros='LZ', factor=factor,
-                                                                       slot_type=slot_type)
+                        excellon_code = obj.iter_excellon(ewhole, efract, form='ndec', e_zeros='LZ', factor=factor,
+                                                          slot_type=slot_type)
                         header += '%s,%s\n' % (eunits, 'LZ')
                         header += format_exc
 
@@ -9773,9 +9740,8 @@ class MenuFileHandlers(QtCore.QObject):
                                     tool=str(tool),
                                     dec=4)
                     else:
-                        has_slots, excellon_code = obj.export_excellon(ewhole, efract,
-                                                                       form='ndec', e_zeros='TZ', factor=factor,
-                                                                       slot_type=slot_type)
+                        excellon_code = obj.iter_excellon(ewhole, efract, form='ndec', e_zeros='TZ', factor=factor,
+                                                          slot_type=slot_type)
                         header += '%s,%s\n' % (eunits, 'TZ')
                         header += format_exc
 
@@ -9793,14 +9759,19 @@ class MenuFileHandlers(QtCore.QObject):
                 header += '%\n'
                 footer = 'M30\n'
 
-                exported_excellon = header
-                exported_excellon += excellon_code
-                exported_excellon += footer
+                # the code is made as it is written so the drills of a panel are not all copied at once
+                first_code = next(excellon_code, None)
+                if first_code is None:
+                    self.app.log.debug("App.export_excellon.make_excellon() --> Excellon Object is empty.")
+                    return 'fail'
 
                 if local_use is None:
                     try:
                         with open(filename, 'w') as fp:
-                            fp.write(exported_excellon)
+                            fp.write(header)
+                            fp.write(first_code)
+                            fp.writelines(excellon_code)
+                            fp.write(footer)
                     except PermissionError:
                         self.inform.emit('[WARNING] %s' %
                                          _("Permission denied, saving not possible.\n"
@@ -9812,7 +9783,7 @@ class MenuFileHandlers(QtCore.QObject):
                     self.app.file_saved.emit("Excellon", filename)
                     self.inform.emit('[success] %s: %s' % (_("Excellon file exported to"), filename))
                 else:
-                    return exported_excellon
+                    return header + first_code + ''.join(excellon_code) + footer
             except Exception as e:
                 self.app.log.debug("App.export_excellon.make_excellon() --> %s" % str(e))
                 return 'fail'
@@ -9926,16 +9897,15 @@ class MenuFileHandlers(QtCore.QObject):
 
                 footer = 'M02*\n'
 
-                gerber_code = obj.export_gerber(gwhole, gfract, g_zeros=gzeros, factor=factor)
-
-                exported_gerber = header
-                exported_gerber += gerber_code
-                exported_gerber += footer
+                # the code is made as it is written so the geometry of a panel is not all copied at once
+                gerber_code = obj.iter_gerber(gwhole, gfract, g_zeros=gzeros, factor=factor)
 
                 if local_use is None:
                     try:
                         with open(filename, 'w') as fp:
-                            fp.write(exported_gerber)
+                            fp.write(header)
+                            fp.writelines(gerber_code)
+                            fp.write(footer)
                     except PermissionError:
                         self.inform.emit('[WARNING] %s' %
                                          _("Permission denied, saving not possible.\n"
@@ -9947,7 +9917,7 @@ class MenuFileHandlers(QtCore.QObject):
                     self.app.file_saved.emit("Gerber", filename)
                     self.inform.emit('[success] %s: %s' % (_("Gerber file exported to"), filename))
                 else:
-                    return exported_gerber
+                    return header + ''.join(gerber_code) + footer
             except Exception as e:
                 log.debug("App.export_gerber.make_gerber() --> %s" % str(e))
                 return 'fail'
@@ -10162,6 +10132,12 @@ class MenuFileHandlers(QtCore.QObject):
             assert isinstance(gerber_obj, GerberObject), \
                 "Expected to initialize a GerberObject but got %s" % type(gerber_obj)
 
+            cache_key = None
+            if self.app.parse_cache.enabled:
+                cache_key = self.app.parse_cache.make_key('gerber', filename)
+                if self.app.parse_cache.load('gerber', cache_key, gerber_obj):
+                    return
+
             # Opening the file happens here
             try:
                 gerber_obj.parse_file(filename)
@@ -10184,6 +10160,9 @@ class MenuFileHandlers(QtCore.QObject):
                                     _("Object is not Gerber file or empty. Aborting object creation."))
                 return "fail"
 
+            if cache_key is not None:
+                self.app.parse_cache.store('gerber', cache_key, gerber_obj)
+
         self.app.log.debug("open_gerber()")
 
         with self.app.proc_container.new(_("Opening ...")):
@@ -10223,6 +10202,12 @@ class MenuFileHandlers(QtCore.QObject):
 
         # How the object should be initialized
         def obj_init(excellon_obj, app_obj):
+            cache_key = None
+            if self.app.parse_cache.enabled:
+                cache_key = self.app.parse_cache.make_key('excellon', filename)
+                if self.app.parse_cache.load('excellon', cache_key, excellon_obj):
+                    return
+
             try:
                 ret = excellon_obj.parse_file(filename=filename)
                 if ret == "fail":
@@ -10246,6 +10231,8 @@ class MenuFileHandlers(QtCore.QObject):
 
             for tool in excellon_obj.tools:
                 if excellon_obj.tools[tool]['solid_geometry']:
+                    if cache_key is not None:
+                        self.app.parse_cache.store('excellon', cache_key, excellon_obj)
                     return
             app_obj.inform.emit('[ERROR_NOTCL] %s: %s' % (_("No geometry found in file"), filename))
             return "fail"
@@ -10344,6 +10331,8 @@ class MenuFileHandlers(QtCore.QObject):
         :param filename:    HPGL2 file filename
         :return:            None
         """
+        from appParsers.ParseHPGL2 import HPGL2
+
         filename = filename
 
         # How the object should be initialized
@@ -10555,23 +10544,39 @@ class MenuFileHandlers(QtCore.QObject):
                 self.inform.emit('[ERROR_NOTCL] %s: %s' % (_("Failed to open project file"), filename))
                 return
 
-        try:
-            d = json.load(f, object_hook=dict2obj)
-        except Exception as e:
-            self.app.log.error(
-                "Failed to parse project file, trying to see if it loads as an LZMA archive: %s because %s" %
-                (filename, str(e)))
+        # the binary project file holds an index of the objects; each object is decoded only when it is created
+        project_reader = None
+        if is_project_archive(filename):
             f.close()
-
-            # Open and parse a compressed Project file
             try:
-                with lzma.open(filename) as f:
-                    file_content = f.read().decode('utf-8')
-                    d = json.loads(file_content, object_hook=dict2obj)
+                project_reader = ProjectReader(filename)
+                d = {
+                    'options': project_reader.options,
+                    'objs': project_reader.index
+                }
             except Exception as e:
                 self.app.log.error("Failed to open project file: %s with error: %s" % (filename, str(e)))
                 self.inform.emit('[ERROR_NOTCL] %s: %s' % (_("Failed to open project file"), filename))
                 return
+        else:
+            # legacy project file, JSON or JSON in an LZMA archive
+            try:
+                d = json.load(f, object_hook=dict2obj)
+            except Exception as e:
+                self.app.log.error(
+                    "Failed to parse project file, trying to see if it loads as an LZMA archive: %s because %s" %
+                    (filename, str(e)))
+                f.close()
+
+                # Open and parse a compressed Project file
+                try:
+                    with lzma.open(filename) as f:
+                        file_content = f.read().decode('utf-8')
+                        d = json.loads(file_content, object_hook=dict2obj)
+                except Exception as e:
+                    self.app.log.error("Failed to open project file: %s with error: %s" % (filename, str(e)))
+                    self.inform.emit('[ERROR_NOTCL] %s: %s' % (_("Failed to open project file"), filename))
+                    return
 
         # Clear the current project
         # # NOT THREAD SAFE # ##
@@ -10596,23 +10601,28 @@ class MenuFileHandlers(QtCore.QObject):
         self.app.log.debug(" **************** Started PROEJCT loading... **************** ")
 
         for obj in d['objs']:
+            obj_name = obj['name'] if project_reader is not None else obj['options']['name']
+
             def obj_init(obj_inst, app_inst):
                 try:
-                    obj_inst.from_dict(obj)
+                    obj_inst.from_dict(project_reader.load_object(obj) if project_reader is not None else obj)
                 except Exception as erro:
                     app_inst.log('MenuFileHandlers.open_project() --> ' + str(erro))
                     return 'fail'
 
             self.app.log.debug(
-                "Recreating from opened project an %s object: %s" % (obj['kind'].capitalize(), obj['options']['name']))
+                "Recreating from opened project an %s object: %s" % (obj['kind'].capitalize(), obj_name))
 
             # for some reason, setting ui_title does not work when this method is called from Tcl Shell
             # it's because the TclCommand is run in another thread (it inherit TclCommandSignaled)
             if cli is None:
                 self.app.ui.set_ui_title(name="{} {}: {}".format(
-                    _("Loading Project ... restoring"), obj['kind'].upper(), obj['options']['name']))
+                    _("Loading Project ... restoring"), obj['kind'].upper(), obj_name))
+
+            self.app.app_obj.new_object(obj['kind'], obj_name, obj_init, plot=plot)
 
-            self.app.app_obj.new_object(obj['kind'], obj['options']['name'], obj_init, plot=plot)
+        if project_reader is not None:
+            project_reader.close()
 
         self.inform.emit('[success] %s: %s' % (_("Project loaded from"), filename))
 
@@ -10656,65 +10666,44 @@ class MenuFileHandlers(QtCore.QObject):
             except Exception as e:
                 self.app.log.debug("save_project() --> There was no active object. Skipping read_form. %s" % str(e))
 
-            # Serialize the whole project
-            d = {
-                "objs":     [obj.to_dict() for obj in self.app.collection.get_list()],
-                "options":  self.app.options,
-                "version":  self.app.version
-            }
-
-            if self.defaults["global_save_compressed"] is True:
-                with lzma.open(filename, "w", preset=int(self.defaults['global_compression_level'])) as f:
-                    g = json.dumps(d, default=to_dict, indent=2, sort_keys=True).encode('utf-8')
-                    # # Write
-                    f.write(g)
-                self.inform.emit('[success] %s: %s' % (_("Project saved to"), filename))
-            else:
-                # Open file
-                try:
-                    f = open(filename, 'w')
-                except IOError:
-                    self.app.log.error("Failed to open file for saving: %s", filename)
-                    self.inform.emit('[ERROR_NOTCL] %s' % _("The object is used by another application."))
-                    return
-
-                # Write
-                json.dump(d, f, default=to_dict, indent=2, sort_keys=True)
-                f.close()
-
-                # verification of the saved project
-                # Open and parse
-                try:
-                    saved_f = open(filename, 'r')
-                except IOError:
-                    if silent is False:
-                        self.inform.emit('[ERROR_NOTCL] %s: %s %s' %
-                                         (_("Failed to verify project file"), filename, _("Retry to save it.")))
-                    return
-
-                try:
-                    saved_d = json.load(saved_f, object_hook=dict2obj)
-                except Exception:
-                    if silent is False:
-                        self.inform.emit('[ERROR_NOTCL] %s: %s %s' %
-                                         (_("Failed to parse saved project file"), filename, _("Retry to save it.")))
-                    f.close()
-                    return
-                saved_f.close()
+            # Serialize the whole project. The objects that did not change since the last save in the same file
+            # are copied from it.
+            try:
+                reused = write_project(filename,
+                                       objs=[obj.to_dict() for obj in self.app.collection.get_list()],
+                                       options=self.app.options,
+                                       version=self.app.version,
+                                       compress=self.defaults["global_save_compressed"],
+                                       compression_level=self.defaults['global_compression_level'])
+            except IOError:
+                self.app.log.error("Failed to open file for saving: %s", filename)
+                self.inform.emit('[ERROR_NOTCL] %s' % _("The object is used by another application."))
+                return
+            self.app.log.debug("save_project() --> %d unchanged objects copied from the previous file." % reused)
 
+            # verification of the saved project
+            try:
+                with ProjectReader(filename) as saved_project:
+                    saved_version = saved_project.version
+            except Exception:
                 if silent is False:
-                    if 'version' in saved_d:
-                        self.inform.emit('[success] %s: %s' % (_("Project saved to"), filename))
-                    else:
-                        self.inform.emit('[ERROR_NOTCL] %s: %s %s' %
-                                         (_("Failed to parse saved project file"), filename, _("Retry to save it.")))
+                    self.inform.emit('[ERROR_NOTCL] %s: %s %s' %
+                                     (_("Failed to parse saved project file"), filename, _("Retry to save it.")))
+                return
+
+            if silent is False:
+                if saved_version is not None:
+                    self.inform.emit('[success] %s: %s' % (_("Project saved to"), filename))
+                else:
+                    self.inform.emit('[ERROR_NOTCL] %s: %s %s' %
+                                     (_("Failed to parse saved project file"), filename, _("Retry to save it.")))
 
-                tb_settings = QSettings("Open Source", "FlatCAM")
-                lock_state = self.app.ui.lock_action.isChecked()
-                tb_settings.setValue('toolbar_lock', lock_state)
+            tb_settings = QSettings("Open Source", "FlatCAM")
+            lock_state = self.app.ui.lock_action.isChecked()
+            tb_settings.setValue('toolbar_lock', lock_state)
 
-                # This will write the setting to the platform specific storage.
-                del tb_settings
+            # This will write the setting to the platform specific storage.
+            del tb_settings
 
             # if quit:
             # t = threading.Thread(target=lambda: self.check_project_file_size(1, filename=filename))
@@ -9,11 +9,18 @@
 
 from PyQt5 import QtWidgets, QtCore
 from io import StringIO
+from array import array
 
 from numpy.linalg import solve, norm
 
 import platform
+import time
 from copy import deepcopy
+from collections import OrderedDict, deque
+from itertools import islice
+import os
+import hashlib
+from math import hypot, sqrt
 
 import traceback
 from decimal import Decimal
@@ -25,7 +32,8 @@ from lxml import etree as ET
 from shapely.geometry import Polygon, Point, LinearRing
 
 from shapely.geometry import box as shply_box
-from shapely.ops import unary_union, substring, linemerge
+from shapely.ops import unary_union, substring, linemerge, nearest_points
+from shapely.prepared import prep
 import shapely.affinity as affinity
 from shapely.wkt import loads as sloads
 from shapely.wkt import dumps as sdumps
@@ -1415,6 +1423,124 @@ class Geometry(object):
             boundary = self.solid_geometry.envelope
         return boundary.difference(self.solid_geometry)
 
+    def clearing_step(self):
+        """
+        Called on each step of the polygon clearing loops. Raises grace if the user requested an abort and lets the
+        GUI process its events.
+
+        :return: None
+        """
+        if self.app.abort_flag:
+            # graceful abort requested by the user
+            raise grace
+
+        # provide the app with a way to process the GUI events when in a blocking loop
+        QtWidgets.QApplication.processEvents()
+
+    def clear_polygon_by_method(self, polygon, tooldia, steps_per_circle, method='standard', overlap=0.15,
+                                connect=True, contour=True, prog_plot=False, tried=None):
+        """
+        Clears a polygon with one of the clearing methods.
+
+        :param polygon:             Polygon to clear.
+        :param tooldia:             Diameter of the tool.
+        :param steps_per_circle:    number of linear segments to be used to approximate a circle
+        :param method:              'standard', 'seed', 'lines' or 'combo'; the 'combo' method tries the 'lines',
+                                    the 'seed' and then the 'standard' method until one of them has a result
+        :param overlap:             Overlap of toolpasses.
+        :param connect:             Connect the toolpaths to minimize the tool lifts.
+        :param contour:             Cut around the inside edges of the polygon.
+        :param prog_plot:           boolean; if True use the progressive plotting
+        :param tried:               if not None, a list where the name of each method is added as it is tried
+        :return:                    the toolpaths
+        :rtype:                     FlatCAMEndpointStorage | None
+        """
+        if method == 'combo':
+            methods = ['lines', 'seed', 'standard']
+        else:
+            methods = [method]
+
+        clear_methods = {
+            'standard': self.clear_polygon,
+            'seed': self.clear_polygon2,
+            'lines': self.clear_polygon3
+        }
+
+        cp = None
+        for method_name in methods:
+            if tried is not None:
+                tried.append(method_name)
+            cp = clear_methods[method_name](polygon, tooldia, steps_per_circle=steps_per_circle, overlap=overlap,
+                                            contour=contour, connect=connect, prog_plot=prog_plot)
+            if cp and cp.objects:
+                break
+        return cp
+
+    def clear_polygons(self, polygons, tooldia, steps_per_circle, method='standard', overlap=0.15, connect=True,
+                       contour=True, prog_plot=False, messages=None):
+        """
+        Clears a list of polygons. Each polygon is cleared independently so when there is more than one polygon
+        and no progressive plotting is used, the polygons are cleared in the process pool. The results are
+        collected in the order of the polygons, the progress is shown in the proc_container and the abort flag is
+        checked as each polygon is done. On abort the polygons that were not started are dropped from the pool.
+
+        :param polygons:            list of Polygons to clear
+        :param tooldia:             Diameter of the tool.
+        :param steps_per_circle:    number of linear segments to be used to approximate a circle
+        :param method:              'standard', 'seed', 'lines' or 'combo'; see clear_polygon_by_method()
+        :param overlap:             Overlap of toolpasses.
+        :param connect:             Connect the toolpaths to minimize the tool lifts.
+        :param contour:             Cut around the inside edges of the polygons.
+        :param prog_plot:           boolean; if True use the progressive plotting
+        :param messages:            dict with a message for each clearing method; the message is shown when the
+                                    method was tried for a polygon (e.g. for the 'combo' method)
+        :return:                    for each polygon, a list of toolpaths or None if it could not be cleared
+        :rtype:                     list
+        """
+        jobs = [(poly, tooldia, steps_per_circle, method, overlap, connect, contour) for poly in polygons]
+
+        queue = None
+        pool = getattr(self.app, 'pool', None)
+        if prog_plot or pool is None or len(jobs) < 2:
+            def clear_serial(job):
+                tried = []
+                try:
+                    cp = self.clear_polygon_by_method(*job, prog_plot=prog_plot, tried=tried)
+                except grace:
+                    raise
+                except Exception as err:
+                    log.debug("camlib.Geometry.clear_polygons() --> %s" % str(err))
+                    return None, tried
+                return (list(cp.get_objects()) if cp and cp.objects else None), tried
+
+            results = (clear_serial(job) for job in jobs)
+        else:
+            log.debug("camlib.Geometry.clear_polygons() --> Clearing %d polygons in the process pool." % len(jobs))
+            queue = PoolQueue(pool, clear_polygon_task, jobs)
+            results = iter(queue)
+
+        cleared = []
+        old_disp_number = 0
+        for pol_nr, (res, tried) in enumerate(results, start=1):
+            if self.app.abort_flag:
+                # graceful abort requested by the user
+                if queue is not None:
+                    queue.cancel()
+                raise grace
+
+            if messages:
+                for method_name in tried:
+                    if method_name in messages:
+                        self.app.inform.emit(messages[method_name])
+
+            cleared.append(res)
+
+            disp_number = int(np.interp(pol_nr, [0, len(jobs)], [0, 100]))
+            if old_disp_number < disp_number <= 100:
+                self.app.proc_container.update_view_text(' %d%%' % disp_number)
+                old_disp_number = disp_number
+        return cleared
+
     def clear_polygon(self, polygon, tooldia, steps_per_circle, overlap=0.15, connect=True, contour=True,
                       prog_plot=False):
         """
@@ -1442,11 +1568,7 @@ class Geometry(object):
 
         # ## The toolpaths
         # Index first and last points in paths
-        def get_pts(o):
-            return [o.coords[0], o.coords[-1]]
-
-        geoms = FlatCAMRTreeStorage()
-        geoms.get_points = get_pts
+        geoms = FlatCAMEndpointStorage()
 
         # Can only result in a Polygon or MultiPolygon
         # NOTE: The resulting polygon can be "empty".
@@ -1471,12 +1593,7 @@ class Geometry(object):
                 geoms.insert(i)
 
         while True:
-            if self.app.abort_flag:
-                # graceful abort requested by the user
-                raise grace
-
-            # provide the app with a way to process the GUI events when in a blocking loop
-            QtWidgets.QApplication.processEvents()
+            self.clearing_step()
 
             # Can only result in a Polygon or MultiPolygon
             current = current.buffer(-tooldia * (1 - overlap), int(steps_per_circle))
@@ -1534,7 +1651,7 @@ class Geometry(object):
         :param contour:             Cut countour inside the polygon.
         :param prog_plot:           boolean; if True use the progressive plotting
         :return:                    List of toolpaths covering polygon.
-        :rtype:                     FlatCAMRTreeStorage | None
+        :rtype:                     FlatCAMEndpointStorage | None
         """
 
         # log.debug("camlib.clear_polygon2()")
@@ -1544,11 +1661,7 @@ class Geometry(object):
 
         # ## The toolpaths
         # Index first and last points in paths
-        def get_pts(o):
-            return [o.coords[0], o.coords[-1]]
-
-        geoms = FlatCAMRTreeStorage()
-        geoms.get_points = get_pts
+        geoms = FlatCAMEndpointStorage()
 
         # Path margin
         path_margin = polygon_to_clear.buffer(-tooldia / 2, int(steps_per_circle))
@@ -1563,12 +1676,7 @@ class Geometry(object):
         # Grow from seed until outside the box. The polygons will
         # never have an interior, so take the exterior LinearRing.
         while True:
-            if self.app.abort_flag:
-                # graceful abort requested by the user
-                raise grace
-
-            # provide the app with a way to process the GUI events when in a blocking loop
-            QtWidgets.QApplication.processEvents()
+            self.clearing_step()
 
             path = Point(seedpoint).buffer(radius, int(steps_per_circle)).exterior
             path = path.intersection(path_margin)
@@ -1654,11 +1762,7 @@ class Geometry(object):
 
         # ## The toolpaths
         # Index first and last points in paths
-        def get_pts(o):
-            return [o.coords[0], o.coords[-1]]
-
-        geoms = FlatCAMRTreeStorage()
-        geoms.get_points = get_pts
+        geoms = FlatCAMEndpointStorage()
 
         lines_trimmed = []
 
@@ -1677,12 +1781,7 @@ class Geometry(object):
             try:
                 y = top - tooldia / 1.99999999
                 while y > bot + tooldia / 1.999999999:
-                    if self.app.abort_flag:
-                        # graceful abort requested by the user
-                        raise grace
-
-                    # provide the app with a way to process the GUI events when in a blocking loop
-                    QtWidgets.QApplication.processEvents()
+                    self.clearing_step()
 
                     line = LineString([(left, y), (right, y)])
                     line = line.intersection(margin_poly)
@@ -1714,12 +1813,7 @@ class Geometry(object):
             try:
                 x = left + tooldia / 1.99999999
                 while x < right - tooldia / 1.999999999:
-                    if self.app.abort_flag:
-                        # graceful abort requested by the user
-                        raise grace
-
-                    # provide the app with a way to process the GUI events when in a blocking loop
-                    QtWidgets.QApplication.processEvents()
+                    self.clearing_step()
 
                     line = LineString([(x, top), (x, bot)])
                     line = line.intersection(margin_poly)
@@ -1827,11 +1921,7 @@ class Geometry(object):
 
         # ## The toolpaths
         # Index first and last points in paths
-        def get_pts(o):
-            return [o.coords[0], o.coords[-1]]
-
-        geoms = FlatCAMRTreeStorage()
-        geoms.get_points = get_pts
+        geoms = FlatCAMEndpointStorage()
 
         lines_trimmed = []
 
@@ -1981,7 +2071,7 @@ class Geometry(object):
         within the paint area. This avoids unnecessary tool lifting.
 
         :param storage: Geometry to be optimized.
-        :type storage: FlatCAMRTreeStorage
+        :type storage: FlatCAMRTreeStorage | FlatCAMEndpointStorage
         :param boundary: Polygon defining the limits of the paintable area.
         :type boundary: Polygon
         :param tooldia: Tool diameter.
@@ -1990,215 +2080,60 @@ class Geometry(object):
         :param max_walk: Maximum allowable distance without lifting tool.
         :type max_walk: float or None
         :return: Optimized geometry.
-        :rtype: FlatCAMRTreeStorage
+        :rtype: FlatCAMEndpointStorage
         """
 
         # If max_walk is not specified, the maximum allowed is
         # 10 times the tool diameter
         max_walk = max_walk or 10 * tooldia
 
-        # Assuming geolist is a flat list of flat elements
-
-        # ## Index first and last points in paths
-        def get_pts(o):
-            return [o.coords[0], o.coords[-1]]
-
-        # storage = FlatCAMRTreeStorage()
-        # storage.get_points = get_pts
-        #
-        # for shape in geolist:
-        #     if shape is not None:
-        #         # Make LlinearRings into linestrings otherwise
-        #         # When chaining the coordinates path is messed up.
-        #         storage.insert(LineString(shape))
-        #         #storage.insert(shape)
-
-        # ## Iterate over geometry paths getting the nearest each time.
-        # optimized_paths = []
-        optimized_paths = FlatCAMRTreeStorage()
-        optimized_paths.get_points = get_pts
-        path_count = 0
-        current_pt = (0, 0)
-        try:
-            pt, geo = storage.nearest(current_pt)
-        except StopIteration:
+        paths = [list(geo.coords) for geo in storage.get_objects() if not geo.is_empty]
+        if not paths:
             log.debug("camlib.Geometry.paint_connect(). Storage empty")
             return None
 
-        storage.remove(geo)
-
-        geo = LineString(geo)
-        current_pt = geo.coords[-1]
-        try:
-            while True:
-                path_count += 1
-                # log.debug("Path %d" % path_count)
-
-                pt, candidate = storage.nearest(current_pt)
-                storage.remove(candidate)
-
-                candidate = LineString(candidate)
-
-                # If last point in geometry is the nearest
-                # then reverse coordinates.
-                # but prefer the first one if last == first
-                if pt != candidate.coords[0] and pt == candidate.coords[-1]:
-                    # in place coordinates update deprecated in Shapely 2.0
-                    # candidate.coords = list(candidate.coords)[::-1]
-                    candidate = LineString(list(candidate.coords)[::-1])
-
-                # Straight line from current_pt to pt.
-                # Is the toolpath inside the geometry?
-                walk_path = LineString([current_pt, pt])
-                walk_cut = walk_path.buffer(tooldia / 2, int(steps_per_circle))
-
-                if walk_cut.within(boundary) and walk_path.length < max_walk:
-                    # log.debug("Walk to path #%d is inside. Joining." % path_count)
-
-                    # Completely inside. Append...
-                    # in place coordinates update deprecated in Shapely 2.0
-                    # geo.coords = list(geo.coords) + list(candidate.coords)
-                    geo = LineString(list(geo.coords) + list(candidate.coords))
-                    # try:
-                    #     last = optimized_paths[-1]
-                    #     last.coords = list(last.coords) + list(geo.coords)
-                    # except IndexError:
-                    #     optimized_paths.append(geo)
-
-                else:
-
-                    # Have to lift tool. End path.
-                    # log.debug("Path #%d not within boundary. Next." % path_count)
-                    # optimized_paths.append(geo)
-                    optimized_paths.insert(geo)
-                    geo = candidate
+        # the tool cut along a walk is inside the boundary when the walk is inside the boundary shrunk by the
+        # tool radius
+        walk_area = prep(boundary.buffer(-tooldia / 2, int(steps_per_circle)))
 
-                current_pt = geo.coords[-1]
-
-                # Next
-                # pt, geo = storage.nearest(current_pt)
-
-        except StopIteration:  # Nothing left in storage.
-            # pass
-            optimized_paths.insert(geo)
+        def can_walk(start, end):
+            if hypot(end[0] - start[0], end[1] - start[1]) >= max_walk:
+                return False
+            if start == end:
+                return walk_area.covers(Point(start))
+            return walk_area.covers(LineString([start, end]))
 
+        optimized_paths = FlatCAMEndpointStorage()
+        for chain in connect_near_paths(paths, can_walk):
+            optimized_paths.insert(LineString(chain))
         return optimized_paths
 
     @staticmethod
     def path_connect(storage, origin=(0, 0)):
         """
-        Simplifies paths in the FlatCAMRTreeStorage storage by
+        Simplifies paths in the storage by
         connecting paths that touch on their endpoints.
 
         :param storage:     Storage containing the initial paths.
-        :rtype storage:     FlatCAMRTreeStorage
-        :param origin:      tuple; point from which to calculate the nearest point
+        :rtype storage:     FlatCAMRTreeStorage | FlatCAMEndpointStorage
+        :param origin:      tuple; point from which to calculate the nearest point (not used, kept for compatibility)
         :return:            Simplified storage.
-        :rtype:             FlatCAMRTreeStorage
+        :rtype:             FlatCAMEndpointStorage
         """
 
         log.debug("path_connect()")
 
-        # ## Index first and last points in paths
-        def get_pts(o):
-            return [o.coords[0], o.coords[-1]]
-
-        #
-        # storage = FlatCAMRTreeStorage()
-        # storage.get_points = get_pts
-        #
-        # for shape in pathlist:
-        #     if shape is not None:
-        #         storage.insert(shape)
-
-        path_count = 0
-        pt, geo = storage.nearest(origin)
-        storage.remove(geo)
-        # optimized_geometry = [geo]
-        optimized_geometry = FlatCAMRTreeStorage()
-        optimized_geometry.get_points = get_pts
-        # optimized_geometry.insert(geo)
-        try:
-            while True:
-                path_count += 1
-                _, left = storage.nearest(geo.coords[0])
-
-                # If left touches geo, remove left from original
-                # storage and append to geo.
-                if type(left) == LineString:
-                    if left.coords[0] == geo.coords[0]:
-                        storage.remove(left)
-                        # geo.coords = list(geo.coords)[::-1] + list(left.coords)   # Shapely 2.0
-                        geo = LineString(list(geo.coords)[::-1] + list(left.coords))
-                        continue
-
-                    if left.coords[-1] == geo.coords[0]:
-                        storage.remove(left)
-                        # geo.coords = list(left.coords) + list(geo.coords)  # Shapely 2.0
-                        geo = LineString(list(geo.coords)[::-1] + list(left.coords))
-                        continue
-
-                    if left.coords[0] == geo.coords[-1]:
-                        storage.remove(left)
-                        # geo.coords = list(geo.coords) + list(left.coords) # Shapely 2.0
-                        geo = LineString(list(geo.coords) + list(left.coords))
-                        continue
-
-                    if left.coords[-1] == geo.coords[-1]:
-                        storage.remove(left)
-                        # geo.coords = list(geo.coords) + list(left.coords)[::-1] # Shapely 2.0
-                        geo = LineString(list(geo.coords) + list(left.coords)[::-1])
-                        continue
-
-                _, right = storage.nearest(geo.coords[-1])
-
-                # If right touches geo, remove left from original
-                # storage and append to geo.
-                if type(right) == LineString:
-                    if right.coords[0] == geo.coords[-1]:
-                        storage.remove(right)
-                        # geo.coords = list(geo.coords) + list(right.coords)  # Shapely 2.0
-                        geo = LineString(list(geo.coords) + list(right.coords))
-                        continue
-
-                    if right.coords[-1] == geo.coords[-1]:
-                        storage.remove(right)
-                        # geo.coords = list(geo.coords) + list(right.coords)[::-1]    # Shapely 2.0
-                        geo = LineString(list(geo.coords) + list(right.coords)[::-1])
-                        continue
-
-                    if right.coords[0] == geo.coords[0]:
-                        storage.remove(right)
-                        # geo.coords = list(geo.coords)[::-1] + list(right.coords)    # Shapely 2.0
-                        geo = LineString(list(geo.coords)[::-1] + list(right.coords))
-                        continue
-
-                    if right.coords[-1] == geo.coords[0]:
-                        storage.remove(right)
-                        # geo.coords = list(left.coords) + list(geo.coords)   # Shapely 2.0
-                        geo = LineString(list(left.coords) + list(geo.coords))
-                        continue
-
-                # right is either a LinearRing or it does not connect
-                # to geo (nothing left to connect to geo), so we continue
-                # with right as geo.
-                storage.remove(right)
-
-                if type(right) == LinearRing:
-                    optimized_geometry.insert(right)
-                else:
-                    # Cannot extend geo any further. Put it away.
-                    optimized_geometry.insert(geo)
-
-                    # Continue with right.
-                    geo = right
-
-        except StopIteration:  # Nothing found in storage.
-            optimized_geometry.insert(geo)
-
-        # print path_count
-        log.debug("path_count = %d" % path_count)
+        paths = []
+        optimized_geometry = FlatCAMEndpointStorage()
+        for geo in storage.get_objects():
+            if type(geo) == LinearRing:
+                # the rings are not connected
+                optimized_geometry.insert(geo)
+            else:
+                paths.append(list(geo.coords))
 
+        for chain in connect_touching_paths(paths):
+            optimized_geometry.insert(LineString(chain))
         return optimized_geometry
 
     def convert_units(self, obj_units):
@@ -2627,6 +2562,261 @@ class AttrDict(dict):
         self.__dict__ = self
 
 
+class GCodeSink:
+    """
+    Buffer for the G-Code made by the CNCjob generators.
+
+    The text is kept as a list of chunks so adding to it does not copy the text that is already in the buffer, as it
+    happens with the string concatenation. It can be used as a string accumulator (``sink += text``) and it can be
+    written to a file chunk by chunk, without joining the chunks in one string.
+    """
+
+    def __init__(self, *chunks):
+        self.chunks = []
+        self.size = 0
+
+        for chunk in chunks:
+            self.write(chunk)
+
+    def write(self, text):
+        """
+        Add text at the end of the buffer.
+
+        :param text:    a string or another GCodeSink whose chunks are added to this one
+        :return:        the buffer itself
+        """
+        if isinstance(text, GCodeSink):
+            self.chunks += text.chunks
+            self.size += text.size
+        elif text:
+            self.chunks.append(text)
+            self.size += len(text)
+        return self
+
+    def __iadd__(self, text):
+        return self.write(text)
+
+    def __len__(self):
+        return self.size
+
+    def __bool__(self):
+        return self.size > 0
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def getvalue(self):
+        """
+        :return:    the content of the buffer as a string. The chunks are joined once and kept joined.
+        """
+        if len(self.chunks) > 1:
+            self.chunks = [''.join(self.chunks)]
+        return self.chunks[0] if self.chunks else ''
+
+    def __str__(self):
+        return self.getvalue()
+
+    def write_to(self, f):
+        """
+        Write the content of the buffer to an open text file, chunk by chunk.
+
+        :param f:   file object
+        :return:    None
+        """
+        for chunk in self.chunks:
+            f.write(chunk)
+
+
+class GCodeToolpath:
+    """
+    The result of parsing a G-Code program with CNCjob.gcode_parse(), kept in numpy arrays.
+
+    The moves are kept in the ``x``, ``y``, ``z``, ``kind``, ``feed`` and ``tool`` arrays, one element for each
+    vertex. The program is a sequence of entries: a path (the moves done between two changes of height, a range of
+    vertices) or the hole made by a drill plunge (an element of the ``hole_*`` arrays). The Shapely geometry of an
+    entry is made only when it is requested and then it is kept.
+
+    Iterating it (or ``to_list()``) gives the entries in the format of CNCjob.gcode_parsed:
+    {"geom": LineString(path), "kind": kind}
+    """
+
+    # bits of the kind of a move / entry
+    TRAVEL = 1
+    SLOW = 2
+    HOLE = 4
+
+    def __init__(self):
+        # moves: x, y, z, kind, feed, tool for each move
+        self._moves = array('d')
+
+        # holes
+        self._hole_x = array('d')
+        self._hole_y = array('d')
+        self._hole_dia = array('d')
+
+        # entries; for a path: range of moves, for a hole: index of the hole
+        self._start = array('q')
+        self._end = array('q')
+        self._kind = array('B')
+
+        self.x = self.y = self.z = self.move_kind = self.feed = self.tool = None
+        self.hole_x = self.hole_y = self.hole_dia = None
+        self.start = self.end = self.kind = None
+
+        self._geoms = None
+        self._items = None
+
+    # ## Building, used by the parser
+    def add_move(self, x, y, z, kind, feed, tool):
+        self._moves.extend((x, y, z, kind, feed, tool))
+
+    def add_moves(self, xy, z, kind, feed, tool):
+        """
+        Adds several moves with the same height, kind, feed and tool.
+
+        :param xy:      array of shape (N, 2) with the coordinates of the moves
+        """
+        moves = np.empty((len(xy), 6), dtype=np.float64)
+        moves[:, :2] = xy
+        moves[:, 2:] = (z, kind, feed, tool)
+        self._moves.frombytes(moves.tobytes())
+
+    @property
+    def nr_moves(self):
+        return len(self._moves) // 6
+
+    def add_path(self, start, kind):
+        """
+        Adds the moves from ``start`` to the last one as a path.
+
+        :param start:   index of the first move of the path
+        :param kind:    kind of the path: a combination of the TRAVEL and SLOW bits
+        """
+        self._start.append(start)
+        self._end.append(len(self._moves) // 6)
+        self._kind.append(kind)
+
+    def add_hole(self, x, y, dia):
+        self._start.append(len(self._hole_x))
+        self._end.append(len(self._hole_x) + 1)
+        self._kind.append(self.HOLE)
+
+        self._hole_x.append(x)
+        self._hole_y.append(y)
+        self._hole_dia.append(dia)
+
+    def finish(self):
+        """
+        Moves the parsed data in numpy arrays. Must be called when the parsing is done.
+        """
+        moves = np.frombuffer(self._moves, dtype=np.float64).reshape((-1, 6))
+        self.x = np.ascontiguousarray(moves[:, 0])
+        self.y = np.ascontiguousarray(moves[:, 1])
+        self.z = np.ascontiguousarray(moves[:, 2])
+        self.move_kind = moves[:, 3].astype(np.uint8)
+        self.feed = np.ascontiguousarray(moves[:, 4])
+        self.tool = np.ascontiguousarray(moves[:, 5])
+        self._moves = None
+
+        self.hole_x = np.frombuffer(self._hole_x, dtype=np.float64)
+        self.hole_y = np.frombuffer(self._hole_y, dtype=np.float64)
+        self.hole_dia = np.frombuffer(self._hole_dia, dtype=np.float64)
+
+        self.start = np.frombuffer(self._start, dtype=np.int64)
+        self.end = np.frombuffer(self._end, dtype=np.int64)
+        self.kind = np.frombuffer(self._kind, dtype=np.uint8)
+
+        self._geoms = [None] * len(self.start)
+
+    # ## Access
+    def __len__(self):
+        return len(self._kind)
+
+    def __bool__(self):
+        return len(self._kind) > 0
+
+    def kind_list(self, idx):
+        """
+        :param idx:     index of the entry
+        :return:        the kind of the entry as in gcode_parsed: ["T" or "C", "F" or "S"]
+        """
+        kind = int(self.kind[idx])
+        return ['T' if kind & self.TRAVEL else 'C', 'S' if kind & self.SLOW else 'F']
+
+    def is_travel(self):
+        """
+        :return:    boolean array, True for the travel entries
+        """
+        return (self.kind & self.TRAVEL).astype(bool)
+
+    def coords(self, idx):
+        """
+        :param idx:     index of a path entry
+        :return:        (N, 2) array with the vertices of the path
+        """
+        return np.column_stack((self.x[self.start[idx]:self.end[idx]], self.y[self.start[idx]:self.end[idx]]))
+
+    def paths_coords(self, indexes):
+        """
+        :param indexes: array with the indexes of path entries
+        :return:        tuple (xy, breaks): (N, 2) array with the vertices of the paths, one path after the other, and
+                        array with the index in xy of the first vertex of each path
+        """
+        starts, ends = self.start[indexes], self.end[indexes]
+        lengths = ends - starts
+        breaks = np.cumsum(lengths) - lengths
+        moves = np.repeat(starts - breaks, lengths) + np.arange(int(lengths.sum()))
+        return np.column_stack((self.x[moves], self.y[moves])), breaks
+
+    def end_coords(self, idx):
+        """
+        :param idx:     index of a path entry
+        :return:        tuple with the first and the last vertex of the path, as (x, y) tuples
+        """
+        start, end = self.start[idx], self.end[idx] - 1
+        return (float(self.x[start]), float(self.y[start])), (float(self.x[end]), float(self.y[end]))
+
+    def geometry(self, idx):
+        """
+        :param idx:     index of the entry
+        :return:        the Shapely geometry of the entry: a LineString for a path, a LinearRing for a hole
+        """
+        geo = self._geoms[idx]
+        if geo is None:
+            if self.kind[idx] & self.HOLE:
+                h_idx = self.start[idx]
+                geo = Point(self.hole_x[h_idx], self.hole_y[h_idx]).buffer(self.hole_dia[h_idx] / 2.0).exterior
+            else:
+                geo = LineString(self.coords(idx))
+            self._geoms[idx] = geo
+        return geo
+
+    def geometries(self):
+        return [self.geometry(idx) for idx in range(len(self))]
+
+    @property
+    def materialized(self):
+        """
+        True after the entries were given as dicts. The dicts can be changed in place (by the transformations) so
+        after this only the dicts are up to date.
+        """
+        return self._items is not None
+
+    def to_list(self):
+        """
+        :return:    list of dicts {"geom": geometry, "kind": kind} as in gcode_parsed
+        """
+        if self._items is None:
+            self._items = [{"geom": self.geometry(idx), "kind": self.kind_list(idx)} for idx in range(len(self))]
+        return self._items
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __getitem__(self, idx):
+        return self.to_list()[idx]
+
+
 class CNCjob(Geometry):
     """
     Represents work to be done by a CNC machine.
@@ -2651,6 +2841,20 @@ class CNCjob(Geometry):
         "excellon_optimization_type": "B",
     }
 
+    # the drill orders calculated by drill_orders(), shared by all the CNC jobs; the least recently used are dropped
+    drill_order_cache = OrderedDict()
+    drill_order_cache_size = 64
+
+    # G-Code parsing
+    re_gcode_words = re.compile(r'(?:\s*[A-Z]\s*[\+\-\.\d\s]+)*')
+    re_gcode_word = re.compile(r'\s*([A-Z])\s*([\+\-\.\d\s]+)')
+    re_roland_z = re.compile(r"^Z(\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?)*;$")
+    re_hpgl_pa = re.compile(r"^PA(\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?)*;$")
+    re_hpgl_pen = re.compile(r"^(P[U|D])")
+    re_laser_xy = re.compile(r"X([\+-]?\d+.[\+-]?\d+)\s*Y([\+-]?\d+.[\+-]?\d+)")
+    re_laser_pos = re.compile(r"^(M0?[3-5])")
+    re_laser_pos_2 = re.compile(r"^(M10[6|7])")
+
     settings = QtCore.QSettings("Open Source", "FlatCAM")
     if settings.contains("machinist"):
         machinist_setting = settings.value('machinist', type=int)
@@ -2721,6 +2925,8 @@ class CNCjob(Geometry):
         self.coordinates_type = self.app.defaults["cncjob_coords_type"]
 
         self.gcode = ""
+        # the parsed G-Code in arrays; gcode_parsed is made from it when it is requested
+        self.gcode_toolpath = None
         self.gcode_parsed = None
 
         self.pp_geometry_name = pp_geometry_name
@@ -2770,6 +2976,8 @@ class CNCjob(Geometry):
 
         # store here the Excellon source object tools to be accessible locally
         self.exc_tools = None
+        # the tools dict that exc_tools is a copy of, so it is copied only once for all the tools of a job
+        self.exc_tools_source = None
 
         # search for toolchange parameters in the Toolchange Custom Code
         self.re_toolchange_custom = re.compile(r'(%[a-zA-Z0-9\-_]+%)')
@@ -2784,6 +2992,22 @@ class CNCjob(Geometry):
                            'tooldia', 'gcode', 'input_geometry_bounds', 'gcode_parsed', 'steps_per_circle',
                            'z_depthpercut', 'spindlespeed', 'dwell', 'dwelltime']
 
+    @property
+    def gcode_parsed(self):
+        """
+        List of dicts {"geom": LineString(path), "kind": kind}, made from gcode_toolpath when it is first requested.
+        """
+        if self._gcode_parsed is None and self.gcode_toolpath is not None:
+            self._gcode_parsed = self.gcode_toolpath.to_list()
+            # the list can be changed in place (transformations) so the arrays are not used after this
+            self.gcode_toolpath = None
+        return self._gcode_parsed
+
+    @gcode_parsed.setter
+    def gcode_parsed(self, value):
+        self._gcode_parsed = value
+        self.gcode_toolpath = None
+
     @property
     def postdata(self):
         """
@@ -2844,6 +3068,36 @@ class CNCjob(Geometry):
             self.app.log.error('Exception occurred within a preprocessor: ' + traceback.format_exc())
             return ''
 
+    def doformat_batch(self, fun, coords, **kwargs):
+        """
+        Same as doformat() called for each point in coords with the x and y parameters set to the point coordinates,
+        but the preprocessor formats all the points in one call.
+
+        :param fun:     One of the per-move methods of the preprocessor (rapid_code, linear_code)
+        :type fun:      class 'function'
+        :param coords:  sequence of points, (x, y) or (x, y, z)
+        :param kwargs:  keyword args which will update attributes of the current class, the same for all the points
+        :type kwargs:   dict
+        :return:        Gcode lines, each one ended by a newline
+        :rtype:         str
+        """
+        if not coords:
+            return ''
+
+        pp = fun.__self__
+        if hasattr(pp, 'format_batch'):
+            # the attributes are copied once for all the points
+            attributes = AttrDict()
+            attributes.update(self.postdata)
+            attributes.update(kwargs)
+            try:
+                lines = pp.format_batch(fun.__name__, attributes, coords)
+                return '\n'.join(lines) + '\n'
+            except Exception:
+                self.app.log.error('Exception occurred within a preprocessor: ' + traceback.format_exc())
+
+        return ''.join([self.doformat(fun, x=pt[0], y=pt[1], **kwargs) for pt in coords])
+
     def parse_custom_toolchange_code(self, data):
         """
         Will parse a text and get a toolchange sequence in text format suitable to be included in a Gcode file.
@@ -2908,145 +3162,39 @@ class CNCjob(Geometry):
         return [(pt.coords.xy[0][0], pt.coords.xy[1][0]) for pt in points]
 
     def optimized_ortools_meta(self, locations, start=None, opt_time=0):
-        optimized_path = []
+        optimized_path = ortools_drill_path(locations, metaheuristic=True, opt_time=opt_time)
 
-        tsp_size = len(locations)
-        num_routes = 1  # The number of routes, which is 1 in the TSP.
-        # Nodes are indexed from 0 to tsp_size - 1. The depot is the starting node of the route.
+        if self.app.abort_flag:
+            # graceful abort requested by the user
+            raise grace
+        return optimized_path
 
-        depot = 0 if start is None else start
+    def optimized_ortools_basic(self, locations, start=None):
+        return ortools_drill_path(locations)
 
-        # Create routing model.
-        if tsp_size == 0:
-            log.warning('OR-tools metaheuristics - Specify an instance greater than 0.')
-            return optimized_path
+    def optimized_travelling_salesman(self, points, start=None):
+        """
+        As solving the problem in the brute force way is too slow,
+        this function implements a simple heuristic: always
+        go to the nearest city.
 
-        manager = pywrapcp.RoutingIndexManager(tsp_size, num_routes, depot)
-        routing = pywrapcp.RoutingModel(manager)
-        search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-        search_parameters.local_search_metaheuristic = (
-            routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH)
+        Even if this algorithm is extremely simple, it works pretty well
+        giving a solution only about 25%% longer than the optimal one (cit. Wikipedia),
+        and runs very fast in O(N^2) time complexity.
 
-        # Set search time limit in milliseconds.
-        if float(opt_time) != 0:
-            search_parameters.time_limit.seconds = int(
-                float(opt_time))
-        else:
-            search_parameters.time_limit.seconds = 3
+        >>> optimized_travelling_salesman([[i,j] for i in range(5) for j in range(5)])
+        [[0, 0], [0, 1], [0, 2], [0, 3], [0, 4], [1, 4], [1, 3], [1, 2], [1, 1], [1, 0], [2, 0], [2, 1], [2, 2],
+        [2, 3], [2, 4], [3, 4], [3, 3], [3, 2], [3, 1], [3, 0], [4, 0], [4, 1], [4, 2], [4, 3], [4, 4]]
+        >>> optimized_travelling_salesman([[0,0],[10,0],[6,0]])
+        [[0, 0], [6, 0], [10, 0]]
 
-        # Callback to the distance function. The callback takes two
-        # arguments (the from and to node indices) and returns the distance between them.
-        dist_between_locations = self.CreateDistanceCallback(locs=locations, manager=manager)
-
-        # if there are no distances then go to the next tool
-        if not dist_between_locations:
-            return
-
-        dist_callback = dist_between_locations.Distance
-        transit_callback_index = routing.RegisterTransitCallback(dist_callback)
-        routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
-
-        # Solve, returns a solution if any.
-        assignment = routing.SolveWithParameters(search_parameters)
-
-        if assignment:
-            # Solution cost.
-            log.info("OR-tools metaheuristics - Total distance: " + str(assignment.ObjectiveValue()))
-
-            # Inspect solution.
-            # Only one route here; otherwise iterate from 0 to routing.vehicles() - 1.
-            route_number = 0
-            node = routing.Start(route_number)
-            start_node = node
-
-            while not routing.IsEnd(node):
-                if self.app.abort_flag:
-                    # graceful abort requested by the user
-                    raise grace
-
-                optimized_path.append(node)
-                node = assignment.Value(routing.NextVar(node))
-        else:
-            log.warning('OR-tools metaheuristics - No solution found.')
-
-        return optimized_path
-        # ############################################# ##
-
-    def optimized_ortools_basic(self, locations, start=None):
-        optimized_path = []
-
-        tsp_size = len(locations)
-        num_routes = 1  # The number of routes, which is 1 in the TSP.
-
-        # Nodes are indexed from 0 to tsp_size - 1. The depot is the starting node of the route.
-        depot = 0 if start is None else start
-
-        # Create routing model.
-        if tsp_size == 0:
-            log.warning('Specify an instance greater than 0.')
-            return optimized_path
-
-        manager = pywrapcp.RoutingIndexManager(tsp_size, num_routes, depot)
-        routing = pywrapcp.RoutingModel(manager)
-        search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-
-        # Callback to the distance function. The callback takes two
-        # arguments (the from and to node indices) and returns the distance between them.
-        dist_between_locations = self.CreateDistanceCallback(locs=locations, manager=manager)
-
-        # if there are no distances then go to the next tool
-        if not dist_between_locations:
-            return
-
-        dist_callback = dist_between_locations.Distance
-        transit_callback_index = routing.RegisterTransitCallback(dist_callback)
-        routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
-
-        # Solve, returns a solution if any.
-        assignment = routing.SolveWithParameters(search_parameters)
-
-        if assignment:
-            # Solution cost.
-            log.info("Total distance: " + str(assignment.ObjectiveValue()))
-
-            # Inspect solution.
-            # Only one route here; otherwise iterate from 0 to routing.vehicles() - 1.
-            route_number = 0
-            node = routing.Start(route_number)
-            start_node = node
-
-            while not routing.IsEnd(node):
-                optimized_path.append(node)
-                node = assignment.Value(routing.NextVar(node))
-        else:
-            log.warning('No solution found.')
-
-        return optimized_path
-        # ############################################# ##
-
-    def optimized_travelling_salesman(self, points, start=None):
-        """
-        As solving the problem in the brute force way is too slow,
-        this function implements a simple heuristic: always
-        go to the nearest city.
-
-        Even if this algorithm is extremely simple, it works pretty well
-        giving a solution only about 25%% longer than the optimal one (cit. Wikipedia),
-        and runs very fast in O(N^2) time complexity.
-
-        >>> optimized_travelling_salesman([[i,j] for i in range(5) for j in range(5)])
-        [[0, 0], [0, 1], [0, 2], [0, 3], [0, 4], [1, 4], [1, 3], [1, 2], [1, 1], [1, 0], [2, 0], [2, 1], [2, 2],
-        [2, 3], [2, 4], [3, 4], [3, 3], [3, 2], [3, 1], [3, 0], [4, 0], [4, 1], [4, 2], [4, 3], [4, 4]]
-        >>> optimized_travelling_salesman([[0,0],[10,0],[6,0]])
-        [[0, 0], [6, 0], [10, 0]]
-
-        :param points:  List of tuples with x, y coordinates
-        :type points:   list
-        :param start:   a tuple with a x,y coordinates of the start point
-        :type start:    tuple
-        :return:        List of points ordered in a optimized way
-        :rtype:         list
-        """
+        :param points:  List of tuples with x, y coordinates
+        :type points:   list
+        :param start:   a tuple with a x,y coordinates of the start point
+        :type start:    tuple
+        :return:        List of points ordered in a optimized way
+        :rtype:         list
+        """
 
         if start is None:
             start = points[0]
@@ -3059,16 +3207,104 @@ class CNCjob(Geometry):
             must_visit.remove(nearest)
         return path
 
+    def optimized_native(self, locations_list, start=None, opt_time=0):
+        """
+        Optimizes the drill path with the built-in optimizer (see optimize_drill_path()).
+
+        :param locations_list:  list of lists of (x, y) locations, one for each tool
+        :param start:           the (x, y) point where the paths start; if None the paths start in the first location
+        :param opt_time:        maximum time, in seconds, spent to optimize each path
+        :return:                list of paths, one for each list of locations, as lists of locations indexes
+        """
+        return self.drill_orders(locations_list, 'N', start=start, opt_time=opt_time)
+
+    def drill_orders(self, locations_list, opt_type, start=None, opt_time=0):
+        """
+        The order in which the drills of each tool are made, for an optimization type.
+        The orders are kept in a cache shared by all the CNC jobs, keyed on the optimization type, its parameters and
+        the locations, so generating the GCode again with other machine parameters (feedrates, depths, preprocessor)
+        does not optimize the paths again. The orders that are not in the cache are calculated in the process pool
+        when there are more of them.
+
+        :param locations_list:  list of lists of (x, y) locations, one for each tool
+        :param opt_type:        the optimization type: 'M' (OR-Tools metaheuristic), 'B' (OR-Tools basic),
+                                'T' (nearest neighbour), 'N' (native) or anything else for no optimization
+        :param start:           the (x, y) point where the paths start, used by the 'N' type; if None the paths start
+                                in the first location
+        :param opt_time:        maximum time, in seconds, spent to optimize each path by the 'M' and 'N' types
+        :return:                list of paths, one for each list of locations, as lists of locations indexes
+        """
+        keys = []
+        found = {}
+        jobs = {}
+        for locations in locations_list:
+            xy = np.array(locations, dtype=float).reshape(-1, 2)
+            # a tool without locations has an empty path and no start point
+            path_start = None
+            if opt_type == 'N' and len(locations):
+                path_start = tuple(locations[0]) if start is None else tuple(start)
+            key = (
+                opt_type,
+                float(opt_time) if opt_type in ('M', 'N') else None,
+                path_start,
+                len(xy),
+                hashlib.sha1(xy.tobytes()).hexdigest()
+            )
+            keys.append(key)
+            if key in self.drill_order_cache:
+                found[key] = self.drill_order_cache[key]
+                self.drill_order_cache.move_to_end(key)
+            elif key not in jobs:
+                jobs[key] = (opt_type, locations, path_start, opt_time)
+
+        if jobs:
+            if len(jobs) > 1:
+                results = self.app.pool.map(drill_path_task, list(jobs.values()))
+            else:
+                results = [drill_path_task(job) for job in jobs.values()]
+
+            if self.app.abort_flag:
+                # graceful abort requested by the user
+                raise grace
+
+            for key, (optimized_path, lengths) in zip(jobs.keys(), results):
+                if lengths is not None:
+                    log.debug("Native drill path optimization for %d locations. Path length: %.4f -> %.4f" %
+                              (len(optimized_path), lengths[0], lengths[1]))
+                    self.app.inform.emit('%s: %s -> %s %s' % (
+                        _("Drill path length"),
+                        str(self.app.dec_format(lengths[0], self.decimals)),
+                        str(self.app.dec_format(lengths[1], self.decimals)),
+                        str(self.units).lower()))
+
+                found[key] = optimized_path
+                self.drill_order_cache[key] = optimized_path
+                while len(self.drill_order_cache) > self.drill_order_cache_size:
+                    self.drill_order_cache.popitem(last=False)
+
+        return [found[key] for key in keys]
+
+    @staticmethod
+    def orient_path(optimized_path, locations, start):
+        """
+        Reverses an open path when its last location is closer to the start point than the first one.
+
+        :param optimized_path:  list of locations indexes
+        :param locations:       list of (x, y) locations
+        :param start:           the (x, y) point where the path starts
+        :return:                the path, reversed if it is the case
+        """
+        if len(optimized_path) > 1 and \
+                distance(start, locations[optimized_path[-1]]) < distance(start, locations[optimized_path[0]]):
+            return optimized_path[::-1]
+        return optimized_path
+
     def geo_optimized_rtree(self, geometry):
         locations = []
 
         # ## Index first and last points in paths. What points to index.
-        def get_pts(o):
-            return [o.coords[0], o.coords[-1]]
-
         # Create the indexed storage.
-        storage = FlatCAMRTreeStorage()
-        storage.get_points = get_pts
+        storage = FlatCAMEndpointStorage()
 
         # Store the geometry
         log.debug("Indexing geometry before generating G-Code...")
@@ -3116,12 +3352,13 @@ class CNCjob(Geometry):
 
     # used in Tool Drilling
     def excellon_tool_gcode_gen(self, tool, points, tools, first_pt, is_first=False, is_last=False, opt_type='T',
-                                toolchange=False):
+                                toolchange=False, optimized_order=None):
         """
         Creates Gcode for this object from an Excellon object
         for the specified tools.
 
-
+        :param optimized_order: the drill order calculated in advance with drill_orders(), for all the tools at once;
+                                if None it is calculated here
 
         :return:            A tuple made from tool_gcode,  another tuple holding the coordinates of the last point
                             and the start gcode
@@ -3129,8 +3366,10 @@ class CNCjob(Geometry):
         """
         log.debug("Creating CNC Job from Excellon for tool: %s" % str(tool))
 
-        self.exc_tools = deepcopy(tools)
-        t_gcode = ''
+        if tools is not self.exc_tools_source:
+            self.exc_tools = deepcopy(tools)
+            self.exc_tools_source = tools
+        t_gcode = GCodeSink()
 
         # holds the temporary coordinates of the processed drill point
         locx, locy = first_pt
@@ -3147,6 +3386,8 @@ class CNCjob(Geometry):
             log.debug("Using OR-Tools Basic drill path optimization.")
         elif opt_type == 'T':
             log.debug("Using Travelling Salesman drill path optimization.")
+        elif opt_type == 'N':
+            log.debug("Using Native drill path optimization.")
         else:
             log.debug("Using no path optimization.")
 
@@ -3255,37 +3496,18 @@ class CNCjob(Geometry):
         # #########################################################################################################
         # ############ Create the data. ###########################################################################
         # #########################################################################################################
-        locations = []
-        optimized_path = []
+        locations = self.create_tool_data_array(points=points)
+        # if there are no locations then go to the next tool
+        if not locations:
+            return 'fail'
 
-        if opt_type == 'M':
-            locations = self.create_tool_data_array(points=points)
-            # if there are no locations then go to the next tool
-            if not locations:
-                return 'fail'
-            opt_time = self.app.defaults["excellon_search_time"]
-            optimized_path = self.optimized_ortools_meta(locations=locations, opt_time=opt_time)
-        elif opt_type == 'B':
-            locations = self.create_tool_data_array(points=points)
-            # if there are no locations then go to the next tool
-            if not locations:
-                return 'fail'
-            optimized_path = self.optimized_ortools_basic(locations=locations)
-        elif opt_type == 'T':
-            locations = self.create_tool_data_array(points=points)
-            # if there are no locations then go to the next tool
-            if not locations:
-                return 'fail'
-            optimized_path = self.optimized_travelling_salesman(locations)
+        if optimized_order is None:
+            optimized_order = self.drill_orders([locations], opt_type, start=first_pt,
+                                                opt_time=self.app.defaults["excellon_search_time"])[0]
+        if opt_type == 'N':
+            optimized_path = self.orient_path(optimized_order, locations, first_pt)
         else:
-            # it's actually not optimized path but here we build a list of (x,y) coordinates
-            # out of the tool's drills
-            for drill in tools[tool]['drills']:
-                unoptimized_coords = (
-                    drill.x,
-                    drill.y
-                )
-                optimized_path.append(unoptimized_coords)
+            optimized_path = optimized_order
         # #########################################################################################################
         # #########################################################################################################
 
@@ -3344,13 +3566,8 @@ class CNCjob(Geometry):
                     # graceful abort requested by the user
                     raise grace
 
-                # if we use Traveling Salesman Algorithm as an optimization
-                if opt_type == 'T':
-                    locx = point[0]
-                    locy = point[1]
-                else:
-                    locx = locations[point][0]
-                    locy = locations[point][1]
+                locx = locations[point][0]
+                locy = locations[point][1]
 
                 travels = self.app.exc_areas.travel_coordinates(start_point=(temp_locx, temp_locy),
                                                                 end_point=(locx, locy),
@@ -3450,7 +3667,7 @@ class CNCjob(Geometry):
             t_gcode += self.doformat(p.end_code, x=0, y=0)
 
         self.app.inform.emit('%s %s' % (_("Finished G-Code generation for tool:"), str(tool)))
-        return t_gcode, (locx, locy), start_gcode
+        return t_gcode.getvalue(), (locx, locy), start_gcode
 
     # used in Geometry (and soon in Tool Milling)
     def geometry_tool_gcode_gen(self, tool, tools, first_pt, tolerance, is_first=False, is_last=False,
@@ -3478,7 +3695,7 @@ class CNCjob(Geometry):
 
         log.debug("geometry_tool_gcode_gen()")
 
-        t_gcode = ''
+        t_gcode = GCodeSink()
         temp_solid_geometry = []
 
         # The Geometry from which we create GCode
@@ -3824,7 +4041,7 @@ class CNCjob(Geometry):
                 '%s... %s %s.' % (_("Finished G-Code generation"), str(path_count), _("paths traced"))
             )
 
-        self.gcode = t_gcode
+        self.gcode = t_gcode.getvalue()
         return self.gcode, start_gcode
 
     # used by the Tcl command Drillcncjob
@@ -4035,7 +4252,7 @@ class CNCjob(Geometry):
         # Initialization
         # #############################################################################################################
         # #############################################################################################################
-        gcode = ''
+        gcode = GCodeSink()
         start_gcode = ''
         if is_first:
             start_gcode = self.doformat(p.start_code)
@@ -4082,9 +4299,8 @@ class CNCjob(Geometry):
             return 'fail'
 
         current_platform = platform.architecture()[0]
-        if current_platform == '64bit':
-            used_excellon_optimization_type = self.excellon_optimization_type
-        else:
+        used_excellon_optimization_type = self.excellon_optimization_type
+        if current_platform != '64bit' and used_excellon_optimization_type in ['M', 'B']:
             used_excellon_optimization_type = 'T'
 
         # #############################################################################################################
@@ -4098,10 +4314,22 @@ class CNCjob(Geometry):
             log.debug("Using OR-Tools Basic drill path optimization.")
         elif used_excellon_optimization_type == 'T':
             log.debug("Using Travelling Salesman drill path optimization.")
+        elif used_excellon_optimization_type == 'N':
+            log.debug("Using Native drill path optimization.")
         else:
             log.debug("Using no path optimization.")
 
         if self.toolchange is True:
+            # the native optimization of the tools paths is done in advance, all the tools at once
+            # the drill orders of all the tools are calculated in advance, in parallel
+            drill_tools = [tool for tool in tools if self.exc_tools[tool]['drills'] and points.get(tool)]
+            tools_locations = {tool: self.create_tool_data_array(points=points[tool]) for tool in drill_tools}
+            drill_paths = dict(zip(drill_tools, self.drill_orders(
+                [tools_locations[tool] for tool in drill_tools],
+                used_excellon_optimization_type,
+                start=(self.oldx, self.oldy),
+                opt_time=self.app.defaults["excellon_search_time"])))
+
             for tool in tools:
                 # check if it has drills
                 if not self.exc_tools[tool]['drills']:
@@ -4153,38 +4381,14 @@ class CNCjob(Geometry):
                 # #########################################################################################################
                 # ############ Create the data. #################
                 # #########################################################################################################
-                locations = []
-                altPoints = []
-                optimized_path = []
-
-                if used_excellon_optimization_type == 'M':
-                    if tool in points:
-                        locations = self.create_tool_data_array(points=points[tool])
-                    # if there are no locations then go to the next tool
-                    if not locations:
-                        continue
-                    opt_time = self.app.defaults["excellon_search_time"]
-                    optimized_path = self.optimized_ortools_meta(locations=locations, opt_time=opt_time)
-                elif used_excellon_optimization_type == 'B':
-                    if tool in points:
-                        locations = self.create_tool_data_array(points=points[tool])
-                    # if there are no locations then go to the next tool
-                    if not locations:
-                        continue
-                    optimized_path = self.optimized_ortools_basic(locations=locations)
-                elif used_excellon_optimization_type == 'T':
-                    for point in points[tool]:
-                        altPoints.append((point.coords.xy[0][0], point.coords.xy[1][0]))
-                    optimized_path = self.optimized_travelling_salesman(altPoints)
+                # if there are no locations then go to the next tool
+                if tool not in drill_paths:
+                    continue
+                locations = tools_locations[tool]
+                if used_excellon_optimization_type == 'N':
+                    optimized_path = self.orient_path(drill_paths[tool], locations, (self.oldx, self.oldy))
                 else:
-                    # it's actually not optimized path but here we build a list of (x,y) coordinates
-                    # out of the tool's drills
-                    for drill in self.exc_tools[tool]['drills']:
-                        unoptimized_coords = (
-                            drill.x,
-                            drill.y
-                        )
-                        optimized_path.append(unoptimized_coords)
+                    optimized_path = drill_paths[tool]
                 # #########################################################################################################
                 # #########################################################################################################
 
@@ -4238,12 +4442,8 @@ class CNCjob(Geometry):
                             # graceful abort requested by the user
                             raise grace
 
-                        if used_excellon_optimization_type == 'T':
-                            locx = point[0]
-                            locy = point[1]
-                        else:
-                            locx = locations[point][0]
-                            locy = locations[point][1]
+                        locx = locations[point][0]
+                        locy = locations[point][1]
 
                         travels = self.app.exc_areas.travel_coordinates(start_point=(self.oldx, self.oldy),
                                                                         end_point=(locx, locy),
@@ -4389,38 +4589,15 @@ class CNCjob(Geometry):
             # #########################################################################################################
             # ############ Create the data. #################
             # #########################################################################################################
-            locations = []
-            altPoints = []
-            optimized_path = []
-
-            if used_excellon_optimization_type == 'M':
-                if all_points:
-                    locations = self.create_tool_data_array(points=all_points)
-                # if there are no locations then go to the next tool
-                if not locations:
-                    return 'fail'
-                opt_time = self.app.defaults["excellon_search_time"]
-                optimized_path = self.optimized_ortools_meta(locations=locations, opt_time=opt_time)
-            elif used_excellon_optimization_type == 'B':
-                if all_points:
-                    locations = self.create_tool_data_array(points=all_points)
-                # if there are no locations then go to the next tool
-                if not locations:
-                    return 'fail'
-                optimized_path = self.optimized_ortools_basic(locations=locations)
-            elif used_excellon_optimization_type == 'T':
-                for point in all_points:
-                    altPoints.append((point.coords.xy[0][0], point.coords.xy[1][0]))
-                optimized_path = self.optimized_travelling_salesman(altPoints)
-            else:
-                # it's actually not optimized path but here we build a list of (x,y) coordinates
-                # out of the tool's drills
-                for pt in all_points:
-                    unoptimized_coords = (
-                        pt.x,
-                        pt.y
-                    )
-                    optimized_path.append(unoptimized_coords)
+            locations = self.create_tool_data_array(points=all_points) if all_points else []
+            # if there are no locations then go to the next tool
+            if not locations:
+                return 'fail'
+            optimized_path = self.drill_orders([locations], used_excellon_optimization_type,
+                                               start=(self.oldx, self.oldy),
+                                               opt_time=self.app.defaults["excellon_search_time"])[0]
+            if used_excellon_optimization_type == 'N':
+                optimized_path = self.orient_path(optimized_path, locations, (self.oldx, self.oldy))
             # #########################################################################################################
             # #########################################################################################################
 
@@ -4471,12 +4648,8 @@ class CNCjob(Geometry):
                         # graceful abort requested by the user
                         raise grace
 
-                    if used_excellon_optimization_type == 'T':
-                        locx = point[0]
-                        locy = point[1]
-                    else:
-                        locx = locations[point][0]
-                        locy = locations[point][1]
+                    locx = locations[point][0]
+                    locy = locations[point][1]
 
                     travels = self.app.exc_areas.travel_coordinates(start_point=(self.oldx, self.oldy),
                                                                     end_point=(locx, locy),
@@ -4572,6 +4745,8 @@ class CNCjob(Geometry):
             log.debug("The total travel distance with OR-TOOLS Basic Algorithm is: %s" % str(measured_distance))
         elif used_excellon_optimization_type == 'T':
             log.debug("The total travel distance with Travelling Salesman Algorithm is: %s" % str(measured_distance))
+        elif used_excellon_optimization_type == 'N':
+            log.debug("The total travel distance with Native optimization is: %s" % str(measured_distance))
         else:
             log.debug("The total travel distance with with no optimization is: %s" % str(measured_distance))
 
@@ -5214,10 +5389,10 @@ class CNCjob(Geometry):
         # #############################################################################################################
         # ############################# Store the GCODE for further usage ############################################
         # #############################################################################################################
-        self.gcode = gcode
+        self.gcode = gcode.getvalue()
 
         self.app.inform.emit('%s ...' % _("Finished G-Code generation"))
-        return gcode, start_gcode
+        return self.gcode, start_gcode
 
     # no longer used
     def generate_from_multitool_geometry(self, geometry, append=True, tooldia=None, offset=0.0, tolerance=0, z_cut=1.0,
@@ -5392,12 +5567,8 @@ class CNCjob(Geometry):
 
         # ## Index first and last points in paths
         # What points to index.
-        def get_pts(o):
-            return [o.coords[0], o.coords[-1]]
-
         # Create the indexed storage.
-        storage = FlatCAMRTreeStorage()
-        storage.get_points = get_pts
+        storage = FlatCAMEndpointStorage()
 
         # Store the geometry
         log.debug("Indexing geometry before generating G-Code...")
@@ -5427,35 +5598,35 @@ class CNCjob(Geometry):
         self.pp_geometry = self.app.preprocessors[self.pp_geometry_name]
         p = self.pp_geometry
 
-        self.gcode = self.doformat(p.start_code)
+        gcode = GCodeSink(self.doformat(p.start_code))
 
-        self.gcode += self.doformat(p.feedrate_code)  # sets the feed rate
+        gcode += self.doformat(p.feedrate_code)  # sets the feed rate
 
         if toolchange is False:
-            self.gcode += self.doformat(p.lift_code, x=0, y=0)  # Move (up) to travel height
-            self.gcode += self.doformat(p.startz_code, x=0, y=0)
+            gcode += self.doformat(p.lift_code, x=0, y=0)  # Move (up) to travel height
+            gcode += self.doformat(p.startz_code, x=0, y=0)
 
         if toolchange:
             # if "line_xyz" in self.pp_geometry_name:
             #     self.gcode += self.doformat(p.toolchange_code, x=self.xy_toolchange[0], y=self.xy_toolchange[1])
             # else:
             #     self.gcode += self.doformat(p.toolchange_code)
-            self.gcode += self.doformat(p.toolchange_code)
+            gcode += self.doformat(p.toolchange_code)
 
             if 'laser' not in self.pp_geometry_name:
-                self.gcode += self.doformat(p.spindle_code)  # Spindle start
+                gcode += self.doformat(p.spindle_code)  # Spindle start
             else:
                 # for laser this will disable the laser
-                self.gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
+                gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
 
             if self.dwell is True:
-                self.gcode += self.doformat(p.dwell_code)  # Dwell time
+                gcode += self.doformat(p.dwell_code)  # Dwell time
         else:
             if 'laser' not in self.pp_geometry_name:
-                self.gcode += self.doformat(p.spindle_code)  # Spindle start
+                gcode += self.doformat(p.spindle_code)  # Spindle start
 
             if self.dwell is True:
-                self.gcode += self.doformat(p.dwell_code)  # Dwell time
+                gcode += self.doformat(p.dwell_code)  # Dwell time
 
         total_travel = 0.0
         total_cut = 0.0
@@ -5503,8 +5674,8 @@ class CNCjob(Geometry):
                     # calculate the cut distance
                     total_cut = total_cut + geo.length
 
-                    self.gcode += self.create_gcode_single_pass(geo, current_tooldia, extracut, extracut_length,
-                                                                tolerance, z_move=z_move, old_point=current_pt)
+                    gcode += self.create_gcode_single_pass(geo, current_tooldia, extracut, extracut_length,
+                                                           tolerance, z_move=z_move, old_point=current_pt)
 
                 # --------- Multi-pass ---------
                 else:
@@ -5521,7 +5692,7 @@ class CNCjob(Geometry):
                     gc, geo = self.create_gcode_multi_pass(geo, current_tooldia, extracut, extracut_length,
                                                            tolerance,  z_move=z_move, postproc=p,
                                                            old_point=current_pt)
-                    self.gcode += gc
+                    gcode += gc
 
                 # calculate the total distance
                 total_travel = total_travel + abs(distance(pt1=current_pt, pt2=pt))
@@ -5544,12 +5715,13 @@ class CNCjob(Geometry):
         self.routing_time += total_cut / self.feedrate
 
         # Finish
-        self.gcode += self.doformat(p.spindle_stop_code)
-        self.gcode += self.doformat(p.lift_code, x=current_pt[0], y=current_pt[1])
-        self.gcode += self.doformat(p.end_code, x=0, y=0)
+        gcode += self.doformat(p.spindle_stop_code)
+        gcode += self.doformat(p.lift_code, x=current_pt[0], y=current_pt[1])
+        gcode += self.doformat(p.end_code, x=0, y=0)
         self.app.inform.emit(
             '%s... %s %s.' % (_("Finished G-Code generation"), str(path_count), _("paths traced"))
         )
+        self.gcode = gcode.getvalue()
         return self.gcode
 
     def generate_from_geometry_2(self, geometry, append=True, tooldia=None, offset=0.0, tolerance=0, z_cut=None,
@@ -5792,12 +5964,8 @@ class CNCjob(Geometry):
 
         # ## Index first and last points in paths
         # What points to index.
-        def get_pts(o):
-            return [o.coords[0], o.coords[-1]]
-
         # Create the indexed storage.
-        storage = FlatCAMRTreeStorage()
-        storage.get_points = get_pts
+        storage = FlatCAMEndpointStorage()
 
         # Store the geometry
         log.debug("Indexing geometry before generating G-Code...")
@@ -5837,34 +6005,35 @@ class CNCjob(Geometry):
             start_gcode = self.doformat(p.start_code)
 
         # self.gcode = self.doformat(p.start_code)
-        self.gcode += self.doformat(p.feedrate_code)  # sets the feed rate
+        gcode = GCodeSink(self.gcode)
+        gcode += self.doformat(p.feedrate_code)  # sets the feed rate
 
         if toolchange is False:
             # all the x and y parameters in self.doformat() are used only by some preprocessors not by all
-            self.gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
-            self.gcode += self.doformat(p.startz_code, x=self.oldx, y=self.oldy)
+            gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
+            gcode += self.doformat(p.startz_code, x=self.oldx, y=self.oldy)
 
         if toolchange:
             # if "line_xyz" in self.pp_geometry_name:
             #     self.gcode += self.doformat(p.toolchange_code, x=self.xy_toolchange[0], y=self.xy_toolchange[1])
             # else:
             #     self.gcode += self.doformat(p.toolchange_code)
-            self.gcode += self.doformat(p.toolchange_code)
+            gcode += self.doformat(p.toolchange_code)
 
             if 'laser' not in self.pp_geometry_name:
-                self.gcode += self.doformat(p.spindle_code)  # Spindle start
+                gcode += self.doformat(p.spindle_code)  # Spindle start
             else:
                 # for laser this will disable the laser
-                self.gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
+                gcode += self.doformat(p.lift_code, x=self.oldx, y=self.oldy)  # Move (up) to travel height
 
             if self.dwell is True:
-                self.gcode += self.doformat(p.dwell_code)  # Dwell time
+                gcode += self.doformat(p.dwell_code)  # Dwell time
         else:
             if 'laser' not in self.pp_geometry_name:
-                self.gcode += self.doformat(p.spindle_code)  # Spindle start
+                gcode += self.doformat(p.spindle_code)  # Spindle start
 
             if self.dwell is True:
-                self.gcode += self.doformat(p.dwell_code)  # Dwell time
+                gcode += self.doformat(p.dwell_code)  # Dwell time
 
         total_travel = 0.0
         total_cut = 0.0
@@ -5912,8 +6081,8 @@ class CNCjob(Geometry):
                 if not multidepth:
                     # calculate the cut distance
                     total_cut += geo.length
-                    self.gcode += self.create_gcode_single_pass(geo, current_tooldia, extracut, self.extracut_length,
-                                                                tolerance, z_move=z_move, old_point=current_pt)
+                    gcode += self.create_gcode_single_pass(geo, current_tooldia, extracut, self.extracut_length,
+                                                           tolerance, z_move=z_move, old_point=current_pt)
 
                 # --------- Multi-pass ---------
                 else:
@@ -5930,7 +6099,7 @@ class CNCjob(Geometry):
                     gc, geo = self.create_gcode_multi_pass(geo, current_tooldia, extracut, self.extracut_length,
                                                            tolerance, z_move=z_move, postproc=p,
                                                            old_point=current_pt)
-                    self.gcode += gc
+                    gcode += gc
 
                 # calculate the travel distance
                 total_travel += abs(distance(pt1=current_pt, pt2=pt))
@@ -5954,13 +6123,14 @@ class CNCjob(Geometry):
         self.routing_time += total_cut / self.feedrate
 
         # Finish
-        self.gcode += self.doformat(p.spindle_stop_code)
-        self.gcode += self.doformat(p.lift_code, x=current_pt[0], y=current_pt[1])
-        self.gcode += self.doformat(p.end_code, x=0, y=0)
+        gcode += self.doformat(p.spindle_stop_code)
+        gcode += self.doformat(p.lift_code, x=current_pt[0], y=current_pt[1])
+        gcode += self.doformat(p.end_code, x=0, y=0)
         self.app.inform.emit(
             '%s... %s %s.' % (_("Finished G-Code generation"), str(path_count), _("paths traced"))
         )
 
+        self.gcode = gcode.getvalue()
         return self.gcode, start_gcode
 
     def generate_gcode_from_solderpaste_geo(self, **kwargs):
@@ -5976,11 +6146,6 @@ class CNCjob(Geometry):
 
         log.debug("Generate_from_solderpaste_geometry()")
 
-        # ## Index first and last points in paths
-        # What points to index.
-        def get_pts(o):
-            return [o.coords[0], o.coords[-1]]
-
         self.gcode = ""
 
         if not kwargs:
@@ -6016,9 +6181,8 @@ class CNCjob(Geometry):
         flat_geometry = self.flatten(kwargs['solid_geometry'], pathonly=True)
         log.debug("%d paths" % len(flat_geometry))
 
-        # Create the indexed storage.
-        storage = FlatCAMRTreeStorage()
-        storage.get_points = get_pts
+        # Create the indexed storage. Index first and last points in paths
+        storage = FlatCAMEndpointStorage()
 
         # Store the geometry
         log.debug("Indexing geometry before generating G-Code...")
@@ -6031,9 +6195,9 @@ class CNCjob(Geometry):
                 storage.insert(geo_shape)
 
         # Initial G-Code
-        self.gcode = self.doformat(p.start_code)
-        self.gcode += self.doformat(p.spindle_off_code)
-        self.gcode += self.doformat(p.toolchange_code)
+        gcode = GCodeSink(self.doformat(p.start_code))
+        gcode += self.doformat(p.spindle_off_code)
+        gcode += self.doformat(p.toolchange_code)
 
         # ## Iterate over geometry paths getting the nearest each time.
         log.debug("Starting SolderPaste G-Code...")
@@ -6063,7 +6227,7 @@ class CNCjob(Geometry):
                     # geo.coords = list(geo.coords)[::-1] # Shapely 2.0
                     geo = LineString(list(geo.coords)[::-1])
 
-                self.gcode += self.create_soldepaste_gcode(geo, p=p, old_point=current_pt)
+                gcode += self.create_soldepaste_gcode(geo, p=p, old_point=current_pt)
                 current_pt = geo.coords[-1]
                 pt, geo = storage.nearest(current_pt)  # Next
 
@@ -6080,13 +6244,14 @@ class CNCjob(Geometry):
         )
 
         # Finish
-        self.gcode += self.doformat(p.lift_code)
-        self.gcode += self.doformat(p.end_code)
+        gcode += self.doformat(p.lift_code)
+        gcode += self.doformat(p.end_code)
 
+        self.gcode = gcode.getvalue()
         return self.gcode
 
     def create_soldepaste_gcode(self, geometry, p, old_point=(0, 0)):
-        gcode = ''
+        gcode = GCodeSink()
         path = geometry.coords
 
         self.coordinates_type = self.app.defaults["cncjob_coords_type"]
@@ -6152,7 +6317,7 @@ class CNCjob(Geometry):
             gcode += self.doformat(p.dwell_rev_code)
             gcode += self.doformat(p.z_feedrate_code)
             gcode += self.doformat(p.lift_code)
-        return gcode
+        return gcode.getvalue()
 
     def create_gcode_single_pass(self, geometry, cdia, extracut, extracut_length, tolerance, z_move, old_point=(0, 0)):
         """
@@ -6218,7 +6383,7 @@ class CNCjob(Geometry):
         """
         p = postproc
 
-        gcode_multi_pass = ''
+        gcode_multi_pass = GCodeSink()
 
         if isinstance(self.z_cut, Decimal):
             z_cut = self.z_cut
@@ -6271,36 +6436,63 @@ class CNCjob(Geometry):
 
         # Lift the tool
         gcode_multi_pass += self.doformat(p.lift_code, x=old_point[0], y=old_point[1])
-        return gcode_multi_pass, geometry
+        return gcode_multi_pass.getvalue(), geometry
+
+    def gcode_flavor(self):
+        """
+        The way the G-Code lines are split in codes depends on the preprocessor used to make them.
+
+        :return:    "roland", "hpgl", "laser", "paste" or "generic"
+        :rtype:     str
+        """
+        if 'Roland' in self.pp_excellon_name or 'Roland' in self.pp_geometry_name:
+            return 'roland'
+        if 'hpgl' in self.pp_excellon_name or 'hpgl' in self.pp_geometry_name:
+            return 'hpgl'
+        if 'laser' in self.pp_excellon_name.lower() or 'laser' in self.pp_geometry_name.lower() or \
+                (self.pp_solderpaste_name is not None and 'paste' in self.pp_solderpaste_name.lower()):
+            return 'laser'
+        if self.pp_solderpaste_name is not None:
+            return 'paste'
+        return 'generic'
 
-    def codes_split(self, gline):
+    def codes_split(self, gline, flavor=None):
         """
         Parses a line of G-Code such as "G01 X1234 Y987" into
         a dictionary: {'G': 1.0, 'X': 1234.0, 'Y': 987.0}
 
         :param gline:       G-Code line string
         :type gline:        str
+        :param flavor:      as returned by gcode_flavor(); if None it is found here
+        :type flavor:       str
         :return:            Dictionary with parsed line.
         :rtype:             dict
         """
 
         command = {}
 
-        if 'Roland' in self.pp_excellon_name or 'Roland' in self.pp_geometry_name:
-            match_z = re.search(r"^Z(\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?)*;$", gline)
+        if flavor is None:
+            flavor = self.gcode_flavor()
+
+        if flavor == 'generic':
+            for code, value in self.re_gcode_word.findall(self.re_gcode_words.match(gline).group()):
+                command[code] = float(value.replace(" ", ""))
+
+        elif flavor == 'roland':
+            match_z = self.re_roland_z.search(gline)
             if match_z:
                 command['G'] = 0
                 command['X'] = float(match_z.group(1).replace(" ", "")) * 0.025
                 command['Y'] = float(match_z.group(2).replace(" ", "")) * 0.025
                 command['Z'] = float(match_z.group(3).replace(" ", "")) * 0.025
 
-        elif 'hpgl' in self.pp_excellon_name or 'hpgl' in self.pp_geometry_name:
-            match_pa = re.search(r"^PA(\s*-?\d+\.\d+?),(\s*\s*-?\d+\.\d+?)*;$", gline)
+        elif flavor == 'hpgl':
+            match_pa = self.re_hpgl_pa.search(gline)
             if match_pa:
                 command['G'] = 0
                 command['X'] = float(match_pa.group(1).replace(" ", "")) / 40
                 command['Y'] = float(match_pa.group(2).replace(" ", "")) / 40
-            match_pen = re.search(r"^(P[U|D])", gline)
+            match_pen = self.re_hpgl_pen.search(gline)
             if match_pen:
                 if match_pen.group(1) == 'PU':
                     # the value does not matter, only that it is positive so the gcode_parse() know it is > 0,
@@ -6309,14 +6501,13 @@ class CNCjob(Geometry):
                 else:
                     command['Z'] = 0
 
-        elif 'laser' in self.pp_excellon_name.lower() or 'laser' in self.pp_geometry_name.lower() or \
-                (self.pp_solderpaste_name is not None and 'paste' in self.pp_solderpaste_name.lower()):
-            match_lsr = re.search(r"X([\+-]?\d+.[\+-]?\d+)\s*Y([\+-]?\d+.[\+-]?\d+)", gline)
+        elif flavor == 'laser':
+            match_lsr = self.re_laser_xy.search(gline)
             if match_lsr:
                 command['X'] = float(match_lsr.group(1).replace(" ", ""))
                 command['Y'] = float(match_lsr.group(2).replace(" ", ""))
 
-            match_lsr_pos = re.search(r"^(M0?[3-5])", gline)
+            match_lsr_pos = self.re_laser_pos.search(gline)
             if match_lsr_pos:
                 if 'M05' in match_lsr_pos.group(1) or 'M5' in match_lsr_pos.group(1):
                     # the value does not matter, only that it is positive so the gcode_parse() know it is > 0,
@@ -6325,207 +6516,219 @@ class CNCjob(Geometry):
                 else:
                     command['Z'] = 0
 
-            match_lsr_pos_2 = re.search(r"^(M10[6|7])", gline)
+            match_lsr_pos_2 = self.re_laser_pos_2.search(gline)
             if match_lsr_pos_2:
                 if 'M107' in match_lsr_pos_2.group(1):
                     command['Z'] = 1
                 else:
                     command['Z'] = 0
-        elif self.pp_solderpaste_name is not None:
+
+        elif flavor == 'paste':
             if 'Paste' in self.pp_solderpaste_name:
-                match_paste = re.search(r"X([\+-]?\d+.[\+-]?\d+)\s*Y([\+-]?\d+.[\+-]?\d+)", gline)
+                match_paste = self.re_laser_xy.search(gline)
                 if match_paste:
                     command['X'] = float(match_paste.group(1).replace(" ", ""))
                     command['Y'] = float(match_paste.group(2).replace(" ", ""))
-        else:
-            match = re.search(r'^\s*([A-Z])\s*([\+\-\.\d\s]+)', gline)
-            while match:
-                command[match.group(1)] = float(match.group(2).replace(" ", ""))
-                gline = gline[match.end():]
-                match = re.search(r'^\s*([A-Z])\s*([\+\-\.\d\s]+)', gline)
         return command
 
-    def gcode_parse(self, force_parsing=None):
+    def gcode_toolpath_parse(self, lines, start_pt=(0, 0), force_parsing=None, hole_dia=None):
         """
-        G-Code parser (from self.gcode). Generates dictionary with
-        single-segment LineString's and "kind" indicating cut or travel,
-        fast or feedrate speed.
+        Parses G-Code lines in a GCodeToolpath. The lines are read one at a time so they can come from a file or
+        from a StringIO. Used by gcode_parse() and excellon_tool_gcode_parse().
 
-        Will return a list of dict in the format:
-        {
-            "geom": LineString(path),
-            "kind": kind
-        }
-        where kind can be either ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
+        A path is stored each time the height changes; the kind of the path is the kind of its last move: "T"
+        (travel) if Z > 0 else "C" (cut) and "S" (slow) if the last G code is > 0 else "F" (fast).
 
-        :param force_parsing:
-        :type force_parsing:
-        :return:
-        :rtype:                 dict
-        """
+        :param lines:           iterable of G-Code lines
+        :type lines:            iterable
+        :param start_pt:        the point coordinates from where to start the parsing
+        :type start_pt:         tuple
+        :param force_parsing:   if not True the parsing fails on the lines with Gerber content
+        :type force_parsing:    bool
+        :param hole_dia:        function (x, y) -> diameter of the hole made by a plunge (Z < 0) at those coordinates
+                                or None if there is no hole there; if None no holes are added
+        :type hole_dia:         callable
+        :return:                the toolpath or "fail"
+        :rtype:                 GCodeToolpath
+        """
+        flavor = self.gcode_flavor()
+
+        # the non orthogonal moves are not checked for these
+        check_orthogonal = not (
+            'Roland' in self.pp_excellon_name or 'Roland' in self.pp_geometry_name or
+            'hpgl' in self.pp_excellon_name or 'hpgl' in self.pp_geometry_name or
+            'laser' in self.pp_excellon_name or 'laser' in self.pp_geometry_name or
+            self.pp_geometry_name == 'line_xyz' or self.pp_excellon_name == 'line_xyz'
+        )
+        arcdir = [None, None, "cw", "ccw"]
 
-        kind = ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
+        toolpath = GCodeToolpath()
+        kind = 0  # cut, fast
+        travel, slow = GCodeToolpath.TRAVEL, GCodeToolpath.SLOW
 
-        # Results go here
-        geometry = []
+        # local names for the calls done for each line
+        add_move = toolpath._moves.extend
+        codes_split = self.codes_split
+        generic = flavor == 'generic'
+        match_words = self.re_gcode_words.match
+        find_words = self.re_gcode_word.findall
 
         # Last known instruction
         current = {'X': 0.0, 'Y': 0.0, 'Z': 0.0, 'G': 0}
 
-        # Current path: temporary storage until tool is
-        # lifted or lowered.
-        if self.toolchange_xy_type == "excellon":
-            if self.app.defaults["tools_drill_toolchangexy"] == '' or \
-                    self.app.defaults["tools_drill_toolchangexy"] is None:
-                pos_xy = (0, 0)
-            else:
-                pos_xy = self.app.defaults["tools_drill_toolchangexy"]
-                try:
-                    pos_xy = [float(eval(a)) for a in pos_xy.split(",")]
-                except Exception:
-                    if len(pos_xy) != 2:
-                        pos_xy = (0, 0)
-        else:
-            if self.app.defaults["geometry_toolchangexy"] == '' or self.app.defaults["geometry_toolchangexy"] is None:
-                pos_xy = (0, 0)
-            else:
-                pos_xy = self.app.defaults["geometry_toolchangexy"]
-                try:
-                    pos_xy = [float(eval(a)) for a in pos_xy.split(",")]
-                except Exception:
-                    if len(pos_xy) != 2:
-                        pos_xy = (0, 0)
-
-        path = [pos_xy]
-        # path = [(0, 0)]
-
-        gcode_lines_list = self.gcode.splitlines()
-        self.app.inform.emit('%s: %d' % (_("Parsing GCode file. Number of lines"), len(gcode_lines_list)))
+        # Current path: the moves from path_start to the last one. It is stored when the tool is lifted or lowered.
+        last_pt = (float(start_pt[0]), float(start_pt[1]))
+        toolpath.add_move(last_pt[0], last_pt[1], 0.0, kind, 0.0, 0.0)
+        path_start = 0
 
         # Process every instruction
-        for line in gcode_lines_list:
+        for line in lines:
+            line = line.rstrip('\r\n')
             if force_parsing is False or force_parsing is None:
-                if '%MO' in line or '%' in line or 'MOIN' in line or 'MOMM' in line:
+                if '%' in line or 'MOIN' in line or 'MOMM' in line:
                     return "fail"
 
-            gobj = self.codes_split(line)
+            if generic:
+                # same as codes_split()
+                gobj = {code: float(value.replace(" ", "")) for code, value in find_words(match_words(line).group())}
+            else:
+                gobj = codes_split(line, flavor)
+            if not gobj:
+                continue
 
             # ## Units
             if 'G' in gobj and (gobj['G'] == 20.0 or gobj['G'] == 21.0):
                 self.units = {20.0: "IN", 21.0: "MM"}[gobj['G']]
                 continue
 
-            # TODO take into consideration the tools and update the travel line thickness
-            if 'T' in gobj:
-                pass
-
             # ## Changing height
             if 'Z' in gobj:
-                if 'Roland' in self.pp_excellon_name or 'Roland' in self.pp_geometry_name:
-                    pass
-                elif 'hpgl' in self.pp_excellon_name or 'hpgl' in self.pp_geometry_name:
-                    pass
-                elif 'laser' in self.pp_excellon_name or 'laser' in self.pp_geometry_name:
-                    pass
-                elif ('X' in gobj or 'Y' in gobj) and gobj['Z'] != current['Z']:
-                    if self.pp_geometry_name == 'line_xyz' or self.pp_excellon_name == 'line_xyz':
-                        pass
-                    else:
-                        log.warning("Non-orthogonal motion: From %s" % str(current))
-                        log.warning("  To: %s" % str(gobj))
+                if check_orthogonal and ('X' in gobj or 'Y' in gobj) and gobj['Z'] != current['Z']:
+                    log.warning("Non-orthogonal motion: From %s" % str(current))
+                    log.warning("  To: %s" % str(gobj))
 
                 current['Z'] = gobj['Z']
-                # Store the path into geometry and reset path
-                if len(path) > 1:
-                    geometry.append({"geom": LineString(path),
-                                     "kind": kind})
-                    path = [path[-1]]  # Start with the last point of last path.
+                # Store the path and start a new one from the last point of the stored path
+                if toolpath.nr_moves - path_start > 1:
+                    toolpath.add_path(path_start, kind)
+                    path_start = toolpath.nr_moves
+                    add_move((last_pt[0], last_pt[1], current['Z'], kind, current.get('F', 0.0), current.get('T', 0.0)))
 
                 # create the geometry for the holes created when drilling Excellon drills
-                if self.origin_kind == 'excellon':
-                    if current['Z'] < 0:
-                        current_drill_point_coords = (
-                            float('%.*f' % (self.decimals, current['X'])),
-                            float('%.*f' % (self.decimals, current['Y']))
-                        )
-
-                        # find the drill diameter knowing the drill coordinates
-                        break_loop = False
-                        for tool, tool_dict in self.exc_tools.items():
-                            if 'drills' in tool_dict:
-                                for drill_pt in tool_dict['drills']:
-                                    point_in_dict_coords = (
-                                        float('%.*f' % (self.decimals, drill_pt.x)),
-                                        float('%.*f' % (self.decimals, drill_pt.y))
-                                    )
-                                    if point_in_dict_coords == current_drill_point_coords:
-                                        dia = self.exc_tools[tool]['tooldia']
-                                        kind = ['C', 'F']
-                                        geometry.append(
-                                            {
-                                                "geom": Point(current_drill_point_coords).buffer(dia / 2.0).exterior,
-                                                "kind": kind
-                                            }
-                                        )
-                                        break_loop = True
-                                        break
-                                if break_loop:
-                                    break
+                if hole_dia is not None and current['Z'] < 0:
+                    dia = hole_dia(current['X'], current['Y'])
+                    if dia is not None:
+                        kind = 0
+                        toolpath.add_hole(float('%.*f' % (self.decimals, current['X'])),
+                                          float('%.*f' % (self.decimals, current['Y'])), dia)
 
             if 'G' in gobj:
                 current['G'] = int(gobj['G'])
 
             if 'X' in gobj or 'Y' in gobj:
-                if 'X' in gobj:
-                    x = gobj['X']
-                    # current['X'] = x
-                else:
-                    x = current['X']
-
-                if 'Y' in gobj:
-                    y = gobj['Y']
-                else:
-                    y = current['Y']
-
-                kind = ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
+                x = gobj['X'] if 'X' in gobj else current['X']
+                y = gobj['Y'] if 'Y' in gobj else current['Y']
 
-                if current['Z'] > 0:
-                    kind[0] = 'T'
-                if current['G'] > 0:
-                    kind[1] = 'S'
+                kind = (travel if current['Z'] > 0 else 0) | (slow if current['G'] > 0 else 0)
+                feed = current.get('F', 0.0)
+                tool = current.get('T', 0.0)
 
                 if current['G'] in [0, 1]:  # line
-                    path.append((x, y))
+                    add_move((x, y, current['Z'], kind, feed, tool))
+                    last_pt = (x, y)
 
-                arcdir = [None, None, "cw", "ccw"]
                 if current['G'] in [2, 3]:  # arc
                     center = [gobj['I'] + current['X'], gobj['J'] + current['Y']]
                     radius = np.sqrt(gobj['I'] ** 2 + gobj['J'] ** 2)
                     start = np.arctan2(-gobj['J'], -gobj['I'])
                     stop = np.arctan2(-center[1] + y, -center[0] + x)
-                    path += arc(center, radius, start, stop, arcdir[current['G']], int(self.steps_per_circle))
+                    points = arc_array(center, radius, start, stop, arcdir[int(current['G'])],
+                                       int(self.steps_per_circle))
+                    toolpath.add_moves(points, current['Z'], kind, feed, tool)
+                    last_pt = (points[-1, 0], points[-1, 1])
 
                 current['X'] = x
                 current['Y'] = y
 
             # Update current instruction
-            for code in gobj:
-                current[code] = gobj[code]
+            current.update(gobj)
 
-        self.app.inform.emit('%s...' % _("Creating Geometry from the parsed GCode file. "))
-        # There might not be a change in height at the
-        # end, therefore, see here too if there is
-        # a final path.
-        if len(path) > 1:
-            geometry.append(
-                {
-                    "geom": LineString(path),
-                    "kind": kind
-                }
-            )
+        # There might not be a change in height at the end, therefore, see here too if there is a final path.
+        if toolpath.nr_moves - path_start > 1:
+            toolpath.add_path(path_start, kind)
 
-        self.gcode_parsed = geometry
-        return geometry
+        toolpath.finish()
+        return toolpath
+
+    def gcode_parse(self, force_parsing=None):
+        """
+        G-Code parser (from self.gcode). The result is stored in self.gcode_toolpath and the geometry is made from
+        it only when it is needed: self.gcode_parsed is a list of dict in the format:
+        {
+            "geom": LineString(path),
+            "kind": kind
+        }
+        where kind can be either ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
+
+        :param force_parsing:
+        :type force_parsing:
+        :return:                the parsed G-Code or "fail"
+        :rtype:                 GCodeToolpath
+        """
+
+        # Current path: temporary storage until tool is
+        # lifted or lowered.
+        if self.toolchange_xy_type == "excellon":
+            if self.app.defaults["tools_drill_toolchangexy"] == '' or \
+                    self.app.defaults["tools_drill_toolchangexy"] is None:
+                pos_xy = (0, 0)
+            else:
+                pos_xy = self.app.defaults["tools_drill_toolchangexy"]
+                try:
+                    pos_xy = [float(eval(a)) for a in pos_xy.split(",")]
+                except Exception:
+                    if len(pos_xy) != 2:
+                        pos_xy = (0, 0)
+        else:
+            if self.app.defaults["geometry_toolchangexy"] == '' or self.app.defaults["geometry_toolchangexy"] is None:
+                pos_xy = (0, 0)
+            else:
+                pos_xy = self.app.defaults["geometry_toolchangexy"]
+                try:
+                    pos_xy = [float(eval(a)) for a in pos_xy.split(",")]
+                except Exception:
+                    if len(pos_xy) != 2:
+                        pos_xy = (0, 0)
+
+        # the diameter of the drills, known by their coordinates, for the holes created when drilling Excellon drills
+        hole_dia = None
+        if self.origin_kind == 'excellon':
+            drill_dias = {}
+            for tool, tool_dict in self.exc_tools.items():
+                for drill_pt in tool_dict.get('drills', []):
+                    point_in_dict_coords = (
+                        float('%.*f' % (self.decimals, drill_pt.x)),
+                        float('%.*f' % (self.decimals, drill_pt.y))
+                    )
+                    if point_in_dict_coords not in drill_dias:
+                        drill_dias[point_in_dict_coords] = tool_dict['tooldia']
+
+            def drill_dia(x, y):
+                return drill_dias.get((float('%.*f' % (self.decimals, x)), float('%.*f' % (self.decimals, y))))
+
+            hole_dia = drill_dia
+
+        self.app.inform.emit('%s: %d' % (_("Parsing GCode file. Number of lines"), self.gcode.count('\n') + 1))
+
+        toolpath = self.gcode_toolpath_parse(StringIO(self.gcode), start_pt=pos_xy, force_parsing=force_parsing,
+                                             hole_dia=hole_dia)
+        if isinstance(toolpath, str):
+            return toolpath
+
+        self.app.inform.emit('%s...' % _("Creating Geometry from the parsed GCode file. "))
+        self.gcode_parsed = None
+        self.gcode_toolpath = toolpath
+        return toolpath
 
     def excellon_tool_gcode_parse(self, dia, gcode, start_pt=(0, 0), force_parsing=None):
         """
@@ -6552,123 +6755,19 @@ class CNCjob(Geometry):
         :rtype:                 list
         """
 
-        kind = ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
+        self.app.inform.emit(
+            '%s: %s. %s: %d' % (_("Parsing GCode file for tool diameter"),
+                                str(dia), _("Number of lines"),
+                                gcode.count('\n') + 1)
+        )
 
-        # Results go here
-        geometry = []
+        toolpath = self.gcode_toolpath_parse(StringIO(gcode), start_pt=start_pt, force_parsing=force_parsing,
+                                             hole_dia=lambda x, y: dia)
+        if isinstance(toolpath, str):
+            return toolpath
 
-        # Last known instruction
-        current = {'X': 0.0, 'Y': 0.0, 'Z': 0.0, 'G': 0}
-
-        # Current path: temporary storage until tool is
-        # lifted or lowered.
-        pos_xy = start_pt
-
-        path = [pos_xy]
-        # path = [(0, 0)]
-
-        gcode_lines_list = gcode.splitlines()
-        self.app.inform.emit(
-            '%s: %s. %s: %d' % (_("Parsing GCode file for tool diameter"),
-                                str(dia), _("Number of lines"),
-                                len(gcode_lines_list))
-        )
-
-        # Process every instruction
-        for line in gcode_lines_list:
-            if force_parsing is False or force_parsing is None:
-                if '%MO' in line or '%' in line or 'MOIN' in line or 'MOMM' in line:
-                    return "fail"
-
-            gobj = self.codes_split(line)
-
-            # ## Units
-            if 'G' in gobj and (gobj['G'] == 20.0 or gobj['G'] == 21.0):
-                self.units = {20.0: "IN", 21.0: "MM"}[gobj['G']]
-                continue
-
-            # TODO take into consideration the tools and update the travel line thickness
-            if 'T' in gobj:
-                pass
-
-            # ## Changing height
-            if 'Z' in gobj:
-                if 'Roland' in self.pp_excellon_name or 'Roland' in self.pp_geometry_name:
-                    pass
-                elif 'hpgl' in self.pp_excellon_name or 'hpgl' in self.pp_geometry_name:
-                    pass
-                elif 'laser' in self.pp_excellon_name or 'laser' in self.pp_geometry_name:
-                    pass
-                elif ('X' in gobj or 'Y' in gobj) and gobj['Z'] != current['Z']:
-                    if self.pp_geometry_name == 'line_xyz' or self.pp_excellon_name == 'line_xyz':
-                        pass
-                    else:
-                        log.warning("Non-orthogonal motion: From %s" % str(current))
-                        log.warning("  To: %s" % str(gobj))
-
-                current['Z'] = gobj['Z']
-                # Store the path into geometry and reset path
-                if len(path) > 1:
-                    geometry.append({"geom": LineString(path),
-                                     "kind": kind})
-                    path = [path[-1]]  # Start with the last point of last path.
-
-                # create the geometry for the holes created when drilling Excellon drills
-                if current['Z'] < 0:
-                    current_drill_point_coords = (
-                        float('%.*f' % (self.decimals, current['X'])),
-                        float('%.*f' % (self.decimals, current['Y']))
-                    )
-
-                    kind = ['C', 'F']
-                    geometry.append(
-                        {
-                            "geom": Point(current_drill_point_coords).buffer(dia/2.0).exterior,
-                            "kind": kind
-                        }
-                    )
-
-            if 'G' in gobj:
-                current['G'] = int(gobj['G'])
-
-            if 'X' in gobj or 'Y' in gobj:
-                x = gobj['X'] if 'X' in gobj else current['X']
-                y = gobj['Y'] if 'Y' in gobj else current['Y']
-
-                kind = ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
-
-                if current['Z'] > 0:
-                    kind[0] = 'T'
-                if current['G'] > 0:
-                    kind[1] = 'S'
-                if current['G'] in [0, 1]:  # line
-                    path.append((x, y))
-
-                arcdir = [None, None, "cw", "ccw"]
-                if current['G'] in [2, 3]:  # arc
-                    center = [gobj['I'] + current['X'], gobj['J'] + current['Y']]
-                    radius = np.sqrt(gobj['I'] ** 2 + gobj['J'] ** 2)
-                    start = np.arctan2(-gobj['J'], -gobj['I'])
-                    stop = np.arctan2(-center[1] + y, -center[0] + x)
-                    path += arc(center, radius, start, stop, arcdir[current['G']], int(self.steps_per_circle))
-
-                current['X'] = x
-                current['Y'] = y
-
-            # Update current instruction
-            for code in gobj:
-                current[code] = gobj[code]
-
-        self.app.inform.emit('%s: %s' % (_("Creating Geometry from the parsed GCode file for tool diameter"), str(dia)))
-        # There might not be a change in height at the end, therefore, see here too if there is a final path.
-        if len(path) > 1:
-            geometry.append(
-                {
-                    "geom": LineString(path),
-                    "kind": kind
-                }
-            )
-        return geometry
+        self.app.inform.emit('%s: %s' % (_("Creating Geometry from the parsed GCode file for tool diameter"), str(dia)))
+        return toolpath.to_list()
 
     # def plot(self, tooldia=None, dpi=75, margin=0.1,
     #          color={"T": ["#F0E24D", "#B5AB3A"], "C": ["#5E6CFF", "#4650BD"]},
@@ -6741,7 +6840,8 @@ class CNCjob(Geometry):
                 "C": [self.app.defaults["cncjob_plot_fill"], self.app.defaults["cncjob_plot_line"]]
             }
 
-        gcode_parsed = gcode_parsed if gcode_parsed else self.gcode_parsed
+        if not gcode_parsed:
+            gcode_parsed = self.gcode_toolpath if self.gcode_toolpath is not None else self.gcode_parsed
 
         if tooldia is None:
             tooldia = self.tooldia
@@ -6750,57 +6850,76 @@ class CNCjob(Geometry):
         if isinstance(tooldia, list):
             tooldia = tooldia[0] if tooldia[0] is not None else self.tooldia
 
+        # the parsed G-Code in arrays is drawn from the arrays, in batches
+        if isinstance(gcode_parsed, GCodeToolpath) and not gcode_parsed.materialized and \
+                self.app.is_legacy is False and hasattr(obj, 'add_toolpath'):
+            return self.plot_toolpath(gcode_parsed, tooldia=tooldia, color=color, obj=obj, visible=visible, kind=kind,
+                                      tool_tolerance=tool_tolerance)
+
+        # the parsed G-Code in arrays is used directly, the geometry is made only for the plotted entries
+        if isinstance(gcode_parsed, GCodeToolpath) and not gcode_parsed.materialized:
+            kinds = np.where(gcode_parsed.is_travel(), 'T', 'C').tolist()
+            get_geom = gcode_parsed.geometry
+            get_ends = gcode_parsed.end_coords
+        else:
+            kinds = [geo['kind'][0] for geo in gcode_parsed]
+
+            def get_geom(idx):
+                return gcode_parsed[idx]['geom']
+
+            def get_ends(idx):
+                coords = gcode_parsed[idx]['geom'].coords
+                return coords[0], coords[-1]
+
         if tooldia == 0:
-            for geo in gcode_parsed:
+            for idx, geo_kind in enumerate(kinds):
                 if kind == 'all':
-                    obj.add_shape(shape=geo['geom'], color=color[geo['kind'][0]][1], visible=visible)
+                    obj.add_shape(shape=get_geom(idx), color=color[geo_kind][1], visible=visible)
                 elif kind == 'travel':
-                    if geo['kind'][0] == 'T':
-                        obj.add_shape(shape=geo['geom'], color=color['T'][1], visible=visible)
+                    if geo_kind == 'T':
+                        obj.add_shape(shape=get_geom(idx), color=color['T'][1], visible=visible)
                 elif kind == 'cut':
-                    if geo['kind'][0] == 'C':
-                        obj.add_shape(shape=geo['geom'], color=color['C'][1], visible=visible)
+                    if geo_kind == 'C':
+                        obj.add_shape(shape=get_geom(idx), color=color['C'][1], visible=visible)
         else:
             path_num = 0
 
             self.coordinates_type = self.app.defaults["cncjob_coords_type"]
             if self.coordinates_type == "G90":
-                # For Absolute coordinates type G90
-                for geo in gcode_parsed:
-                    if geo['kind'][0] == 'T':
-                        start_position = geo['geom'].coords[0]
-
-                        if tooldia not in obj.annotations_dict:
-                            obj.annotations_dict[tooldia] = {
-                                'pos': [],
-                                'text': []
-                            }
-                        if start_position not in obj.annotations_dict[tooldia]['pos']:
-                            path_num += 1
-                            obj.annotations_dict[tooldia]['pos'].append(start_position)
-                            obj.annotations_dict[tooldia]['text'].append(str(path_num))
-
-                        end_position = geo['geom'].coords[-1]
+                annotated = set(obj.annotations_dict[tooldia]['pos']) if tooldia in obj.annotations_dict else set()
 
-                        if tooldia not in obj.annotations_dict:
-                            obj.annotations_dict[tooldia] = {
-                                'pos': [],
-                                'text': []
-                            }
-                        if end_position not in obj.annotations_dict[tooldia]['pos']:
-                            path_num += 1
-                            obj.annotations_dict[tooldia]['pos'].append(end_position)
-                            obj.annotations_dict[tooldia]['text'].append(str(path_num))
+                # For Absolute coordinates type G90
+                for idx, geo_kind in enumerate(kinds):
+                    if kind == 'travel' and geo_kind != 'T' or kind == 'cut' and geo_kind != 'C':
+                        skip_plot = True
+                    else:
+                        skip_plot = False
+
+                    if geo_kind == 'T':
+                        for position in get_ends(idx):
+                            if position not in annotated:
+                                if tooldia not in obj.annotations_dict:
+                                    obj.annotations_dict[tooldia] = {
+                                        'pos': [],
+                                        'text': []
+                                    }
+                                path_num += 1
+                                annotated.add(position)
+                                obj.annotations_dict[tooldia]['pos'].append(position)
+                                obj.annotations_dict[tooldia]['text'].append(str(path_num))
+
+                    if skip_plot:
+                        continue
 
+                    geom = get_geom(idx)
                     # plot the geometry of Excellon objects
                     if self.origin_kind == 'excellon':
                         try:
                             # if the geos are travel lines
-                            if geo['kind'][0] == 'T':
-                                poly = geo['geom'].buffer(distance=(tooldia / 1.99999999),
-                                                          resolution=self.steps_per_circle)
+                            if geo_kind == 'T':
+                                poly = geom.buffer(distance=(tooldia / 1.99999999), resolution=self.steps_per_circle)
                             else:
-                                poly = Polygon(geo['geom'])
+                                poly = Polygon(geom)
 
                             poly = poly.simplify(tool_tolerance)
                         except Exception:
@@ -6808,24 +6927,102 @@ class CNCjob(Geometry):
                             continue
                     else:
                         # plot the geometry of any objects other than Excellon
-                        poly = geo['geom'].buffer(distance=(tooldia / 1.99999999), resolution=self.steps_per_circle)
+                        poly = geom.buffer(distance=(tooldia / 1.99999999), resolution=self.steps_per_circle)
                         poly = poly.simplify(tool_tolerance)
 
                     if kind == 'all':
-                        obj.add_shape(shape=poly, color=color[geo['kind'][0]][1], face_color=color[geo['kind'][0]][0],
-                                      visible=visible, layer=1 if geo['kind'][0] == 'C' else 2)
+                        obj.add_shape(shape=poly, color=color[geo_kind][1], face_color=color[geo_kind][0],
+                                      visible=visible, layer=1 if geo_kind == 'C' else 2)
                     elif kind == 'travel':
-                        if geo['kind'][0] == 'T':
-                            obj.add_shape(shape=poly, color=color['T'][1], face_color=color['T'][0],
-                                          visible=visible, layer=2)
+                        obj.add_shape(shape=poly, color=color['T'][1], face_color=color['T'][0],
+                                      visible=visible, layer=2)
                     elif kind == 'cut':
-                        if geo['kind'][0] == 'C':
-                            obj.add_shape(shape=poly, color=color['C'][1], face_color=color['C'][0],
-                                          visible=visible, layer=1)
+                        obj.add_shape(shape=poly, color=color['C'][1], face_color=color['C'][0],
+                                      visible=visible, layer=1)
             else:
                 self.app.inform.emit('[ERROR_NOTCL] %s...' % _('G91 coordinates not implemented'))
                 return 'fail'
 
+    def plot_toolpath(self, toolpath, tooldia, color, obj, visible=False, kind='all', tool_tolerance=0.0005):
+        """
+        Plots the G-code parsed in arrays. The paths of each kind (cut or travel) are added to the object as one
+        shape made from the coordinates arrays, drawn with the tool width (or as lines when the tool diameter is
+        zero) with a level of detail that follows the zoom. The drill holes are drawn as circles.
+
+        :param toolpath:            Parsed Gcode
+        :type toolpath:             GCodeToolpath
+        :param tooldia:             Tool diameter.
+        :type tooldia:              float
+        :param color:               Color specification: {"T": [fill, line], "C": [fill, line]}
+        :type color:                dict
+        :param obj:                 The object for which to plot; it has to have the add_toolpath() method
+        :type obj:                  class
+        :param visible:             Visibility status
+        :type visible:              bool
+        :param kind:                Can be: "travel", "cut", "all"
+        :type kind:                 str
+        :param tool_tolerance:      Tolerance when drawing the shapes that are not drawn from the arrays.
+        :type tool_tolerance:       float
+        :return:                    None or 'fail'
+        :rtype:
+        """
+        if tooldia != 0:
+            self.coordinates_type = self.app.defaults["cncjob_coords_type"]
+            if self.coordinates_type != "G90":
+                self.app.inform.emit('[ERROR_NOTCL] %s...' % _('G91 coordinates not implemented'))
+                return 'fail'
+
+        is_travel = toolpath.is_travel()
+        is_hole = (toolpath.kind & GCodeToolpath.HOLE).astype(bool)
+
+        if tooldia != 0:
+            # number the travel ends
+            annotated = set(obj.annotations_dict[tooldia]['pos']) if tooldia in obj.annotations_dict else set()
+            path_num = 0
+            for idx in np.nonzero(is_travel & ~is_hole)[0]:
+                for position in toolpath.end_coords(idx):
+                    if position not in annotated:
+                        if tooldia not in obj.annotations_dict:
+                            obj.annotations_dict[tooldia] = {
+                                'pos': [],
+                                'text': []
+                            }
+                        path_num += 1
+                        annotated.add(position)
+                        obj.annotations_dict[tooldia]['pos'].append(position)
+                        obj.annotations_dict[tooldia]['text'].append(str(path_num))
+
+        for geo_kind, layer in (('C', 1), ('T', 2)):
+            if kind == 'travel' and geo_kind != 'T' or kind == 'cut' and geo_kind != 'C':
+                continue
+
+            of_kind = is_travel if geo_kind == 'T' else ~is_travel
+            paths = np.nonzero(of_kind & ~is_hole)[0]
+            holes = np.nonzero(of_kind & is_hole)[0]
+
+            if tooldia != 0 and self.origin_kind == 'excellon' and geo_kind == 'C':
+                # the cuts of the Excellon objects, other than the holes, are plotted as polygons
+                for idx in paths:
+                    try:
+                        poly = Polygon(toolpath.geometry(idx)).simplify(tool_tolerance)
+                    except Exception:
+                        # deal here with unexpected plot errors due of LineStrings not valid
+                        continue
+                    obj.add_shape(shape=poly, color=color['C'][1], face_color=color['C'][0], visible=visible,
+                                  layer=layer)
+                paths = paths[:0]
+
+            if len(paths) == 0 and len(holes) == 0:
+                continue
+
+            xy, breaks = toolpath.paths_coords(paths)
+            hole_idx = toolpath.start[holes]
+            circles = np.column_stack((toolpath.hole_x[hole_idx], toolpath.hole_y[hole_idx],
+                                       toolpath.hole_dia[hole_idx] / 2.0))
+
+            obj.add_toolpath(xy=xy, breaks=breaks, width=tooldia, circles=circles, visible=visible, layer=layer,
+                             color=color[geo_kind][1], face_color=color[geo_kind][0] if tooldia != 0 else None)
+
     def plot_annotations(self, obj, visible=True):
         """
         Plot annotations.
@@ -6901,7 +7098,10 @@ class CNCjob(Geometry):
         # self.solid_geometry = unary_union([geo['geom'] for geo in self.gcode_parsed])
 
         # This is much faster but not so nice to look at as you can see different segments of the geometry
-        self.solid_geometry = [geo['geom'] for geo in self.gcode_parsed]
+        if self.gcode_toolpath is not None:
+            self.solid_geometry = self.gcode_toolpath.geometries()
+        else:
+            self.solid_geometry = [geo['geom'] for geo in self.gcode_parsed]
 
         return self.solid_geometry
 
@@ -7015,7 +7215,7 @@ class CNCjob(Geometry):
         else:
             target_linear = linear
 
-        gcode = ""
+        gcode = GCodeSink()
 
         # path = list(target_linear.coords)
         path = self.segment(target_linear.coords)
@@ -7080,33 +7280,26 @@ class CNCjob(Geometry):
             gcode += self.doformat(p.feedrate_code, feedrate=feedrate)
 
         # Cutting...
+        if self.app.abort_flag:
+            # graceful abort requested by the user
+            raise grace
+
         prev_x = first_x
         prev_y = first_y
-        for pt in path[1:]:
-            if self.app.abort_flag:
-                # graceful abort requested by the user
-                raise grace
-
-            if self.coordinates_type == "G90":
-                # For Absolute coordinates type G90
-                next_x = pt[0]
-                next_y = pt[1]
-            else:
+        if len(path) > 1:
+            if self.coordinates_type != "G90":
                 # For Incremental coordinates type G91
-                # next_x = pt[0] - prev_x
-                # next_y = pt[1] - prev_y
                 self.app.inform.emit('[ERROR_NOTCL] %s...' % _('G91 coordinates not implemented'))
-                next_x = pt[0]
-                next_y = pt[1]
 
-            gcode += self.doformat(p.linear_code, x=next_x, y=next_y, z=z_cut)  # Linear motion to point
-            prev_x = pt[0]
-            prev_y = pt[1]
+            # Linear motion to each point, the points are formatted in one go
+            gcode += self.doformat_batch(p.linear_code, path[1:], z=z_cut)
+            prev_x = path[-1][0]
+            prev_y = path[-1][1]
 
         # Up to travelling height.
         if up:
             gcode += self.doformat(p.lift_code, x=prev_x, y=prev_y, z_move=z_move)  # Stop cutting
-        return gcode
+        return gcode.getvalue()
 
     def linear2gcode_extra(self, linear, dia, extracut_length, tolerance=0, down=True, up=True,
                            z_cut=None, z_move=None, zdownrate=None,
@@ -7161,7 +7354,7 @@ class CNCjob(Geometry):
         else:
             target_linear = linear
 
-        gcode = ""
+        gcode = GCodeSink()
 
         path = list(target_linear.coords)
         p = self.pp_geometry
@@ -7227,29 +7420,21 @@ class CNCjob(Geometry):
                 gcode += self.doformat(p.down_code, x=first_x, y=first_y, z_cut=z_cut)  # Start cutting
 
         # Cutting...
+        if self.app.abort_flag:
+            # graceful abort requested by the user
+            raise grace
+
         prev_x = first_x
         prev_y = first_y
-        for pt in path[1:]:
-            if self.app.abort_flag:
-                # graceful abort requested by the user
-                raise grace
-
-            if self.coordinates_type == "G90":
-                # For Absolute coordinates type G90
-                next_x = pt[0]
-                next_y = pt[1]
-            else:
-                # For Incremental coordinates type G91
+        if len(path) > 1:
+            if self.coordinates_type != "G90":
                 # For Incremental coordinates type G91
-                # next_x = pt[0] - prev_x
-                # next_y = pt[1] - prev_y
                 self.app.inform.emit('[ERROR_NOTCL] %s...' % _('G91 coordinates not implemented'))
-                next_x = pt[0]
-                next_y = pt[1]
 
-            gcode += self.doformat(p.linear_code, x=next_x, y=next_y, z=z_cut)  # Linear motion to point
-            prev_x = next_x
-            prev_y = next_y
+            # Linear motion to each point, the points are formatted in one go
+            gcode += self.doformat_batch(p.linear_code, path[1:], z=z_cut)
+            prev_x = path[-1][0]
+            prev_y = path[-1][1]
 
         # this line is added to create an extra cut over the first point in patch
         # to make sure that we remove the copper leftovers
@@ -7377,7 +7562,7 @@ class CNCjob(Geometry):
         if up:
             gcode += self.doformat(p.lift_code, x=last_pt[0], y=last_pt[1], z_move=z_move)  # Stop cutting
 
-        return gcode
+        return gcode.getvalue()
 
     def point2gcode(self, point, dia, z_move=None, old_point=(0, 0)):
         """
@@ -7393,7 +7578,7 @@ class CNCjob(Geometry):
         :return:                    G-code to cut on the Point feature.
         :rtype:                     str
         """
-        gcode = ""
+        gcode = GCodeSink()
 
         if self.app.abort_flag:
             # graceful abort requested by the user
@@ -7461,7 +7646,7 @@ class CNCjob(Geometry):
             gcode += self.doformat(p.down_code, x=first_x, y=first_y, z_cut=self.z_cut)  # Start cutting
 
         gcode += self.doformat(p.lift_code, x=first_x, y=first_y)  # Stop cutting
-        return gcode
+        return gcode.getvalue()
 
     def export_svg(self, scale_stroke_factor=0.00):
         """
@@ -8058,6 +8243,1205 @@ def get_bounds(geometry_list):
     return [xmin, ymin, xmax, ymax]
 
 
+def flatten_polygons(geometry):
+    """
+    Returns a flat list with all the non empty polygons found in the geometry.
+
+    :param geometry:    a Shapely geometry or a (nested) list of Shapely geometries
+    :return:            list of Shapely Polygons
+    """
+    if geometry is None:
+        return []
+
+    if isinstance(geometry, Polygon):
+        return [] if geometry.is_empty else [geometry]
+
+    if isinstance(geometry, BaseGeometry):
+        try:
+            geometry = geometry.geoms
+        except (AttributeError, NotImplementedError):
+            # not a collection and not a polygon, e.g. a LineString
+            return []
+
+    polys = []
+    try:
+        for geo in geometry:
+            polys += flatten_polygons(geo)
+    except TypeError:
+        pass
+    return polys
+
+
+def union_polygons(job):
+    """
+    Makes the union of a list of polygons. It is a module level function so it can be used by the process pool.
+
+    :param job:     a tuple (polygons, method) where method is 'union' for unary_union() or 'buffer' for the union
+                    made by buffering a MultiPolygon with a very small distance (Gerber "full" buffering)
+    :return:        Shapely geometry
+    """
+    polygons, method = job
+    if method == 'buffer':
+        geo = MultiPolygon(polygons).buffer(0.00000001)
+        return geo.buffer(-0.00000001)
+    return unary_union(polygons)
+
+
+def tiled_union(geometry, pool=None, method='union', tile_polygons=500, threshold=2000):
+    """
+    Union of a large number of polygons. The polygons are split in tiles using the center of their bounding box,
+    each tile is merged separately in the process pool and then only the merged polygons that overlap the bounding
+    box of polygons from other tiles are merged again (the tile seams). Without a process pool the union is made in
+    one go since the GEOS union is already hierarchical and the tiles would only add the seams work.
+
+    :param geometry:        a list of Shapely geometries (or any geometry accepted by flatten_polygons())
+    :param pool:            a multiprocessing Pool or None
+    :param method:          'union' or 'buffer'; see union_polygons()
+    :param tile_polygons:   the approximate number of polygons in a tile
+    :param threshold:       below this number of polygons the union is made directly, without tiles
+    :return:                Shapely geometry
+    """
+    polygons = flatten_polygons(geometry)
+
+    if pool is None or len(polygons) < threshold:
+        return union_polygons((polygons, method))
+
+    bounds = np.array([p.bounds for p in polygons])
+    centers_x = (bounds[:, 0] + bounds[:, 2]) / 2.0
+    centers_y = (bounds[:, 1] + bounds[:, 3]) / 2.0
+
+    tiles_per_side = max(1, int(np.ceil(np.sqrt(len(polygons) / float(tile_polygons)))))
+    xmin, xmax = centers_x.min(), centers_x.max()
+    ymin, ymax = centers_y.min(), centers_y.max()
+    col = ((centers_x - xmin) / max(xmax - xmin, 1e-12) * tiles_per_side).astype(int).clip(0, tiles_per_side - 1)
+    row = ((centers_y - ymin) / max(ymax - ymin, 1e-12) * tiles_per_side).astype(int).clip(0, tiles_per_side - 1)
+    tile_ids = row * tiles_per_side + col
+
+    tiles = {}
+    for poly, tile_id in zip(polygons, tile_ids):
+        tiles.setdefault(tile_id, []).append(poly)
+
+    merged_tiles = pool.map(union_polygons, [(tile, method) for tile in tiles.values()])
+
+    # stitch the seams: only the merged polygons that may overlap polygons from another tile are merged again
+    merged = []
+    merged_tile = []
+    for tile_id, tile_geo in enumerate(merged_tiles):
+        tile_polys = flatten_polygons(tile_geo)
+        merged += tile_polys
+        merged_tile += [tile_id] * len(tile_polys)
+
+    if not merged:
+        return Polygon()
+
+    rti = rtindex.Index((idx, p.bounds, None) for idx, p in enumerate(merged))
+    on_seam = np.zeros(len(merged), dtype=bool)
+    for idx, poly in enumerate(merged):
+        for other in rti.intersection(poly.bounds):
+            if merged_tile[other] != merged_tile[idx]:
+                on_seam[idx] = True
+                on_seam[other] = True
+                break
+
+    seam_polys = [p for p, seam in zip(merged, on_seam) if seam]
+    result = [p for p, seam in zip(merged, on_seam) if not seam]
+    if seam_polys:
+        result += flatten_polygons(union_polygons((seam_polys, method)))
+
+    return result[0] if len(result) == 1 else MultiPolygon(result)
+
+
+class PolygonIndex:
+    """
+    A set of non overlapping polygons indexed in an R-tree by their bounding boxes. Geometry can be added to it or
+    subtracted from it and only the polygons whose bounding boxes intersect the geometry take part in the operation.
+    The index is updated in place, so it is cheap to apply many small changes on a large set of polygons, like the
+    Gerber polarity changes.
+    """
+
+    def __init__(self, polygons=None):
+        """
+
+        :param polygons:    the initial polygons; any geometry accepted by flatten_polygons()
+        """
+        self.polygons = {}
+        self.bounds = {}
+        self.next_id = 0
+
+        polys = flatten_polygons(polygons) if polygons is not None else []
+        for poly in polys:
+            self.polygons[self.next_id] = poly
+            self.bounds[self.next_id] = poly.bounds
+            self.next_id += 1
+
+        if self.bounds:
+            self.rti = rtindex.Index((idx, bounds, None) for idx, bounds in self.bounds.items())
+        else:
+            self.rti = rtindex.Index()
+
+    def __len__(self):
+        return len(self.polygons)
+
+    def add_polygon(self, poly):
+        bounds = poly.bounds
+        self.polygons[self.next_id] = poly
+        self.bounds[self.next_id] = bounds
+        self.rti.insert(self.next_id, bounds)
+        self.next_id += 1
+
+    def remove_polygon(self, idx):
+        self.rti.delete(idx, self.bounds.pop(idx))
+        del self.polygons[idx]
+
+    def apply(self, geometry, operation='union'):
+        """
+        Adds (union) or subtracts (difference) the geometry.
+
+        :param geometry:    the geometry to add or to subtract, made of non overlapping polygons
+        :param operation:   'union' or 'difference'
+        :return:            None
+        """
+        touched_idx = set()
+        touching_geo = []
+        for poly in flatten_polygons(geometry):
+            hits = list(self.rti.intersection(poly.bounds))
+            if hits:
+                touched_idx.update(hits)
+                touching_geo.append(poly)
+            elif operation == 'union':
+                self.add_polygon(poly)
+
+        if not touched_idx:
+            return
+
+        # both are already made of non overlapping polygons so a binary operation is enough and it is much faster
+        # than merging all the polygons together
+        touched = [self.polygons[idx] for idx in sorted(touched_idx)]
+        touched = touched[0] if len(touched) == 1 else MultiPolygon(touched)
+        touching_geo = touching_geo[0] if len(touching_geo) == 1 else MultiPolygon(touching_geo)
+        if operation == 'union':
+            changed = touched.union(touching_geo)
+        else:
+            changed = touched.difference(touching_geo)
+
+        for idx in touched_idx:
+            self.remove_polygon(idx)
+        for poly in flatten_polygons(changed):
+            self.add_polygon(poly)
+
+    def geometry(self):
+        """
+
+        :return:    the polygons as a Shapely geometry
+        """
+        polys = list(self.polygons.values())
+        if not polys:
+            return Polygon()
+        return polys[0] if len(polys) == 1 else MultiPolygon(polys)
+
+
+def local_boolean(solid, geometry, operation='union'):
+    """
+    Adds (union) or subtracts (difference) the geometry from the solid geometry. Only the polygons whose bounding
+    boxes intersect take part in the operation, the rest of them are kept as they are. When the operation is
+    repeated many times on the same solid geometry use a PolygonIndex instead.
+
+    :param solid:       the solid geometry, made of non overlapping polygons
+    :param geometry:    the geometry to add or to subtract, made of non overlapping polygons
+    :param operation:   'union' or 'difference'
+    :return:            Shapely geometry
+    """
+    index = PolygonIndex(solid)
+    index.apply(geometry, operation)
+    return index.geometry()
+
+
+def close_pairs(geometry, distance, other=None):
+    """
+    Finds the pairs of geometry elements that may be closer than the given distance. The elements are indexed in an
+    R-tree by their bounding boxes and each element is queried with its bounding box grown by the distance, so only
+    the neighbours are returned instead of all the pairs. The actual distance has to be measured by the caller.
+
+    :param geometry:    list of Shapely geometry elements
+    :param distance:    the search distance
+    :param other:       list of Shapely geometry elements; if None, the pairs are searched within geometry
+    :return:            generator of (index in geometry, index in other) tuples; when other is None each pair is
+                        returned once with the first index smaller than the second
+    """
+    targets = geometry if other is None else other
+    target_items = [(idx, geo.bounds, None) for idx, geo in enumerate(targets) if not geo.is_empty]
+    if not target_items:
+        return
+
+    rti = rtindex.Index(iter(target_items))
+    for idx, geo in enumerate(geometry):
+        if geo.is_empty:
+            continue
+
+        minx, miny, maxx, maxy = geo.bounds
+        for t_idx in sorted(rti.intersection((minx - distance, miny - distance, maxx + distance, maxy + distance))):
+            if other is None and t_idx <= idx:
+                continue
+            yield idx, t_idx
+
+
+def measure_distances(job):
+    """
+    Measures the distances between pairs of geometry elements. It is run in the process pool by min_distances().
+
+    :param job:     tuple (list of (geometry, other geometry) tuples, maximum distance, decimals)
+    :return:        list with an element for each pair: None if the pair is farther apart than the maximum distance,
+                    otherwise a tuple (distance, ((x0, y0), (x1, y1))) with the distance and the nearest points
+                    rounded to the given decimals
+    """
+    pairs, max_dist, decimals = job
+
+    result = []
+    for geo, s_geo in pairs:
+        dist = geo.distance(s_geo)
+        if dist > max_dist:
+            result.append(None)
+            continue
+
+        loc_1, loc_2 = nearest_points(geo, s_geo)
+        proc_loc = (
+            (float('%.*f' % (decimals, loc_1.x)), float('%.*f' % (decimals, loc_1.y))),
+            (float('%.*f' % (decimals, loc_2.x)), float('%.*f' % (decimals, loc_2.y)))
+        )
+        result.append((float('%.*f' % (decimals, dist)), proc_loc))
+    return result
+
+
+class PoolQueue:
+    """
+    Runs jobs in the process pool and gives their results in the order of the jobs. Only a window of jobs is queued
+    in the pool at a time, so when the caller stops (e.g. on abort) the jobs not started yet are dropped and cancel()
+    has to wait only for the few that are running, instead of the pool being busy with the whole list.
+    """
+
+    def __init__(self, pool, fcn, jobs, window=None):
+        """
+
+        :param pool:    multiprocessing pool
+        :param fcn:     the function run for each job, with the job as the only argument
+        :param jobs:    iterable of jobs
+        :param window:  how many jobs are queued in the pool at a time; two for each CPU if None
+        """
+        self.pool = pool
+        self.fcn = fcn
+        self.jobs = iter(jobs)
+        self.window = window if window else 2 * (os.cpu_count() or 1)
+        self.in_flight = deque()
+
+    def __iter__(self):
+        while True:
+            for job in islice(self.jobs, self.window - len(self.in_flight)):
+                self.in_flight.append(self.pool.apply_async(self.fcn, (job, )))
+            if not self.in_flight:
+                return
+            yield self.in_flight.popleft().get()
+
+    def cancel(self):
+        """
+        Drops the jobs that were not queued yet and waits for the queued ones to end.
+
+        :return:    None
+        """
+        self.jobs = iter(())
+        while self.in_flight:
+            self.in_flight.popleft().wait()
+
+
+def min_distances(geometry, decimals, top_k=1, pool=None, pairs_per_job=2000, progress=None):
+    """
+    Finds the smallest distances between the elements of the geometry and the locations where they are found.
+
+    Instead of measuring all the pairs, the search starts from an upper bound of the minimum distance (the distance
+    of each element to the element with the nearest bounds) and only the pairs whose bounds are within the search
+    distance are measured. The search distance is doubled until top_k distances are found. The pairs are sorted in
+    vertical strips and the strips are measured in the process pool, if one is given.
+
+    :param geometry:        list of Shapely geometry elements
+    :param decimals:        the distances and the locations are rounded to this number of decimals
+    :param top_k:           how many distances to return, starting with the minimum one
+    :param pool:            multiprocessing pool
+    :param pairs_per_job:   how many pairs are measured in one job of the pool
+    :param progress:        if not None, called with the percentage of the pairs measured in the current pass after
+                            each job; it may raise an exception (e.g. on abort) to stop the search
+    :return:                dict where the keys are the top_k smallest distances and the values are lists of locations
+                            ((x0, y0), (x1, y1)) of the nearest points where the distance is found; an empty dict if
+                            there are less than two elements
+    """
+    geometry = [geo for geo in geometry if not geo.is_empty]
+    if len(geometry) < 2:
+        return {}
+
+    rti = rtindex.Index((idx, geo.bounds, None) for idx, geo in enumerate(geometry))
+    minx, miny, maxx, maxy = rti.bounds
+    diagonal = np.hypot(maxx - minx, maxy - miny)
+    centers_x = [(geo.bounds[0] + geo.bounds[2]) / 2.0 for geo in geometry]
+
+    # upper bound of the minimum distance
+    search_dist = None
+    for idx, geo in enumerate(geometry):
+        for n_idx in rti.nearest(geo.bounds, 2):
+            if n_idx != idx:
+                dist = geo.distance(geometry[n_idx])
+                search_dist = dist if search_dist is None else min(search_dist, dist)
+                break
+
+    found = {}
+    measured = set()
+    while True:
+        pairs = [pair for pair in close_pairs(geometry, search_dist) if pair not in measured]
+
+        pairs.sort(key=lambda pair: centers_x[pair[0]])
+        jobs = [
+            ([(geometry[i], geometry[j]) for i, j in pairs[start:start + pairs_per_job]], search_dist, decimals)
+            for start in range(0, len(pairs), pairs_per_job)
+        ]
+        queue = PoolQueue(pool, measure_distances, jobs) if pool is not None and len(jobs) > 1 else None
+        results = []
+        try:
+            for res in (queue if queue is not None else (measure_distances(job) for job in jobs)):
+                results.append(res)
+                if progress is not None:
+                    progress(int(100 * len(results) / len(jobs)))
+        except BaseException:
+            if queue is not None:
+                queue.cancel()
+            raise
+
+        # the pairs farther apart than the search distance are measured again in the next pass, if there is one
+        for pair, res in zip(pairs, (res for job_res in results for res in job_res)):
+            if res is None:
+                continue
+            measured.add(pair)
+
+            dist, loc = res
+            if dist in found:
+                found[dist].append(loc)
+            else:
+                found[dist] = [loc]
+
+        if search_dist >= diagonal:
+            # all the pairs were measured
+            complete = list(found.keys())
+            break
+
+        # a distance equal with the rounded search distance may also be found in the pairs not measured yet
+        limit = float('%.*f' % (decimals, search_dist))
+        complete = [dist for dist in found if dist < limit]
+        if len(complete) >= top_k:
+            break
+
+        search_dist = search_dist * 2 if search_dist > 0 else diagonal / 1000.0
+
+    return {dist: found[dist] for dist in sorted(complete)[:top_k]}
+
+
+class PointGrid:
+    """
+    Uniform grid of buckets over a set of points, used for the nearest neighbour searches.
+    The points can be removed from the grid, e.g. as they are visited.
+    """
+
+    def __init__(self, xy, per_cell=2.0):
+        """
+
+        :param xy:          list of (x, y) points or numpy array of shape (N, 2); it can't be empty. The cell size is
+                            calculated from these points
+        :param per_cell:    the average number of points in a cell
+        """
+        xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        self.pts = xy.tolist()
+        self.minx, self.miny = xy.min(axis=0).tolist()
+        maxx, maxy = xy.max(axis=0).tolist()
+        width = max(maxx - self.minx, 1e-9)
+        height = max(maxy - self.miny, 1e-9)
+        self.cell = max(sqrt(width * height * per_cell / len(xy)), max(width, height) / 4096.0)
+
+        self.buckets = {}
+        for idx, (x, y) in enumerate(self.pts):
+            self.add_to_bucket(idx, x, y)
+
+    def key(self, x, y):
+        return int((x - self.minx) // self.cell), int((y - self.miny) // self.cell)
+
+    def add_to_bucket(self, idx, x, y):
+        key = self.key(x, y)
+        try:
+            self.buckets[key].append(idx)
+        except KeyError:
+            self.buckets[key] = [idx]
+
+    def add(self, x, y):
+        """
+        Adds a point to the grid.
+
+        :return:    the index of the point
+        """
+        self.pts.append([x, y])
+        idx = len(self.pts) - 1
+        self.add_to_bucket(idx, x, y)
+        return idx
+
+    def remove(self, idx):
+        key = self.key(*self.pts[idx])
+        bucket = self.buckets[key]
+        bucket.remove(idx)
+        if not bucket:
+            del self.buckets[key]
+
+    def ring(self, cx, cy, r):
+        """
+        Generator of the non empty buckets on the square ring at distance r (in cells) of the cell (cx, cy).
+        """
+        buckets = self.buckets
+        if r == 0:
+            if (cx, cy) in buckets:
+                yield buckets[(cx, cy)]
+            return
+
+        keys = [(cx + d, cy - r) for d in range(-r, r + 1)] + [(cx + d, cy + r) for d in range(-r, r + 1)] + \
+               [(cx - r, cy + d) for d in range(-r + 1, r)] + [(cx + r, cy + d) for d in range(-r + 1, r)]
+        for key in keys:
+            if key in buckets:
+                yield buckets[key]
+
+    def nearest(self, x, y, max_rings=4):
+        """
+        The nearest point to (x, y) that is still in the grid.
+
+        :param x:           X coordinate
+        :param y:           Y coordinate
+        :param max_rings:   how many rings of cells are searched before falling back to measuring all the points
+        :return:            the index of the nearest point or None if the grid is empty
+        """
+        if not self.buckets:
+            return None
+
+        cx, cy = self.key(x, y)
+        pts = self.pts
+        best = None
+        best_dist = np.inf
+        for r in range(max_rings + 1):
+            for bucket in self.ring(cx, cy, r):
+                for idx in bucket:
+                    px, py = pts[idx]
+                    dist = hypot(px - x, py - y)
+                    if dist < best_dist:
+                        best_dist = dist
+                        best = idx
+            # a point in a farther ring can't be closer than r cells
+            if best is not None and best_dist <= r * self.cell:
+                return best
+
+        left = [idx for bucket in self.buckets.values() for idx in bucket]
+        left_xy = np.array([pts[idx] for idx in left])
+        return left[int(np.argmin(np.hypot(left_xy[:, 0] - x, left_xy[:, 1] - y)))]
+
+
+class PanelInstances:
+    """
+    The placements of the copies of one board in a panel. The geometry of the board is kept once and it is
+    translated to a placement only when a copy is needed.
+    """
+
+    def __init__(self, offsets, source_bounds=None):
+        """
+
+        :param offsets:         list of (dx, dy) translations, one for each copy of the board
+        :param source_bounds:   the bounds (xmin, ymin, xmax, ymax) of the board geometry, for bounds()
+        """
+        self.offsets = [(float(dx), float(dy)) for dx, dy in offsets]
+        self.source_bounds = source_bounds
+
+    @classmethod
+    def grid(cls, rows, columns, dx, dy, source_bounds=None):
+        """
+        The placements of a panel of rows x columns copies, in the order the rows and the columns are made.
+
+        :param rows:            number of rows
+        :param columns:         number of columns
+        :param dx:              distance between the columns
+        :param dy:              distance between the rows
+        :param source_bounds:   the bounds of the board geometry
+        :return:                PanelInstances
+        """
+        return cls([(col * dx, row * dy) for row in range(rows) for col in range(columns)], source_bounds)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @staticmethod
+    def board_elements(geometry):
+        """
+        :param geometry:    the geometry of a board: a list of elements, a multi-geometry or a single geometry
+        :return:            a new list with its elements, to be stored as the board geometry of a panel
+        """
+        if geometry is None:
+            return []
+        if isinstance(geometry, list):
+            return list(geometry)
+        try:
+            return list(geometry.geoms)
+        except AttributeError:
+            return [geometry]
+
+    @classmethod
+    def translate(cls, geometry, dx, dy):
+        """
+        Translates the geometry, keeping the structure of the lists, tuples (slots) and dicts (Gerber geometry
+        elements) it is stored in.
+
+        :param geometry:    Shapely geometry or (nested) list, tuple or dict of Shapely geometry
+        :param dx:          translation on X axis
+        :param dy:          translation on Y axis
+        :return:            the translated geometry
+        """
+        if isinstance(geometry, BaseGeometry):
+            if dx == 0 and dy == 0:
+                return geometry
+            return affinity.translate(geometry, xoff=dx, yoff=dy)
+        if isinstance(geometry, dict):
+            return {key: cls.translate(val, dx, dy) for key, val in geometry.items()}
+        if isinstance(geometry, (list, tuple)):
+            return type(geometry)(cls.translate(geo, dx, dy) for geo in geometry)
+        return geometry
+
+    def iterate(self, geometry):
+        """
+        Yields the elements of all the copies of the geometry, one copy after another, without keeping them.
+
+        :param geometry:    the board geometry; a list of elements or a single geometry
+        :return:            generator of the translated elements
+        """
+        for dx, dy in self.offsets:
+            if isinstance(geometry, list):
+                for geo in geometry:
+                    yield self.translate(geo, dx, dy)
+            else:
+                yield self.translate(geometry, dx, dy)
+
+    def expand(self, geometry):
+        """
+        :param geometry:    the board geometry; a list of elements or a single geometry
+        :return:            list with the elements of all the copies
+        """
+        return list(self.iterate(geometry))
+
+    def bounds(self):
+        """
+        :return:    the bounds of the panel, from the board bounds
+        """
+        xmin, ymin, xmax, ymax = self.source_bounds
+        dxs = [dx for dx, __ in self.offsets]
+        dys = [dy for __, dy in self.offsets]
+        return xmin + min(dxs), ymin + min(dys), xmax + max(dxs), ymax + max(dys)
+
+
+class PanelDict(dict):
+    """
+    A tool / aperture dict of a panel. The parameters are stored as usual while the geometry keys hold the geometry of
+    the board, in panel_source, until they are used; then the copies are made and stored in the dict. Iterating over
+    the items, copying or pickling the dict makes all the copies.
+    """
+
+    def __init__(self, params, panel_source, instances):
+        """
+
+        :param params:          the parameters of the tool / aperture
+        :param panel_source:    geometry key -> the geometry of the board
+        :param instances:       PanelInstances
+        """
+        super().__init__(params)
+        self.panel_source = panel_source
+        self.instances = instances
+
+    def __missing__(self, key):
+        if key not in self.panel_source:
+            raise KeyError(key)
+        value = self.instances.expand(self.panel_source.pop(key))
+        dict.__setitem__(self, key, value)
+        return value
+
+    def __setitem__(self, key, value):
+        self.panel_source.pop(key, None)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        if key in self.panel_source:
+            del self.panel_source[key]
+        else:
+            dict.__delitem__(self, key)
+
+    def pop(self, key, *default):
+        if key in self.panel_source:
+            self.__missing__(key)
+        return dict.pop(self, key, *default)
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self.panel_source
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def expand(self):
+        """
+        Makes the copies of all the geometry keys.
+        """
+        for key in list(self.panel_source.keys()):
+            self.__missing__(key)
+
+    def __iter__(self):
+        self.expand()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        return dict.__len__(self) + len(self.panel_source)
+
+    def keys(self):
+        self.expand()
+        return dict.keys(self)
+
+    def values(self):
+        self.expand()
+        return dict.values(self)
+
+    def items(self):
+        self.expand()
+        return dict.items(self)
+
+    def copy(self):
+        self.expand()
+        return dict(dict.items(self))
+
+    def __reduce_ex__(self, protocol):
+        # deepcopy and pickle make plain dicts with the copies
+        return dict, (self.copy(),)
+
+
+def connect_touching_paths(paths):
+    """
+    Joins the paths that touch on their end points. The end points are found in a dictionary so each join is done
+    in constant time and the chains are built as lists of coordinates.
+
+    :param paths:   list of paths as lists of (x, y) coordinates
+    :return:        list of chains as lists of (x, y) coordinates; each path is in a chain, reversed if it was needed
+    """
+    ends = {}
+    for idx, coords in enumerate(paths):
+        ends.setdefault(coords[0], []).append(idx)
+        ends.setdefault(coords[-1], []).append(idx)
+    used = [False] * len(paths)
+
+    def take(pt):
+        # an unused path that has an end point in pt
+        candidates = ends.get(pt)
+        while candidates:
+            idx = candidates.pop()
+            if not used[idx]:
+                used[idx] = True
+                return paths[idx]
+        return None
+
+    chains = []
+    for idx, coords in enumerate(paths):
+        if used[idx]:
+            continue
+        used[idx] = True
+
+        # the chain is head[::-1] + tail
+        tail = list(coords)
+        head = []
+        while True:
+            last = tail[-1]
+            coords = take(last)
+            if coords is None:
+                break
+            tail.extend(coords[1:] if coords[0] == last else coords[-2::-1])
+        while True:
+            first = head[-1] if head else tail[0]
+            coords = take(first)
+            if coords is None:
+                break
+            head.extend(coords[-2::-1] if coords[-1] == first else coords[1:])
+
+        chains.append(head[::-1] + tail)
+    return chains
+
+
+def connect_near_paths(paths, can_walk, origin=(0, 0)):
+    """
+    Orders the paths by always going to the nearest end point of the paths not visited yet and joins a path with
+    the previous one when the tool can walk between them. The end points are kept in a grid of buckets
+    (see PointGrid) and the chains are built as lists of coordinates.
+
+    :param paths:       list of paths as lists of (x, y) coordinates; it can't be empty
+    :param can_walk:    function of the (x, y) start point and the (x, y) end point of a walk, it returns True if the
+                        tool can go from the start point to the end point without lifting
+    :param origin:      the (x, y) point where the search starts
+    :return:            list of chains as lists of (x, y) coordinates
+    """
+    grid = PointGrid([pt for coords in paths for pt in (coords[0], coords[-1])])
+
+    def take_nearest(pt):
+        pt_idx = grid.nearest(pt[0], pt[1])
+        if pt_idx is None:
+            return None
+
+        idx = pt_idx // 2
+        grid.remove(2 * idx)
+        grid.remove(2 * idx + 1)
+
+        coords = paths[idx]
+        # if the last point is the nearest then reverse the path but prefer the first one if last == first
+        if pt_idx % 2 == 1 and coords[0] != coords[-1]:
+            return coords[::-1]
+        return list(coords)
+
+    chains = []
+    chain = take_nearest(origin)
+    while True:
+        coords = take_nearest(chain[-1])
+        if coords is None:
+            break
+
+        if can_walk(chain[-1], coords[0]):
+            chain.extend(coords)
+        else:
+            # have to lift tool, end the chain
+            chains.append(chain)
+            chain = coords
+    chains.append(chain)
+    return chains
+
+
+def drill_path_neighbours(xy, k):
+    """
+    The k nearest points of each point, found with a R-tree.
+
+    :param xy:  numpy array of shape (N, 2) with the coordinates of the points
+    :param k:   the number of neighbours
+    :return:    numpy array of shape (N, k) with the indexes of the neighbours, nearest first; -1 where the
+                point has less than k neighbours
+    """
+    pts = xy.tolist()
+    rti = rtindex.Index((idx, (x, y, x, y), None) for idx, (x, y) in enumerate(pts))
+
+    neighbours = np.full((len(pts), k), -1, dtype=np.int64)
+    for idx, (x, y) in enumerate(pts):
+        # the point itself is returned too, together with all the points that are tied at the k-th distance
+        found = [n_idx for n_idx in rti.nearest((x, y, x, y), k + 1) if n_idx != idx][:k]
+        neighbours[idx, :len(found)] = found
+    return neighbours
+
+
+def drill_path_length(nodes, tour):
+    """
+    The length of the open path that visits the nodes in the order of the tour.
+    """
+    pts = nodes[tour]
+    return float(np.hypot(pts[1:, 0] - pts[:-1, 0], pts[1:, 1] - pts[:-1, 1]).sum())
+
+
+def two_opt_pass(nodes, tour, pos, pairs, deadline):
+    """
+    One pass of 2-opt moves on an open path, in place. The first node of the tour is not moved.
+
+    For each pair of neighbour nodes (a, c) two moves are considered: the one that links a to c followed by
+    the successors of a and c, and the one that links the predecessors of a and c followed by a to c. The
+    gains of all the moves are calculated at once and the moves are applied starting with the best one, each
+    after checking that it still improves the path changed by the moves applied before it.
+
+    :param nodes:       numpy array of shape (N, 2) with the coordinates of the nodes
+    :param tour:        numpy array with the nodes indexes in the order they are visited
+    :param pos:         numpy array with the position of each node in the tour
+    :param pairs:       tuple of two numpy arrays, the indexes of the nodes in each pair of neighbours
+    :param deadline:    time.time() value when the pass is stopped
+    :return:            the number of moves applied
+    """
+    m = len(tour)
+    node_a, node_c = pairs
+    xy = nodes[tour]
+    # the distance from each node of the tour to the next one; the path is open, nothing follows the last node
+    next_dist = np.zeros(m)
+    next_dist[:-1] = np.hypot(xy[1:, 0] - xy[:-1, 0], xy[1:, 1] - xy[:-1, 1])
+
+    pos_a, pos_c = pos[node_a], pos[node_c]
+    p = np.minimum(pos_a, pos_c)
+    q = np.maximum(pos_a, pos_c)
+    ac_dist = np.hypot(nodes[node_a, 0] - nodes[node_c, 0], nodes[node_a, 1] - nodes[node_c, 1])
+
+    # (t[p], t[p+1]), (t[q], t[q+1]) -> (t[p], t[q]), (t[p+1], t[q+1])
+    p_next = np.minimum(p + 1, m - 1)
+    q_next = np.minimum(q + 1, m - 1)
+    added = np.where(q == m - 1, 0.0, np.hypot(xy[p_next, 0] - xy[q_next, 0], xy[p_next, 1] - xy[q_next, 1]))
+    gain_next = np.where(q > p + 1, next_dist[p] + next_dist[q] - ac_dist - added, 0.0)
+    # (t[p-1], t[p]), (t[q-1], t[q]) -> (t[p-1], t[q-1]), (t[p], t[q])
+    p_prev = np.maximum(p - 1, 0)
+    q_prev = np.maximum(q - 1, 0)
+    added = np.hypot(xy[p_prev, 0] - xy[q_prev, 0], xy[p_prev, 1] - xy[q_prev, 1])
+    gain_prev = np.where((p >= 1) & (q > p + 1), next_dist[p_prev] + next_dist[q_prev] - added - ac_dist, 0.0)
+
+    gains = np.concatenate((gain_next, gain_prev))
+    candidates = np.nonzero(gains > 1e-9)[0]
+    if not len(candidates):
+        return 0
+    candidates = candidates[np.argsort(-gains[candidates], kind='stable')]
+
+    nr_pairs = len(node_a)
+    node_a = node_a.tolist()
+    node_c = node_c.tolist()
+    pts = nodes.tolist()
+
+    def dist(i, j):
+        return hypot(pts[i][0] - pts[j][0], pts[i][1] - pts[j][1])
+
+    applied = 0
+    for count, cand in enumerate(candidates.tolist()):
+        if count % 256 == 0 and time.time() > deadline:
+            break
+
+        prev_move = cand >= nr_pairs
+        pair = cand - nr_pairs if prev_move else cand
+        i, j = int(pos[node_a[pair]]), int(pos[node_c[pair]])
+        i, j = (i, j) if i < j else (j, i)
+        if prev_move:
+            i -= 1
+            j -= 1
+        if i < 0 or j <= i + 1:
+            continue
+
+        t_i, t_i1, t_j = int(tour[i]), int(tour[i + 1]), int(tour[j])
+        gain = dist(t_i, t_i1) - dist(t_i, t_j)
+        if j < m - 1:
+            t_j1 = int(tour[j + 1])
+            gain += dist(t_j, t_j1) - dist(t_i1, t_j1)
+        if gain <= 1e-9:
+            continue
+
+        tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1].copy()
+        pos[tour[i + 1:j + 1]] = np.arange(i + 1, j + 1)
+        applied += 1
+    return applied
+
+
+def or_opt_pass(nodes, tour, pos, neighbours, deadline, max_length=3):
+    """
+    One pass of Or-opt moves on an open path, in place. The first node of the tour is not moved.
+
+    A segment of 1 to max_length nodes is moved after or before (reversed) one of the neighbours of the segment
+    first node. As in two_opt_pass() the gains are calculated at once and the moves are applied starting with
+    the best one.
+
+    :param nodes:       numpy array of shape (N, 2) with the coordinates of the nodes
+    :param tour:        numpy array with the nodes indexes in the order they are visited
+    :param pos:         numpy array with the position of each node in the tour
+    :param neighbours:  numpy array of shape (N, k) with the neighbours of each node, -1 for none
+    :param deadline:    time.time() value when the pass is stopped
+    :param max_length:  the maximum number of nodes in a moved segment
+    :return:            the number of moves applied
+    """
+    m = len(tour)
+    if m < 4:
+        return 0
+
+    xy = nodes[tour]
+    next_dist = np.zeros(m)
+    next_dist[:-1] = np.hypot(xy[1:, 0] - xy[:-1, 0], xy[1:, 1] - xy[:-1, 1])
+
+    def dist_xy(a, b):
+        return np.hypot(a[..., 0] - b[..., 0], a[..., 1] - b[..., 1])
+
+    moves = []
+    for length in range(1, max_length + 1):
+        s = np.arange(1, m - length + 1)
+        e = s + length - 1
+        # the gain of taking out the segment t[s] .. t[e]
+        e_next = np.minimum(e + 1, m - 1)
+        removal = next_dist[s - 1] + np.where(e < m - 1, next_dist[e] - dist_xy(xy[s - 1], xy[e_next]), 0.0)
+
+        near = neighbours[tour[s]]
+        valid = near >= 0
+        near = np.where(valid, near, 0)
+        k = pos[near]
+        valid &= (k < s[:, None]) | (k > e[:, None])
+        near_dist = dist_xy(nodes[near], xy[s][:, None, :])
+
+        # after t[k]: t[k], t[s] .. t[e], t[k+1]
+        k_next = np.minimum(k + 1, m - 1)
+        cost = near_dist + np.where(k == m - 1, 0.0, dist_xy(xy[e][:, None, :], xy[k_next]) - next_dist[k])
+        ok = valid & (k != s[:, None] - 1)
+        moves.append((removal[:, None] - cost, ok, s, length, near, 0))
+
+        # before t[k]: t[k-1], t[e] .. t[s], t[k]
+        k_prev = np.maximum(k - 1, 0)
+        cost = near_dist + dist_xy(xy[k_prev], xy[e][:, None, :]) - next_dist[k_prev]
+        ok = valid & (k >= 1) & (k != e[:, None] + 1)
+        moves.append((removal[:, None] - cost, ok, s, length, near, 1))
+
+    gains, firsts, lengths, targets, before = [], [], [], [], []
+    for gain, ok, s, length, near, is_before in moves:
+        rows, cols = np.nonzero(ok & (gain > 1e-9))
+        gains.append(gain[rows, cols])
+        firsts.append(tour[s[rows]])
+        lengths.append(np.full(len(rows), length))
+        targets.append(near[rows, cols])
+        before.append(np.full(len(rows), is_before))
+
+    gains = np.concatenate(gains)
+    if not len(gains):
+        return 0
+    order = np.argsort(-gains, kind='stable')
+    firsts = np.concatenate(firsts)[order].tolist()
+    lengths = np.concatenate(lengths)[order].tolist()
+    targets = np.concatenate(targets)[order].tolist()
+    before = np.concatenate(before)[order].tolist()
+    pts = nodes.tolist()
+
+    def dist(i, j):
+        return hypot(pts[i][0] - pts[j][0], pts[i][1] - pts[j][1])
+
+    applied = 0
+    for count in range(len(firsts)):
+        if count % 256 == 0 and time.time() > deadline:
+            break
+
+        length = lengths[count]
+        s = int(pos[firsts[count]])
+        e = s + length - 1
+        k = int(pos[targets[count]])
+        if s < 1 or e > m - 1 or s <= k <= e:
+            continue
+
+        t_s, t_e, t_prev = int(tour[s]), int(tour[e]), int(tour[s - 1])
+        removal = dist(t_prev, t_s)
+        if e < m - 1:
+            t_next = int(tour[e + 1])
+            removal += dist(t_e, t_next) - dist(t_prev, t_next)
+
+        t_k = int(tour[k])
+        if before[count]:
+            if k < 1 or k == e + 1:
+                continue
+            t_k_prev = int(tour[k - 1])
+            cost = dist(t_k, t_s) + dist(t_k_prev, t_e) - dist(t_k_prev, t_k)
+        else:
+            if k == s - 1:
+                continue
+            cost = dist(t_k, t_s)
+            if k < m - 1:
+                t_k_next = int(tour[k + 1])
+                cost += dist(t_e, t_k_next) - dist(t_k, t_k_next)
+        if removal - cost <= 1e-9:
+            continue
+
+        segment = tour[s:e + 1].copy()
+        if before[count]:
+            segment = segment[::-1]
+        rest = np.concatenate((tour[:s], tour[e + 1:]))
+        k = k if k < s else k - length
+        insert_at = k if before[count] else k + 1
+        new_tour = np.concatenate((rest[:insert_at], segment, rest[insert_at:]))
+
+        # only the nodes between the old and the new place of the segment change position
+        start = min(s, insert_at)
+        stop = max(e, insert_at + length - 1) + 1
+        tour[start:stop] = new_tour[start:stop]
+        pos[tour[start:stop]] = np.arange(start, stop)
+        applied += 1
+    return applied
+
+
+def optimize_drill_path(job):
+    """
+    Finds a short path through the drill points: a nearest neighbour tour improved with 2-opt and Or-opt moves
+    between each point and its nearest neighbours, until no move improves the path or the time is up.
+    It is run in the process pool by drill_path_task().
+
+    :param job:     tuple (list of (x, y) locations, (x, y) start point, time budget in seconds)
+    :return:        tuple (list of the locations indexes in the order they are visited, the length of the path
+                    through the locations in their initial order, the length of the optimized path); the lengths
+                    include the travel from the start point
+    """
+    locations, start, opt_time = job
+    deadline = time.time() + opt_time
+
+    nr_locations = len(locations)
+    if nr_locations == 0:
+        return [], 0.0, 0.0
+
+    xy = np.array(locations, dtype=float).reshape(-1, 2)
+    # the start point is an extra node, always the first one in the tour
+    nodes = np.vstack((xy, [start]))
+    initial_length = drill_path_length(nodes, np.arange(-1, nr_locations))
+
+    grid = PointGrid(xy)
+    tour = [nr_locations]
+    x, y = start
+    for __ in range(nr_locations):
+        idx = grid.nearest(x, y)
+        tour.append(idx)
+        grid.remove(idx)
+        x, y = grid.pts[idx]
+    tour = np.array(tour, dtype=np.int64)
+
+    if nr_locations > 3:
+        k = min(8, nr_locations - 1)
+        neighbours = np.vstack((drill_path_neighbours(xy, k), np.full((1, k), -1, dtype=np.int64)))
+        pairs = (np.repeat(np.arange(nr_locations), k), neighbours[:-1].ravel())
+        valid = pairs[1] >= 0
+        pairs = (pairs[0][valid], pairs[1][valid])
+
+        pos = np.empty(nr_locations + 1, dtype=np.int64)
+        pos[tour] = np.arange(nr_locations + 1)
+        while time.time() < deadline:
+            moved = two_opt_pass(nodes, tour, pos, pairs, deadline)
+            moved += or_opt_pass(nodes, tour, pos, neighbours, deadline)
+            if not moved:
+                break
+
+    return tour[1:].tolist(), initial_length, drill_path_length(nodes, tour)
+
+
+def ortools_drill_path(locations, metaheuristic=False, opt_time=0):
+    """
+    Finds a path through the drill points with the OR-Tools routing solver, starting in the first location.
+    It is run in the process pool by CNCjob.drill_orders().
+
+    :param locations:       list of (x, y) locations
+    :param metaheuristic:   if True the solution is improved with the Guided Local Search for opt_time seconds
+    :param opt_time:        time budget in seconds for the metaheuristic; 3 seconds if 0
+    :return:                list of the locations indexes in the order they are visited
+    """
+    optimized_path = []
+
+    tsp_size = len(locations)
+    num_routes = 1  # The number of routes, which is 1 in the TSP.
+    # Nodes are indexed from 0 to tsp_size - 1. The depot is the starting node of the route.
+    depot = 0
+
+    # Create routing model.
+    if tsp_size == 0:
+        log.warning('OR-tools - Specify an instance greater than 0.')
+        return optimized_path
+
+    manager = pywrapcp.RoutingIndexManager(tsp_size, num_routes, depot)
+    routing = pywrapcp.RoutingModel(manager)
+    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+    if metaheuristic:
+        search_parameters.local_search_metaheuristic = (
+            routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH)
+
+        # Set search time limit in seconds.
+        search_parameters.time_limit.seconds = int(float(opt_time)) if float(opt_time) != 0 else 3
+
+    # Callback to the distance function. The callback takes two
+    # arguments (the from and to node indices) and returns the distance between them.
+    dist_between_locations = CNCjob.CreateDistanceCallback(locs=locations, manager=manager)
+    transit_callback_index = routing.RegisterTransitCallback(dist_between_locations.Distance)
+    routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+
+    # Solve, returns a solution if any.
+    assignment = routing.SolveWithParameters(search_parameters)
+
+    if assignment:
+        log.info("OR-tools - Total distance: " + str(assignment.ObjectiveValue()))
+
+        # Only one route here; otherwise iterate from 0 to routing.vehicles() - 1.
+        node = routing.Start(0)
+        while not routing.IsEnd(node):
+            optimized_path.append(manager.IndexToNode(node))
+            node = assignment.Value(routing.NextVar(node))
+    else:
+        log.warning('OR-tools - No solution found.')
+
+    return optimized_path
+
+
+def nearest_neighbour_drill_path(locations):
+    """
+    Always go to the nearest drill point that was not visited yet, starting in the first location.
+    It is run in the process pool by CNCjob.drill_orders().
+
+    :param locations:   list of (x, y) locations
+    :return:            list of the locations indexes in the order they are visited
+    """
+    if not locations:
+        return []
+
+    grid = PointGrid(locations)
+    path = [0]
+    grid.remove(0)
+    for __ in range(len(locations) - 1):
+        x, y = grid.pts[path[-1]]
+        idx = grid.nearest(x, y)
+        path.append(idx)
+        grid.remove(idx)
+    return path
+
+
+def drill_path_task(job):
+    """
+    Calculates the drill order for the locations of one tool with one of the optimizers. It is run in the process pool
+    by CNCjob.drill_orders().
+
+    :param job:     tuple (optimization type: 'M', 'B', 'T', 'N' or anything else for no optimization, list of (x, y)
+                    locations, (x, y) start point used by the 'N' type, time budget in seconds for the 'M' and 'N'
+                    types)
+    :return:        tuple (list of the locations indexes in the order they are visited, the path lengths before and
+                    after the optimization for the 'N' type or None for the others)
+    """
+    opt_type, locations, start, opt_time = job
+
+    if opt_type == 'M':
+        return ortools_drill_path(locations, metaheuristic=True, opt_time=opt_time), None
+    if opt_type == 'B':
+        return ortools_drill_path(locations), None
+    if opt_type == 'T':
+        return nearest_neighbour_drill_path(locations), None
+    if opt_type == 'N':
+        optimized_path, initial_length, optimized_length = optimize_drill_path((locations, start, opt_time))
+        return optimized_path, (initial_length, optimized_length)
+    return list(range(len(locations))), None
+
+
+class PolygonClearer(Geometry):
+    """
+    A Geometry without the app, used to clear polygons in the process pool. There is no GUI to process the events
+    of and the abort is checked by the process that collects the results.
+    """
+
+    def __init__(self):
+        # the Geometry init needs the app so it is not called
+        pass
+
+    def clearing_step(self):
+        pass
+
+
+def clear_polygon_task(job):
+    """
+    Clears a polygon. It is a module level function so it can be used by the process pool.
+
+    :param job:     a tuple (polygon, tooldia, steps_per_circle, method, overlap, connect, contour); see
+                    Geometry.clear_polygon_by_method()
+    :return:        tuple (list of toolpaths or None if the polygon could not be cleared, list of the names of the
+                    methods that were tried)
+    """
+    polygon, tooldia, steps_per_circle, method, overlap, connect, contour = job
+    tried = []
+    try:
+        cp = PolygonClearer().clear_polygon_by_method(polygon, tooldia, steps_per_circle, method=method,
+                                                      overlap=overlap, connect=connect, contour=contour, tried=tried)
+    except Exception as err:
+        log.debug("camlib.clear_polygon_task() --> %s" % str(err))
+        return None, tried
+    return (list(cp.get_objects()) if cp and cp.objects else None), tried
+
+
 def arc(center, radius, start, stop, direction, steps_per_circ):
     """
     Creates a list of point along the specified arc.
@@ -8098,6 +9482,40 @@ def arc(center, radius, start, stop, direction, steps_per_circ):
     return points
 
 
+def arc_array(center, radius, start, stop, direction, steps_per_circ):
+    """
+    Same as arc() but the points are computed at once and returned as a numpy array.
+
+    :param center:          Coordinates of the center [x, y]
+    :type center:           list
+    :param radius:          Radius of the arc.
+    :type radius:           float
+    :param start:           Starting angle in radians
+    :type start:            float
+    :param stop:            End angle in radians
+    :type stop:             float
+    :param direction:       Orientation of the arc, "CW" or "CCW"
+    :type direction:        string
+    :param steps_per_circ:  Number of straight line segments to
+                            represent a circle.
+    :type steps_per_circ:   int
+    :return:                The desired arc, as an array of shape (N, 2)
+    :rtype:                 numpy.ndarray
+    """
+    da_sign = {"cw": -1.0, "ccw": 1.0}
+    if direction == "ccw" and stop <= start:
+        stop += 2 * np.pi
+    if direction == "cw" and stop >= start:
+        stop -= 2 * np.pi
+
+    angle = abs(stop - start)
+
+    steps = max([int(np.ceil(angle / (2 * np.pi) * steps_per_circ)), 2])
+    delta_angle = da_sign[direction] * angle * 1.0 / steps
+    theta = start + delta_angle * np.arange(steps + 1)
+    return np.column_stack((center[0] + radius * np.cos(theta), center[1] + radius * np.sin(theta)))
+
+
 def arc2(p1, p2, center, direction, steps_per_circ):
     r = np.sqrt((center[0] - p1[0]) ** 2 + (center[1] - p1[1]) ** 2)
     start = np.arctan2(p1[1] - center[1], p1[0] - center[0])
@@ -8566,6 +9984,10 @@ class FlatCAMRTree(object):
         # object in obj2points.
         self.points2obj = []
 
+        # Index of the objects bounding boxes, the id in the index is the object id. It is made at the first search
+        # by bounds (see FlatCAMRTreeStorage.objects_in_bounds()) and kept updated after that
+        self.bounds_rti = None
+
         self.get_points = lambda go: go.coords
 
     def grow_obj2points(self, idx):
@@ -8585,23 +10007,50 @@ class FlatCAMRTree(object):
             for i in range(len(self.obj2points), idx + 1):
                 self.obj2points.append([])
 
+    @staticmethod
+    def points_bounds(points):
+        """
+        The bounding box of an object, as it is stored in the bounds index: the bounds of its indexed points.
+
+        :param points:  the points of the object
+        :return:        (xmin, ymin, xmax, ymax) or None if there are no points
+        """
+        if not points:
+            return None
+        xs = [pt[0] for pt in points]
+        ys = [pt[1] for pt in points]
+        return min(xs), min(ys), max(xs), max(ys)
+
     def insert(self, objid, obj):
         self.grow_obj2points(objid)
         self.obj2points[objid] = []
 
-        for pt in self.get_points(obj):
+        points = list(self.get_points(obj))
+        for pt in points:
             self.rti.insert(len(self.points2obj), (pt[0], pt[1], pt[0], pt[1]), obj=objid)
             self.obj2points[objid].append(len(self.points2obj))
             self.points2obj.append(objid)
 
+        if self.bounds_rti is not None:
+            bounds = self.points_bounds(points)
+            if bounds is not None:
+                self.bounds_rti.insert(objid, bounds)
+
     def remove_obj(self, objid, obj):
+        points = list(self.get_points(obj))
+
         # Use all ptids to delete from index
-        for i, pt in enumerate(self.get_points(obj)):
+        for i, pt in enumerate(points):
             try:
                 self.rti.delete(self.obj2points[objid][i], (pt[0], pt[1], pt[0], pt[1]))
             except IndexError:
                 pass
 
+        if self.bounds_rti is not None:
+            bounds = self.points_bounds(points)
+            if bounds is not None:
+                self.bounds_rti.delete(objid, bounds)
+
     def nearest(self, pt):
         """
         Will raise StopIteration if no items are found.
@@ -8664,9 +10113,52 @@ class FlatCAMRTreeStorage(FlatCAMRTree):
         # Remove from index
         self.remove_obj(objidx, obj)
 
+    def update(self, obj, old_obj):
+        """
+        Indexes again an object whose points changed.
+
+        :param obj:     the stored object
+        :param old_obj: an object with the points and the bounds that the object had when it was indexed; they are
+                        needed to remove them from the index
+        :return:        None
+        """
+        objidx = self.indexes[id(obj)]
+        self.remove_obj(objidx, old_obj)
+        super().insert(objidx, obj)
+
     def get_objects(self):
         return (o for o in self.objects if o is not None)
 
+    def make_bounds_index(self):
+        """
+        Makes the index of the objects bounding boxes, loading all the stored objects at once.
+
+        :return:    None
+        """
+        def stream():
+            for idx, obj in enumerate(self.objects):
+                if obj is None:
+                    continue
+                bounds = self.points_bounds(list(self.get_points(obj)))
+                if bounds is not None:
+                    yield idx, bounds, None
+
+        items = list(stream())
+        self.bounds_rti = rtindex.Index(iter(items)) if items else rtindex.Index()
+
+    def objects_in_bounds(self, bounds):
+        """
+        The objects whose bounding box intersects the given bounds, in the order they were stored.
+
+        :param bounds:  (xmin, ymin, xmax, ymax)
+        :return:        list of objects
+        """
+        if self.bounds_rti is None:
+            self.make_bounds_index()
+
+        return [self.objects[idx] for idx in sorted(set(self.bounds_rti.intersection(bounds)))
+                if self.objects[idx] is not None]
+
     def nearest(self, pt):
         """
         Returns the nearest matching points and the object
@@ -8680,6 +10172,92 @@ class FlatCAMRTreeStorage(FlatCAMRTree):
         tidx = super(FlatCAMRTreeStorage, self).nearest(pt)
         return (tidx.bbox[0], tidx.bbox[1]), self.objects[tidx.object]
 
+
+class FlatCAMEndpointStorage:
+    """
+    Storage for paths (objects with a "coords" property) indexed by their first and last points in a grid of
+    buckets (see PointGrid). It has the interface of FlatCAMRTreeStorage, with get_points() returning the end points
+    of the paths, but finding and removing the paths does not slow down as the storage is emptied.
+    """
+
+    def __init__(self):
+        self.objects = []
+
+        # id() of the objects -> index in self.objects; see the note in FlatCAMRTreeStorage.insert()
+        self.indexes = {}
+
+        # made at the first search, from the objects stored then
+        self.grid = None
+        # for each object the indexes of its end points in the grid
+        self.obj2points = []
+        # for each point in the grid the index of its object
+        self.points2obj = []
+
+    def insert(self, obj):
+        self.objects.append(obj)
+        idx = len(self.objects) - 1
+        self.indexes[id(obj)] = idx
+
+        self.obj2points.append([])
+        if self.grid is not None:
+            self.index_obj(idx)
+
+    def index_obj(self, idx):
+        for x, y in self.get_points(self.objects[idx]):
+            self.obj2points[idx].append(self.grid.add(x, y))
+            self.points2obj.append(idx)
+
+    @staticmethod
+    def get_points(obj):
+        return [obj.coords[0], obj.coords[-1]]
+
+    def make_grid(self):
+        points = []
+        for idx, obj in enumerate(self.objects):
+            if obj is None:
+                continue
+            for pt in self.get_points(obj):
+                self.obj2points[idx].append(len(points))
+                self.points2obj.append(idx)
+                points.append(pt)
+
+        if points:
+            self.grid = PointGrid(points)
+
+    def remove(self, obj):
+        objidx = self.indexes.pop(id(obj))
+        self.objects[objidx] = None
+
+        if self.grid is not None:
+            for pt_idx in self.obj2points[objidx]:
+                self.grid.remove(pt_idx)
+        self.obj2points[objidx] = []
+
+    def get_objects(self):
+        return (o for o in self.objects if o is not None)
+
+    def nearest(self, pt):
+        """
+        Returns the nearest end point and the object it belongs to.
+        Will raise StopIteration if the storage is empty.
+
+        :param pt:  Query point.
+        :return:    (match_x, match_y), Object owner of matching point.
+        :rtype:     tuple
+        """
+        if self.grid is None:
+            self.make_grid()
+            if self.grid is None:
+                raise StopIteration
+
+        pt_idx = self.grid.nearest(pt[0], pt[1])
+        if pt_idx is None:
+            raise StopIteration
+
+        x, y = self.grid.pts[pt_idx]
+        return (x, y), self.objects[self.points2obj[pt_idx]]
+
+
 # class myO:
 #     def __init__(self, coords):
 #         self.coords = coords
@@ -99,6 +99,8 @@ class FlatCAMDefaults:
         "global_compression_level": 3,
         "global_autosave": False,
         "global_autosave_timeout": 300000,
+        "global_parse_cache": False,
+        "global_parse_cache_size": 500,     # Size limit of the parse cache in MB.
 
         "global_tpdf_tmargin": 15.0,
         "global_tpdf_bmargin": 10.0,
@@ -207,6 +209,7 @@ class FlatCAMDefaults:
         "gerber_delayed_buffering": True,
         "gerber_simplification": False,
         "gerber_simp_tolerance": 0.0005,
+        "gerber_parallel_parsing": True,
 
         # Gerber Export
         "gerber_exp_units": 'IN',
@@ -627,6 +630,7 @@ class FlatCAMDefaults:
 
         # Optimal Tool
         "tools_opt_precision": 4,
+        "tools_opt_distances": 10,
 
         # Check Rules Tool
         "tools_cr_trace_size": True,
@@ -226,6 +226,22 @@ G00 Z{z_toolchange}
         return ('G01 ' + self.position_code(p)).format(**p) + \
                ' F' + str(self.feedrate_format % (p.fr_decimals, p.feedrate))
 
+    def compile_code(self, fun, p):
+        if fun not in ('rapid_code', 'linear_code'):
+            return super().compile_code(fun, p)
+
+        template = ('G00 ' if fun == 'rapid_code' else 'G01 ') + \
+            'X' + self.coordinate_format + ' Y' + self.coordinate_format
+        if fun == 'linear_code':
+            # the feedrate is the same for all the moves
+            template += (' F' + str(self.feedrate_format % (p.fr_decimals, p.feedrate))).replace('%', '%%')
+        decimals = p.coords_decimals
+
+        def formatter(x, y):
+            return template % (decimals, x, decimals, y)
+
+        return formatter
+
     def end_code(self, p):
         coords_xy = p['xy_end']
         gcode = ('G00 Z' + self.feedrate_format % (p.fr_decimals, p.z_end) + "\n")
@@ -1,6 +1,5 @@
 from tclCommands.TclCommand import TclCommand
-
-import shapely.affinity as affinity
+from camlib import PanelInstances
 
 import logging
 from copy import deepcopy
@@ -198,17 +197,11 @@ class TclCommandPanelize(TclCommand):
             if obj is not None:
                 self.app.inform.emit("Generating panel ... Please wait.")
 
-                def job_init_excellon(obj_fin, app_obj):
-                    currenty = 0.0
-
-                    obj_fin.tools = obj.tools.copy()
-                    if 'drills' not in obj_fin.tools:
-                        obj_fin.tools['drills'] = []
-                    if 'slots' not in obj_fin.tools:
-                        obj_fin.tools['slots'] = []
-                    if 'solid_geometry' not in obj_fin.tools:
-                        obj_fin.tools['solid_geometry'] = []
+                # the panel keeps the geometry of the source object once and the placements of the copies
+                instances = PanelInstances.grid(rows, columns, lenghtx, lenghty, source_bounds=obj.bounds())
+                board_solid = PanelInstances.board_elements(obj.solid_geometry)
 
+                def job_init_excellon(obj_fin, app_obj):
                     for option in obj.options:
                         if option != 'name':
                             try:
@@ -217,70 +210,21 @@ class TclCommandPanelize(TclCommand):
                                 app_obj.log.warning("Failed to copy option: %s" % str(option))
                                 app_obj.log.debug("TclCommandPanelize.execute().panelize2() --> %s" % str(e))
 
-                    for row in range(rows):
-                        currentx = 0.0
-                        for col in range(columns):
-                            if 'drills' in obj.tools:
-                                for drill_pt in obj.tools['drills']:
-                                    point_offseted = affinity.translate(drill_pt, currentx, currenty)
-                                    obj_fin.tools['drills'].append(point_offseted)
-                            if 'slots' in obj.tools:
-                                for slot_tuple in obj.tools['slots']:
-                                    start_offseted = affinity.translate(slot_tuple[0], currentx, currenty)
-                                    stop_offseted = affinity.translate(slot_tuple[1], currentx, currenty)
-                                    obj_fin.tools['slots'].append(
-                                        (start_offseted, stop_offseted)
-                                    )
-                            currentx += lenghtx
-                        currenty += lenghty
-
-                    obj_fin.create_geometry()
+                    obj_fin.set_panel(instances, {'solid_geometry': board_solid},
+                                      {'tools': (deepcopy(obj.tools), ['drills', 'slots', 'solid_geometry'])})
                     obj_fin.zeros = obj.zeros
                     obj_fin.units = obj.units
 
                 def job_init_geometry(obj_fin, app_obj):
-                    currentx = 0.0
-                    currenty = 0.0
-
-                    def translate_recursion(geom):
-                        if type(geom) == list:
-                            geoms = []
-                            for local_geom in geom:
-                                geoms.append(translate_recursion(local_geom))
-                            return geoms
-                        else:
-                            return affinity.translate(geom, xoff=currentx, yoff=currenty)
-
-                    obj_fin.solid_geometry = []
-
                     if obj.kind == 'geometry':
                         obj_fin.multigeo = obj.multigeo
                         obj_fin.tools = deepcopy(obj.tools)
                         if obj.multigeo is True:
-                            for tool in obj.tools:
-                                obj_fin.tools[tool]['solid_geometry'][:] = []
-
-                    for row in range(rows):
-                        currentx = 0.0
-
-                        for col in range(columns):
-                            if obj.kind == 'geometry':
-                                if obj.multigeo is True:
-                                    for tool in obj.tools:
-                                        obj_fin.tools[tool]['solid_geometry'].append(translate_recursion(
-                                            obj.tools[tool]['solid_geometry'])
-                                        )
-                                else:
-                                    obj_fin.solid_geometry.append(
-                                        translate_recursion(obj.solid_geometry)
-                                    )
-                            else:
-                                obj_fin.solid_geometry.append(
-                                    translate_recursion(obj.solid_geometry)
-                                )
-
-                            currentx += lenghtx
-                        currenty += lenghty
+                            obj_fin.solid_geometry = []
+                            obj_fin.set_panel(instances, {}, {'tools': (obj_fin.tools, ['solid_geometry'])})
+                            return
+
+                    obj_fin.set_panel(instances, {'solid_geometry': board_solid})
 
                 if obj.kind == 'excellon':
                     self.app.app_obj.new_object("excellon", outname, job_init_excellon, plot=False, autoselected=True)
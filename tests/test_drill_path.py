@@ -0,0 +1,52 @@
+import unittest
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from camlib import CNCjob, optimize_drill_path, drill_path_task
+
+
+class DrillPathTest(unittest.TestCase):
+
+    def test_visits_all(self):
+        locations = [(x * 2.0, (x * 7) % 5) for x in range(40)]
+        path, initial_length, optimized_length = optimize_drill_path((locations, (0, 0), 1))
+
+        self.assertEqual(sorted(path), list(range(len(locations))))
+        self.assertLessEqual(optimized_length, initial_length)
+
+    def test_empty(self):
+        self.assertEqual(optimize_drill_path(([], (0, 0), 1)), ([], 0.0, 0.0))
+        self.assertEqual(drill_path_task(('N', [], None, 1)), ([], (0.0, 0.0)))
+
+
+class DrillOrdersTest(unittest.TestCase):
+    """
+    CNCjob.drill_orders() on a job without the application; the paths are optimized in this process.
+    """
+
+    def setUp(self):
+        app = SimpleNamespace(abort_flag=False, pool=SimpleNamespace(map=lambda fcn, jobs: list(map(fcn, jobs))),
+                              inform=SimpleNamespace(emit=lambda msg: None), dec_format=lambda val, dec: round(val, dec))
+        self.job = SimpleNamespace(app=app, decimals=4, units='MM', drill_order_cache=OrderedDict(),
+                                   drill_order_cache_size=CNCjob.drill_order_cache_size)
+
+    def drill_orders(self, locations_list, opt_type, start=None):
+        return CNCjob.drill_orders(self.job, locations_list, opt_type, start=start, opt_time=1)
+
+    def test_tool_without_locations(self):
+        locations = [(0, 0), (5, 0), (1, 0)]
+        for start in (None, (0, 0)):
+            orders = self.drill_orders([[], locations], 'N', start=start)
+            self.assertEqual(orders[0], [])
+            self.assertEqual(sorted(orders[1]), [0, 1, 2])
+
+    def test_cache(self):
+        locations = [(0, 0), (3, 0), (1, 0), (2, 0)]
+        first = self.drill_orders([locations], 'N', start=(0, 0))
+        self.assertEqual(len(self.job.drill_order_cache), 1)
+        self.assertEqual(self.drill_orders([locations], 'N', start=(0, 0)), first)
+        self.assertEqual(len(self.job.drill_order_cache), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
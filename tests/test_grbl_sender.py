@@ -0,0 +1,124 @@
+import os
+import time
+import threading
+import unittest
+
+import serial
+from PyQt5 import QtCore
+
+from appCommon.GrblSender import GrblSender
+
+
+class FakeGrbl(threading.Thread):
+    """
+    A GRBL stand-in on the master side of a pty: it keeps the received characters in a 128 bytes RX buffer,
+    executes a line each `line_time` seconds and answers with 'ok' (or 'error:20' for the lines with 'BAD').
+    """
+
+    def __init__(self, fd, line_time=0.0005):
+        super().__init__(daemon=True)
+        self.fd = fd
+        self.line_time = line_time
+        self.rx = b''
+        self.max_rx = 0
+        self.lines = []
+        self.realtime = []
+        self.running = True
+
+    def run(self):
+        while self.running:
+            try:
+                data = os.read(self.fd, 256)
+            except OSError:
+                return
+            for char in data:
+                char = bytes([char])
+                if char in (b'?', b'!', b'~', b'\x18'):
+                    self.realtime.append(char)
+                    if char == b'?':
+                        self.answer(b'<Idle|MPos:0.000,0.000,0.000>')
+                    continue
+                self.rx += char
+            self.max_rx = max(self.max_rx, len(self.rx))
+
+            while b'\n' in self.rx:
+                line, self.rx = self.rx.split(b'\n', 1)
+                time.sleep(self.line_time)
+                self.lines.append(line.decode())
+                self.answer(b'error:20' if b'BAD' in line else b'ok')
+
+    def answer(self, text):
+        try:
+            os.write(self.fd, text + b'\r\n')
+        except OSError:
+            self.running = False
+
+
+class GrblSenderTest(unittest.TestCase):
+
+    def setUp(self):
+        if not hasattr(os, 'openpty'):
+            self.skipTest("A pty is needed.")
+
+        master, slave = os.openpty()
+        self.grbl = FakeGrbl(master)
+        self.grbl.start()
+        self.port = serial.Serial(os.ttyname(slave), 115200, timeout=0.05)
+        self.master = master
+        self.slave = slave
+
+    def tearDown(self):
+        self.grbl.running = False
+        self.port.close()
+        os.close(self.slave)
+        # with the slave side closed the read on the master fails and the thread ends; it has to end before the
+        # master fd is closed, otherwise it would read from the pty of the next test, which can get the same fd
+        self.grbl.join(5)
+        os.close(self.master)
+
+    def test_stream(self):
+        lines = ['G21', 'G90 (absolute)', '', '; comment'] + \
+                ['G01 X%.4f Y%.4f F100' % (i * 0.1, i * 0.2) for i in range(2000)]
+
+        sender = GrblSender(self.port)
+        sender.start(lines)
+        self.assertTrue(sender.wait(30))
+
+        self.assertTrue(sender.result)
+        self.assertEqual(sender.acked_lines, 2002)
+        self.assertEqual(self.grbl.lines[:2], ['G21', 'G90'])
+        self.assertEqual(self.grbl.lines[-1], 'G01X199.9000Y399.8000F100')
+        self.assertLessEqual(self.grbl.max_rx, GrblSender.RX_BUFFER_SIZE)
+        # the buffer is kept full: many lines are sent before the first answer
+        self.assertGreater(self.grbl.max_rx, GrblSender.RX_BUFFER_SIZE - 30)
+
+    def test_error_stops(self):
+        lines = ['G01 X%d' % i for i in range(50)] + ['BAD'] + ['G01 Y%d' % i for i in range(500)]
+
+        sender = GrblSender(self.port)
+        sender.start(lines)
+        self.assertTrue(sender.wait(30))
+
+        self.assertFalse(sender.result)
+        self.assertEqual(sender.errors[0], (51, 'error:20'))
+        self.assertLess(len(self.grbl.lines), 551)
+
+    def test_realtime(self):
+        received = []
+        lines = ['G01 X%d' % i for i in range(300)]
+
+        sender = GrblSender(self.port)
+        sender.line_received.connect(received.append, QtCore.Qt.DirectConnection)
+        sender.start(lines)
+        sender.realtime('status')
+        sender.realtime('hold')
+        sender.realtime(b'~')
+        self.assertTrue(sender.wait(30))
+
+        self.assertTrue(sender.result)
+        self.assertEqual(self.grbl.realtime, [b'?', b'!', b'~'])
+        self.assertIn('<Idle|MPos:0.000,0.000,0.000>', received)
+
+
+if __name__ == '__main__':
+    unittest.main()
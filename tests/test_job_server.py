@@ -0,0 +1,128 @@
+import os
+import time
+import tempfile
+import threading
+import unittest
+
+from appCommon.JobServer import JobServer, JobClient, parse_address, load_authkey
+
+
+class JobServerTest(unittest.TestCase):
+    """
+    Runs a job server with two workers (each one a headless FlatCAM application) and sends it Tcl scripts over a
+    Unix socket.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        if not hasattr(os, 'fork'):
+            raise unittest.SkipTest("A Unix socket is needed.")
+
+        cls.folder = tempfile.TemporaryDirectory()
+        cls.address = os.path.join(cls.folder.name, 'jobs')
+        cls.server = JobServer(cls.address, workers=2, jobs_per_worker=3)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+        for __ in range(100):
+            if os.path.exists(cls.address):
+                break
+            time.sleep(0.1)
+        cls.client = JobClient(cls.address)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.shutdown()
+        cls.thread.join(60)
+        cls.folder.cleanup()
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address('localhost:5000'), ('localhost', 5000))
+        self.assertEqual(parse_address(':5000'), ('localhost', 5000))
+        self.assertEqual(parse_address('/tmp/jobs'), '/tmp/jobs')
+
+    def test_isolated_jobs(self):
+        ids = [self.client.submit('set a %d\nnew_geometry geo_%d\nget_names' % (i, i), name='board%d' % i)
+               for i in range(8)]
+        results = [self.client.result(job_id) for job_id in ids]
+
+        for i, result in enumerate(results):
+            self.assertEqual(result['state'], 'done')
+            self.assertEqual(result['name'], 'board%d' % i)
+            # only the object made by this job
+            self.assertEqual(result['result'], 'geo_%d' % i)
+            self.assertGreaterEqual(result['wait_time'], 0)
+            self.assertGreater(result['run_time'], 0)
+
+        # the workers are replaced after 3 jobs
+        self.assertGreater(len(set(r['worker'] for r in results)), 2)
+
+        # the variables of the previous jobs are gone
+        self.assertEqual(self.client.run('info exists a')['result'], '0')
+
+        # the result is delivered once
+        with self.assertRaises(RuntimeError):
+            self.client.result(ids[0])
+
+    def test_failed_job(self):
+        result = self.client.run('set a 1\nno_such_command 1')
+        self.assertEqual(result['state'], 'failed')
+        self.assertIn('invalid command name "no_such_command"', result['error'])
+
+        # the worker goes on with the next jobs
+        self.assertEqual(self.client.run('expr 6 * 7')['result'], '42')
+
+    def test_cwd(self):
+        result = self.client.run('pwd', cwd=self.folder.name)
+        self.assertEqual(os.path.realpath(result['result']), os.path.realpath(self.folder.name))
+
+    def test_status(self):
+        status = self.client.status()
+        self.assertEqual(status['workers'], 2)
+        self.assertEqual(status['queued'], 0)
+
+
+class JobServerKeyTest(unittest.TestCase):
+    """
+    The key of a server listening on a TCP address.
+    """
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.key_file = os.path.join(self.folder.name, 'jobs.key')
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_new_key(self):
+        key = load_authkey(self.key_file, create=True)
+        self.assertGreaterEqual(len(key), 32)
+        if os.name == 'posix':
+            self.assertEqual(os.stat(self.key_file).st_mode & 0o777, 0o600)
+
+        # the existing key is kept
+        self.assertEqual(load_authkey(self.key_file, create=True), key)
+        self.assertEqual(load_authkey(self.key_file), key)
+
+    def test_missing_key(self):
+        with self.assertRaises(FileNotFoundError):
+            load_authkey(self.key_file)
+
+    @unittest.skipUnless(os.name == 'posix', "File permissions are needed.")
+    def test_shared_key_file(self):
+        with open(self.key_file, 'w') as f:
+            f.write('secret')
+        os.chmod(self.key_file, 0o644)
+        with self.assertRaises(PermissionError):
+            load_authkey(self.key_file)
+
+    def test_tcp_server_key(self):
+        server = JobServer(('localhost', 0), workers=1, key_file=self.key_file)
+        self.assertEqual(server.authkey, load_authkey(self.key_file))
+
+        # a Unix socket or a named pipe does not need one
+        self.assertIsNone(JobServer(os.path.join(self.folder.name, 'jobs'), workers=1).authkey)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+from shapely.geometry import box
+
+from camlib import min_distances
+
+
+class MinDistancesTest(unittest.TestCase):
+
+    def test_grid(self):
+        boxes = [box(x * 3, y * 3, x * 3 + 2, y * 3 + 2) for x in range(10) for y in range(10)]
+        min_dict = min_distances(boxes, 4, top_k=2)
+        self.assertEqual(list(min_dict.keys()), [1.0, 1.4142])
+
+    def test_no_distances(self):
+        self.assertEqual(min_distances([box(0, 0, 1, 1)], 4), {})
+        # the empty elements are skipped
+        self.assertEqual(min_distances([box(0, 0, 1, 1), box(0, 0, 1, 1).difference(box(-1, -1, 2, 2))], 4), {})
+
+    def test_abort(self):
+        class Abort(Exception):
+            pass
+
+        def progress(disp_number):
+            raise Abort()
+
+        boxes = [box(x * 3, 0, x * 3 + 2, 2) for x in range(10)]
+        with self.assertRaises(Abort):
+            min_distances(boxes, 4, progress=progress)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import sys
+import tempfile
+import unittest
+from copy import deepcopy
+
+from shapely.geometry import LineString
+
+
+class SolderPasteProjectTest(unittest.TestCase):
+    """
+    Saves a project that holds a solder paste CNCJob and opens it back.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+            os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+        from PyQt5 import QtWidgets
+
+        sys.argv = sys.argv[:1]
+        from app_Main import App
+
+        App.cmd_line_headless = 1
+        App.cmd_line_shellfile = ''
+        App.cmd_line_shellvar = ''
+        App.args = []
+
+        cls.qapp = QtWidgets.QApplication.instance() or QtWidgets.QApplication(['FlatCAM'])
+        cls.fc = App(qapp=cls.qapp)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fc.pool.terminate()
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.fc.f_handlers.on_file_new(cli=True)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def make_paste_geometry(self):
+        from defaults import FlatCAMDefaults
+
+        # the nozzle tool is made here from the factory defaults: the app defaults after a new project do not have the
+        # form values set_tool_ui() expects
+        data = {k: v for k, v in FlatCAMDefaults.factory_defaults.items() if k.startswith('tools_solderpaste_')}
+
+        def geo_init(geo_obj, app_obj):
+            geo_obj.options.update(data)
+            geo_obj.solid_geometry = []
+            geo_obj.multigeo = True
+            geo_obj.multitool = True
+            geo_obj.special_group = 'solder_paste_tool'
+            geo_obj.tools = {
+                1: {
+                    'tooldia': 1.0,
+                    'data': deepcopy(data),
+                    'solid_geometry': [LineString([(0, 0), (2, 0)]), LineString([(5, 5), (5, 8)])],
+                    'offset': 'Path',
+                    'offset_value': 0.0,
+                    'type': 'SolderPaste',
+                    'tool_type': 'DN'
+                }
+            }
+
+        self.fc.app_obj.new_object("geometry", "board_solderpaste", geo_init, plot=False)
+        return self.fc.collection.get_by_name("board_solderpaste")
+
+    def test_save_solderpaste_job(self):
+        from appCommon.ProjectFile import ProjectReader
+
+        geo_obj = self.make_paste_geometry()
+        self.fc.paste_tool.on_create_gcode(name="board_cnc_solderpaste", workobject=geo_obj, use_thread=False)
+
+        job_obj = self.fc.collection.get_by_name("board_cnc_solderpaste")
+        self.assertIsNotNone(job_obj)
+        gcode_parsed = job_obj.cnc_tools[1]['gcode_parsed']
+        self.assertIsInstance(gcode_parsed, list)
+        self.assertTrue(all('geom' in geo and 'kind' in geo for geo in gcode_parsed))
+
+        filename = os.path.join(self.folder.name, 'solderpaste.FlatPrj')
+        self.fc.f_handlers.save_project(filename, silent=True)
+
+        with ProjectReader(filename) as project:
+            names = [item['name'] for item in project.index]
+            self.assertIn("board_cnc_solderpaste", names)
+
+            d = project.load_object("board_cnc_solderpaste")
+            saved_tools = d['cnc_tools']
+            saved_parsed = list(saved_tools.values())[0]['gcode_parsed']
+            self.assertEqual(len(saved_parsed), len(gcode_parsed))
+            self.assertEqual(saved_parsed[0]['geom'], gcode_parsed[0]['geom'])
+
+
+if __name__ == '__main__':
+    unittest.main()
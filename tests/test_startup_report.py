@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from appCommon.StartupReport import StartupReport
+
+
+class StartupReportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.folder.name, 'startup_outer.py'), 'w') as f:
+            f.write("import time\nimport startup_inner\ntime.sleep(0.02)\n")
+        with open(os.path.join(self.folder.name, 'startup_inner.py'), 'w') as f:
+            f.write("import time\ntime.sleep(0.05)\nVALUE = 42\n")
+        sys.path.insert(0, self.folder.name)
+        self.report = StartupReport()
+
+    def tearDown(self):
+        self.report.stop()
+        sys.path.remove(self.folder.name)
+        for name in ('startup_outer', 'startup_inner'):
+            sys.modules.pop(name, None)
+        self.folder.cleanup()
+
+    def test_imports(self):
+        self.report.start()
+        import startup_outer
+        self.report.mark("import")
+        self.report.stop()
+
+        self.assertEqual(startup_outer.startup_inner.VALUE, 42)
+        # the module has its own loader, not the one of the report
+        self.assertNotIn('LoaderProxy', type(startup_outer.__loader__).__name__)
+
+        outer_total, outer_self = self.report.modules['startup_outer']
+        inner_total, inner_self = self.report.modules['startup_inner']
+        self.assertGreaterEqual(inner_self, 0.05)
+        self.assertGreaterEqual(outer_total, inner_total + 0.02)
+        self.assertLess(outer_self, inner_total)
+
+        text = self.report.report()
+        self.assertIn("import", text)
+        self.assertIn("startup_inner", text)
+
+    def test_not_started(self):
+        self.report.mark("nothing")
+        self.assertEqual(self.report.phases, [])
+        self.assertFalse(self.report.is_active())
+
+
+if __name__ == '__main__':
+    unittest.main()